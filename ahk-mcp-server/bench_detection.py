@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+AHK MCP Server - Detection accuracy and throughput benchmark
+
+Generate a labeled synthetic corpus (scripts + expected window traces):
+    python bench_detection.py generate corpus/ --count 3000 --seed 0
+
+Replay it through the launcher model and the parsing path, and compare
+with the stored baseline (exit code 1 on regression):
+    python bench_detection.py run corpus/
+
+After an intended change in accuracy or speed, store the new numbers:
+    python bench_detection.py run corpus/ --update-baseline
+
+Time the error dialog parser on the corpus's dialogs and on control
+trees captured by recorded runs (AHK_MCP_RECORD traces):
+    python bench_detection.py parse corpus/ --trace traces/corpus.jsonl.gz
+
+`run` and `parse` without a corpus directory generate the baseline's
+corpus in a temporary directory first. Works on any OS (see
+services/detection.py).
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.resolve()
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from ahk_mcp.services.corpus import (
+    bench_parser, collect_control_trees, compare_to_baseline, evaluate, generate_corpus, summarize
+)
+
+BASELINE_PATH = PROJECT_ROOT / "baselines" / "detection.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Detection accuracy/throughput benchmark on a synthetic corpus")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Write a labeled synthetic corpus")
+    gen.add_argument("corpus", help="Output directory")
+    gen.add_argument("--count", type=int, default=3000)
+    gen.add_argument("--seed", type=int, default=0)
+
+    run = sub.add_parser("run", help="Evaluate a corpus and compare with the baseline")
+    run.add_argument("corpus", nargs="?", help="Corpus directory (default: generate the baseline's corpus)")
+    run.add_argument("--baseline", default=str(BASELINE_PATH))
+    run.add_argument("--update-baseline", action="store_true", help="Store this report as the new baseline")
+    run.add_argument("--timeout-ms", type=int, default=3000)
+    run.add_argument("--throughput-tolerance", type=float, help="Allowed throughput drop (0.5 = 50%%; 1 disables)")
+    run.add_argument("--json", action="store_true", help="Print the full report as JSON")
+
+    bench = sub.add_parser("parse", help="Benchmark the error dialog parser")
+    bench.add_argument("corpus", nargs="?", help="Corpus directory (default: generate the baseline's corpus)")
+    bench.add_argument("--trace", action="append", default=[], help="Recorded trace with captured control trees (repeatable)")
+    bench.add_argument("--baseline", default=str(BASELINE_PATH))
+    bench.add_argument("--rounds", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        labels = generate_corpus(args.corpus, args.count, args.seed)
+        print(f"Wrote {args.count} scripts and {labels}")
+        return
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else None
+
+    corpus = args.corpus
+    if corpus is None and not (args.command == "parse" and args.trace):
+        params = (baseline or {}).get("corpus") or {"count": 3000, "seed": 0}
+        corpus = tempfile.mkdtemp(prefix="ahk-corpus-")
+        generate_corpus(corpus, params["count"], params["seed"])
+
+    if args.command == "parse":
+        print(json.dumps(bench_parser(collect_control_trees(corpus, tuple(args.trace)), args.rounds), indent=2))
+        return
+
+    report = evaluate(corpus, args.timeout_ms)
+    print(json.dumps(report, indent=2) if args.json else summarize(report))
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline written to {baseline_path}")
+        return
+    if baseline is None:
+        print(f"\nNo baseline at {baseline_path} (store one with --update-baseline)")
+        return
+
+    tolerances = {}
+    if args.throughput_tolerance is not None:
+        tolerances["throughput"] = args.throughput_tolerance
+    regressions = compare_to_baseline(report, baseline, tolerances)
+    if regressions:
+        print("\nREGRESSIONS against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\nNo regression against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+AHK MCP Server - Response format benchmark
+
+Times ahk_run_script per response format for one ERROR result (a 39-line
+source block), with the launcher replaced by the canned result so only the
+server side is measured (run artifacts go to a temporary directory):
+
+    python bench_formatting.py
+    python bench_formatting.py --calls 5000 --token-budget 40
+
+For each format: median microseconds per tool call and response size in
+characters. The steps behind the json/compact formats are also timed on
+their own: decoding the launcher's JSON line (json, and orjson when the
+[fast] extra is installed), validation into RunScriptResult and its
+serialization.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.resolve()
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+# Run artifacts of the benchmark stay out of the real runs/ directory
+RUNS_DIR = tempfile.mkdtemp(prefix="ahk-bench-runs-")
+os.environ["AHK_MCP_RUNS_DIR"] = RUNS_DIR
+
+from ahk_mcp.formatting import build_run_result, render_compact, render_json
+from ahk_mcp.tools import run_script
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ("markdown", "json", "compact")
+
+
+def error_result(source_lines: int = 39, failing: int = 20) -> dict:
+    """Launcher result of a V2 runtime error with a `source_lines` source block."""
+    source = [
+        f"{'--->' if n == failing else '    '}\t{n:03d}: value{n} := Compute(value{n - 1}, {n})"
+        for n in range(1, source_lines + 1)
+    ]
+    return {
+        "status": "ERROR",
+        "message": "Error: Call to nonexistent function.",
+        "executionTimeMs": 412,
+        "scriptPath": "C:\\scripts\\bench.ahk",
+        "ahkVersion": "V2",
+        "trayIcon": "NOT_CHECKED",
+        "errorDetails": {
+            "title": "bench.ahk",
+            "errorContent": ["Error: Call to nonexistent function.", "Specifically: Compute"],
+            "sourceCode": source,
+            "buttons": ["&Abort", "&Help", "&Edit", "&Reload", "E&xitApp"],
+            "line": failing,
+        },
+    }
+
+
+def median_us(fn, calls: int) -> float:
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1e6)
+    return round(statistics.median(times), 1)
+
+
+async def bench_tool(result: dict, calls: int, token_budget) -> dict:
+    async def launcher(**_):
+        return copy.deepcopy(result)
+
+    run_script.run_ahk_launcher = launcher
+    report = {}
+    for format in FORMATS:
+        times = []
+        response = ""
+        for _ in range(calls):
+            start = time.perf_counter()
+            response = await run_script.ahk_run_script(
+                None, result["scriptPath"], "V2", 3000, format, token_budget,
+                snapshot=False, capture_output=False, output_kb=16, inline_images=False
+            )
+            times.append((time.perf_counter() - start) * 1e6)
+        report[format] = {"us": round(statistics.median(times), 1), "chars": len(response)}
+    return report
+
+
+def bench_steps(result: dict, calls: int, token_budget) -> dict:
+    line = json.dumps(result)
+    steps = {"decode.json": median_us(lambda: json.loads(line), calls)}
+    if orjson is not None:
+        steps["decode.orjson"] = median_us(lambda: orjson.loads(line), calls)
+    validated = build_run_result(result, "bench", None, token_budget)
+    steps["validate"] = median_us(lambda: build_run_result(result, "bench", None, token_budget), calls)
+    steps["serialize.json"] = median_us(lambda: render_json(validated), calls)
+    steps["render.compact"] = median_us(lambda: render_compact(result, "bench"), calls)
+    return steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ahk_run_script response formats")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--source-lines", type=int, default=39)
+    parser.add_argument("--token-budget", type=int, default=None)
+    args = parser.parse_args()
+
+    result = error_result(args.source_lines)
+    try:
+        summary = {
+            "tool": asyncio.run(bench_tool(result, args.calls, args.token_budget)),
+            "steps": bench_steps(result, args.calls, args.token_budget),
+            "tokenBudget": args.token_budget,
+        }
+    finally:
+        shutil.rmtree(RUNS_DIR, ignore_errors=True)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+AHK MCP Server - Inline screenshot benchmark
+
+Compares what a visual check costs the client per response mode, for a set
+of screenshots (PNG files, e.g. a run's screenshots/ directory):
+
+    python bench_images.py screenshots/*.png
+    python bench_images.py --synthetic          # a drawn 1920x1080 window
+
+- path: the tool answers with a file path and the client reads the PNG back
+  (second round trip; the full-size PNG goes to the model base64 encoded)
+- inline modes: the image is downscaled and encoded in the server's worker
+  threads and sent with the response (services/image_content.py)
+
+For each mode: median latency, payload bytes on the wire (base64) and
+whether the image fits the inline budget. "maxLoopLagMs" is the longest the
+event loop stalled while the inline encodes ran (off the loop) next to the
+same encodes run on the loop. Needs Pillow (pip install ahk-mcp-server[images]).
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.resolve()
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from ahk_mcp.services.image_content import IMAGE_MAX_BYTES, Image, encode_image, inline_image
+
+MODES = {
+    "png-1280": {"image_format": "png", "max_dim": 1280},
+    "jpeg-q80-1280": {"image_format": "jpeg", "quality": 80, "max_dim": 1280},
+    "jpeg-q60-800": {"image_format": "jpeg", "quality": 60, "max_dim": 800},
+    "webp-q80-1280": {"image_format": "webp", "quality": 80, "max_dim": 1280},
+}
+
+
+def synthetic_window(width: int = 1920, height: int = 1080) -> bytes:
+    """A settings-dialog-like window: title bar, labels, edit boxes, buttons."""
+    from PIL import ImageDraw
+
+    image = Image.new("RGB", (width, height), (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 0, width, 30], fill=(0, 90, 160))
+    draw.text((10, 8), "Settings - script.ahk", fill="white")
+    for i in range((height - 120) // 25):
+        y = 50 + i * 25
+        draw.text((20, y), f"Option {i}: value {i * 37 % 101}", fill="black")
+        draw.rectangle([300, y, 700, y + 18], outline=(120, 120, 120), fill="white")
+        draw.text((305, y + 3), "edit text " * 3, fill=(30, 30, 30))
+    for i in range(6):
+        left = width - 1100 + i * 170
+        draw.rectangle([left, height - 60, left + 150, height - 30], fill=(225, 225, 225), outline="gray")
+        draw.text((left + 30, height - 52), f"Button {i}", fill="black")
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+async def max_loop_lag(work) -> float:
+    """Longest gap (ms) between 1ms ticks of the event loop while `work` runs."""
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            lag = max(lag, (now - last) * 1000 - 1)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)
+    try:
+        await work()
+    finally:
+        done = True
+        await task
+    return round(lag, 1)
+
+
+async def bench(png: bytes, path: Path, rounds: int) -> dict:
+    report = {}
+
+    def read_back():
+        # What the client's Read of the path costs: the file, base64 encoded
+        return base64.b64encode(path.read_bytes()) if path else base64.b64encode(png)
+
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        payload = await asyncio.to_thread(read_back)
+        times.append((time.perf_counter() - start) * 1000)
+    report["path"] = {"ms": round(statistics.median(times), 2), "payloadBytes": len(payload), "roundTrips": 2}
+
+    for mode, options in MODES.items():
+        times = []
+        encoded = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            encoded, _ = await inline_image(png, **options, max_bytes=1 << 30)
+            times.append((time.perf_counter() - start) * 1000)
+        report[mode] = {
+            "ms": round(statistics.median(times), 2),
+            "payloadBytes": len(base64.b64encode(encoded["data"])),
+            "size": f"{encoded['width']}x{encoded['height']}",
+            "fitsBudget": encoded["bytes"] <= IMAGE_MAX_BYTES,
+            "roundTrips": 1,
+        }
+
+    options = MODES["jpeg-q80-1280"]
+
+    async def threaded():
+        await asyncio.gather(*(inline_image(png, **options) for _ in range(4)))
+
+    async def on_loop():
+        for _ in range(4):
+            encode_image(png, **options)
+
+    report["maxLoopLagMs"] = {"threadPool": await max_loop_lag(threaded), "onLoop": await max_loop_lag(on_loop)}
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark path vs inline screenshot responses")
+    parser.add_argument("images", nargs="*", help="PNG screenshots")
+    parser.add_argument("--synthetic", action="store_true", help="Also bench a drawn 1920x1080 window")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if Image is None:
+        parser.error("Pillow is required (pip install ahk-mcp-server[images])")
+    inputs = [(Path(p).name, Path(p).read_bytes(), Path(p)) for p in args.images]
+    if args.synthetic or not inputs:
+        inputs.append(("synthetic-1920x1080", synthetic_window(), None))
+
+    summary = {}
+    for name, png, path in inputs:
+        summary[name] = {"pngBytes": len(png), **asyncio.run(bench(png, path, args.rounds))}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+AHK MCP Server - Cold vs warm startup benchmark
+
+Starts fresh server processes and times the first useful responses
+(ahk://errors/clusters, github://issues and one ahk_run_script ERROR run with
+source mapping), first without a warm-state snapshot, then restoring the
+snapshot the cold process left behind:
+
+    python bench_startup.py --trace traces/corpus.jsonl.gz --script tests/test_include_error.ahk
+
+Runs are served from the trace (replay backend), so this works without
+AutoHotkey; github://issues uses whatever `gh` is on PATH.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.resolve()
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+
+async def first_responses(script: str) -> dict:
+    from fastmcp import Client
+
+    from ahk_mcp.server import mcp
+
+    timings = {}
+    async with Client(mcp) as client:
+        start = time.perf_counter()
+        clusters = (await client.read_resource("ahk://errors/clusters"))[0].text
+        timings["clustersMs"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        await client.read_resource("github://issues")
+        timings["issuesMs"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        await client.call_tool("ahk_run_script", {"script_path": script, "format": "json"})
+        timings["runMs"] = round((time.perf_counter() - start) * 1000, 1)
+    timings["clustersKnown"] = clusters.count("\n| ")
+    return timings
+
+
+def child(script: str) -> None:
+    t0 = time.perf_counter()
+    import ahk_mcp.server  # noqa: F401 - import cost is the same cold or warm
+    from ahk_mcp.services.warm_state import restore_snapshot, save_snapshot
+    imported = time.perf_counter()
+    restored = restore_snapshot()
+    ready = time.perf_counter()
+    timings = asyncio.run(first_responses(script))
+    done = time.perf_counter()
+    save_snapshot()
+    print(json.dumps({
+        "importMs": round((imported - t0) * 1000, 1),
+        "restoreMs": round((ready - imported) * 1000, 1),
+        "firstResponsesMs": round((done - ready) * 1000, 1),
+        "startToResponsesMs": round((done - t0) * 1000, 1),
+        **timings,
+        "restored": restored,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cold vs warm server startup")
+    parser.add_argument("--trace", required=True, help="Trace served by the replay backend")
+    parser.add_argument("--script", required=True, help="Script run through ahk_run_script (should ERROR)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(str(Path(args.script).resolve()))
+        return
+
+    state_file = Path(tempfile.mkdtemp(prefix="ahk-warm-")) / "warm_state.json.gz"
+    env = dict(os.environ, AHK_MCP_STATE_FILE=str(state_file), AHK_MCP_REPLAY=args.trace)
+    cmd = [sys.executable, __file__, "--child", "--trace", args.trace, "--script", args.script]
+
+    results: dict[str, list[dict]] = {"cold": [], "warm": []}
+    for _ in range(args.rounds):
+        for mode in ("cold", "warm"):
+            if mode == "cold":
+                state_file.unlink(missing_ok=True)
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+            results[mode].append(json.loads(out.strip().splitlines()[-1]))
+
+    summary = {}
+    for mode, rounds in results.items():
+        summary[mode] = {
+            key: round(sorted(r[key] for r in rounds)[len(rounds) // 2], 1)
+            for key in ("importMs", "restoreMs", "firstResponsesMs", "clustersMs", "issuesMs", "runMs", "startToResponsesMs")
+        }
+        summary[mode]["clustersKnown"] = rounds[-1]["clustersKnown"]
+    summary["snapshotBytes"] = state_file.stat().st_size if state_file.exists() else 0
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
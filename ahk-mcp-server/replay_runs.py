@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+AHK MCP Server - Record/replay harness for launcher runs
+
+Record the tests/*.ahk corpus with the real launcher (Windows):
+    python replay_runs.py record traces/corpus.jsonl.gz
+
+Replay a trace on any OS, each record issued N times concurrently:
+    python replay_runs.py load traces/corpus.jsonl.gz --amplify 20 --scale 0.1
+
+Load-test the streamable-HTTP server with simulated MCP clients (replay backend):
+    python replay_runs.py clients traces/corpus.jsonl.gz --clients 20 --calls 10 --scale 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.resolve()
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from ahk_mcp.services.trace import enable_replay, load_test, load_trace, record_corpus
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def client_load_test(trace: str, clients: int, calls: int, time_scale: float, parallel: int = 4) -> dict:
+    """
+    Serve the MCP server over streamable HTTP in-process and drive it with
+    `clients` concurrent MCP clients issuing `calls` ahk_run_script calls each,
+    `parallel` at a time (more than the per-client quota, so it is exercised).
+
+    Returns:
+        Dict with throughput, latency percentiles, statuses and the peak run
+        slots held in total and by a single client (quota check)
+    """
+    from fastmcp import Client
+
+    from ahk_mcp.server import mcp
+    from ahk_mcp.services.quotas import run_pool
+
+    enable_replay(trace, time_scale)
+    records = load_trace(trace)
+    port = _free_port()
+    server = asyncio.create_task(mcp.run_http_async(
+        show_banner=False, transport="http", host="127.0.0.1", port=port, path="/mcp", log_level="warning"
+    ))
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            break
+        except OSError:
+            await asyncio.sleep(0.05)
+
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    peak = {"total": 0, "client": 0}
+    done = asyncio.Event()
+
+    async def sample() -> None:
+        while not done.is_set():
+            status = run_pool.status()
+            peak["total"] = max(peak["total"], status["inUse"])
+            peak["client"] = max([peak["client"], *status["clients"].values()])
+            await asyncio.sleep(0.005)
+
+    async def client(i: int) -> None:
+        in_flight = asyncio.Semaphore(parallel)
+
+        async def call(c: Client, j: int) -> None:
+            record = records[(i * calls + j) % len(records)]
+            async with in_flight:
+                start = time.perf_counter()
+                response = await c.call_tool("ahk_run_script", {
+                    "script_path": record["script"],
+                    "version": record["args"].get("version", "Auto"),
+                    "format": "compact",
+                })
+                latencies.append((time.perf_counter() - start) * 1000)
+            status = response.content[0].text.split(" |", 1)[0]
+            statuses[status] = statuses.get(status, 0) + 1
+
+        async with Client(f"http://127.0.0.1:{port}/mcp") as c:
+            await asyncio.gather(*(call(c, j) for j in range(calls)))
+
+    sampler = asyncio.create_task(sample())
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        wall = time.perf_counter() - start
+    finally:
+        done.set()
+        await sampler
+        # uvicorn reports the lifespan cancellation as an error: expected here
+        logging.getLogger("uvicorn.error").setLevel(logging.CRITICAL)
+        server.cancel()
+        try:
+            await server
+        except asyncio.CancelledError:
+            pass
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "runs": len(latencies),
+        "wallS": round(wall, 3),
+        "throughputPerS": round(len(latencies) / wall, 1) if wall else 0.0,
+        "latencyMs": {
+            "p50": round(statistics.median(latencies), 1),
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+            "max": round(latencies[-1], 1),
+        },
+        "statuses": statuses,
+        "peakSlots": {"total": peak["total"], "maxRuns": run_pool.max_runs},
+        "peakSlotsPerClient": {"observed": peak["client"], "quota": run_pool.client_max_runs},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay ahklauncher.ps1 traces")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="Load-test a trace through the replay backend")
+    load.add_argument("trace")
+    load.add_argument("--amplify", type=int, default=1, help="Copies of each record issued concurrently")
+    load.add_argument("--scale", type=float, default=1.0, help="Multiplier applied to recorded wall times")
+    load.add_argument("--concurrency", type=int, default=0, help="Max in-flight runs (0 = unbounded)")
+
+    clients = sub.add_parser("clients", help="Load-test the HTTP server with simulated MCP clients")
+    clients.add_argument("trace")
+    clients.add_argument("--clients", type=int, default=20)
+    clients.add_argument("--calls", type=int, default=10, help="ahk_run_script calls per client")
+    clients.add_argument("--parallel", type=int, default=4, help="Concurrent calls per client")
+    clients.add_argument("--scale", type=float, default=1.0, help="Multiplier applied to recorded wall times")
+
+    rec = sub.add_parser("record", help="Record the tests/*.ahk corpus with the real launcher")
+    rec.add_argument("trace")
+    rec.add_argument("--corpus", default=str(PROJECT_ROOT.parent / "tests"))
+    rec.add_argument("--version", default="Auto")
+    rec.add_argument("--timeout-ms", type=int, default=3000)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)s] %(message)s")
+
+    if args.command == "load":
+        stats = asyncio.run(load_test(args.trace, args.amplify, args.scale, args.concurrency))
+        print(json.dumps(stats, indent=2))
+    elif args.command == "clients":
+        stats = asyncio.run(client_load_test(args.trace, args.clients, args.calls, args.scale, args.parallel))
+        print(json.dumps(stats, indent=2))
+    else:
+        count = asyncio.run(record_corpus(args.trace, args.corpus, args.version, args.timeout_ms))
+        print(f"Recorded {count} script(s) to {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
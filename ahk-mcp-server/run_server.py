@@ -3,7 +3,14 @@
 AHK MCP Server - Entry point
 Standalone entry point that works with absolute path (no cwd needed).
 Compatible with reloaderoo hot-reload.
+
+Transports:
+    python run_server.py                                   # stdio, one client
+    python run_server.py --transport http --port 8848      # many clients on
+                                                           # http://127.0.0.1:8848/mcp
 """
+import argparse
+import os
 import sys
 from pathlib import Path
 
@@ -15,34 +22,12 @@ if str(SRC_PATH) not in sys.path:
 
 # Setup early logging before any imports
 import logging
-from logging.handlers import RotatingFileHandler
-
-log_dir = PROJECT_ROOT / "logs"
-log_dir.mkdir(exist_ok=True)
-
-# Configure logging
-log_file = log_dir / "mcp-server.log"
-handler = RotatingFileHandler(
-    log_file,
-    maxBytes=2 * 1024 * 1024,  # 2MB
-    backupCount=5,
-    encoding="utf-8"
-)
-handler.setFormatter(logging.Formatter(
-    "[%(asctime)s] %(levelname)s [%(name)s]: %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-))
 
-# Setup root logger
-root_logger = logging.getLogger()
-root_logger.addHandler(handler)
-root_logger.setLevel(logging.DEBUG)
+from ahk_mcp.structured_logging import setup_logging
 
-# Also log to stderr for MCP inspector debugging
-stderr_handler = logging.StreamHandler(sys.stderr)
-stderr_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
-stderr_handler.setLevel(logging.INFO)
-root_logger.addHandler(stderr_handler)
+# JSON lines (logs/mcp-server.jsonl, gzip rotation) + stderr for MCP inspector
+# debugging, both written by a background thread
+setup_logging(PROJECT_ROOT / "logs")
 
 logger = logging.getLogger("ahk_mcp")
 logger.info("=" * 50)
@@ -55,10 +40,32 @@ logger.info("=" * 50)
 try:
     from ahk_mcp.server import mcp
     logger.info("Server module loaded successfully")
+
+    # Caches, indexes and issue data from the previous process (hot reload)
+    from ahk_mcp.services.warm_state import restore_snapshot, start_checkpoints
+    restore_snapshot()
+    start_checkpoints()
 except Exception as e:
     logger.exception(f"Failed to import server module: {e}")
     raise
 
 if __name__ == "__main__":
-    logger.info("Starting MCP server...")
-    mcp.run()
+    parser = argparse.ArgumentParser(description="AHK MCP Server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default=os.environ.get("AHK_MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.environ.get("AHK_MCP_HTTP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("AHK_MCP_HTTP_PORT", "8848")))
+    args = parser.parse_args()
+
+    # Optional Prometheus endpoint (localhost only)
+    metrics_port = os.environ.get("AHK_MCP_METRICS_PORT")
+    if metrics_port:
+        from ahk_mcp.services.metrics import start_metrics_server
+        start_metrics_server(int(metrics_port))
+
+    if args.transport == "http":
+        # One process for every session: caches, interpreter discovery, artifact store and the run pool are shared
+        logger.info(f"Starting MCP server on http://{args.host}:{args.port}/mcp (streamable HTTP)")
+        mcp.run(transport="http", host=args.host, port=args.port, path="/mcp", show_banner=False)
+    else:
+        logger.info("Starting MCP server...")
+        mcp.run()
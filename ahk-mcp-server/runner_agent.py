@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+AHK MCP Server - Runner agent for dispatched runs
+
+Run on each Windows host that should execute scripts:
+    set AHK_MCP_RUNNER_TOKEN=<shared secret>
+    python runner_agent.py --host 0.0.0.0 --port 8765 --capacity 2
+
+Then point the MCP server at the runners:
+    AHK_MCP_RUNNERS=host1:8765,host2:8765 AHK_MCP_RUNNER_TOKEN=<shared secret>
+
+Stand-in runner on Linux, serving a recorded trace instead of AutoHotkey:
+    python runner_agent.py --port 8765 --replay traces/corpus.jsonl.gz --scale 0.1
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.resolve()
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from ahk_mcp.services.fleet import configure_fleet
+from ahk_mcp.services.runner import RunnerAgent
+from ahk_mcp.services.trace import enable_replay
+
+
+async def serve(args: argparse.Namespace, token: str) -> None:
+    agent = RunnerAgent(token, args.name, args.capacity, args.work_dir)
+    server = await agent.serve(args.host, args.port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Execute AHK runs dispatched by the MCP server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--capacity", type=int, default=1, help="Concurrent runs")
+    parser.add_argument("--name", default=None, help="Runner name (default: host name)")
+    parser.add_argument("--work-dir", default=None, help="Where job scripts are unpacked (default: temp)")
+    parser.add_argument("--replay", default=None, help="Serve this trace instead of running AutoHotkey")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier applied to recorded wall times")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+    token = os.environ.get("AHK_MCP_RUNNER_TOKEN")
+    if not token:
+        parser.error("AHK_MCP_RUNNER_TOKEN must be set")
+
+    # A runner executes locally, whatever the environment says
+    configure_fleet(None)
+    if args.replay:
+        enable_replay(args.replay, args.scale)
+
+    try:
+        asyncio.run(serve(args, token))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
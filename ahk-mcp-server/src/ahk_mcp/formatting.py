@@ -0,0 +1,240 @@
+"""Result shaping shared by tool responses (JSON / compact formats, token budgets)."""
+import logging
+import re
+from typing import Optional
+
+from pydantic import ValidationError
+
+from .schemas import ErrorDetails, ResourceUsage, RunScriptResult, SpeculativeRun, StreamTail
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio used for budget estimates
+CHARS_PER_TOKEN = 4
+
+# Source line marker AHK puts on the failing line ("---> 005: ...")
+_FAILING_LINE = re.compile(r"^\s*--->\s*(\d{1,5}):")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer dependency)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def failing_line_index(source_code: list[str]) -> Optional[int]:
+    """Index of the "--->" line in an AHK sourceCode block, if any."""
+    for i, line in enumerate(source_code):
+        if _FAILING_LINE.match(line):
+            return i
+    return None
+
+
+def failing_line_number(source_code: list[str]) -> Optional[int]:
+    """Script line number of the failing line, if the block marks one."""
+    idx = failing_line_index(source_code)
+    if idx is None:
+        return None
+    return int(_FAILING_LINE.match(source_code[idx]).group(1))
+
+
+def truncate_source_code(source_code: list[str], token_budget: Optional[int]) -> list[str]:
+    """
+    Keep the source lines closest to the failing line within a token budget.
+
+    Lines are added alternately below and above the "--->" line (or from the
+    top when no line is marked) until the budget is spent. Elided ranges are
+    replaced by a "..." line so the context stays readable.
+    """
+    if not token_budget or not source_code:
+        return source_code
+
+    costs = [estimate_tokens(line) for line in source_code]
+    if sum(costs) <= token_budget:
+        return source_code
+
+    center = failing_line_index(source_code) or 0
+    lo = hi = center
+    spent = costs[center]
+    while True:
+        grew = False
+        if hi + 1 < len(source_code) and spent + costs[hi + 1] <= token_budget:
+            hi += 1
+            spent += costs[hi]
+            grew = True
+        if lo > 0 and spent + costs[lo - 1] <= token_budget:
+            lo -= 1
+            spent += costs[lo]
+            grew = True
+        if not grew:
+            break
+
+    kept = source_code[lo:hi + 1]
+    if lo > 0:
+        kept = ["..."] + kept
+    if hi < len(source_code) - 1:
+        kept = kept + ["..."]
+    return kept
+
+
+def error_signature(result: dict) -> str:
+    """
+    One-line description of an error result: first error line plus failing line number.
+
+    Falls back to the first line of `message` when there are no errorDetails.
+    """
+    details = result.get("errorDetails") or {}
+    content = details.get("errorContent") or []
+    headline = content[0] if content else (result.get("message") or "").split("\n", 1)[0]
+    line_no = failing_line_number(details.get("sourceCode") or [])
+    if line_no is not None:
+        return f"{headline} @L{line_no}"
+    return headline
+
+
+# Fields a run result cannot do without, and their value when the launcher's is malformed
+_REQUIRED_DEFAULTS = {"status": "CONFIG_ERROR", "message": "Unknown error", "execution_time_ms": 0, "script_path": ""}
+
+
+def _submodel(name: str, build, dropped: list[str]):
+    """`build()`, or None (and `name` noted in `dropped`) when the launcher's value is malformed."""
+    try:
+        return build()
+    except (ValidationError, TypeError, ValueError, AttributeError):
+        dropped.append(name)
+        return None
+
+
+def _validated(fields: dict, dropped: list[str]) -> RunScriptResult:
+    """RunScriptResult from `fields`, ignoring the fields that do not validate."""
+    while True:
+        try:
+            return RunScriptResult(**fields)
+        except ValidationError as e:
+            bad = {err["loc"][0] for err in e.errors() if err["loc"]} - set(dropped)
+            if not bad:
+                raise
+            for name in bad:
+                dropped.append(name)
+                if name in _REQUIRED_DEFAULTS:
+                    fields[name] = _REQUIRED_DEFAULTS[name]
+                else:
+                    fields.pop(name, None)
+
+
+def build_run_result(
+    result: dict,
+    run_id: Optional[str] = None,
+    screenshot_uri: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    error_fingerprint: Optional[str] = None,
+    source_location: Optional[dict] = None,
+    artifacts_dir: Optional[str] = None
+) -> RunScriptResult:
+    """
+    Validate a launcher result dict (camelCase) into a RunScriptResult.
+
+    A malformed field is left out (or set to its default when required) and
+    logged; the run's status and message are kept.
+    """
+    dropped: list[str] = []
+    details = result.get("errorDetails")
+    error_details = None
+    if details:
+        error_details = _submodel("error_details", lambda: ErrorDetails(
+            title=details.get("title") or "",
+            error_content=details.get("errorContent") or [],
+            source_code=truncate_source_code(details.get("sourceCode") or [], token_budget),
+            buttons=details.get("buttons") or [],
+            line=details.get("line"),
+            file=details.get("file"),
+            rules=details.get("rules"),
+        ), dropped)
+
+    window_handle = result.get("windowHandle")
+    usage = result.get("resources")
+    race = result.get("speculative")
+    streams = result.get("output")
+    speculative = None
+    if race:
+        speculative = _submodel("speculative", lambda: SpeculativeRun(
+            winner=race.get("winner"), outcomes=race.get("outcomes") or {}, elapsed_ms=race.get("elapsedMs", 0)
+        ), dropped)
+    resources = None
+    if usage:
+        resources = _submodel("resources", lambda: ResourceUsage(
+            cpu_time_s=usage.get("cpuTimeS", 0),
+            peak_rss_mb=usage.get("peakRssMb", 0),
+            peak_threads=usage.get("peakThreads", 0),
+            peak_handles=usage.get("peakHandles", 0),
+            children=usage.get("children", 0),
+            samples=usage.get("samples", 0),
+        ), dropped)
+    output = None
+    if streams:
+        output = _submodel("output", lambda: {name: StreamTail(**stream) for name, stream in streams.items()}, dropped)
+    execution_time = result.get("executionTimeMs") or 0
+    try:
+        execution_time = int(execution_time)
+    except (TypeError, ValueError):
+        pass
+
+    run_result = _validated({
+        "status": result.get("status", "CONFIG_ERROR"),
+        "message": result.get("message", "Unknown error"),
+        "error_details": error_details,
+        "screenshot_path": result.get("screenshot"),
+        "screenshot_uri": screenshot_uri,
+        "window_handle": str(window_handle) if window_handle else None,
+        "tray_icon": result.get("trayIcon"),
+        "execution_time_ms": execution_time,
+        "script_path": result.get("scriptPath") or "",
+        "ahk_version": result.get("ahkVersion"),
+        "run_id": run_id,
+        "error_fingerprint": error_fingerprint,
+        "source_location": source_location,
+        "reaped_processes": result.get("reapedProcesses") or None,
+        "artifacts_dir": artifacts_dir,
+        "resources": resources,
+        "over_budget": result.get("overBudget") or None,
+        "speculative": speculative,
+        "output": output,
+    }, dropped)
+    if dropped:
+        logger.warning("Ignored malformed launcher result field(s) of run %s: %s", run_id, ", ".join(dropped))
+    return run_result
+
+
+def render_json(run_result: RunScriptResult) -> str:
+    """Compact JSON rendering (None fields dropped)."""
+    return run_result.model_dump_json(exclude_none=True)
+
+
+def render_compact(
+    result: dict,
+    run_id: Optional[str] = None,
+    screenshot_uri: Optional[str] = None,
+    error_fingerprint: Optional[str] = None,
+    source_location: Optional[dict] = None
+) -> str:
+    """One-line rendering: status, time, run id, error signature / window handle."""
+    status = result.get("status", "CONFIG_ERROR")
+    parts = [status, f"{result.get('executionTimeMs', 0)}ms"]
+    if run_id:
+        parts.append(f"run={run_id}")
+    if status in ("ERROR", "CONFIG_ERROR"):
+        parts.append(error_signature(result))
+        if error_fingerprint:
+            parts.append(f"fp={error_fingerprint}")
+        if source_location:
+            parts.append(f"at {source_location['file']}:{source_location['line']}")
+    elif result.get("windowHandle"):
+        parts.append(f"hwnd={result['windowHandle']}")
+    if result.get("overBudget"):
+        parts.append("over budget: " + ",".join(v["resource"] for v in result["overBudget"]))
+    if result.get("speculative"):
+        parts.append(f"raced: {result['speculative'].get('winner') or 'no winner'}")
+    for name, stream in (result.get("output") or {}).items():
+        parts.append(f"{name}={stream['bytes']}B")
+    if screenshot_uri:
+        parts.append(screenshot_uri)
+    return " | ".join(parts)
@@ -0,0 +1,38 @@
+"""Error cluster resource for AHK MCP Server."""
+import logging
+from datetime import datetime
+
+from ..services.error_index import error_index
+
+logger = logging.getLogger(__name__)
+
+
+async def get_error_clusters(limit: int = 20) -> str:
+    """
+    Get the most frequent error clusters seen by ahk_run_script.
+
+    URI: ahk://errors/clusters
+
+    Returns formatted table of clusters with counts and representative scripts.
+    """
+    clusters = error_index.top_clusters(limit)
+
+    if not clusters:
+        return "No ERROR runs recorded since the server started."
+
+    lines = [
+        "# Error Clusters",
+        "",
+        f"Total: {error_index.total_runs()} error runs in {len(error_index)} clusters",
+        "",
+        "| Fingerprint | Count | Error | Last Seen | Scripts |",
+        "|-------------|-------|-------|-----------|---------|"
+    ]
+
+    for cluster in clusters:
+        example = cluster["example"][:60].replace("|", "\\|")
+        last_seen = datetime.fromtimestamp(cluster["lastSeen"]).strftime("%Y-%m-%d %H:%M:%S")
+        scripts = ", ".join(f"`{s}`" for s in cluster["scripts"])
+        lines.append(f"| {cluster['fingerprint']} | {cluster['count']} | {example} | {last_seen} | {scripts} |")
+
+    return "\n".join(lines)
@@ -1,20 +1,47 @@
 """GitHub issues resource for AHK MCP Server."""
 import logging
-import json
-from ..services.github_cli import list_github_issues, get_github_issue
+from typing import Optional
+from urllib.parse import quote
+
+from ..services.github_cli import get_github_issue, list_github_issues_page, list_issue_comments
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_ISSUES_PAGE = 20
+DEFAULT_COMMENTS_PAGE = 10
+MAX_PAGE_SIZE = 100
+
+# Comment bodies longer than this are truncated
+COMMENT_MAX_CHARS = 1000
+
+
+def _page_size(value: Optional[str], default: int) -> int:
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE)) if value else default
+    except ValueError:
+        return default
+
+
+def _next_page(base_uri: str, cursor: Optional[str], page_size: int) -> list[str]:
+    if not cursor:
+        return ["", "_Last page._"]
+    return ["", f"**Next page**: `{base_uri}?cursor={quote(cursor, safe='')}&page_size={page_size}`"]
+
 
-async def get_issues_list() -> str:
+async def get_issues_list(cursor: Optional[str] = None, page_size: Optional[str] = None) -> str:
     """
-    Get list of GitHub issues.
+    Get one page of GitHub issues, newest first.
 
-    URI: github://issues
+    URI: github://issues?cursor=...&page_size=...
+
+    Args:
+        cursor: Opaque cursor from the previous page's "Next page" link
+        page_size: Issues per page (default 20, max 100)
 
     Returns formatted list of issues.
     """
-    result = await list_github_issues(state="all", limit=50)
+    size = _page_size(page_size, DEFAULT_ISSUES_PAGE)
+    result = await list_github_issues_page(state="all", cursor=cursor or None, page_size=size)
 
     if not result.get("success"):
         return f"Error: {result.get('error', 'Unknown error')}"
@@ -27,7 +54,7 @@ async def get_issues_list() -> str:
     lines = [
         "# GitHub Issues - ahk-wrapper-powershell",
         "",
-        f"Total: {len(issues)} issues",
+        f"Total: {result.get('total_count', len(issues))} issues (showing {len(issues)})",
         "",
         "| # | Title | State | Labels |",
         "|---|-------|-------|--------|"
@@ -40,6 +67,7 @@ async def get_issues_list() -> str:
         labels = ", ".join([l.get("name", "") for l in issue.get("labels", [])])
         lines.append(f"| {number} | {title} | {state} | {labels} |")
 
+    lines.extend(_next_page("github://issues", result.get("next_cursor"), size))
     return "\n".join(lines)
 
 
@@ -70,7 +98,7 @@ async def get_issue_detail(issue_number: str) -> str:
         f"# Issue #{issue.get('number', '?')}: {issue.get('title', 'Untitled')}",
         "",
         f"**State**: {issue.get('state', 'unknown')}",
-        f"**Author**: {issue.get('author', {}).get('login', 'unknown')}",
+        f"**Author**: {(issue.get('author') or {}).get('login', 'unknown')}",
         f"**Created**: {issue.get('createdAt', 'unknown')}",
         f"**URL**: {issue.get('url', '')}",
     ]
@@ -87,19 +115,57 @@ async def get_issue_detail(issue_number: str) -> str:
         issue.get("body", "_No description_"),
     ])
 
-    comments = issue.get("comments", [])
-    if comments:
+    comment_count = issue.get("comment_count", 0)
+    if comment_count:
+        lines.extend([
+            "",
+            f"## Comments ({comment_count})",
+            "",
+            f"Read them page by page at `github://issues/{num}/comments`.",
+        ])
+
+    return "\n".join(lines)
+
+
+async def get_issue_comments(issue_number: str, cursor: Optional[str] = None, page_size: Optional[str] = None) -> str:
+    """
+    Get one page of an issue's comments, oldest first.
+
+    URI: github://issues/{issue_number}/comments?cursor=...&page_size=...
+
+    Args:
+        issue_number: The issue number as string
+        cursor: Opaque cursor from the previous page's "Next page" link
+        page_size: Comments per page (default 10, max 100)
+
+    Returns formatted comments.
+    """
+    try:
+        num = int(issue_number)
+    except ValueError:
+        return f"Error: Invalid issue number: {issue_number}"
+
+    size = _page_size(page_size, DEFAULT_COMMENTS_PAGE)
+    result = await list_issue_comments(num, cursor=cursor or None, page_size=size)
+
+    if not result.get("success"):
+        return f"Error: {result.get('error', 'Unknown error')}"
+
+    comments = result.get("comments", [])
+    if not comments:
+        return f"No comments on issue #{num}."
+
+    lines = [f"# Issue #{num} - Comments ({result.get('total_count', len(comments))})"]
+    for comment in comments:
+        author = (comment.get("author") or {}).get("login", "unknown")
+        body = comment.get("body", "")
+        if len(body) > COMMENT_MAX_CHARS:
+            body = body[:COMMENT_MAX_CHARS] + f"... _({len(body) - COMMENT_MAX_CHARS} more chars)_"
         lines.extend([
             "",
-            f"## Comments ({len(comments)})",
+            f"**@{author}** ({comment.get('createdAt', '')}):",
+            body,
         ])
-        for comment in comments[:10]:  # Limit to 10 comments
-            author = comment.get("author", {}).get("login", "unknown")
-            body = comment.get("body", "")[:200]
-            lines.extend([
-                "",
-                f"**@{author}**:",
-                body,
-            ])
 
+    lines.extend(_next_page(f"github://issues/{num}/comments", result.get("next_cursor"), size))
     return "\n".join(lines)
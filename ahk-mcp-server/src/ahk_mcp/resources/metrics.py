@@ -0,0 +1,47 @@
+"""Metrics resource for AHK MCP Server."""
+import logging
+
+from ..services.metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+
+def _labels(metric, key: tuple[str, ...]) -> str:
+    return ", ".join(f"{k}={v}" for k, v in zip(metric.label_names, key)) or "-"
+
+
+async def get_metrics() -> str:
+    """
+    Get the server's counters, gauges and latency histograms.
+
+    URI: ahk://metrics
+
+    Returns formatted tables; histograms show count, mean and bucket-based
+    p50/p95/p99 (upper bound of the bucket holding the quantile).
+    """
+    lines = ["# AHK MCP Metrics", ""]
+
+    scalars = ["| Metric | Labels | Value |", "|--------|--------|-------|"]
+    for metric in registry.metrics():
+        if isinstance(metric, (Counter, Gauge)):
+            for name, labels, value in metric.samples():
+                scalars.append(f"| {name} | {labels.strip('{}') or '-'} | {value:g} |")
+    lines.extend(["## Counters and Gauges", "", *scalars, ""])
+
+    lines.extend([
+        "## Latency (seconds)",
+        "",
+        "| Metric | Labels | Count | Mean | p50 | p95 | p99 |",
+        "|--------|--------|-------|------|-----|-----|-----|",
+    ])
+    for metric in registry.metrics():
+        if not isinstance(metric, Histogram):
+            continue
+        for key, child in metric.children():
+            _, count, total = child.snapshot()
+            if not count:
+                continue
+            quantiles = " | ".join(f"≤{child.quantile(q):g}" for q in (0.5, 0.95, 0.99))
+            lines.append(f"| {metric.name} | {_labels(metric, key)} | {count:g} | {total / count:.3f} | {quantiles} |")
+
+    return "\n".join(lines)
@@ -0,0 +1,82 @@
+"""Run artifact resources for AHK MCP Server."""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from fastmcp.exceptions import ResourceError
+
+from ..services.artifacts import artifact_store
+from ..services.deferred_capture import get_capture
+
+logger = logging.getLogger(__name__)
+
+
+async def get_run_screenshot(run_id: str) -> bytes:
+    """
+    Get the deferred screenshot of a run as PNG bytes.
+
+    URI: ahk://runs/{run_id}/screenshot
+
+    Waits for the capture if it is still pending. Raises ResourceError when
+    the run is unknown or the window could not be captured (the binary
+    resource has no room for an inline error message).
+    """
+    result = await get_capture(run_id)
+
+    if result is None:
+        # Not captured in this session: fall back to the run's artifact directory
+        run = await asyncio.to_thread(artifact_store.get, run_id)
+        shots = await asyncio.to_thread(run.screenshots) if run else []
+        if not shots:
+            raise ResourceError(f"Unknown run: {run_id}")
+        result = {"success": True, "screenshot_path": str(shots[-1])}
+
+    if not result.get("success"):
+        raise ResourceError(f"Screenshot unavailable for run {run_id}: {result.get('error', 'Unknown error')}")
+
+    path = Path(result.get("screenshot_path", ""))
+    try:
+        return await asyncio.to_thread(path.read_bytes)
+    except OSError as e:
+        raise ResourceError(f"Screenshot file unreadable for run {run_id}: {e}")
+
+
+async def get_run_artifacts(run_id: str) -> str:
+    """
+    Get the artifact listing of a run.
+
+    URI: ahk://runs/{run_id}
+
+    Returns formatted summary of the stored result and the run's files.
+    """
+    run = await asyncio.to_thread(artifact_store.get, run_id)
+    if run is None:
+        return f"Error: Unknown run `{run_id}` (never created, or removed by the artifact GC)"
+
+    result = {}
+    if run.result_path.exists():
+        try:
+            result = json.loads(await asyncio.to_thread(run.result_path.read_text, encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable result.json for run {run_id}: {e}")
+
+    files = await asyncio.to_thread(run.files)
+    created = datetime.fromtimestamp(run.created).strftime("%Y-%m-%d %H:%M:%S")
+
+    lines = [
+        f"# Run {run_id}",
+        "",
+        f"**Directory**: `{run.directory}`",
+        f"**Created**: {created}",
+        f"**Status**: {result.get('status', 'in progress' if not run.finished else 'unknown')}",
+    ]
+    if result.get("scriptPath"):
+        lines.append(f"**Script**: `{result['scriptPath']}`")
+    if result.get("errorFingerprint"):
+        lines.append(f"**Error Fingerprint**: `{result['errorFingerprint']}`")
+
+    lines.extend(["", f"## Files ({len(files)})", ""])
+    lines.extend(f"- `{f.as_posix()}`" for f in files)
+    return "\n".join(lines)
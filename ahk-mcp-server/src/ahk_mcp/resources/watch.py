@@ -0,0 +1,45 @@
+"""Watch session resource for AHK MCP Server."""
+import logging
+from pathlib import Path
+
+from ..services.watcher import get_watch
+
+logger = logging.getLogger(__name__)
+
+
+async def get_watch_status(watch_id: str) -> str:
+    """
+    Get the latest result of every script re-run by a watch.
+
+    URI: ahk://watch/{watch_id}
+
+    Returns formatted table of scripts with status and error fingerprint.
+    """
+    watch = get_watch(watch_id)
+    if watch is None:
+        return f"Error: Unknown watch: {watch_id}"
+
+    lines = [
+        f"# Watch {watch.id}",
+        "",
+        f"**Directory**: `{watch.directory}`",
+        f"**Runs**: {watch.run_count}",
+        "",
+    ]
+    if watch.last_error:
+        lines[-1:-1] = [f"**Failed batches**: {watch.failed_batches} (last: {watch.last_error})"]
+    if not watch.results:
+        lines.append("No runs yet - waiting for changes.")
+        return "\n".join(lines)
+
+    lines.extend([
+        "| Script | Status | Time | Fingerprint | Message |",
+        "|--------|--------|------|-------------|---------|",
+    ])
+    for script, outcome in sorted(watch.results.items()):
+        message = outcome["message"][:60].replace("|", "\\|")
+        lines.append(
+            f"| `{Path(script).name}` | {outcome['status']} | {outcome['executionTimeMs']}ms "
+            f"| {outcome.get('fingerprint', '')} | {message} |"
+        )
+    return "\n".join(lines)
@@ -19,6 +19,10 @@ class RunScriptInput(BaseModel):
         le=30000,
         description="Timeout in milliseconds to wait for script execution (500-30000)"
     )
+    snapshot: Optional[bool] = Field(
+        default=False,
+        description="Copy the script and its #Include files into the run's artifact directory"
+    )
 
 
 class CaptureUIInput(BaseModel):
@@ -58,19 +62,77 @@ class ErrorDetails(BaseModel):
     error_content: list[str] = Field(description="Error message lines")
     source_code: list[str] = Field(description="Source code context with line numbers")
     buttons: list[str] = Field(description="Error window buttons")
+    line: Optional[int] = Field(None, description="Failing line named by the dialog text")
+    file: Optional[str] = Field(None, description="Failing file named by the dialog text")
+    rules: Optional[str] = Field(None, description="Dialog rule set used to parse the window (V1, V2, fr, ...)")
+
+
+class SourceLocation(BaseModel):
+    """Failing line mapped to the file of the #Include closure it comes from."""
+    file: str
+    line: int
+    context: list[str] = Field(description="Numbered lines around the failing line")
+
+
+class ReapedProcess(BaseModel):
+    """Process terminated when a run timed out or was cancelled."""
+    pid: int
+    name: str
+    killed: bool = Field(description="True if the process had to be force-killed")
+
+
+class ResourceUsage(BaseModel):
+    """Resources used by the processes a run started (sampled while it ran)."""
+    cpu_time_s: float = Field(description="User + system CPU time, summed over the tree")
+    peak_rss_mb: float = Field(description="Largest summed resident memory at one sample")
+    peak_threads: int
+    peak_handles: int = Field(description="Handles (file descriptors outside Windows)")
+    children: int = Field(description="Processes seen under the launcher")
+    samples: int
+
+
+class BudgetViolation(BaseModel):
+    """Resource budget a run exceeded."""
+    resource: str
+    value: float
+    budget: float
+
+
+class SpeculativeRun(BaseModel):
+    """V1/V2 race of a script whose version was unknown."""
+    winner: Optional[Literal["V1", "V2"]] = Field(None, description="Interpreter whose verdict was kept (None: no decisive verdict)")
+    outcomes: dict[str, str] = Field(description="Per version: won, cancelled, mismatch, inconclusive or lost")
+    elapsed_ms: int
+
+
+class StreamTail(BaseModel):
+    """Captured stdout or stderr of a run."""
+    tail: str = Field(description="Last bytes the script wrote to the stream")
+    bytes: int = Field(description="Total bytes written")
+    truncated: bool = Field(description="Older output was dropped from the tail")
 
 
 class RunScriptResult(BaseModel):
     """Result from ahk_run_script tool."""
-    status: Literal["SUCCESS", "ERROR", "TIMEOUT", "CONFIG_ERROR"]
+    status: Literal["SUCCESS", "ERROR", "RUNNING", "TIMEOUT", "CONFIG_ERROR"]
     message: str
     error_details: Optional[ErrorDetails] = None
     screenshot_path: Optional[str] = None
+    screenshot_uri: Optional[str] = Field(default=None, description="Deferred screenshot resource URI")
     window_handle: Optional[str] = None
-    tray_icon: Optional[Literal["FOUND", "NOT_FOUND"]] = None
+    tray_icon: Optional[Literal["FOUND", "NOT_FOUND", "NOT_CHECKED", "SIMULATION"]] = None
     execution_time_ms: int
     script_path: str
     ahk_version: Optional[str] = None
+    run_id: Optional[str] = None
+    error_fingerprint: Optional[str] = Field(default=None, description="Stable fingerprint grouping equivalent errors")
+    source_location: Optional[SourceLocation] = None
+    reaped_processes: Optional[list[ReapedProcess]] = None
+    artifacts_dir: Optional[str] = Field(default=None, description="Run artifact directory (result, log, screenshots)")
+    resources: Optional[ResourceUsage] = None
+    over_budget: Optional[list[BudgetViolation]] = None
+    speculative: Optional[SpeculativeRun] = None
+    output: Optional[dict[str, StreamTail]] = Field(default=None, description="Captured stdout/stderr (capture_output=True)")
 
 
 class CaptureUIResult(BaseModel):
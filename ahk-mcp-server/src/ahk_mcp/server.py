@@ -5,14 +5,33 @@ Provides tools for LLMs to test AutoHotkey scripts:
 - ahk_run_script: Execute AHK scripts and detect errors
 - ahk_capture_ui: Capture screenshots of AHK windows
 - ahk_create_github_issue: Create issues on the repo
+- ahk_watch: Re-run affected scripts when files in a directory change
+- ahk_query_logs: Query the structured logs by run ID or status
+- ahk_run_batch: Run many scripts, longest predicted runtime first
+- ahk_run_tests: Run AHK unit tests in parallel shards (JSON / JUnit XML results)
 """
 import logging
-from fastmcp import FastMCP
+from typing import Literal
+
+from fastmcp import Context, FastMCP
+from fastmcp.tools.tool import ToolResult
 
 from .tools.run_script import ahk_run_script
 from .tools.capture_ui import ahk_capture_ui
 from .tools.github_issue import ahk_create_github_issue
-from .resources.github import get_issues_list, get_issue_detail
+from .tools.watch import ahk_watch
+from .tools.query_logs import ahk_query_logs
+from .tools.run_batch import ahk_run_batch
+from .tools.run_tests import ahk_run_tests
+from .resources.github import get_issue_comments, get_issue_detail, get_issues_list
+from .resources.runs import get_run_artifacts, get_run_screenshot
+from .resources.errors import get_error_clusters
+from .resources.watch import get_watch_status
+from .resources.metrics import get_metrics
+from .services.image_content import IMAGE_MAX_DIM, IMAGE_QUALITY
+from .services.quotas import client_quota
+from .services.stabilize import STABLE_FRAMES, STABLE_MAX_MS
+from .structured_logging import correlated
 
 logger = logging.getLogger(__name__)
 
@@ -28,18 +47,45 @@ This MCP server provides tools to test AutoHotkey (V1 and V2) scripts:
 
 ### ahk_run_script
 Execute an AHK script and detect if it works or has errors.
-- Automatically detects AHK V1 vs V2
-- Captures screenshot of error windows
+- Automatically detects AHK V1 vs V2; scripts of unknown version run on both at once (first non-mismatch verdict wins, remembered per script; AHK_MCP_SPECULATIVE=0 disables)
+- Captures screenshot of error windows in the background (read ahk://runs/{run_id}/screenshot)
 - Extracts error messages with line numbers
+- format="compact" (one line) or "json" (RunScriptResult) for batch loops; token_budget trims source context
+- Cancelling the request (or a wrapper timeout) terminates the whole AHK process tree
+- Every run has its own artifact directory (result, log, screenshots; snapshot=True adds a copy of the sources), listed at ahk://runs/{run_id}
+- capture_output=True streams the script's stdout/stderr as "ahk_output" log notifications and returns the last output_kb KB
+- inline_images=True returns the ERROR window screenshot as image content in the same response
+
+### ahk_run_batch
+Run many scripts (a list or every root script of a directory) in parallel.
+- Runtimes are predicted from past runs or script features (size, include depth, Gui/Persistent/SetTimer)
+- order="longest" minimizes the batch time; "fail_fast" surfaces errors first (stop_on_failure to stop early)
+- Reports predicted vs actual time per script and per batch
+
+### ahk_run_tests
+Run AHK test files (test_*.ahk, *_test.ahk, *.test.ahk) and report each test case.
+- Test files call AhkTest("name"), AhkAssert(cond, "msg") and AhkAssertEqual(actual, expected); the reporter is injected
+- Files run in parallel shards balanced by predicted runtime
+- format="json" (merged report) or "junit" (JUnit XML); both are kept at ahk://runs/{run_id}
 
 ### ahk_capture_ui
 Capture a screenshot of a running AHK script's window.
 - Use after ahk_run_script returns SUCCESS
 - Verify the UI matches expected design
+- wait_stable=True waits until the window stops changing (capped by max_wait_ms); run screenshots of
+  non-error windows already do this
+- inline=True returns the image itself (downscaled to max_dimension, JPEG quality) instead of a path to Read;
+  images over the size budget ($AHK_MCP_IMAGE_MAX_KB) still come back as a path
 
 ### ahk_create_github_issue
 Create issues on the ahk-wrapper-powershell repository.
 
+### ahk_watch
+Watch a script directory while you edit it.
+- Re-runs only the scripts whose #Include closure contains the changed file
+- Bursts of edits are coalesced into one run
+- Status changes are pushed as log notifications; latest results at ahk://watch/{watch_id}
+
 ## Workflow
 
 1. Write your AHK script
@@ -47,6 +93,18 @@ Create issues on the ahk-wrapper-powershell repository.
 3. If SUCCESS, use `ahk_capture_ui` to verify the UI
 4. If ERROR, read the screenshot and error details to fix the script
 5. Report bugs using `ahk_create_github_issue`
+
+Server logs are JSON lines tagged with a correlation ID per tool call and the run ID;
+use `ahk_query_logs` with a run ID to see everything that happened during a run.
+
+Throughput, error rates and latency histograms are at `ahk://metrics` (also served as
+Prometheus text on http://127.0.0.1:$AHK_MCP_METRICS_PORT/metrics when that variable is set).
+
+Several clients can share one server over streamable HTTP (`run_server.py --transport http`);
+runs are then limited per client ($AHK_MCP_CLIENT_MAX_RUNS) within a shared pool ($AHK_MCP_MAX_RUNS).
+
+For batch runs, read `ahk://errors/clusters` to see which errors repeat across scripts
+(runs are grouped by a fingerprint that ignores paths, line numbers and identifiers).
 """
 )
 
@@ -54,33 +112,50 @@ Create issues on the ahk-wrapper-powershell repository.
 # Register tools
 @mcp.tool(
     name="ahk_run_script",
-    description="Execute an AutoHotkey script and detect if it works or has errors. Returns SUCCESS, ERROR (with screenshot), TIMEOUT, or CONFIG_ERROR."
+    description="Execute an AutoHotkey script and detect if it works or has errors. Returns SUCCESS, ERROR (with deferred screenshot resource), TIMEOUT, or CONFIG_ERROR."
 )
+@correlated("ahk_run_script")
+@client_quota
 async def run_script_tool(
     script_path: str,
     version: str = "Auto",
-    timeout_ms: int = 3000
-) -> str:
+    timeout_ms: int = 3000,
+    format: Literal["markdown", "json", "compact"] = "markdown",
+    token_budget: int | None = None,
+    snapshot: bool = False,
+    capture_output: bool = False,
+    output_kb: int = 16,
+    inline_images: bool = False
+) -> str | ToolResult:
     """Execute an AHK script and detect errors."""
-    return await ahk_run_script(None, script_path, version, timeout_ms)
+    return await ahk_run_script(None, script_path, version, timeout_ms, format, token_budget, snapshot, capture_output, output_kb, inline_images)
 
 
 @mcp.tool(
     name="ahk_capture_ui",
     description="Capture a screenshot of an AutoHotkey script's window to verify the UI design."
 )
+@correlated("ahk_capture_ui")
+@client_quota
 async def capture_ui_tool(
     window_title: str | None = None,
-    window_handle: str | None = None
-) -> str:
+    window_handle: str | None = None,
+    wait_stable: bool = False,
+    stable_frames: int = STABLE_FRAMES,
+    max_wait_ms: int = STABLE_MAX_MS,
+    inline: bool = False,
+    max_dimension: int = IMAGE_MAX_DIM,
+    quality: int = IMAGE_QUALITY
+) -> str | ToolResult:
     """Capture screenshot of AHK window."""
-    return await ahk_capture_ui(None, window_title, window_handle)
+    return await ahk_capture_ui(None, window_title, window_handle, wait_stable, stable_frames, max_wait_ms, inline, max_dimension, quality)
 
 
 @mcp.tool(
     name="ahk_create_github_issue",
     description="Create a GitHub issue on the ahk-wrapper-powershell repository."
 )
+@correlated("ahk_create_github_issue")
 async def create_issue_tool(
     title: str,
     body: str,
@@ -90,11 +165,81 @@ async def create_issue_tool(
     return await ahk_create_github_issue(None, title, body, labels)
 
 
+@mcp.tool(
+    name="ahk_watch",
+    description="Watch a directory of AHK scripts and re-run the scripts affected by each file change (action: start, stop, list)."
+)
+@correlated("ahk_watch")
+async def watch_tool(
+    ctx: Context,
+    action: Literal["start", "stop", "list"] = "start",
+    directory: str | None = None,
+    scripts: list[str] | None = None,
+    watch_id: str | None = None,
+    version: str = "Auto",
+    timeout_ms: int = 3000,
+    debounce_ms: int = 300
+) -> str:
+    """Start, stop or list watch sessions."""
+    return await ahk_watch(ctx, action, directory, scripts, watch_id, version, timeout_ms, debounce_ms)
+
+
+@mcp.tool(
+    name="ahk_query_logs",
+    description="Query the server's structured logs by run ID, final run status or level, without scanning whole log files."
+)
+@correlated("ahk_query_logs")
+async def query_logs_tool(
+    run_id: str | None = None,
+    status: Literal["SUCCESS", "ERROR", "RUNNING", "TIMEOUT", "CONFIG_ERROR"] | None = None,
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] | None = None,
+    limit: int = 50
+) -> str:
+    """Query structured log records."""
+    return await ahk_query_logs(None, run_id, status, level, limit)
+
+
+@mcp.tool(
+    name="ahk_run_batch",
+    description="Run many AutoHotkey scripts in parallel, longest predicted runtime first (or fail-fast), and report predicted vs actual times."
+)
+@correlated("ahk_run_batch")
+async def run_batch_tool(
+    scripts: list[str] | None = None,
+    directory: str | None = None,
+    version: str = "Auto",
+    timeout_ms: int = 3000,
+    workers: int = 4,
+    order: Literal["longest", "fail_fast", "input"] = "longest",
+    stop_on_failure: bool = False
+) -> str:
+    """Run a batch of AHK scripts."""
+    return await ahk_run_batch(None, scripts, directory, version, timeout_ms, workers, order, stop_on_failure)
+
+
+@mcp.tool(
+    name="ahk_run_tests",
+    description="Run AutoHotkey unit test files (AhkAssert/AhkAssertEqual) in parallel shards and report per-test results, as Markdown, JSON or JUnit XML."
+)
+@correlated("ahk_run_tests")
+async def run_tests_tool(
+    tests: list[str] | None = None,
+    directory: str | None = None,
+    patterns: list[str] | None = None,
+    version: str = "Auto",
+    timeout_ms: int = 5000,
+    shards: int = 4,
+    format: Literal["markdown", "json", "junit"] = "markdown"
+) -> str:
+    """Run AHK unit tests."""
+    return await ahk_run_tests(None, tests, directory, patterns, version, timeout_ms, shards, format)
+
+
 # Register resources
-@mcp.resource("github://issues")
-async def issues_resource() -> str:
-    """List all GitHub issues on the ahk-wrapper-powershell repository."""
-    return await get_issues_list()
+@mcp.resource("github://issues{?cursor,page_size}")
+async def issues_resource(cursor: str | None = None, page_size: str | None = None) -> str:
+    """One page of GitHub issues on the ahk-wrapper-powershell repository (cursor-paginated)."""
+    return await get_issues_list(cursor, page_size)
 
 
 @mcp.resource("github://issues/{issue_number}")
@@ -103,5 +248,41 @@ async def issue_detail_resource(issue_number: str) -> str:
     return await get_issue_detail(issue_number)
 
 
-logger.info("AHK MCP Server initialized with tools: ahk_run_script, ahk_capture_ui, ahk_create_github_issue")
-logger.info("Resources: github://issues, github://issues/{issue_number}")
+@mcp.resource("github://issues/{issue_number}/comments{?cursor,page_size}")
+async def issue_comments_resource(issue_number: str, cursor: str | None = None, page_size: str | None = None) -> str:
+    """One page of a GitHub issue's comments (cursor-paginated)."""
+    return await get_issue_comments(issue_number, cursor, page_size)
+
+
+@mcp.resource("ahk://errors/clusters")
+async def error_clusters_resource() -> str:
+    """Most frequent error fingerprints across runs, with counts and example scripts."""
+    return await get_error_clusters()
+
+
+@mcp.resource("ahk://watch/{watch_id}")
+async def watch_status_resource(watch_id: str) -> str:
+    """Latest result of each script re-run by a watch session."""
+    return await get_watch_status(watch_id)
+
+
+@mcp.resource("ahk://metrics")
+async def metrics_resource() -> str:
+    """Run/capture/GitHub counters, in-flight gauges and latency histograms."""
+    return await get_metrics()
+
+
+@mcp.resource("ahk://runs/{run_id}")
+async def run_artifacts_resource(run_id: str) -> str:
+    """Result, log, screenshots and snapshot stored for a run."""
+    return await get_run_artifacts(run_id)
+
+
+@mcp.resource("ahk://runs/{run_id}/screenshot", mime_type="image/png")
+async def run_screenshot_resource(run_id: str) -> bytes:
+    """Screenshot of a run's error/success window, captured after the run returned."""
+    return await get_run_screenshot(run_id)
+
+
+logger.info("AHK MCP Server initialized with tools: ahk_run_script, ahk_capture_ui, ahk_create_github_issue, ahk_watch, ahk_query_logs, ahk_run_batch, ahk_run_tests")
+logger.info("Resources: github://issues?cursor=, github://issues/{issue_number}, github://issues/{issue_number}/comments?cursor=, ahk://runs/{run_id}, ahk://runs/{run_id}/screenshot, ahk://errors/clusters, ahk://watch/{watch_id}, ahk://metrics")
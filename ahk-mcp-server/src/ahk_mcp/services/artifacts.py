@@ -0,0 +1,312 @@
+"""Per-run artifact store.
+
+Every ahk_run_script run gets its own directory, runs/{run_id}/:
+    result.json     final result (launcher JSON + run id, fingerprint, location)
+    launcher.json   raw launcher output (-OutputFile)
+    launcher.log    launcher log (-LogPath)
+    screenshots/    launcher and deferred window captures
+    snapshot/       optional copy of the script's #Include closure
+
+Parallel runs therefore never share file names. A background task deletes
+runs older than the age quota, then the oldest runs until the store fits the
+size quota. An in-memory index maps run IDs to their directory and size, so
+lookups never scan the store (it is listed once, on first use).
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from .metrics import registry
+from .source_index import get_source_index
+from .warm_state import register_state
+
+logger = logging.getLogger(__name__)
+
+MCP_SERVER_ROOT = Path(__file__).parent.parent.parent.parent
+RUNS_DIR = Path(os.environ.get("AHK_MCP_RUNS_DIR", MCP_SERVER_ROOT.parent / "runs"))
+
+# Quotas (override with AHK_MCP_RUNS_MAX_MB / AHK_MCP_RUNS_MAX_AGE_H)
+MAX_STORE_BYTES = int(float(os.environ.get("AHK_MCP_RUNS_MAX_MB", "500")) * 1024 * 1024)
+MAX_RUN_AGE_S = float(os.environ.get("AHK_MCP_RUNS_MAX_AGE_H", "72")) * 3600
+
+GC_INTERVAL_S = 300.0
+
+# ioctl(2) request to clone a file's extents (btrfs, XFS, bcachefs...)
+_FICLONE = 0x40049409
+
+
+def _dir_size(directory: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _clone_file(src: Path, dst: Path) -> None:
+    """Copy-on-write clone where the filesystem supports it, plain copy otherwise."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if sys.platform.startswith("linux"):
+        import fcntl
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+class RunArtifacts:
+    """Paths of one run's artifacts."""
+
+    def __init__(self, run_id: str, directory: Path, created: float, script_path: Optional[str] = None):
+        self.run_id = run_id
+        self.directory = directory
+        self.created = created
+        self.script_path = script_path
+        self.size = 0
+        self.finished = False
+
+    @property
+    def result_path(self) -> Path:
+        return self.directory / "result.json"
+
+    @property
+    def output_path(self) -> Path:
+        return self.directory / "launcher.json"
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / "launcher.log"
+
+    @property
+    def screenshots_dir(self) -> Path:
+        return self.directory / "screenshots"
+
+    @property
+    def snapshot_dir(self) -> Path:
+        return self.directory / "snapshot"
+
+    def screenshots(self) -> list[Path]:
+        """Screenshots of the run, oldest first."""
+        if not self.screenshots_dir.is_dir():
+            return []
+        return sorted(self.screenshots_dir.glob("*.png"), key=lambda p: p.stat().st_mtime)
+
+    def files(self) -> list[Path]:
+        """Every artifact file, relative to the run directory."""
+        return sorted(
+            p.relative_to(self.directory)
+            for p in self.directory.rglob("*")
+            if p.is_file()
+        )
+
+
+class ArtifactStore:
+    """Run directories under `root`, indexed by run ID, with size/age quotas."""
+
+    def __init__(self, root: Path = RUNS_DIR, max_bytes: int = MAX_STORE_BYTES, max_age_s: float = MAX_RUN_AGE_S):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._index: dict[str, RunArtifacts] = {}
+        self._dirty: set[str] = set()
+        # Runs with artifacts still being written after finalize() (deferred captures)
+        self._held: dict[str, int] = {}
+        self._loaded = False
+        self._restored: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._gc_task: Optional[asyncio.Task] = None
+
+    def _load(self) -> None:
+        """List existing run directories once (runs from previous sessions)."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            restored, self._restored = self._restored, None
+            if restored and restored["rootMtime"] == self.root.stat().st_mtime:
+                # No run directory added or removed since the snapshot: skip the scan.
+                # Sizes and unfinished runs are checked on disk by the next collect()
+                for run_id, created, size, *finished in restored["runs"]:
+                    run = RunArtifacts(run_id, self.root / run_id, created)
+                    run.size = size
+                    run.finished = bool(finished and finished[0])
+                    self._index[run_id] = run
+                    self._dirty.add(run_id)
+                self._loaded = True
+                logger.debug(f"Artifact store {self.root}: {len(self._index)} run(s) from warm state")
+                return
+            for entry in os.scandir(self.root):
+                if entry.is_dir():
+                    run = RunArtifacts(entry.name, Path(entry.path), entry.stat().st_mtime)
+                    run.size = _dir_size(run.directory)
+                    run.finished = True
+                    self._index[run.run_id] = run
+            self._loaded = True
+            logger.debug(f"Artifact store {self.root}: {len(self._index)} existing run(s)")
+
+    def create(self, script_path: Optional[str] = None, snapshot: bool = False) -> RunArtifacts:
+        """
+        Allocate a run ID and its directory.
+
+        Args:
+            script_path: Script being run (snapshotted when `snapshot` is set)
+            snapshot: Copy the script's #Include closure into snapshot/
+
+        Returns:
+            RunArtifacts for the new run
+        """
+        self._load()
+        while True:
+            run_id = uuid.uuid4().hex[:12]
+            directory = self.root / run_id
+            try:
+                directory.mkdir()
+                break
+            except FileExistsError:
+                continue
+
+        run = RunArtifacts(run_id, directory, time.time(), script_path)
+        run.screenshots_dir.mkdir()
+        if snapshot and script_path:
+            try:
+                self._snapshot(script_path, run.snapshot_dir)
+            except OSError as e:
+                logger.warning(f"Snapshot of {script_path} for run {run_id} failed: {e}")
+
+        with self._lock:
+            self._index[run_id] = run
+        return run
+
+    def _snapshot(self, script_path: str, dest: Path) -> None:
+        index = get_source_index(script_path)
+        base = index.root.parent
+        for path in index.files:
+            try:
+                relative = path.relative_to(base)
+            except ValueError:
+                # Included from outside the script directory (Lib, absolute path)
+                relative = Path("_external") / path.name
+            _clone_file(path, dest / relative)
+
+    def finalize(self, run: RunArtifacts, result: dict) -> None:
+        """Write result.json and record the run's size."""
+        run.result_path.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        run.size = _dir_size(run.directory)
+        run.finished = True
+
+    def mark_dirty(self, run_id: str) -> None:
+        """A run gained artifacts after finalize(): re-measure it on the next GC pass."""
+        self._dirty.add(run_id)
+
+    def hold(self, run_id: str) -> None:
+        """Keep a run out of GC until release() (its deferred capture is pending)."""
+        with self._lock:
+            self._held[run_id] = self._held.get(run_id, 0) + 1
+
+    def release(self, run_id: str) -> None:
+        with self._lock:
+            count = self._held.pop(run_id, 0) - 1
+            if count > 0:
+                self._held[run_id] = count
+
+    def get(self, run_id: str) -> Optional[RunArtifacts]:
+        """Artifacts of a run, or None if unknown (or collected)."""
+        self._load()
+        return self._index.get(run_id)
+
+    def total_size(self) -> int:
+        return sum(run.size for run in list(self._index.values()))
+
+    def collect(self) -> dict:
+        """
+        Enforce the quotas: drop expired runs, then the oldest until under max_bytes.
+
+        Runs still in progress, or held for a pending capture, are never removed.
+
+        Returns:
+            Dict with removed run count and freed bytes
+        """
+        self._load()
+        dirty, self._dirty = self._dirty, set()
+        for run_id in dirty:
+            run = self._index.get(run_id)
+            if run is not None:
+                run.size = _dir_size(run.directory)
+                # Restored unfinished: finished once its result.json exists
+                run.finished = run.finished or run.result_path.exists()
+
+        now = time.time()
+        with self._lock:
+            candidates = sorted(
+                (run for run in self._index.values() if run.finished and run.run_id not in self._held),
+                key=lambda run: run.created
+            )
+        total = self.total_size()
+        removed = freed = 0
+        for run in candidates:
+            expired = now - run.created > self.max_age_s
+            if not expired and total <= self.max_bytes:
+                break
+            shutil.rmtree(run.directory, ignore_errors=True)
+            with self._lock:
+                self._index.pop(run.run_id, None)
+            total -= run.size
+            freed += run.size
+            removed += 1
+
+        if removed:
+            logger.info(f"Artifact GC: removed {removed} run(s), freed {freed // 1024} KiB")
+        return {"removed": removed, "freedBytes": freed, "totalBytes": total}
+
+    def to_state(self) -> Optional[dict]:
+        if not self._loaded:
+            return None
+        try:
+            root_mtime = self.root.stat().st_mtime
+        except OSError:
+            return None
+        runs = [[run.run_id, run.created, run.size, run.finished] for run in list(self._index.values())]
+        return {"rootMtime": root_mtime, "runs": runs}
+
+    def load_state(self, state: dict) -> int:
+        """Keep a snapshot of the index; _load() uses it if the runs directory is unchanged."""
+        if not self._loaded:
+            self._restored = state
+        return len(state["runs"])
+
+    def start_gc(self, interval_s: float = GC_INTERVAL_S) -> None:
+        """Start the background GC task (idempotent; needs a running loop)."""
+        if self._gc_task is None or self._gc_task.done():
+            self._gc_task = asyncio.create_task(self._gc_loop(interval_s))
+
+    async def _gc_loop(self, interval_s: float) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                logger.exception(f"Artifact GC failed: {e}")
+            await asyncio.sleep(interval_s)
+
+
+artifact_store = ArtifactStore()
+
+register_state("artifact_index", artifact_store.to_state, artifact_store.load_state)
+
+registry.gauge("ahk_artifact_store_bytes", "Size of the run artifact store", function=artifact_store.total_size)
@@ -0,0 +1,571 @@
+"""Synthetic labeled script corpus and detection accuracy/throughput harness.
+
+generate_corpus() writes thousands of small V1/V2 scripts in six
+categories (syntax error, runtime error, include error, MsgBox success,
+persistent GUI/tray, instant exit) with, for each one, the window trace
+AutoHotkey would produce (dialog titles, control classes and texts,
+timings, exit code; see detection.py) and the expected verdict. Variants
+cover the cases the launcher is known to struggle with: MsgBox texts
+containing "error", custom window titles, slow GUIs, runtime errors after
+the 2s persistent-script rule, sub-500ms clean exits and an editor window
+open on the script.
+
+evaluate() replays every trace through the launcher model and the
+server's parsing path (JSON result parsing, error fingerprinting, source
+mapping, result validation) and reports status accuracy, failing-line
+accuracy, the time-to-verdict distribution and throughput.
+compare_to_baseline() turns a report into a list of regressions.
+bench_parser() times the error dialog parser (error_parser.py) on the
+corpus's dialogs or on control trees captured in recorded traces, and on
+synthetic dialogs of growing length to check that it stays linear.
+
+Driven by bench_detection.py at the root of the MCP server.
+"""
+import gzip
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Optional
+
+from ..formatting import build_run_result
+from .detection import control_tree, detect
+from .error_index import ErrorIndex
+from .error_parser import parse_control_tree
+from .powershell import _parse_json_output
+from .source_index import locate_error
+from .trace import load_trace
+
+logger = logging.getLogger(__name__)
+
+CORPUS_VERSION = 1
+LABELS_FILE = "labels.jsonl.gz"
+
+CATEGORIES = ("syntax_error", "runtime_error", "include_error", "msgbox_success", "persistent_gui", "instant_exit")
+
+# Share of scripts with an editor window open on them (title contains the script name)
+EDITOR_OPEN_RATE = 0.1
+# Share of scripts run while an unrelated application shows an error dialog
+FOREIGN_ERROR_RATE = 0.1
+
+_NAMES = (
+    "clipboard_tool", "hotstrings", "window_mover", "launcher", "backup", "reminder", "notes",
+    "volume_keys", "text_expander", "screen_ruler", "autosave", "tray_menu", "timer", "renamer",
+)
+
+_V1_FILLER = (
+    "x{n} := {n}", "count := count + {n}", "SetWorkingDir, %A_ScriptDir%", "SendMode Input",
+    "StringUpper, out{n}, in{n}", "; step {n}", "name{n} = item{n}", "",
+)
+_V2_FILLER = (
+    "x{n} := {n}", "count += {n}", "SetWorkingDir(A_ScriptDir)", "SendMode(\"Input\")",
+    "out{n} := StrUpper(\"in{n}\")", "; step {n}", "name{n} := \"item{n}\"", "",
+)
+_V1_HEADER = ("#NoEnv", "#SingleInstance Force")
+_V2_HEADER = ("#Requires AutoHotkey v2.0", "#SingleInstance Force")
+
+# (line text, message)
+_SYNTAX = {
+    "V1": (
+        ("x := (1 + 2", 'Missing ")"'),
+        ('MsgBox, % "Hello', "Missing close-quote"),
+        ("Foo bar baz", "This line does not contain a recognized action."),
+        ("If (x = 1", 'Missing ")"'),
+    ),
+    "V2": (
+        ('MsgBox("Hello"', 'Missing ")"'),
+        ("x := [1, 2", 'Missing "]"'),
+        ("y := 1 +* 2", "Unexpected operator"),
+        ('Send("{Enter}', "Missing close-quote"),
+    ),
+}
+_RUNTIME = {
+    "V1": (
+        ("Run, nonexistent_{n}.exe", "Failed attempt to launch program or document:"),
+        ("Gui, Add, Foo, , x", "Invalid option."),
+        ('FileAppend, x, *:\\bad{n}.txt', "Failed to write file."),
+    ),
+    "V2": (
+        ("x{n}.Foo()", 'This value of type "Integer" has no method named "Foo".'),
+        ("y := 1 / 0", "Divide by zero."),
+        ("z := arr[10]", "Invalid index."),
+        ('Run("nonexistent_{n}.exe")', "Failed attempt to launch program or document."),
+    ),
+}
+_MSGBOX_TEXTS = (
+    "Hello from the script", "Done: {n} items processed", "Backup complete", "Settings saved",
+    "Ready", "Clipboard copied ({n} chars)",
+    # Success messages the launcher's keyword rules mistake for errors
+    "No errors found", "Syntax check passed",
+)
+_GUI_TITLES = ("Settings", "Quick Notes", "Timer {n}", "Launcher", "Better Transcription", "Renamer - preview")
+_V2_LOAD_BUTTONS = ("&Help", "&Edit", "&Reload", "E&xitApp")
+_V2_RUNTIME_BUTTONS = ("&Abort", "&Continue", "&Help", "&Edit", "&Reload", "E&xitApp")
+
+
+class _Builder:
+    """Generates one script (and its trace) at a time from a seeded RNG."""
+
+    def __init__(self, rng: random.Random, scripts_dir: Path):
+        self.rng = rng
+        self.scripts_dir = scripts_dir
+        self.hwnd = 0x10000
+
+    def _next_hwnd(self) -> int:
+        self.hwnd += self.rng.randint(2, 40)
+        return self.hwnd
+
+    def _body(self, version: str, lines: int) -> list[str]:
+        filler = _V1_FILLER if version == "V1" else _V2_FILLER
+        header = _V1_HEADER if version == "V1" else _V2_HEADER
+        body = [f"; generated {version} test script", *header]
+        for n in range(lines):
+            body.append(self.rng.choice(filler).format(n=n))
+        return body
+
+    @staticmethod
+    def _context(lines: list[str], line: int, marker: str) -> list[str]:
+        """Dialog source excerpt around 1-based `line` (V1 "--->", V2 "▶")."""
+        excerpt = []
+        for n in range(max(1, line - 2), min(len(lines), line + 1) + 1):
+            prefix = marker if n == line else ""
+            excerpt.append(f"{prefix}\t{n:03d}: {lines[n - 1]}")
+        return excerpt
+
+    def _dialog(self, pid: int, title: str, static: list[str], buttons: list[str]) -> dict:
+        controls = [{"class": "Static", "text": text} for text in static]
+        controls += [{"class": "Button", "text": b} for b in buttons]
+        return {"hwnd": self._next_hwnd(), "pid": pid, "title": title, "class": "#32770", "controls": controls}
+
+    def _error_dialog(self, version: str, pid: int, title: str, lines: list[str], line: int,
+                      message: str, load_time: bool, file_path: Optional[str] = None) -> dict:
+        end = "The program will exit." if load_time else "The current thread will exit."
+        if version == "V1":
+            if load_time:
+                where = f'Error at line {line} in #include file "{file_path}".' if file_path else f"Error at line {line}."
+                text = f"{where}\n\nLine Text: {lines[line - 1]}\nError: {message}\n\n{end}"
+            else:
+                excerpt = "\n".join(["\tLine#", *self._context(lines, line, "--->")])
+                text = f"Error:  {message}\n\n{excerpt}\n\n{end}"
+            return self._dialog(pid, title, [text], ["OK"])
+        excerpt = "\n".join(self._context(lines, line, "▶"))
+        static = [f"Error: {message}", excerpt, end]
+        return self._dialog(pid, title, static, list(_V2_LOAD_BUTTONS if load_time else _V2_RUNTIME_BUTTONS))
+
+    def build(self, index: int, category: str, version: str) -> dict:
+        rng = self.rng
+        name = f"{rng.choice(_NAMES)}_{index:05d}.ahk"
+        path = self.scripts_dir / name
+        pid = rng.randint(1000, 60000)
+        lines = self._body(version, rng.randint(4, 40))
+        events: list[dict] = []
+        expected: dict = {}
+        variant = "plain"
+        extra_files: dict[str, list[str]] = {}
+
+        if category == "syntax_error":
+            text, message = rng.choice(_SYNTAX[version])
+            line = rng.randint(len(_V1_HEADER) + 2, len(lines) + 1)
+            lines.insert(line - 1, text)
+            t = rng.randint(60, 250)
+            events.append({"t": t, "open": self._error_dialog(version, pid, name, lines, line, message, True)})
+            expected = {"status": "ERROR", "file": name, "line": line}
+
+        elif category == "runtime_error":
+            text, message = rng.choice(_RUNTIME[version])
+            text = text.format(n=index)
+            line = rng.randint(len(_V1_HEADER) + 2, len(lines) + 1)
+            lines.insert(line - 1, text)
+            if rng.random() < 0.1:
+                # Reached after a long Sleep: past the launcher's 2s rule
+                t, variant = rng.randint(2200, 2800), "late"
+            else:
+                t = rng.randint(100, 1500)
+            events.append({"t": t, "open": self._error_dialog(version, pid, name, lines, line, message, False)})
+            expected = {"status": "ERROR", "file": name, "line": line}
+
+        elif category == "include_error":
+            if rng.random() < 0.5:
+                variant = "missing"
+                target = f"lib_missing_{index}.ahk"
+                line = rng.randint(len(_V1_HEADER) + 2, len(lines) + 1)
+                lines.insert(line - 1, f"#Include {target}")
+                message = f'#Include file "{target}" cannot be opened.'
+                dialog = self._error_dialog(version, pid, name, lines, line, message, True)
+                expected = {"status": "ERROR", "file": name, "line": line}
+            else:
+                variant = "in_library"
+                lib_name = f"lib_{index:05d}.ahk"
+                lib_lines = self._body(version, rng.randint(3, 20))[1:]
+                text, message = rng.choice(_SYNTAX[version])
+                lib_line = rng.randint(2, len(lib_lines) + 1)
+                lib_lines.insert(lib_line - 1, text)
+                extra_files[lib_name] = lib_lines
+                lines.insert(rng.randint(len(_V1_HEADER) + 2, len(lines) + 1), f"#Include {lib_name}")
+                dialog = self._error_dialog(
+                    version, pid, name, lib_lines, lib_line, message, True,
+                    file_path=str(self.scripts_dir / lib_name)
+                )
+                expected = {"status": "ERROR", "file": lib_name, "line": lib_line}
+            events.append({"t": rng.randint(60, 250), "open": dialog})
+
+        elif category == "msgbox_success":
+            text = rng.choice(_MSGBOX_TEXTS).format(n=index)
+            if rng.random() < 0.3:
+                title, variant = rng.choice(_GUI_TITLES).format(n=index), "custom_title"
+                lines.append(f'MsgBox, 0, {title}, {text}' if version == "V1" else f'MsgBox("{text}", "{title}")')
+            else:
+                title = name
+                lines.append(f"MsgBox, {text}" if version == "V1" else f'MsgBox("{text}")')
+            if "error" in text.lower() or "syntax" in text.lower():
+                variant = "error_words"
+            t = rng.randint(80, 600)
+            events.append({"t": t, "open": self._dialog(pid, title, [text], ["OK"])})
+            expected = {"status": "SUCCESS", "window": True}
+
+        elif category == "persistent_gui":
+            if rng.random() < 0.3:
+                variant = "tray"
+                lines.extend(["#Persistent", "return"] if version == "V1" else ["Persistent()"])
+                expected = {"status": "RUNNING"}
+            else:
+                title = rng.choice(_GUI_TITLES).format(n=index)
+                if version == "V1":
+                    lines.extend(["Gui, Add, Text,, Name:", "Gui, Add, Edit, vName", "Gui, Add, Button, Default, Save", f"Gui, Show,, {title}", "return"])
+                else:
+                    lines.extend(["g := Gui()", 'g.Add("Text",, "Name:")', 'g.Add("Edit", "vName")', 'g.Add("Button", "Default", "Save")', f'g.Title := "{title}"', "g.Show()"])
+                if rng.random() < 0.1:
+                    t, variant = rng.randint(2100, 2600), "slow"
+                else:
+                    t = rng.randint(150, 900)
+                window = {
+                    "hwnd": self._next_hwnd(), "pid": pid, "title": title, "class": "AutoHotkeyGUI",
+                    "controls": [{"class": "Static", "text": "Name:"}, {"class": "Edit", "text": ""}, {"class": "Button", "text": "Save"}],
+                }
+                events.append({"t": t, "open": window})
+                # A running GUI script is healthy whether the window was seen in time or not
+                expected = {"status": "SUCCESS", "accept": ["SUCCESS", "RUNNING"], "window": True}
+
+        else:  # instant_exit
+            if rng.random() < 0.6:
+                t = rng.randint(20, 450)
+            else:
+                t, variant = rng.randint(550, 1200), "sleep_first"
+                lines.append("Sleep, 600" if version == "V1" else "Sleep(600)")
+            lines.append("ExitApp" if version == "V1" else "ExitApp(0)")
+            events.append({"t": t, "exit": 0})
+            expected = {"status": "SUCCESS"}
+
+        # The run's own windows go away when the launcher kills AHK; foreign ones stay
+        if rng.random() < EDITOR_OPEN_RATE:
+            variant += "+editor"
+            editor = {"hwnd": self._next_hwnd(), "pid": rng.randint(60001, 65000), "title": f"{name} - Visual Studio Code", "class": "Chrome_WidgetWin_1", "controls": []}
+            events.insert(0, {"t": 0, "open": editor})
+        if rng.random() < FOREIGN_ERROR_RATE:
+            variant += "+foreign_error"
+            foreign = self._dialog(rng.randint(60001, 65000), "Python Error", ["Traceback (most recent call last): ..."], ["OK"])
+            events.insert(0, {"t": 0, "open": foreign})
+
+        expected.setdefault("accept", [expected["status"]])
+        self._write(path, lines)
+        for lib_name, lib_lines in extra_files.items():
+            self._write(self.scripts_dir / lib_name, lib_lines)
+
+        return {
+            "script": name,
+            "version": version,
+            "category": category,
+            "variant": variant,
+            "expected": expected,
+            "trace": {"script": name, "pid": pid, "otherAhk": rng.random() < 0.2, "events": events},
+        }
+
+    @staticmethod
+    def _write(path: Path, lines: list[str]) -> None:
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def generate_corpus(out_dir: str, count: int = 3000, seed: int = 0) -> Path:
+    """
+    Write `count` labeled scripts (even split of categories and versions) to out_dir.
+
+    Returns:
+        Path of the labels file (one JSON line per script: category,
+        variant, expected verdict and window trace)
+    """
+    out = Path(out_dir)
+    scripts_dir = out / "scripts"
+    scripts_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    builder = _Builder(rng, scripts_dir)
+
+    labels_path = out / LABELS_FILE
+    with gzip.open(labels_path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"v": CORPUS_VERSION, "count": count, "seed": seed}) + "\n")
+        for index in range(count):
+            category = CATEGORIES[index % len(CATEGORIES)]
+            version = ("V1", "V2")[(index // len(CATEGORIES)) % 2]
+            f.write(json.dumps(builder.build(index, category, version), ensure_ascii=False) + "\n")
+    logger.info(f"Generated {count} scripts in {scripts_dir}")
+    return labels_path
+
+
+def load_corpus(corpus_dir: str) -> tuple[dict, list[dict]]:
+    """(header, labels) of a generated corpus."""
+    with gzip.open(Path(corpus_dir) / LABELS_FILE, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("v") != CORPUS_VERSION:
+            raise ValueError(f"Corpus format {header.get('v')} != {CORPUS_VERSION}: regenerate it")
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": 0, "p90": 0, "p99": 0, "max": 0}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def evaluate(corpus_dir: str, timeout_ms: int = 3000) -> dict:
+    """
+    Replay a corpus through detection and the parsing path.
+
+    Returns:
+        Report dict: accuracy (overall, per category/version, per variant),
+        line accuracy of ERROR results, confusion matrix, time-to-verdict
+        percentiles (launcher model ms) and throughput with per-stage
+        microseconds of the Python path
+    """
+    header, labels = load_corpus(corpus_dir)
+    scripts_dir = Path(corpus_dir) / "scripts"
+    index = ErrorIndex()
+    stages = {"detectUs": 0.0, "parseUs": 0.0, "fingerprintUs": 0.0, "locateUs": 0.0, "validateUs": 0.0}
+    groups: dict[str, list[int]] = {}
+    variants: dict[str, list[int]] = {}
+    confusion: dict[str, dict[str, int]] = {}
+    verdicts: dict[str, list[float]] = {}
+    lines_ok = lines_total = 0
+
+    def tally(table: dict, key: str, ok: bool) -> None:
+        entry = table.setdefault(key, [0, 0])
+        entry[0] += ok
+        entry[1] += 1
+
+    start = time.perf_counter()
+    for label in labels:
+        script_path = str(scripts_dir / label["script"])
+        t0 = time.perf_counter()
+        launcher_result = detect(label["trace"], timeout_ms)
+        t1 = time.perf_counter()
+        result = _parse_json_output(json.dumps(launcher_result), "", label["version"])
+        result["scriptPath"] = script_path
+        t2 = time.perf_counter()
+        location = None
+        if result["status"] == "ERROR":
+            index.add(result, script_path=script_path)
+            t3 = time.perf_counter()
+            location = locate_error(script_path, result)
+        else:
+            t3 = time.perf_counter()
+        t4 = time.perf_counter()
+        build_run_result(result, source_location=location)
+        t5 = time.perf_counter()
+        for key, (a, b) in zip(stages, ((t0, t1), (t1, t2), (t2, t3), (t3, t4), (t4, t5))):
+            stages[key] += (b - a) * 1e6
+
+        expected = label["expected"]
+        status = result["status"]
+        ok = status in expected["accept"]
+        tally(groups, "all", ok)
+        tally(groups, f"{label['category']}/{label['version']}", ok)
+        tally(groups, label["category"], ok)
+        tally(variants, f"{label['category']}:{label['variant']}", ok)
+        confusion.setdefault(label["category"], {}).setdefault(status, 0)
+        confusion[label["category"]][status] += 1
+        verdicts.setdefault(label["category"], []).append(result.get("executionTimeMs", 0))
+
+        if "line" in expected:
+            lines_total += 1
+            lines_ok += bool(
+                location and Path(location["file"]).name == expected["file"] and location["line"] == expected["line"]
+            )
+    elapsed = time.perf_counter() - start
+
+    def rate(entry: list[int]) -> float:
+        return round(entry[0] / entry[1], 4) if entry[1] else 0.0
+
+    all_verdicts = [v for values in verdicts.values() for v in values]
+    return {
+        "corpus": {"count": len(labels), "seed": header.get("seed")},
+        "accuracy": rate(groups.pop("all")),
+        "accuracyBy": {key: rate(entry) for key, entry in sorted(groups.items())},
+        "accuracyByVariant": {key: {"accuracy": rate(entry), "n": entry[1]} for key, entry in sorted(variants.items())},
+        "lineAccuracy": round(lines_ok / lines_total, 4) if lines_total else 0.0,
+        "confusion": confusion,
+        "verdictMs": {"all": _percentiles(all_verdicts), **{c: _percentiles(v) for c, v in sorted(verdicts.items())}},
+        "errorClusters": len(index),
+        "throughput": {
+            "scriptsPerS": round(len(labels) / elapsed, 1) if elapsed else 0.0,
+            **{key: round(total / max(len(labels), 1), 1) for key, total in stages.items()},
+        },
+    }
+
+
+# Allowed drift before compare_to_baseline() reports a regression
+TOLERANCES = {
+    # Accuracy is deterministic for a given corpus: any drop counts
+    "accuracy": 0.0,
+    # Launcher-model verdict times are deterministic too; allow rounding
+    "verdictMs": 0.02,
+    # Throughput depends on the machine: only flag large drops
+    "throughput": 0.5,
+}
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerances: Optional[dict] = None) -> list[str]:
+    """
+    List the regressions of a report against a baseline report.
+
+    Accuracy (overall, per category/version, line accuracy) may not drop,
+    verdict percentiles may not grow beyond tolerance and throughput may not
+    fall below (1 - tolerance) of the baseline. Reports of different corpora
+    are not comparable.
+    """
+    tol = {**TOLERANCES, **(tolerances or {})}
+    if report["corpus"] != baseline.get("corpus"):
+        return [f"corpus {report['corpus']} differs from baseline corpus {baseline.get('corpus')}"]
+
+    regressions = []
+    pairs = [("accuracy", report["accuracy"], baseline["accuracy"]), ("lineAccuracy", report["lineAccuracy"], baseline["lineAccuracy"])]
+    pairs += [(f"accuracy {key}", value, baseline["accuracyBy"].get(key, 0.0)) for key, value in report["accuracyBy"].items()]
+    for name, value, before in pairs:
+        if value < before - tol["accuracy"] - 1e-9:
+            regressions.append(f"{name}: {value:.2%} < baseline {before:.2%}")
+
+    for category, stats in report["verdictMs"].items():
+        before = baseline["verdictMs"].get(category)
+        if not before:
+            continue
+        for q in ("p50", "p90", "p99"):
+            if stats[q] > before[q] * (1 + tol["verdictMs"]) + 1:
+                regressions.append(f"verdict {category} {q}: {stats[q]}ms > baseline {before[q]}ms")
+
+    if tol["throughput"] < 1:
+        value, before = report["throughput"]["scriptsPerS"], baseline["throughput"]["scriptsPerS"]
+        if value < before * (1 - tol["throughput"]):
+            regressions.append(f"throughput: {value}/s < {1 - tol['throughput']:.0%} of baseline {before}/s")
+    return regressions
+
+
+def collect_control_trees(corpus_dir: Optional[str] = None, trace_paths: tuple = ()) -> list[dict]:
+    """
+    Error dialog control trees to benchmark the parser on.
+
+    Args:
+        corpus_dir: Generated corpus; every dialog (#32770) of its traces
+        trace_paths: Recorded traces (trace.py); the controlTree of each ERROR run
+
+    Returns:
+        Control trees as the launcher emits them
+    """
+    trees = []
+    if corpus_dir:
+        for label in load_corpus(corpus_dir)[1]:
+            for event in label["trace"]["events"]:
+                window = event.get("open")
+                if window and window.get("class") == "#32770":
+                    trees.append(control_tree(window))
+    for path in trace_paths:
+        for record in load_trace(path):
+            tree = (record.get("out") or {}).get("controlTree")
+            if tree:
+                trees.append(tree)
+    return trees
+
+
+def _long_dialog(lines: int) -> dict:
+    """V2 runtime error dialog listing `lines` source lines (one marked)."""
+    marked = lines // 2
+    source = "\n".join(
+        f"{'▶' if n == marked else ''}\t{n:03d}: value{n} := Format(\"{{1}}-{{2}}\", a{n}, b{n})"
+        for n in range(1, lines + 1)
+    )
+    return {"title": "long.ahk", "controls": [
+        {"class": "Static", "text": "Error: This value of type \"String\" has no method named \"Push\".", "order": 0},
+        {"class": "Static", "text": source, "order": 1},
+        {"class": "Static", "text": "The current thread will exit.", "order": 2},
+        *({"class": "Button", "text": b, "order": 3 + i} for i, b in enumerate(_V2_RUNTIME_BUTTONS)),
+    ]}
+
+
+def bench_parser(trees: list[dict], rounds: int = 5, sizes: tuple = (1000, 4000, 16000, 64000)) -> dict:
+    """
+    Time parse_control_tree() on captured trees and on growing dialogs.
+
+    Returns:
+        Report dict: trees, lines, rule sets picked, best-round
+        microseconds per tree and lines/s, and per-size timings of the
+        synthetic dialogs (usPerLine should stay flat: linear time)
+    """
+    rules: dict[str, int] = {}
+    line_count = 0
+    for tree in trees:
+        details = parse_control_tree(tree)
+        rules[details["rules"]] = rules.get(details["rules"], 0) + 1
+        line_count += sum((c.get("text") or "").count("\n") + 1 for c in tree.get("controls") or ())
+
+    best = float("inf")
+    for _ in range(rounds if trees else 0):
+        start = time.perf_counter()
+        for tree in trees:
+            parse_control_tree(tree)
+        best = min(best, time.perf_counter() - start)
+
+    scaling = []
+    for size in sizes:
+        dialog = _long_dialog(size)
+        elapsed = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            details = parse_control_tree(dialog)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        scaling.append({
+            "lines": size,
+            "ms": round(elapsed * 1000, 2),
+            "usPerLine": round(elapsed * 1e6 / size, 3),
+            "failingLine": next((line.split(":", 1)[0] for line in details["sourceCode"] if line.startswith("--->")), None),
+        })
+
+    return {
+        "trees": len(trees),
+        "lines": line_count,
+        "rules": dict(sorted(rules.items())),
+        "usPerTree": round(best * 1e6 / len(trees), 2) if trees else 0.0,
+        "linesPerS": round(line_count / best) if trees and best else 0,
+        "scaling": scaling,
+        # Per-line cost of the largest dialog relative to the smallest (1.0 = linear)
+        "scalingRatio": round(scaling[-1]["usPerLine"] / scaling[0]["usPerLine"], 2) if len(scaling) > 1 and scaling[0]["usPerLine"] else None,
+    }
+
+
+def summarize(report: dict) -> str:
+    """Short human-readable summary of an evaluate() report."""
+    lines = [
+        f"Scripts: {report['corpus']['count']} (seed {report['corpus']['seed']})",
+        f"Status accuracy: {report['accuracy']:.2%}   failing-line accuracy: {report['lineAccuracy']:.2%}",
+        f"Throughput: {report['throughput']['scriptsPerS']} scripts/s",
+        "",
+        f"{'group':32} {'accuracy':>9}",
+    ]
+    lines += [f"{key:32} {value:>9.2%}" for key, value in report["accuracyBy"].items()]
+    misses = {k: v for k, v in report["accuracyByVariant"].items() if v["accuracy"] < 1}
+    if misses:
+        lines += ["", "Variants below 100%:"]
+        lines += [f"  {key:40} {v['accuracy']:>7.2%} (n={v['n']})" for key, v in misses.items()]
+    lines += ["", "Time to verdict (launcher model, ms):"]
+    lines += [f"  {key:16} p50={v['p50']:<6} p90={v['p90']:<6} p99={v['p99']}" for key, v in report["verdictMs"].items()]
+    stages = ", ".join(f"{k[:-2]} {v}us" for k, v in report["throughput"].items() if k.endswith("Us"))
+    lines += ["", f"Per script: {stages}"]
+    return "\n".join(lines)
@@ -0,0 +1,142 @@
+"""Deferred screenshot capture for ahk_run_script results.
+
+The run returns as soon as the launcher has a verdict; the window is then
+captured by a background task and published under ahk://runs/{run_id}/screenshot.
+For ERROR results the launcher leaves the AHK process alive (-KeepErrorWindow)
+so the error dialog is still on screen; it is reaped once the capture is done.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from .artifacts import artifact_store
+from .metrics import registry
+from .powershell import capture_window_screenshot
+from .process_tree import ProcessTree
+
+logger = logging.getLogger(__name__)
+
+# Completed captures kept in memory (oldest evicted first)
+MAX_CAPTURES = 200
+
+# How long a resource read waits for a pending capture
+CAPTURE_WAIT_S = 30.0
+
+_captures: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+
+registry.gauge(
+    "ahk_captures_pending", "Deferred captures not finished yet",
+    function=lambda: sum(not task.done() for task in list(_captures.values()))
+)
+
+
+def screenshot_uri(run_id: str) -> str:
+    """Resource URI under which a run's screenshot is published."""
+    return f"ahk://runs/{run_id}/screenshot"
+
+
+def schedule_capture(
+    run_id: str,
+    window_handle: Optional[str] = None,
+    window_title: Optional[str] = None,
+    reap_pid: Optional[int] = None,
+    output_dir: Optional[str] = None,
+    stable: bool = False
+) -> str:
+    """
+    Start capturing a run's window in the background.
+
+    Args:
+        run_id: Run identifier the screenshot is published under
+        window_handle: Window handle reported by the launcher
+        window_title: Fallback title match when no handle is known
+        reap_pid: AHK process to terminate once the capture is done (ERROR runs)
+        output_dir: Directory for the PNG (the run's artifact directory)
+        stable: Wait for the window to stop changing (script GUIs)
+
+    Returns:
+        The pending resource URI
+    """
+    task = asyncio.create_task(_capture(run_id, window_handle, window_title, reap_pid, output_dir, stable))
+    # The run directory must outlive the capture written into it
+    artifact_store.hold(run_id)
+    task.add_done_callback(lambda _: artifact_store.release(run_id))
+    return _register(run_id, task)
+
+
+def publish_capture(run_id: str, result: dict) -> str:
+    """Publish a capture taken elsewhere (by a remote runner, during the run)."""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return _register(run_id, future)
+
+
+def _register(run_id: str, task: asyncio.Future) -> str:
+    _captures[run_id] = task
+
+    while len(_captures) > MAX_CAPTURES:
+        oldest_id, oldest = next(iter(_captures.items()))
+        if not oldest.done():
+            break
+        del _captures[oldest_id]
+
+    return screenshot_uri(run_id)
+
+
+async def _capture(
+    run_id: str,
+    window_handle: Optional[str],
+    window_title: Optional[str],
+    reap_pid: Optional[int],
+    output_dir: Optional[str],
+    stable: bool = False
+) -> dict:
+    try:
+        result = await capture_window_screenshot(
+            window_title=window_title,
+            window_handle=window_handle,
+            output_path=output_dir,
+            stable=stable
+        )
+        if result.get("success"):
+            logger.info("Deferred capture for run %s: %s", run_id, result.get("screenshot_path"))
+            if output_dir:
+                artifact_store.mark_dirty(run_id)
+        else:
+            logger.warning("Deferred capture for run %s failed: %s", run_id, result.get("error"))
+        return result
+    except Exception as e:
+        logger.exception("Deferred capture for run %s crashed: %s", run_id, e)
+        return {"success": False, "error": str(e)}
+    finally:
+        if reap_pid:
+            await asyncio.to_thread(ProcessTree(reap_pid).reap)
+
+
+async def get_capture(run_id: str, wait_s: float = CAPTURE_WAIT_S) -> Optional[dict]:
+    """
+    Get the capture result for a run, waiting for it if still pending.
+
+    Returns:
+        capture_window_screenshot() result dict, or None for an unknown run
+    """
+    task = _captures.get(run_id)
+    if task is None:
+        return None
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=wait_s)
+    except asyncio.TimeoutError:
+        return {"success": False, "pending": True, "error": f"Capture still pending after {wait_s}s"}
+
+
+def capture_status(run_id: str) -> str:
+    """Return "pending", "ready", "failed" or "unknown" for a run's capture."""
+    task = _captures.get(run_id)
+    if task is None:
+        return "unknown"
+    if not task.done():
+        return "pending"
+    if task.cancelled():
+        return "failed"
+    return "ready" if task.result().get("success") else "failed"
@@ -0,0 +1,295 @@
+"""Python model of ahklauncher.ps1's verdict loop, driven by window traces.
+
+The launcher decides a run's status by polling the desktop every 50ms:
+process exit code, error dialogs (Get-ErrorWindowText), windows named
+after the script (Test-WindowIsSuccess), windows of the AHK process
+(Get-ProcessWindows), then the 2s "persistent script" rule and the
+timeout. Those rules only run on Windows; this module applies the same
+rules, in the same order and with the same quirks (GetWindowText buffer
+sizes, case-insensitive -match/-eq), to a recorded or synthetic window
+trace, so detection accuracy and time-to-verdict can be measured on any
+OS (see corpus.py).
+
+Since launcher 1.12.0 every check only sees the windows of the run's
+process tree (the AHK process and its descendants, "pid" and "childPids"
+in the trace), and the tray status only looks at that tree; windows of
+other processes (an editor open on the script, another run) are ignored.
+
+A window trace is a dict:
+
+    {"script": "x.ahk", "pid": 4242, "childPids": [4250],
+     "events": [
+        {"t": 180, "open": {"hwnd": 1001, "pid": 4242, "title": "x.ahk",
+                            "class": "#32770",
+                            "controls": [{"class": "Static", "text": "..."},
+                                         {"class": "Button", "text": "OK"}]}},
+        {"t": 900, "close": 1001},
+        {"t": 950, "exit": 0}]}
+
+Times are ms after AutoHotkey started. Windows are enumerated newest
+first (top of the z-order).
+"""
+import re
+from typing import Optional
+
+# Launcher timing (ahklauncher.ps1 monitoring loop)
+POLL_MS = 50
+# Modelled cost of one poll's window enumeration and text reads
+SCAN_MS = 30
+QUICK_EXIT_MS = 500
+PERSISTENT_MS = 2000
+
+# GetWindowText buffer sizes used by the launcher (capacity - 1 characters);
+# control texts are read at their full length (Get-WindowControls)
+ENUM_TITLE_CHARS = 255
+TITLE_CHARS = 511
+BUTTON_TEXT_CHARS = 255
+
+ERROR_BUTTONS = ("&Abort", "&Help", "&Edit", "&Reload", "E&xitApp", "&Continue")
+_ERROR_BUTTONS_LOWER = {b.lower() for b in ERROR_BUTTONS}
+
+# Get-ErrorWindowText rule 1: full text of a window titled like the script
+_SCRIPT_WINDOW_ERROR_RE = re.compile(
+    r"(&Abort|&Help|&Edit|&Reload|E&xitApp|&Continue|Error|Erreur|Fatal|Syntax|Runtime|Access Violation|Division by zero|Invalid memory)",
+    re.IGNORECASE
+)
+# Rule 2: error keywords in the title of a non-browser/editor window
+_TITLE_ERROR_RE = re.compile(r"(error|erreur|syntax|fatal|runtime|access.violation|division.by.zero|invalid.memory)", re.IGNORECASE)
+_TITLE_APP_RE = re.compile(r"(explorateur|file explorer|chrome|notepad|visual studio|teams)", re.IGNORECASE)
+# Rule 2bis: AutoHotkey in the title
+_TITLE_AHK_RE = re.compile(r"autohotkey", re.IGNORECASE)
+_TITLE_EXPLORER_RE = re.compile(r"(explorateur|file explorer|scripts.*explorateur)", re.IGNORECASE)
+
+# Error text patterns of Test-WindowIsSuccess / rule 3 ...
+_CONTENT_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    "Error at line", "Error in #include", "requires AutoHotkey", "syntax error", "runtime error",
+    "fatal error", "access violation", "division by zero", "invalid memory", "The program will exit",
+    "Script exited", "Current interpreter:",
+)]
+# ... and the shorter list of Get-ProcessWindows
+_PROCESS_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    "Error at line", "Error in #include", "requires AutoHotkey", "syntax error", "runtime error",
+    "fatal error", "The program will exit", "Current interpreter:",
+)]
+
+_OK_CANCEL_RE = re.compile(r"^(OK|Cancel|&OK|&Cancel)$", re.IGNORECASE)
+_CHILD_SKIP_RE = re.compile(r"^(OK|Cancel|&OK|&Cancel|Button)$", re.IGNORECASE)
+
+
+# -- window text helpers (Get-WindowControls / Get-ControlTreeText) -----
+
+def control_tree(window: dict) -> dict:
+    """Get-WindowControls: the raw controlTree the launcher emits for an error window."""
+    return {
+        "title": window.get("title", "")[:TITLE_CHARS],
+        "controls": [
+            {"class": c.get("class", ""), "text": c.get("text", ""), "order": i}
+            for i, c in enumerate(window.get("controls", ()))
+        ],
+    }
+
+
+def window_text(window: dict) -> Optional[str]:
+    """Get-ControlTreeText: title and meaningful child texts joined by " | "."""
+    parts = []
+    title = window.get("title", "")[:TITLE_CHARS]
+    if title and not _OK_CANCEL_RE.match(title):
+        parts.append(title)
+    for control in window.get("controls", ()):
+        text = control.get("text", "").strip()
+        if len(text) > 3 and not _CHILD_SKIP_RE.match(text):
+            parts.append(text)
+    text = " | ".join(parts).rstrip(" |").strip()
+    return text or None
+
+
+def has_error_buttons(window: dict) -> bool:
+    """Test-WindowHasErrorButtons: at least 3 of the AHK error dialog buttons."""
+    texts = {c.get("text", "")[:BUTTON_TEXT_CHARS].strip().lower() for c in window.get("controls", ())}
+    return len(texts & _ERROR_BUTTONS_LOWER) >= 3
+
+
+def _matches_any(text: Optional[str], patterns: list) -> bool:
+    return bool(text) and any(p.search(text) for p in patterns)
+
+
+# -- the launcher's window checks ------------------------------------
+
+def scan_error_windows(windows: list[dict], script_name: str, pids: set[int]) -> Optional[dict]:
+    """Get-ErrorWindowText (windows of the run's processes): SUCCESS/ERROR verdict dict or None."""
+    base_name = script_name.replace(".ahk", "")
+    script_lower, base_lower = script_name.lower(), base_name.lower()
+
+    for window in windows:
+        if window.get("pid") not in pids:
+            continue
+        title = window["title"]
+        is_error = False
+
+        if title.lower() in (script_lower, base_lower):
+            full_text = window_text(window)
+            is_error = bool(full_text and _SCRIPT_WINDOW_ERROR_RE.search(full_text))
+        elif _TITLE_ERROR_RE.search(title) and not _TITLE_APP_RE.search(title) and len(title) < 100:
+            is_error = True
+        elif _TITLE_AHK_RE.search(title) and not _TITLE_EXPLORER_RE.search(title) and len(title) < 80:
+            is_error = True
+        elif base_name in title and len(title) < 100:
+            if has_error_buttons(window) or _matches_any(window_text(window), _CONTENT_PATTERNS):
+                is_error = True
+            else:
+                return {"status": "SUCCESS", "message": f"Script window detected: {title}", "windowHandle": window["hwnd"]}
+
+        if is_error:
+            # errorDetails are parsed from the control tree by the server (error_parser.py)
+            return {
+                "status": "ERROR",
+                "message": window_text(window) or f"Error detected in window: {title}",
+                "controlTree": control_tree(window),
+                "windowHandle": window["hwnd"],
+            }
+    return None
+
+
+def find_success_window(windows: list[dict], script_name: str, pids: set[int]) -> Optional[dict]:
+    """Test-WindowIsSuccess: a window of the run whose title contains the script name."""
+    base_lower = script_name.replace(".ahk", "").lower()
+    for window in windows:
+        if window.get("pid") not in pids or base_lower not in window["title"].lower():
+            continue
+        if has_error_buttons(window) or _matches_any(window_text(window), _CONTENT_PATTERNS):
+            continue
+        return window
+    return None
+
+
+def process_windows(windows: list[dict], pids: set[int]) -> list[dict]:
+    """Get-ProcessWindows: the windows of the run's processes with an IsError flag."""
+    found = []
+    for window in windows:
+        if window.get("pid") not in pids:
+            continue
+        text = window_text(window)
+        found.append({"window": window, "isError": has_error_buttons(window) or _matches_any(text, _PROCESS_PATTERNS), "text": text})
+    return found
+
+
+# -- trace replay -----------------------------------------------------
+
+class _Desktop:
+    """Windows and exit code of a trace as of a (non-decreasing) time."""
+
+    def __init__(self, trace: dict):
+        self.events = sorted(trace.get("events", ()), key=lambda e: e["t"])
+        self.position = 0
+        self.windows: dict = {}
+        self.exit_code: Optional[int] = None
+
+    def advance(self, t: float) -> None:
+        while self.position < len(self.events) and self.events[self.position]["t"] <= t:
+            event = self.events[self.position]
+            if "open" in event:
+                window = event["open"]
+                self.windows.pop(window["hwnd"], None)
+                self.windows[window["hwnd"]] = window
+            elif "close" in event:
+                self.windows.pop(event["close"], None)
+            elif "exit" in event:
+                self.exit_code = event["exit"]
+            self.position += 1
+
+    def visible(self) -> list[dict]:
+        # EnumWindows: top of the z-order (newest) first, titled windows only
+        return [w for w in reversed(self.windows.values()) if w.get("title", "")[:ENUM_TITLE_CHARS]]
+
+
+def detect(trace: dict, timeout_ms: int = 3000, poll_ms: float = POLL_MS, scan_ms: float = SCAN_MS) -> dict:
+    """
+    Run the launcher's monitoring loop over a window trace.
+
+    Args:
+        trace: Window trace (see module docstring)
+        timeout_ms: Launcher -TimeoutMs
+        poll_ms: Sleep between polls
+        scan_ms: Modelled duration of one poll's checks
+
+    Returns:
+        Launcher JSON result (status, message, controlTree, windowHandle,
+        trayIcon, executionTimeMs = time to verdict, scriptPath, processId)
+    """
+    script_name = trace["script"].replace("\\", "/").rsplit("/", 1)[-1]
+    pid = trace.get("pid", 0)
+    pids = {pid, *trace.get("childPids", ())}
+    desktop = _Desktop(trace)
+    t = 0.0
+
+    def verdict(status: str, message: str, **extra) -> dict:
+        alive = desktop.exit_code is None
+        result = {
+            "status": status,
+            "message": message,
+            "trayIcon": extra.pop("trayIcon", "FOUND" if alive else "NOT_FOUND"),
+            "executionTimeMs": int(t),
+            "scriptPath": trace["script"],
+            "processId": pid,
+        }
+        if extra.get("windowHandle") is not None:
+            extra["windowHandle"] = str(extra["windowHandle"])
+        result.update({k: v for k, v in extra.items() if v is not None})
+        return result
+
+    error = None
+    timed_out = False
+    while True:
+        desktop.advance(t)
+        if desktop.exit_code is not None:
+            if desktop.exit_code != 0:
+                error = {"message": f"AutoHotkey process exited with error code: {desktop.exit_code}"}
+            elif t < QUICK_EXIT_MS:
+                error = {"message": f"AutoHotkey process exited quickly (likely syntax error) - duration: {t}ms"}
+            break
+
+        windows = desktop.visible()
+        found = scan_error_windows(windows, script_name, pids)
+        if found and found["status"] == "SUCCESS":
+            return verdict("SUCCESS", found["message"], trayIcon="NOT_CHECKED", windowHandle=found["windowHandle"])
+        if found:
+            error = found
+
+        if error is None:
+            success = find_success_window(windows, script_name, pids)
+            if success is not None:
+                return verdict("SUCCESS", f"Script window detected: {success['title']}", trayIcon="NOT_CHECKED", windowHandle=success["hwnd"])
+            owned = process_windows(windows, pids)
+            ok = [w for w in owned if not w["isError"]]
+            if ok:
+                window = ok[0]["window"]
+                return verdict("SUCCESS", f"Script GUI window detected: {window['title']}", trayIcon="NOT_CHECKED", windowHandle=window["hwnd"])
+            bad = [w for w in owned if w["isError"]]
+            if bad:
+                error = {"message": bad[0]["text"], "windowHandle": bad[0]["window"]["hwnd"]}
+
+        if error is not None:
+            break
+
+        t += scan_ms
+        desktop.advance(t)
+        if t >= PERSISTENT_MS and desktop.exit_code is None:
+            return verdict("RUNNING", "Script is running (persistent script)", trayIcon="FOUND")
+        if desktop.exit_code == 0:
+            return verdict("SUCCESS", "Script launched successfully (parent exited, may have child processes)", trayIcon="NOT_CHECKED")
+        if t >= timeout_ms:
+            timed_out = True
+            break
+        t += poll_ms
+
+    if error is not None:
+        return verdict(
+            "ERROR", error.get("message") or "", trayIcon="NOT_FOUND",
+            controlTree=error.get("controlTree"), windowHandle=error.get("windowHandle")
+        )
+    if timed_out:
+        desktop.advance(t)
+        if desktop.exit_code is None:
+            return verdict("RUNNING", "Script is running (persistent script with tray icon or GUI)")
+        return verdict("TIMEOUT", "Script exited but no window was detected")
+    return verdict("SUCCESS", "Script completed successfully")
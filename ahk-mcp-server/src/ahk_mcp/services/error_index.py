@@ -0,0 +1,128 @@
+"""Error fingerprinting and clustering across runs.
+
+The same AHK mistake produces different raw messages in every script
+(paths, line numbers, identifiers). normalize_error() strips those parts
+so the remaining text identifies the *kind* of error; its hash is the
+fingerprint, and ErrorIndex groups runs by fingerprint for triage.
+"""
+import hashlib
+import re
+import time
+from typing import Optional
+
+from .warm_state import register_state
+
+# Error lines that carry no information about the kind of error
+_NOISE_LINES = re.compile(
+    r"^(?:the program will exit\.?|the current thread will exit\.?|line\s*#|"
+    r"---+|call stack:?|error at line \d+\.?)$",
+    re.IGNORECASE,
+)
+
+# Source code lines ("005: ..." / "---> 005: ...") are script-specific
+_SOURCE_LINE = re.compile(r"^\s*(?:--->\s*)?\d{1,5}:")
+
+# Order matters: paths before numbers, "Specifically:" payload before quotes
+_SUBSTITUTIONS = [
+    (re.compile(r"[A-Za-z]:[\\/][^\s\"'<>|]*"), "<path>"),
+    (re.compile(r"(?:\.{0,2}/)?(?:[\w.-]+/)+[\w.-]+"), "<path>"),
+    (re.compile(r"[\w.-]+\.ahk\b", re.IGNORECASE), "<file>"),
+    (re.compile(r"\b(specifically|text|function|variable|class|name):\s*.*$", re.IGNORECASE), r"\1: <x>"),
+    (re.compile(r"\"[^\"]*\"|'[^']*'|`[^`]*`"), "<s>"),
+    (re.compile(r"\b(?:line|ligne)\s*#?\s*\d+", re.IGNORECASE), "line <n>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE), "<n>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+# Representative scripts kept per cluster
+MAX_REPRESENTATIVES = 5
+
+
+def normalize_error(result: dict) -> str:
+    """
+    Reduce an ERROR result to the script-independent text of its error.
+
+    Uses errorDetails.errorContent when available, else the message.
+    """
+    details = result.get("errorDetails") or {}
+    lines = details.get("errorContent") or (result.get("message") or "").split("\n")
+
+    kept = []
+    for line in lines:
+        line = line.strip()
+        if not line or _SOURCE_LINE.match(line) or line.lower().startswith("source code:"):
+            continue
+        for pattern, repl in _SUBSTITUTIONS:
+            line = pattern.sub(repl, line)
+        line = line.strip().lower()
+        if line and not _NOISE_LINES.match(line):
+            kept.append(line)
+    return " | ".join(kept)
+
+
+def fingerprint(result: dict) -> str:
+    """Stable 16-hex-char fingerprint of an ERROR result."""
+    return hashlib.blake2b(normalize_error(result).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ErrorIndex:
+    """In-memory index of ERROR runs grouped by fingerprint."""
+
+    def __init__(self):
+        self._clusters: dict[str, dict] = {}
+
+    def add(self, result: dict, run_id: Optional[str] = None, script_path: Optional[str] = None) -> str:
+        """Index an ERROR result and return its fingerprint."""
+        fp = fingerprint(result)
+        now = time.time()
+        script = script_path or result.get("scriptPath") or ""
+
+        cluster = self._clusters.get(fp)
+        if cluster is None:
+            details = result.get("errorDetails") or {}
+            content = details.get("errorContent") or [(result.get("message") or "").split("\n", 1)[0]]
+            cluster = self._clusters[fp] = {
+                "fingerprint": fp,
+                "signature": normalize_error(result),
+                "example": content[0] if content else "",
+                "count": 0,
+                "scripts": [],
+                "lastRunId": None,
+                "firstSeen": now,
+                "lastSeen": now,
+            }
+        cluster["count"] += 1
+        cluster["lastSeen"] = now
+        cluster["lastRunId"] = run_id
+        if script and script not in cluster["scripts"] and len(cluster["scripts"]) < MAX_REPRESENTATIVES:
+            cluster["scripts"].append(script)
+        return fp
+
+    def get(self, fp: str) -> Optional[dict]:
+        return self._clusters.get(fp)
+
+    def top_clusters(self, limit: int = 20) -> list[dict]:
+        """Clusters ordered by run count (most frequent first)."""
+        return sorted(self._clusters.values(), key=lambda c: (-c["count"], -c["lastSeen"]))[:limit]
+
+    def total_runs(self) -> int:
+        return sum(c["count"] for c in self._clusters.values())
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def to_state(self) -> dict:
+        return {fp: {**c, "scripts": list(c["scripts"])} for fp, c in list(self._clusters.items())}
+
+    def load_state(self, state: dict) -> int:
+        """Add clusters from to_state() output (clusters already indexed win)."""
+        for fp, cluster in state.items():
+            self._clusters.setdefault(fp, cluster)
+        return len(state)
+
+
+# Process-wide index fed by ahk_run_script
+error_index = ErrorIndex()
+
+register_state("error_clusters", error_index.to_state, error_index.load_state)
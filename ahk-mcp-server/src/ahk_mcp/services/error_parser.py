@@ -0,0 +1,263 @@
+"""Structured errorDetails from the raw control tree of an AHK error dialog.
+
+ahklauncher.ps1 (1.9.0+) no longer classifies dialog text itself. For an
+error window it emits the window's child controls once, in z-order:
+
+    "controlTree": {"title": "x.ahk",
+                    "controls": [{"class": "Static", "text": "...", "order": 0},
+                                 {"class": "Button", "text": "&Help", "order": 1}]}
+
+parse_control_tree() turns that into the errorDetails dict the rest of the
+server reads (title, errorContent, sourceCode, buttons, plus line/file when
+the dialog names them) in a single pass over the dialog text.
+
+What counts as a button, a failing-line marker or a location line depends
+on the AutoHotkey build that raised the dialog. Each dialect is an
+ErrorRules entry in RULE_SETS (V1, V2 and translated builds); the one that
+best matches the dialog's buttons and wording is used, and
+register_rules() adds more.
+"""
+import logging
+import re
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Failing-line marker used in sourceCode whatever the dialect ("---> 012: ...")
+CANONICAL_MARKER = "--->"
+
+# Dialog text is only classified for these control classes
+_TEXT_CLASSES = ("Static", "Edit")
+
+# Static controls this short (or plain OK/Cancel) carry no error text
+_STATIC_MIN_CHARS = 4
+_STATIC_SKIP = {"ok", "cancel"}
+
+
+class ErrorRules:
+    """Wording of one AutoHotkey build's error dialogs."""
+
+    def __init__(
+        self,
+        name: str,
+        buttons: Iterable[str],
+        markers: Iterable[str] = (CANONICAL_MARKER,),
+        keywords: Iterable[str] = (),
+        headers: Iterable[str] = ("Line#",),
+        line_patterns: Iterable[str] = (),
+        file_patterns: Iterable[str] = (),
+        version: Optional[str] = None
+    ):
+        """
+        Args:
+            name: Rule set name (reported as errorDetails.rules)
+            buttons: Labels of the dialog's error buttons ("&Abort", ...)
+            markers: Prefixes AHK puts on the failing source line
+            keywords: Text that identifies this dialect's dialogs
+            headers: Separator lines that are neither content nor source
+            line_patterns: Regexes whose group 1 is the failing line number
+            file_patterns: Regexes whose group 1 is the failing file
+            version: AutoHotkey major version the dialect belongs to, if any
+        """
+        self.name = name
+        self.buttons = {b.lower() for b in buttons}
+        self.markers = tuple(markers)
+        self.keywords = tuple(keywords)
+        self.headers = {h.lower() for h in headers}
+        self.version = version
+        marker_re = "|".join(re.escape(m) for m in sorted(self.markers, key=len, reverse=True))
+        # "012: text", "--->\t012: text", "▶\t012: text" (AHK pads to 3 digits)
+        self._source_re = re.compile(rf"^(?P<marker>{marker_re})?\s*(?P<num>\d{{3,5}}):(?P<rest>.*)$")
+        self._line_res = [re.compile(p, re.IGNORECASE) for p in line_patterns]
+        self._file_res = [re.compile(p, re.IGNORECASE) for p in file_patterns]
+
+    def score(self, buttons: set[str], text: str) -> int:
+        """How well a dialog (lowercased button labels, full text) matches this dialect."""
+        return 2 * len(buttons & self.buttons) + sum(1 for k in self.keywords if k in text)
+
+    def source_line(self, line: str) -> Optional[str]:
+        """The line in canonical sourceCode form, or None if it is not a source line."""
+        match = self._source_re.match(line)
+        if not match:
+            return None
+        marker = match.group("marker")
+        if marker and marker != CANONICAL_MARKER:
+            return f"{CANONICAL_MARKER}\t{match.group('num')}:{match.group('rest')}"
+        return line
+
+    def location(self, line: str) -> tuple[Optional[int], Optional[str]]:
+        """(line number, file) named by an error content line, if any."""
+        number = path = None
+        for pattern in self._line_res:
+            match = pattern.search(line)
+            if match:
+                number = int(match.group(1))
+                break
+        for pattern in self._file_res:
+            match = pattern.search(line)
+            if match:
+                path = match.group(1).strip()
+                break
+        return number, path
+
+
+RULE_SETS: dict[str, ErrorRules] = {}
+
+
+def register_rules(rules: ErrorRules) -> None:
+    """Add (or replace) a dialect; later parses consider it."""
+    RULE_SETS[rules.name] = rules
+
+
+register_rules(ErrorRules(
+    "V1",
+    buttons=("OK",),
+    markers=("--->",),
+    keywords=("--->", "Error at line", "Line#", "Line Text:"),
+    line_patterns=(r"^Error at line (\d+)",),
+    file_patterns=(r'in #include file "([^"]+)"',),
+    version="V1",
+))
+register_rules(ErrorRules(
+    "V2",
+    buttons=("&Abort", "&Continue", "&Help", "&Edit", "&Reload", "E&xitApp"),
+    markers=("▶", "--->"),
+    keywords=("▶", "Specifically:", "Call stack:"),
+    line_patterns=(r"^Line:\s*(\d+)$",),
+    file_patterns=(r"^File:\s*(.+)$",),
+    version="V2",
+))
+# Translated builds keep the V2 layout and translate labels and location lines
+register_rules(ErrorRules(
+    "fr",
+    buttons=("&Abandonner", "&Continuer", "&Aide", "&Modifier", "&Recharger", "&Quitter"),
+    markers=("▶", "--->"),
+    keywords=("Erreur", "Ligne", "Fichier"),
+    headers=("Ligne#", "Line#"),
+    line_patterns=(r"^Erreur (?:à|a) la ligne (\d+)", r"^Ligne\s*:\s*(\d+)$"),
+    file_patterns=(r'fichier #include "([^"]+)"', r"^Fichier\s*:\s*(.+)$"),
+))
+register_rules(ErrorRules(
+    "de",
+    buttons=("&Abbrechen", "&Fortsetzen", "&Hilfe", "&Bearbeiten", "&Neu laden", "&Beenden"),
+    markers=("▶", "--->"),
+    keywords=("Fehler", "Zeile", "Datei"),
+    headers=("Zeile#", "Line#"),
+    line_patterns=(r"^Fehler in Zeile (\d+)", r"^Zeile\s*:\s*(\d+)$"),
+    file_patterns=(r'#include-Datei "([^"]+)"', r"^Datei\s*:\s*(.+)$"),
+))
+
+
+def select_rules(controls: list[dict], version: Optional[str] = None) -> ErrorRules:
+    """
+    Pick the dialect of a dialog from its buttons and wording.
+
+    Args:
+        controls: Controls of the control tree
+        version: "V1"/"V2" when the interpreter is known; wins ties
+
+    Returns:
+        The best-scoring rule set (the version's own set, else V1, on ties)
+    """
+    buttons = {(c.get("text") or "").strip().lower() for c in controls if c.get("class") == "Button"}
+    text = "\n".join(c.get("text") or "" for c in controls if c.get("class") in _TEXT_CLASSES)
+    best = RULE_SETS.get(version or "V1") or next(iter(RULE_SETS.values()))
+    best_score = best.score(buttons, text)
+    for rules in RULE_SETS.values():
+        score = rules.score(buttons, text)
+        if score > best_score:
+            best, best_score = rules, score
+    return best
+
+
+def parse_control_tree(tree: dict, version: Optional[str] = None, rules: Optional[ErrorRules] = None) -> dict:
+    """
+    Build errorDetails from a launcher control tree.
+
+    Runs in time linear in the dialog text: every control is split into
+    lines once and every line is classified by anchored patterns.
+
+    Args:
+        tree: {"title", "controls": [{"class", "text", "order"}]}
+        version: "V1"/"V2" if known (helps pick the rule set)
+        rules: Force a rule set instead of picking one
+
+    Returns:
+        {"title", "errorContent", "sourceCode", "buttons", "rules"} plus
+        "line"/"file" when the dialog names the failing location
+    """
+    controls = sorted(tree.get("controls") or (), key=lambda c: c.get("order") or 0)
+    rules = rules or select_rules(controls, version)
+    details: dict = {"title": tree.get("title") or "", "errorContent": [], "sourceCode": [], "buttons": []}
+    content, source = details["errorContent"], details["sourceCode"]
+    line_no = file_path = None
+
+    for control in controls:
+        text = (control.get("text") or "").strip()
+        if not text:
+            continue
+        cls = control.get("class", "")
+        if cls == "Button":
+            if text.lower() in rules.buttons and text.lower() not in _STATIC_SKIP:
+                details["buttons"].append(text)
+            continue
+        if cls not in _TEXT_CLASSES:
+            continue
+        if cls == "Static" and (len(text) < _STATIC_MIN_CHARS or text.lower() in _STATIC_SKIP):
+            continue
+
+        for raw in text.split("\n"):
+            line = raw.strip()
+            if not line:
+                continue
+            normalized = rules.source_line(line)
+            if normalized is not None:
+                source.append(normalized)
+            elif line.lower() not in rules.headers:
+                content.append(line)
+                if line_no is None or file_path is None:
+                    found_line, found_file = rules.location(line)
+                    line_no = line_no if line_no is not None else found_line
+                    file_path = file_path or found_file
+
+    details["rules"] = rules.name
+    if line_no is not None:
+        details["line"] = line_no
+    if file_path:
+        details["file"] = file_path
+    return details
+
+
+def error_message(details: dict) -> str:
+    """The launcher's ERROR message: content lines, then the source block."""
+    message = "\n".join(details["errorContent"])
+    if details["sourceCode"]:
+        if message:
+            message += "\n\n"
+        message += "Source Code:\n" + "\n".join(details["sourceCode"])
+    return message
+
+
+def apply_control_tree(result: dict, version: Optional[str] = None) -> dict:
+    """
+    Fill a launcher result's errorDetails and message from its controlTree.
+
+    The raw tree stays in the result (run artifacts and recorded traces
+    keep it for re-parsing). The launcher's own message (the dialog text
+    joined by " | ") is kept when the dialog yields no meaningful error
+    text, as before.
+    """
+    tree = result.get("controlTree")
+    if not tree or result.get("errorDetails"):
+        return result
+    try:
+        details = parse_control_tree(tree, version)
+    except Exception as e:
+        # A malformed tree must never cost the run its verdict
+        logger.warning(f"Could not parse error dialog controls: {e}")
+        return result
+    message = error_message(details)
+    if len(message) > 10:
+        result["errorDetails"] = details
+        result["message"] = message
+    return result
@@ -0,0 +1,421 @@
+"""Dispatch launcher runs and window captures to remote runner agents.
+
+A runner agent (runner.py, started with runner_agent.py) drives the desktop
+of one Windows host. The dispatcher keeps a list of runners, health-checks
+them, sends each job to the least-loaded healthy runner and retries on
+another runner when a connection or the protocol fails.
+
+Protocol: one TCP connection per job, JSON lines in both directions.
+    runner -> {"type": "hello", "nonce": ..., "runner": name, "capacity": n}
+    client -> {"type": "auth", "mac": hmac_sha256(token, nonce)}
+    runner -> {"type": "ready"} | {"type": "error", "message": ...}
+    client -> {"op": "run" | "capture" | "health", "args": {...}}
+    runner -> {"type": "chunk", "name": ..., "data": base64}*   (screenshot bytes)
+              {"type": "result", "result": {...}}
+Runs ship the script and its #Include closure, so runners need no shared
+filesystem. Window handles are remembered per runner so a later capture of
+that window goes back to the host that owns it.
+
+Enable with AHK_MCP_RUNNERS="host:port,host:port" and AHK_MCP_RUNNER_TOKEN.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from .metrics import registry
+from .source_index import get_source_index
+
+logger = logging.getLogger(__name__)
+
+HEALTH_INTERVAL_S = 10.0
+CONNECT_TIMEOUT_S = 5.0
+ACQUIRE_TIMEOUT_S = 60.0
+MAX_ATTEMPTS = 3
+CHUNK_SIZE = 64 * 1024
+LINE_LIMIT = 4 * 1024 * 1024
+
+# Window handle -> runner name, for captures after a run (bounded)
+MAX_AFFINITY = 1000
+
+DISPATCHES = registry.counter("ahk_fleet_dispatch_total", "Jobs sent to runners by runner, op and outcome", ("runner", "op", "outcome"))
+
+
+class RunnerError(Exception):
+    """Connection, authentication or protocol failure talking to a runner."""
+
+
+def sign(token: str, nonce: str) -> str:
+    return hmac.new(token.encode("utf-8"), nonce.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+async def send_message(writer: asyncio.StreamWriter, message: dict) -> None:
+    writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> dict:
+    line = await reader.readline()
+    if not line:
+        raise RunnerError("Connection closed")
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise RunnerError(f"Malformed message: {e}")
+
+
+def pack_script(script_path: str) -> dict:
+    """Script + #Include closure as {"entry": relpath, "files": {relpath: base64}}."""
+    index = get_source_index(script_path)
+    base = index.root.parent
+    files = {}
+    for path in index.files:
+        try:
+            relative = path.relative_to(base).as_posix()
+        except ValueError:
+            relative = f"_external/{path.name}"
+        files[relative] = base64.b64encode(path.read_bytes()).decode("ascii")
+    return {"entry": index.root.name, "files": files}
+
+
+class RunnerEndpoint:
+    """One runner agent as seen by the dispatcher."""
+
+    def __init__(self, host: str, port: int, name: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.name = name or f"{host}:{port}"
+        self.capacity = 1
+        self.active = 0
+        self.healthy = True  # optimistic until the first health check
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_check = 0.0
+
+    @property
+    def load(self) -> float:
+        return self.active / max(self.capacity, 1)
+
+    def status(self) -> dict:
+        return {
+            "runner": self.name,
+            "healthy": self.healthy,
+            "active": self.active,
+            "capacity": self.capacity,
+            "failures": self.failures,
+            "lastError": self.last_error,
+        }
+
+
+class Fleet:
+    """Least-loaded, health-checked dispatch over a set of runners."""
+
+    def __init__(self, endpoints: list[RunnerEndpoint], token: str, health_interval_s: float = HEALTH_INTERVAL_S):
+        self.endpoints = endpoints
+        self.token = token
+        self.health_interval_s = health_interval_s
+        self._affinity: "OrderedDict[str, str]" = OrderedDict()
+        self._slot_freed: Optional[asyncio.Condition] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    # -- connection ---------------------------------------------------
+
+    async def _connect(self, endpoint: RunnerEndpoint) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(endpoint.host, endpoint.port, limit=LINE_LIMIT),
+                timeout=CONNECT_TIMEOUT_S
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RunnerError(f"Cannot connect to {endpoint.name}: {e}")
+
+        hello = await asyncio.wait_for(read_message(reader), timeout=CONNECT_TIMEOUT_S)
+        if hello.get("type") != "hello":
+            writer.close()
+            raise RunnerError(f"Unexpected greeting from {endpoint.name}")
+        endpoint.capacity = int(hello.get("capacity") or 1)
+        await send_message(writer, {"type": "auth", "mac": sign(self.token, hello["nonce"])})
+        reply = await asyncio.wait_for(read_message(reader), timeout=CONNECT_TIMEOUT_S)
+        if reply.get("type") != "ready":
+            writer.close()
+            raise RunnerError(f"{endpoint.name} refused the connection: {reply.get('message')}")
+        return reader, writer
+
+    async def _call(
+        self,
+        endpoint: RunnerEndpoint,
+        op: str,
+        args: dict,
+        timeout_s: float,
+        chunk_dir: Optional[Path] = None
+    ) -> dict:
+        """Run one job on one runner; screenshot chunks are written under chunk_dir (a new temp dir if None)."""
+        reader, writer = await self._connect(endpoint)
+        files: dict[str, object] = {}
+        try:
+            await send_message(writer, {"op": op, "args": args})
+            deadline = time.monotonic() + timeout_s
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RunnerError(f"{endpoint.name} did not answer within {timeout_s:.0f}s")
+                message = await asyncio.wait_for(read_message(reader), timeout=remaining)
+                kind = message.get("type")
+                if kind == "chunk":
+                    if chunk_dir is None:
+                        # Never the server's working directory
+                        chunk_dir = Path(tempfile.mkdtemp(prefix="ahk-fleet-"))
+                    name = Path(message["name"]).name
+                    target = chunk_dir / name
+                    if name not in files:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        files[name] = open(target, "wb")
+                    files[name].write(base64.b64decode(message["data"]))
+                elif kind == "result":
+                    result = message["result"]
+                    for name, f in files.items():
+                        f.close()
+                        result.setdefault("_files", {})[name] = str(chunk_dir / name)
+                    return result
+                elif kind == "error":
+                    raise RunnerError(f"{endpoint.name}: {message.get('message')}")
+        except asyncio.TimeoutError:
+            raise RunnerError(f"{endpoint.name} timed out")
+        finally:
+            for f in files.values():
+                f.close()
+            writer.close()
+
+    # -- scheduling ---------------------------------------------------
+
+    def _pick(self, exclude: set[str], prefer: Optional[str] = None) -> Optional[RunnerEndpoint]:
+        candidates = [
+            e for e in self.endpoints
+            if e.healthy and e.name not in exclude and e.active < e.capacity
+        ]
+        if not candidates:
+            return None
+        if prefer:
+            for e in candidates:
+                if e.name == prefer:
+                    return e
+        return min(candidates, key=lambda e: (e.load, e.active))
+
+    async def _acquire(self, exclude: set[str], prefer: Optional[str] = None) -> Optional[RunnerEndpoint]:
+        """Reserve a slot on the least-loaded healthy runner, waiting for one if all are busy."""
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+        deadline = time.monotonic() + ACQUIRE_TIMEOUT_S
+        async with self._slot_freed:
+            while True:
+                endpoint = self._pick(exclude, prefer)
+                if endpoint is not None:
+                    endpoint.active += 1
+                    return endpoint
+                if not any(e.healthy and e.name not in exclude for e in self.endpoints):
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(self._slot_freed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return None
+
+    async def _release(self, endpoint: RunnerEndpoint) -> None:
+        endpoint.active -= 1
+        async with self._slot_freed:
+            self._slot_freed.notify()
+
+    def _mark_failed(self, endpoint: RunnerEndpoint, error: Exception) -> None:
+        endpoint.failures += 1
+        endpoint.healthy = False
+        endpoint.last_error = str(error)
+        logger.warning(f"Runner {endpoint.name} failed: {error}")
+
+    async def submit(
+        self,
+        op: str,
+        args: dict,
+        timeout_s: float,
+        chunk_dir: Optional[Path] = None,
+        prefer: Optional[str] = None
+    ) -> tuple[dict, str]:
+        """
+        Send a job, retrying on other runners when a runner fails.
+
+        Returns:
+            (result, runner name)
+
+        Raises:
+            RunnerError: no healthy runner, or every attempt failed
+        """
+        self.start()
+        tried: set[str] = set()
+        last_error: Optional[Exception] = None
+        for _ in range(MAX_ATTEMPTS):
+            endpoint = await self._acquire(tried, prefer)
+            if endpoint is None:
+                break
+            tried.add(endpoint.name)
+            try:
+                result = await self._call(endpoint, op, args, timeout_s, chunk_dir)
+                endpoint.failures = 0
+                DISPATCHES.labels(endpoint.name, op, "ok").inc()
+                return result, endpoint.name
+            except RunnerError as e:
+                DISPATCHES.labels(endpoint.name, op, "failed").inc()
+                self._mark_failed(endpoint, e)
+                last_error = e
+            finally:
+                await self._release(endpoint)
+        raise RunnerError(f"No runner could take the {op} job" + (f" (last error: {last_error})" if last_error else ""))
+
+    # -- health -------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the health-check loop (idempotent; needs a running loop)."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def check(self, endpoint: RunnerEndpoint) -> None:
+        try:
+            health = await self._call(endpoint, "health", {}, CONNECT_TIMEOUT_S)
+            endpoint.capacity = int(health.get("capacity") or endpoint.capacity)
+            if not endpoint.healthy:
+                logger.info(f"Runner {endpoint.name} is healthy again")
+            endpoint.healthy = True
+            endpoint.last_error = None
+        except (RunnerError, OSError) as e:
+            if endpoint.healthy:
+                self._mark_failed(endpoint, e)
+            else:
+                endpoint.last_error = str(e)
+        endpoint.last_check = time.time()
+        if endpoint.healthy and self._slot_freed is not None:
+            async with self._slot_freed:
+                self._slot_freed.notify_all()
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(e) for e in self.endpoints))
+            await asyncio.sleep(self.health_interval_s)
+
+    def status(self) -> list[dict]:
+        return [e.status() for e in self.endpoints]
+
+    # -- jobs ---------------------------------------------------------
+
+    async def run(
+        self,
+        script_path: str,
+        version: str,
+        timeout_ms: int,
+        screenshot: bool,
+        keep_error_window: bool,
+        screenshot_dir: Optional[str]
+    ) -> dict:
+        """run_ahk_launcher on a runner; the result refers to local paths only."""
+        try:
+            package = await asyncio.to_thread(pack_script, script_path)
+        except OSError as e:
+            return {"status": "CONFIG_ERROR", "message": f"Cannot read script: {e}", "executionTimeMs": 0, "scriptPath": script_path}
+
+        args = {
+            **package,
+            "version": version,
+            "timeout_ms": timeout_ms,
+            "screenshot": screenshot,
+            # The runner captures (and reaps) the kept error window itself:
+            # its PID and desktop are not reachable from here
+            "capture": keep_error_window,
+        }
+        try:
+            result, runner = await self.submit("run", args, timeout_ms / 1000 + 60, Path(screenshot_dir) if screenshot_dir else None)
+        except RunnerError as e:
+            return {"status": "CONFIG_ERROR", "message": str(e), "executionTimeMs": 0, "scriptPath": script_path}
+
+        files = result.pop("_files", {})
+        if files:
+            result["screenshot"] = next(iter(files.values()))
+        result.pop("processId", None)
+        result["scriptPath"] = script_path
+        result["runner"] = runner
+        if result.get("windowHandle"):
+            self._remember(str(result["windowHandle"]), runner)
+        return result
+
+    async def capture(
+        self,
+        window_title: Optional[str],
+        window_handle: Optional[str],
+        output_path: Optional[str],
+        default_dir: Path,
+        **stability
+    ) -> dict:
+        """capture_window_screenshot on the runner that owns the window (if known)."""
+        prefer = self._affinity.get(str(window_handle)) if window_handle else None
+        args = {"window_title": window_title, "window_handle": window_handle, **stability}
+        try:
+            result, runner = await self.submit("capture", args, 60, Path(output_path) if output_path else default_dir, prefer)
+        except RunnerError as e:
+            return {"success": False, "error": str(e)}
+        files = result.pop("_files", {})
+        if files:
+            result["screenshot_path"] = next(iter(files.values()))
+        result["runner"] = runner
+        return result
+
+    def _remember(self, window_handle: str, runner: str) -> None:
+        self._affinity[window_handle] = runner
+        self._affinity.move_to_end(window_handle)
+        while len(self._affinity) > MAX_AFFINITY:
+            self._affinity.popitem(last=False)
+
+
+def parse_endpoints(spec: str) -> list[RunnerEndpoint]:
+    """"host:port,host:port" -> endpoints."""
+    endpoints = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":")
+        endpoints.append(RunnerEndpoint(host or "127.0.0.1", int(port)))
+    return endpoints
+
+
+_fleet: Optional[Fleet] = None
+
+
+def configure_fleet(spec: Optional[str], token: Optional[str] = None) -> Optional[Fleet]:
+    """Dispatch to the given runners ("host:port,..."), or run locally when spec is empty."""
+    global _fleet
+    if not spec:
+        _fleet = None
+        return None
+    if not token:
+        raise ValueError("A runner token is required (AHK_MCP_RUNNER_TOKEN)")
+    _fleet = Fleet(parse_endpoints(spec), token)
+    logger.info(f"Dispatching runs to {len(_fleet.endpoints)} runner(s): {spec}")
+    return _fleet
+
+
+def get_fleet() -> Optional[Fleet]:
+    return _fleet
+
+
+configure_fleet(os.environ.get("AHK_MCP_RUNNERS"), os.environ.get("AHK_MCP_RUNNER_TOKEN"))
+
+registry.gauge(
+    "ahk_fleet_healthy_runners", "Runners passing health checks",
+    function=lambda: sum(e.healthy for e in _fleet.endpoints) if _fleet else 0
+)
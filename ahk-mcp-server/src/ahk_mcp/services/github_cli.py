@@ -4,9 +4,13 @@ import json
 import logging
 import subprocess
 import tempfile
+import time
 import os
 from typing import Optional
 
+from .metrics import GITHUB_CALLS, GITHUB_SECONDS, track
+from .warm_state import register_state
+
 logger = logging.getLogger(__name__)
 
 # Repository for issues
@@ -62,6 +66,7 @@ async def _get_gh_token() -> Optional[str]:
     return None
 
 
+@track(GITHUB_CALLS, GITHUB_SECONDS, "create_issue")
 async def create_github_issue(
     title: str,
     body: str,
@@ -162,6 +167,8 @@ async def create_github_issue(
             number = url.split("/")[-1] if url else "?"
 
             logger.info(f"Issue created: {url}")
+            # Cached issue lists no longer include everything
+            _responses.clear()
             return {
                 "success": True,
                 "url": url,
@@ -196,26 +203,89 @@ async def create_github_issue(
                 pass
 
 
-async def list_github_issues(state: str = "open", limit: int = 30) -> dict:
+# GraphQL queries: each view asks only for the fields it renders, one page at a time
+_ISSUES_PAGE_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    issues(first: $first, after: $after, %s orderBy: {field: CREATED_AT, direction: DESC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes { number title state labels(first: 10) { nodes { name } } }
+    }
+  }
+}
+"""
+
+_ISSUE_QUERY = """
+query($owner: String!, $name: String!, $number: Int!) {
+  repository(owner: $owner, name: $name) {
+    issue(number: $number) {
+      number title body state createdAt url
+      author { login }
+      labels(first: 20) { nodes { name } }
+      comments { totalCount }
+    }
+  }
+}
+"""
+
+_COMMENTS_PAGE_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    issue(number: $number) {
+      comments(first: $first, after: $after) {
+        totalCount
+        pageInfo { hasNextPage endCursor }
+        nodes { author { login } body createdAt }
+      }
+    }
+  }
+}
+"""
+
+_ISSUE_STATES = {"open": "states: [OPEN],", "closed": "states: [CLOSED],", "all": ""}
+
+# GraphQL responses are reused for this long (and survive restarts, see warm_state.py)
+RESPONSE_TTL_S = 300.0
+
+# (query, variables) -> (fetched at, data); callers must not modify the data
+_responses: dict[str, tuple[float, dict]] = {}
+
+
+def _restore_responses(state: dict) -> int:
+    now = time.time()
+    fresh = {key: (t, data) for key, (t, data) in state.items() if now - t < RESPONSE_TTL_S}
+    _responses.update(fresh)
+    return len(fresh)
+
+
+register_state("github_responses", lambda: dict(_responses), _restore_responses)
+
+
+async def _graphql(query: str, variables: dict) -> dict:
     """
-    List GitHub issues using gh CLI.
-
-    Args:
-        state: "open", "closed", or "all"
-        limit: Maximum number of issues to return
+    Run a GraphQL query through `gh api graphql`.
 
     Returns:
-        Dict with success and issues list, or error
+        Dict with success and data, or error
     """
-    logger.info(f"Listing issues: state={state}, limit={limit}")
+    cache_key = json.dumps([query, variables], sort_keys=True)
+    cached = _responses.get(cache_key)
+    if cached and time.time() - cached[0] < RESPONSE_TTL_S:
+        return {"success": True, "data": cached[1]}
+
+    owner, name = GITHUB_REPO.split("/", 1)
+    cmd = ["gh", "api", "graphql", "-f", f"query={query}", "-f", f"owner={owner}", "-f", f"name={name}"]
+    for key, value in variables.items():
+        if value is None:
+            continue
+        # -F converts integers, -f keeps strings (cursors) raw
+        cmd.extend(["-F" if isinstance(value, int) else "-f", f"{key}={value}"])
 
-    cmd = [
-        "gh", "issue", "list",
-        "--repo", GITHUB_REPO,
-        "--state", state,
-        "--limit", str(limit),
-        "--json", "number,title,state,labels,createdAt,url"
-    ]
+    env = os.environ.copy()
+    token = await _get_gh_token()
+    if token:
+        env["GH_TOKEN"] = token
 
     try:
         result = await asyncio.to_thread(
@@ -224,83 +294,120 @@ async def list_github_issues(state: str = "open", limit: int = 30) -> dict:
             capture_output=True,
             text=True,
             encoding="utf-8",
+            env=env,
             timeout=30
         )
-
-        if result.returncode == 0:
-            issues = json.loads(result.stdout) if result.stdout else []
-            return {
-                "success": True,
-                "issues": issues
-            }
-        else:
-            return {
-                "success": False,
-                "error": result.stderr or "Failed to list issues"
-            }
-
     except FileNotFoundError:
-        return {
-            "success": False,
-            "error": "gh CLI not found"
-        }
+        return {"success": False, "error": "gh CLI not found"}
     except Exception as e:
-        logger.exception(f"Error listing issues: {e}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        logger.exception(f"Error running GraphQL query: {e}")
+        return {"success": False, "error": str(e)}
+
+    if result.returncode != 0:
+        return {"success": False, "error": result.stderr or "GraphQL query failed"}
+    try:
+        payload = json.loads(result.stdout) if result.stdout else {}
+        if not isinstance(payload, dict):
+            raise ValueError(f"expected an object, got {type(payload).__name__}")
+    except ValueError as e:
+        logger.error(f"Malformed GraphQL response from gh: {e}")
+        return {"success": False, "error": f"Malformed GraphQL response: {e}"}
+    if payload.get("errors"):
+        return {"success": False, "error": "; ".join(e.get("message", "") for e in payload["errors"])}
+    data = payload.get("data") or {}
+    _responses[cache_key] = (time.time(), data)
+    return {"success": True, "data": data}
+
+
+def _labels(node: dict) -> list[dict]:
+    return (node.get("labels") or {}).get("nodes", [])
+
+
+@track(GITHUB_CALLS, GITHUB_SECONDS, "list_issues")
+async def list_github_issues_page(state: str = "all", cursor: Optional[str] = None, page_size: int = 20) -> dict:
+    """
+    List one page of GitHub issues (newest first).
+
+    Args:
+        state: "open", "closed", or "all"
+        cursor: Cursor returned as next_cursor by the previous page
+        page_size: Issues per page (1-100)
+
+    Returns:
+        Dict with success, issues, total_count and next_cursor (None on the last page), or error
+    """
+    logger.info(f"Listing issues: state={state}, cursor={cursor}, page_size={page_size}")
+
+    result = await _graphql(_ISSUES_PAGE_QUERY % _ISSUE_STATES.get(state, ""), {"first": page_size, "after": cursor})
+    if not result["success"]:
+        return result
+
+    issues = ((result["data"].get("repository") or {}).get("issues")) or {}
+    page = issues.get("pageInfo") or {}
+    return {
+        "success": True,
+        "issues": [{**node, "labels": _labels(node)} for node in issues.get("nodes", [])],
+        "total_count": issues.get("totalCount", 0),
+        "next_cursor": page.get("endCursor") if page.get("hasNextPage") else None,
+    }
 
 
+@track(GITHUB_CALLS, GITHUB_SECONDS, "get_issue")
 async def get_github_issue(issue_number: int) -> dict:
     """
-    Get a specific GitHub issue.
+    Get a specific GitHub issue, without its comments (see list_issue_comments).
 
     Args:
         issue_number: Issue number
 
     Returns:
-        Dict with issue details or error
+        Dict with issue details (comment_count instead of comments) or error
     """
     logger.info(f"Getting issue #{issue_number}")
 
-    cmd = [
-        "gh", "issue", "view",
-        "--repo", GITHUB_REPO,
-        str(issue_number),
-        "--json", "number,title,body,state,labels,createdAt,url,author,comments"
-    ]
+    result = await _graphql(_ISSUE_QUERY, {"number": issue_number})
+    if not result["success"]:
+        return result
 
-    try:
-        result = await asyncio.to_thread(
-            subprocess.run,
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=30
-        )
+    issue = (result["data"].get("repository") or {}).get("issue")
+    if not issue:
+        return {"success": False, "error": f"Issue #{issue_number} not found"}
+    # A new dict: `issue` belongs to the response cache
+    issue = {
+        **{key: value for key, value in issue.items() if key != "comments"},
+        "labels": _labels(issue),
+        "comment_count": (issue.get("comments") or {}).get("totalCount", 0),
+    }
+    return {"success": True, "issue": issue}
 
-        if result.returncode == 0:
-            issue = json.loads(result.stdout) if result.stdout else {}
-            return {
-                "success": True,
-                "issue": issue
-            }
-        else:
-            return {
-                "success": False,
-                "error": result.stderr or f"Issue #{issue_number} not found"
-            }
 
-    except FileNotFoundError:
-        return {
-            "success": False,
-            "error": "gh CLI not found"
-        }
-    except Exception as e:
-        logger.exception(f"Error getting issue: {e}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+@track(GITHUB_CALLS, GITHUB_SECONDS, "list_comments")
+async def list_issue_comments(issue_number: int, cursor: Optional[str] = None, page_size: int = 10) -> dict:
+    """
+    List one page of an issue's comments (oldest first).
+
+    Args:
+        issue_number: Issue number
+        cursor: Cursor returned as next_cursor by the previous page
+        page_size: Comments per page (1-100)
+
+    Returns:
+        Dict with success, comments, total_count and next_cursor, or error
+    """
+    logger.info(f"Listing comments of issue #{issue_number}: cursor={cursor}, page_size={page_size}")
+
+    result = await _graphql(_COMMENTS_PAGE_QUERY, {"number": issue_number, "first": page_size, "after": cursor})
+    if not result["success"]:
+        return result
+
+    issue = (result["data"].get("repository") or {}).get("issue")
+    if not issue:
+        return {"success": False, "error": f"Issue #{issue_number} not found"}
+    comments = issue.get("comments") or {}
+    page = comments.get("pageInfo") or {}
+    return {
+        "success": True,
+        "comments": comments.get("nodes", []),
+        "total_count": comments.get("totalCount", 0),
+        "next_cursor": page.get("endCursor") if page.get("hasNextPage") else None,
+    }
@@ -0,0 +1,210 @@
+"""Screenshots returned inline as MCP image content.
+
+By default a screenshot is a PNG path the client has to read back (one more
+round trip, and the full-resolution file). With inline images the tool
+response carries the image itself:
+
+    - the capture script hands the PNG over on stdout instead of saving it
+      (ahk_capture_ui); ERROR screenshots are read from the run directory
+    - the image is downscaled to fit IMAGE_MAX_DIM and re-encoded
+      (IMAGE_FORMAT, IMAGE_QUALITY for JPEG/WebP) in a worker thread
+    - an encoding larger than IMAGE_MAX_BYTES is not inlined: the PNG is
+      saved (if it was not already) and its path returned as before
+
+Resizing and re-encoding need Pillow (pip install ahk-mcp-server[images]);
+without it a PNG is inlined unchanged when it already fits both limits.
+
+AHK_MCP_IMAGE_MAX_DIM, AHK_MCP_IMAGE_FORMAT, AHK_MCP_IMAGE_QUALITY and
+AHK_MCP_IMAGE_MAX_KB set the defaults.
+"""
+import asyncio
+import io
+import logging
+import os
+import struct
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Union
+
+from fastmcp.tools.tool import ToolResult
+from fastmcp.utilities.types import Image as McpImage
+
+from .metrics import registry
+
+try:
+    # Optional downscaling / re-encoding (pip install ahk-mcp-server[images])
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+
+
+def _image_format(value: str) -> str:
+    """AHK_MCP_IMAGE_FORMAT checked against IMAGE_FORMATS ("jpg" is JPEG; anything else falls back to JPEG)."""
+    value = value.strip().lower()
+    value = "jpeg" if value == "jpg" else value
+    if value not in IMAGE_FORMATS:
+        logger.warning(f"AHK_MCP_IMAGE_FORMAT={value!r} is not one of {', '.join(IMAGE_FORMATS)}: using jpeg")
+        return "jpeg"
+    return value
+
+
+IMAGE_MAX_DIM = int(os.environ.get("AHK_MCP_IMAGE_MAX_DIM", "1280"))
+IMAGE_FORMAT = _image_format(os.environ.get("AHK_MCP_IMAGE_FORMAT", "jpeg"))
+IMAGE_QUALITY = int(os.environ.get("AHK_MCP_IMAGE_QUALITY", "80"))
+# Budget of the encoded image; base64 adds a third on the wire
+IMAGE_MAX_BYTES = int(float(os.environ.get("AHK_MCP_IMAGE_MAX_KB", "512")) * 1024)
+
+INLINE_IMAGES = registry.counter("ahk_inline_images_total", "Screenshots requested inline, by outcome", ("outcome",))
+ENCODE_SECONDS = registry.histogram("ahk_image_encode_seconds", "Wall time of screenshot downscaling and encoding", ("format",))
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def png_size(data: bytes) -> Optional[tuple[int, int]]:
+    """(width, height) from a PNG header, or None if `data` is not a PNG."""
+    if len(data) < 24 or not data.startswith(_PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", data[16:24])
+
+
+def _encode(png: bytes, max_dim: int, image_format: str, quality: int, max_bytes: int) -> tuple[Optional[dict], Optional[str]]:
+    """(encoded image, None) or (None, why the screenshot is not inlined)."""
+    over_budget = f"larger than the {max_bytes // 1024} KB image budget at {max_dim}px"
+    if Image is None:
+        size = png_size(png)
+        if size is None:
+            return None, "not a PNG (Pillow is not installed to convert it)"
+        if max(size) > max_dim or len(png) > max_bytes:
+            return None, f"{over_budget} (Pillow is not installed to downscale it)"
+        return {"data": png, "format": "png", "width": size[0], "height": size[1],
+                "sourceWidth": size[0], "sourceHeight": size[1], "bytes": len(png)}, None
+
+    try:
+        with Image.open(io.BytesIO(png)) as source:
+            source_size = source.size
+            image = source.convert("RGB") if image_format == "jpeg" else source.copy()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Screenshot not decodable for inlining: {e}")
+        return None, f"the screenshot could not be decoded ({e})"
+    if max(image.size) > max_dim:
+        # reducing_gap: a cheap integer reduce first, LANCZOS for the rest
+        image.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    elif image_format == "png":
+        # Nothing to resize or convert: the capture is inlined as is
+        if len(png) > max_bytes:
+            return None, over_budget
+        return {"data": png, "format": "png", "width": image.width, "height": image.height,
+                "sourceWidth": source_size[0], "sourceHeight": source_size[1], "bytes": len(png)}, None
+
+    out = io.BytesIO()
+    try:
+        if image_format == "png":
+            image.save(out, "PNG")
+        else:
+            image.save(out, image_format.upper(), quality=quality)
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Screenshot not encodable as {image_format}: {e!r}")
+        return None, f"the screenshot could not be encoded as {image_format} ({e})"
+    data = out.getvalue()
+    if len(data) > max_bytes:
+        return None, over_budget
+    return {"data": data, "format": image_format, "width": image.width, "height": image.height,
+            "sourceWidth": source_size[0], "sourceHeight": source_size[1], "bytes": len(data)}, None
+
+
+def encode_image(
+    png: bytes,
+    max_dim: int = IMAGE_MAX_DIM,
+    image_format: str = IMAGE_FORMAT,
+    quality: int = IMAGE_QUALITY,
+    max_bytes: int = IMAGE_MAX_BYTES
+) -> Optional[dict]:
+    """
+    Downscale and encode a PNG screenshot for inlining (blocking, CPU bound).
+
+    Args:
+        png: The captured PNG
+        max_dim: Longest side after downscaling (aspect ratio kept, never upscaled)
+        image_format: png, jpeg or webp
+        quality: JPEG/WebP quality (1-100)
+        max_bytes: Largest encoding that is inlined
+
+    Returns:
+        {"data", "format", "width", "height", "sourceWidth", "sourceHeight", "bytes"},
+        or None when the image cannot be brought within max_bytes (or decoded,
+        or encoded: a Pillow build without WebP)
+    """
+    return _encode(png, max_dim, image_format, quality, max_bytes)[0]
+
+
+async def inline_image(
+    png: bytes,
+    max_dim: int = IMAGE_MAX_DIM,
+    image_format: str = IMAGE_FORMAT,
+    quality: int = IMAGE_QUALITY,
+    max_bytes: int = IMAGE_MAX_BYTES
+) -> tuple[Optional[dict], Optional[str]]:
+    """encode_image() in a worker thread, counted in the metrics: (image, None) or (None, reason)."""
+    start = time.perf_counter()
+    encoded, reason = await asyncio.to_thread(_encode, png, max_dim, image_format, quality, max_bytes)
+    ENCODE_SECONDS.labels(image_format).observe(time.perf_counter() - start)
+    INLINE_IMAGES.labels("inline" if encoded else "path").inc()
+    return encoded, reason
+
+
+def _save_capture(png: bytes, directory: str) -> str:
+    # Random suffix: captures taken in the same second never overwrite each other
+    path = Path(directory) / f"capture_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.png"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(png)
+    return str(path)
+
+
+async def inline_screenshot(capture: dict, directory: str, **options) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Encoded image of a successful capture, or the reason to answer with its path.
+
+    The PNG comes from the capture itself ("png", inline capture scripts) or
+    from its screenshot_path. An in-memory PNG that is not inlined is saved
+    into `directory` and its path set on the capture.
+
+    Args:
+        capture: capture_window_screenshot() result ("png" is removed)
+        directory: Where to save an in-memory PNG that is not inlined
+        **options: encode_image() options (max_dim, image_format, quality, max_bytes)
+
+    Returns:
+        (image, None), or (None, why it was not inlined)
+    """
+    png = capture.pop("png", None)
+    if png is None:
+        path = capture.get("screenshot_path")
+        if not path:
+            return None, "the capture returned no image"
+        try:
+            png = await asyncio.to_thread(Path(path).read_bytes)
+        except OSError as e:
+            logger.warning(f"Screenshot {path} unreadable for inlining: {e}")
+            return None, f"the screenshot file could not be read ({e.strerror or e})"
+    image, reason = await inline_image(png, **options)
+    if image is None and not capture.get("screenshot_path"):
+        capture["screenshot_path"] = await asyncio.to_thread(_save_capture, png, directory)
+    return image, reason
+
+
+def describe(image: dict) -> str:
+    """One-line summary of an inlined image for the Markdown response."""
+    scaled = f" (scaled from {image['sourceWidth']}x{image['sourceHeight']})" if image["width"] != image["sourceWidth"] else ""
+    return f"{image['format'].upper()} {image['width']}x{image['height']}{scaled}, {image['bytes'] // 1024} KB, attached below"
+
+
+def image_response(text: str, image: Optional[dict]) -> Union[str, ToolResult]:
+    """Tool response: the Markdown alone, or followed by the image content."""
+    if image is None:
+        return text
+    return ToolResult(content=[text, McpImage(data=image["data"], format=image["format"])])
@@ -0,0 +1,316 @@
+"""Precompiled interop assemblies for the launcher and window captures.
+
+ahklauncher.ps1 declares its Win32 types (Win32API, RECT, WindowInfo) in an
+Add-Type here-string, and every capture script declares CaptureAPI the same
+way. Add-Type runs the C# compiler each time, which is most of a cold
+launcher start. The server therefore compiles each source once into
+state/interop/<name>-<hash>.dll and passes the DLL to later runs
+(-InteropAssembly for the launcher, Add-Type -Path in capture scripts).
+
+The file name is keyed by a hash of INTEROP_VERSION and the normalized C#
+source, so editing either one selects a new assembly; the manifest records
+the current one per name and older DLLs are deleted once replaced. A run
+that finds no current assembly compiles inline as before while the DLL is
+built in the background (a miss); a launcher that reports it could not
+load the DLL invalidates it. Builds that fail are retried after
+BUILD_RETRY_S.
+
+Disable with AHK_MCP_INTEROP_CACHE=0; AHK_MCP_INTEROP_DIR moves the cache.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MCP_SERVER_ROOT = Path(__file__).parent.parent.parent.parent
+WRAPPER_SCRIPT = MCP_SERVER_ROOT.parent / "ahklauncher.ps1"
+
+ENABLED = os.environ.get("AHK_MCP_INTEROP_CACHE", "1") != "0"
+CACHE_DIR = Path(os.environ.get("AHK_MCP_INTEROP_DIR", MCP_SERVER_ROOT / "state" / "interop"))
+
+# Bump to rebuild every assembly (compiler options, loader changes)
+INTEROP_VERSION = 1
+MANIFEST_VERSION = 1
+
+BUILD_TIMEOUT_S = 120
+BUILD_RETRY_S = 600
+
+INTEROP_CACHE = registry.counter("ahk_interop_cache_total", "Interop assembly lookups by outcome", ("assembly", "outcome"))
+INTEROP_BUILD_SECONDS = registry.histogram("ahk_interop_build_seconds", "Wall time of interop assembly builds", ("assembly",))
+
+CAPTURE_API_SOURCE = """\
+using System;
+using System.Runtime.InteropServices;
+using System.Text;
+using System.Collections.Generic;
+
+public class CaptureAPI {
+    [DllImport("user32.dll")]
+    public static extern IntPtr FindWindow(string lpClassName, string lpWindowName);
+
+    [DllImport("user32.dll", CharSet = CharSet.Auto)]
+    public static extern int GetWindowText(IntPtr hWnd, StringBuilder lpString, int nMaxCount);
+
+    [DllImport("user32.dll")]
+    public static extern bool IsWindowVisible(IntPtr hWnd);
+
+    [DllImport("user32.dll")]
+    public static extern bool GetWindowRect(IntPtr hWnd, out RECT lpRect);
+
+    [DllImport("user32.dll")]
+    public static extern bool PrintWindow(IntPtr hWnd, IntPtr hdcBlt, uint nFlags);
+
+    public delegate bool EnumWindowsProc(IntPtr hWnd, IntPtr lParam);
+
+    [DllImport("user32.dll")]
+    public static extern bool EnumWindows(EnumWindowsProc enumProc, IntPtr lParam);
+
+    public const uint PW_RENDERFULLCONTENT = 0x00000002;
+
+    public static List<KeyValuePair<IntPtr, string>> FoundWindows = new List<KeyValuePair<IntPtr, string>>();
+
+    public static bool EnumCallback(IntPtr hWnd, IntPtr lParam) {
+        if (IsWindowVisible(hWnd)) {
+            StringBuilder sb = new StringBuilder(256);
+            GetWindowText(hWnd, sb, sb.Capacity);
+            if (sb.Length > 0) {
+                FoundWindows.Add(new KeyValuePair<IntPtr, string>(hWnd, sb.ToString()));
+            }
+        }
+        return true;
+    }
+}
+
+[StructLayout(LayoutKind.Sequential)]
+public struct RECT {
+    public int Left, Top, Right, Bottom;
+    public int Width { get { return Right - Left; } }
+    public int Height { get { return Bottom - Top; } }
+}
+"""
+
+# The launcher's interop here-string: the first `Add-Type @' ... '@`
+_HERE_STRING_RE = re.compile(r"^Add-Type @'\r?\n(.*?)\r?\n'@", re.MULTILINE | re.DOTALL)
+
+
+def launcher_source(path: Path = WRAPPER_SCRIPT) -> str:
+    """C# source of the launcher's interop types (empty if the launcher has none)."""
+    text = path.read_bytes().decode("utf-8-sig", errors="replace")
+    match = _HERE_STRING_RE.search(text)
+    return match.group(1) if match else ""
+
+
+def normalize(source: str) -> str:
+    """Source as hashed: LF line endings, no trailing whitespace or blank edges."""
+    return "\n".join(line.rstrip() for line in source.replace("\r\n", "\n").split("\n")).strip() + "\n"
+
+
+def source_hash(source: str, version: int = INTEROP_VERSION) -> str:
+    """Cache key of a C# source: 16 hex chars of SHA-256 over the version and the normalized source."""
+    return hashlib.sha256(f"interop-v{version}\n{normalize(source)}".encode("utf-8")).hexdigest()[:16]
+
+
+def _ps_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class InteropCache:
+    """Compiled interop assemblies under `directory`, one current DLL per name."""
+
+    def __init__(self, directory: Path = CACHE_DIR, version: int = INTEROP_VERSION):
+        self.directory = Path(directory)
+        self.version = version
+        self.manifest_path = self.directory / "manifest.json"
+        self.assemblies: dict[str, dict] = {}
+        self._failed: dict[str, tuple[str, float]] = {}
+        self._building: dict[str, asyncio.Task] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("v") != MANIFEST_VERSION:
+            return
+        self.assemblies = data.get("assemblies", {})
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"v": MANIFEST_VERSION, "assemblies": self.assemblies}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def path_for(self, name: str, source: str) -> Path:
+        return self.directory / f"{name}-{source_hash(source, self.version)}.dll"
+
+    def lookup(self, name: str, source: str) -> Optional[Path]:
+        """The current DLL for this exact source, or None (missing, stale or deleted)."""
+        entry = self.assemblies.get(name)
+        digest = source_hash(source, self.version)
+        if not entry or entry.get("hash") != digest:
+            return None
+        path = self.directory / entry["file"]
+        return path if path.is_file() else None
+
+    def invalidate(self, name: str) -> None:
+        """Forget the current DLL of `name` (it failed to load); the next lookup rebuilds it."""
+        entry = self.assemblies.pop(name, None)
+        if entry is None:
+            return
+        logger.warning(f"Interop assembly {entry['file']} invalidated")
+        try:
+            (self.directory / entry["file"]).unlink()
+        except OSError:
+            # Still loaded by a running launcher; pruned after the next build
+            pass
+        self._save_quietly()
+
+    def build(self, name: str, source: str) -> Path:
+        """Compile `source` into the cache (blocking). Raises RuntimeError on failure."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(name, source)
+        digest = source_hash(source, self.version)
+        src = self.directory / f"{name}-{digest}.{os.getpid()}.cs"
+        tmp = self.directory / f"{name}-{digest}.{os.getpid()}.dll"
+        src.write_text(source, encoding="utf-8")
+        command = (
+            "$ErrorActionPreference = 'Stop'; "
+            f"Add-Type -TypeDefinition ([IO.File]::ReadAllText({_ps_quote(str(src))})) "
+            f"-OutputAssembly {_ps_quote(str(tmp))} -OutputType Library"
+        )
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(
+                ["powershell.exe", "-ExecutionPolicy", "Bypass", "-NoProfile", "-Command", command],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                timeout=BUILD_TIMEOUT_S,
+                creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, "CREATE_NO_WINDOW") else 0
+            )
+            if proc.returncode != 0 or not tmp.is_file():
+                raise RuntimeError((proc.stderr or proc.stdout or f"exit code {proc.returncode}").strip()[:500])
+            os.replace(tmp, path)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise RuntimeError(str(e)) from e
+        finally:
+            for leftover in (src, tmp):
+                try:
+                    leftover.unlink()
+                except OSError:
+                    pass
+        elapsed = time.perf_counter() - start
+        INTEROP_BUILD_SECONDS.labels(name).observe(elapsed)
+
+        self.assemblies[name] = {"hash": digest, "file": path.name, "builtAt": round(time.time()), "buildMs": round(elapsed * 1000)}
+        self._save_quietly()
+        self.prune(name)
+        logger.info(f"Built interop assembly {path.name} in {elapsed * 1000:.0f}ms")
+        return path
+
+    def prune(self, name: str) -> list[Path]:
+        """Delete the DLLs of `name` other than the current one (locked ones stay for later)."""
+        current = self.assemblies.get(name, {}).get("file")
+        removed = []
+        for path in self.directory.glob(f"{name}-*.dll"):
+            if path.name == current:
+                continue
+            try:
+                path.unlink()
+                removed.append(path)
+            except OSError:
+                pass
+        return removed
+
+    def resolve(self, name: str, source: str) -> tuple[Optional[Path], str]:
+        """
+        DLL to load for `source`, starting a background build on a miss.
+
+        Must be called from the event loop.
+
+        Returns:
+            (path, "hit") or (None, "miss" | "building" | "failed" | "disabled")
+        """
+        if not ENABLED or not source:
+            return None, "disabled"
+        path = self.lookup(name, source)
+        if path is not None:
+            outcome = "hit"
+        elif name in self._building:
+            outcome = "building"
+        else:
+            digest = source_hash(source, self.version)
+            failed = self._failed.get(name)
+            if failed and failed[0] == digest and time.time() - failed[1] < BUILD_RETRY_S:
+                outcome = "failed"
+            else:
+                outcome = "miss"
+                self._building[name] = asyncio.create_task(self._build_in_background(name, source))
+        INTEROP_CACHE.labels(name, outcome).inc()
+        return path, outcome
+
+    async def _build_in_background(self, name: str, source: str) -> None:
+        try:
+            await asyncio.to_thread(self.build, name, source)
+            self._failed.pop(name, None)
+        except RuntimeError as e:
+            logger.warning(f"Interop assembly {name} could not be built ({e}); compiling inline for {BUILD_RETRY_S}s")
+            self._failed[name] = (source_hash(source, self.version), time.time())
+        finally:
+            self._building.pop(name, None)
+
+    async def wait_builds(self) -> None:
+        """Wait for the background builds in flight."""
+        if self._building:
+            await asyncio.gather(*self._building.values(), return_exceptions=True)
+
+    def _save_quietly(self) -> None:
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning(f"Could not save interop manifest: {e}")
+
+
+_cache: Optional[InteropCache] = None
+_launcher_source: Optional[tuple[float, str]] = None
+
+
+def get_interop_cache() -> InteropCache:
+    global _cache
+    if _cache is None:
+        _cache = InteropCache()
+    return _cache
+
+
+def current_launcher_source() -> str:
+    """Launcher interop source, re-read when ahklauncher.ps1 changes."""
+    global _launcher_source
+    try:
+        mtime = WRAPPER_SCRIPT.stat().st_mtime
+    except OSError:
+        return ""
+    if _launcher_source is None or _launcher_source[0] != mtime:
+        _launcher_source = (mtime, launcher_source())
+    return _launcher_source[1]
+
+
+def capture_api_loader() -> str:
+    """PowerShell that defines CaptureAPI/RECT: the cached DLL, else (or if it fails to load) the inline source."""
+    inline = f"Add-Type @'\n{CAPTURE_API_SOURCE}'@"
+    path, _ = get_interop_cache().resolve("capture", CAPTURE_API_SOURCE)
+    if path is None:
+        return inline
+    return f"try {{ Add-Type -Path {_ps_quote(str(path))} -ErrorAction Stop }} catch {{\n{inline}\n}}"
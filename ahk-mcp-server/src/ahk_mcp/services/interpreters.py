@@ -0,0 +1,100 @@
+"""AutoHotkey interpreter discovery, shared by every session of the process.
+
+ahklauncher.ps1 looks for the interpreter on every run (portable OneDrive
+folder, Program Files, the working directory), a handful of Test-Path
+calls before AutoHotkey even starts. The server looks once per version,
+in the launcher's order, and hands the result to each run as
+-AhkExecutable; the launcher still falls back to its own search when that
+path has disappeared. Results (also "not found") are kept DISCOVERY_TTL_S,
+so a new install is picked up without a restart.
+
+Only V1 and V2 runs get a path: an "Auto" run lets the launcher choose
+from the script's #Requires line.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_TTL_S = 300.0
+
+INTERPRETER_LOOKUPS = registry.counter("ahk_interpreter_lookups_total", "Interpreter lookups by outcome", ("outcome",))
+
+# Executable names in the launcher's portable layout (Test-AutohotkeyAvailable)
+_PORTABLE = {"V1": Path("AutohotkeyV1") / "AutoHotkeyU64.exe", "V2": Path("AutohotkeyV2") / "AutoHotkey64.exe"}
+
+
+def candidates(version: str) -> list[Path]:
+    """Where the launcher looks for an interpreter of `version`, in its order."""
+    portable = Path(f"C:\\Users\\{os.environ.get('USERNAME', '')}\\OneDrive\\Portable Softwares\\Autohotkey scripts")
+    paths = [portable / _PORTABLE[version]]
+    for variable in ("ProgramFiles", "ProgramFiles(x86)"):
+        if os.environ.get(variable):
+            paths.append(Path(os.environ[variable]) / "AutoHotkey" / "AutoHotkey.exe")
+    paths.append(Path.cwd() / "AutoHotkey.exe")
+    return paths
+
+
+def discover(version: str) -> Optional[str]:
+    """First existing candidate for `version` (blocking)."""
+    for path in candidates(version):
+        if path.is_file():
+            return str(path)
+    return None
+
+
+class InterpreterCache:
+    """Discovered interpreter per version, refreshed after `ttl_s`."""
+
+    def __init__(self, ttl_s: float = DISCOVERY_TTL_S):
+        self.ttl_s = ttl_s
+        self._found: dict[str, tuple[Optional[str], float]] = {}
+        # Filled from the event loop and from worker threads
+        self._lock = threading.Lock()
+
+    def cached(self, version: str) -> tuple[bool, Optional[str]]:
+        """(True, path or None) when a fresh result is known, else (False, None)."""
+        with self._lock:
+            entry = self._found.get(version)
+        if entry is None or time.monotonic() - entry[1] > self.ttl_s:
+            return False, None
+        return True, entry[0]
+
+    def lookup(self, version: str) -> Optional[str]:
+        """Interpreter for V1/V2 (blocking on a miss); None for Auto or when none is installed."""
+        if version not in _PORTABLE:
+            return None
+        known, path = self.cached(version)
+        if known:
+            INTERPRETER_LOOKUPS.labels("hit").inc()
+            return path
+        INTERPRETER_LOOKUPS.labels("miss").inc()
+        path = discover(version)
+        with self._lock:
+            self._found[version] = (path, time.monotonic())
+        logger.debug(f"AutoHotkey {version}: {path or 'not found, the launcher searches itself'}")
+        return path
+
+    async def resolve(self, version: str) -> Optional[str]:
+        """lookup(), with the discovery of a miss in a worker thread."""
+        if version not in _PORTABLE:
+            return None
+        known, path = self.cached(version)
+        if known:
+            INTERPRETER_LOOKUPS.labels("hit").inc()
+            return path
+        return await asyncio.to_thread(self.lookup, version)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._found.clear()
+
+
+interpreter_cache = InterpreterCache()
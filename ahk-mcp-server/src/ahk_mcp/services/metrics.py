@@ -0,0 +1,305 @@
+"""In-process metrics: counters, gauges and fixed-bucket histograms.
+
+Updates are lock-free: every thread writes to its own cell (looked up by
+thread id) and only a scrape sums the cells, so instrumenting the event
+loop and worker threads adds a dict lookup and an add per update.
+
+Exposed as the ahk://metrics resource and, when AHK_MCP_METRICS_PORT is set,
+as Prometheus text on http://127.0.0.1:<port>/metrics.
+"""
+import bisect
+import functools
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds: launcher runs take 0.5-30s, GitHub calls ~1s
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Child:
+    """One label combination of a metric; cells are per thread."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._cells: dict[int, list[float]] = {}
+
+    def _cell(self) -> list[float]:
+        tid = threading.get_ident()
+        cell = self._cells.get(tid)
+        if cell is None:
+            # setdefault is atomic: a racing scrape sees the cell or not, never half of it
+            cell = self._cells.setdefault(tid, [0.0] * self._size)
+        return cell
+
+    def _sum(self) -> list[float]:
+        totals = [0.0] * self._size
+        for cell in list(self._cells.values()):
+            for i, value in enumerate(cell):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._children: dict[tuple[str, ...], _Child] = {}
+
+    def _new_child(self) -> _Child:
+        raise NotImplementedError
+
+    def children(self) -> list[tuple[tuple[str, ...], "_Child"]]:
+        """(label values, child) of every label set observed so far."""
+        return list(self._children.items())
+
+    def labels(self, *values: str) -> "_Child":
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_str(self, values: tuple[str, ...], extra: Optional[tuple[str, str]] = None) -> str:
+        pairs = [f'{k}="{_escape(str(v))}"' for k, v in zip(self.label_names, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild(_Child):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cell()[0] += amount
+
+    def value(self) -> float:
+        return self._sum()[0]
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        return [(self.name, self._label_str(k), c.value()) for k, c in self._children.items()]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        self._cell()[0] -= amount
+
+
+class Gauge(_Metric):
+    """Up/down value (in-flight work), or a callback read at scrape time (queue depth)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        if self.function is not None:
+            try:
+                return [(self.name, "", float(self.function()))]
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+                return []
+        return [(self.name, self._label_str(k), c.value()) for k, c in self._children.items()]
+
+
+class _HistogramChild(_Child):
+    # Cell layout: [bucket_0 .. bucket_n-1, +Inf, sum]
+    def __init__(self, bounds: tuple[float, ...]):
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+
+    def observe(self, value: float) -> None:
+        cell = self._cell()
+        cell[bisect.bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> tuple[list[float], float, float]:
+        """(cumulative bucket counts incl. +Inf, count, sum)."""
+        totals = self._sum()
+        cumulative = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound below which a fraction q of observations fall."""
+        cumulative, count, _ = self.snapshot()
+        if not count:
+            return 0.0
+        target = q * count
+        for bound, seen in zip(self._bounds + (math.inf,), cumulative):
+            if seen >= target:
+                return bound
+        return math.inf
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram (Prometheus semantics: le buckets are cumulative)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        out = []
+        for key, child in self._children.items():
+            cumulative, count, total = child.snapshot()
+            for bound, seen in zip(self.buckets + (math.inf,), cumulative):
+                le = "+Inf" if bound == math.inf else repr(bound)
+                out.append((f"{self.name}_bucket", self._label_str(key, ("le", le)), seen))
+            out.append((f"{self.name}_sum", self._label_str(key), total))
+            out.append((f"{self.name}_count", self._label_str(key), count))
+        return out
+
+
+class Registry:
+    """Named metrics, rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                raise ValueError(
+                    f"{metric.name} is already registered as a {existing.kind} with labels {existing.label_names}"
+                )
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = (), function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(Gauge(name, help, labels, function))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def metrics(self) -> list[_Metric]:
+        return list(self._metrics.values())
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                text = str(int(value)) if value == int(value) else repr(value)
+                lines.append(f"{name}{labels} {text}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# -- instruments ------------------------------------------------------
+
+RUNS = registry.counter("ahk_runs_total", "Launcher runs by final status", ("status",))
+RUN_SECONDS = registry.histogram("ahk_run_duration_seconds", "Wall time of run_ahk_launcher")
+RUNS_IN_FLIGHT = registry.gauge("ahk_runs_in_flight", "Launcher runs currently executing")
+SUBPROCESSES = registry.gauge("ahk_launcher_subprocesses", "powershell.exe launcher processes alive")
+REAPED = registry.counter("ahk_reaped_processes_total", "Processes killed on timeout/cancel")
+OVER_BUDGET = registry.counter("ahk_runs_over_budget_total", "Runs exceeding a resource budget", ("resource",))
+SPECULATIVE_RUNS = registry.counter("ahk_speculative_runs_total", "V1/V2 races by winning interpreter", ("winner",))
+
+CAPTURES = registry.counter("ahk_captures_total", "Window captures by outcome", ("outcome",))
+CAPTURE_SECONDS = registry.histogram("ahk_capture_duration_seconds", "Wall time of capture_window_screenshot")
+
+GITHUB_CALLS = registry.counter("ahk_github_calls_total", "GitHub CLI calls by operation and outcome", ("op", "outcome"))
+GITHUB_SECONDS = registry.histogram("ahk_github_call_duration_seconds", "Wall time of GitHub CLI calls", ("op",))
+
+
+def track(calls: Counter, seconds: Histogram, *labels: str):
+    """
+    Decorator for coroutines returning {"success": bool, ...}.
+
+    Observes the call's wall time in `seconds` (labelled with `labels`) and
+    counts it in `calls` (labelled with `labels` + success/failure/error).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "success" if result.get("success") else "failure"
+                return result
+            finally:
+                seconds.labels(*labels).observe(time.perf_counter() - start)
+                calls.labels(*labels, outcome).inc()
+        return wrapper
+    return decorator
+
+
+# -- HTTP endpoint ----------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("metrics endpoint: " + format, *args)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics in a daemon thread (localhost only by default)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="ahk-metrics", daemon=True).start()
+    logger.info(f"Metrics endpoint on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,201 @@
+"""Capture of a script's stdout/stderr while it runs.
+
+With capture enabled the launcher starts AHK with its standard streams
+redirected to stdout.log / stderr.log (-StdoutFile / -StderrFile, launcher
+1.10.0+). OutputCapture tails both files while the run is in flight:
+
+    - every new chunk goes into a per-stream RingBuffer that keeps only the
+      last `max_bytes`, so a chatty script cannot grow the server's memory
+    - the chunk is handed to an optional async callback (ahk_run_script
+      forwards it to the MCP client as a log notification); a poll that
+      finds more than FORWARD_MAX_BYTES forwards only the newest part
+    - once the run is over, finish() reads the files to their end; output
+      the polls did not catch up with is counted, and only its last
+      `max_bytes` are read
+
+The result gets an "output" entry with the tail of each stream, its total
+size and whether older output was dropped.
+
+AHK_MCP_OUTPUT_KB sets the default tail size.
+"""
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAMS = ("stdout", "stderr")
+
+OUTPUT_BYTES = int(float(os.environ.get("AHK_MCP_OUTPUT_KB", "16")) * 1024)
+
+POLL_INTERVAL_S = 0.1
+
+# Reads of READ_CHUNK per file and poll; a faster writer is caught up on the next polls
+READ_CHUNK = 256 * 1024
+READS_PER_POLL = 16
+
+# Most bytes forwarded per stream and poll; older bytes of a burst are skipped
+FORWARD_MAX_BYTES = 8 * 1024
+
+OutputCallback = Callable[[str, str], Awaitable[None]]
+
+
+class RingBuffer:
+    """The last `max_bytes` bytes written, plus how many were written in total."""
+
+    def __init__(self, max_bytes: int = OUTPUT_BYTES):
+        self.max_bytes = max(1, max_bytes)
+        self.total = 0
+        self._buf = bytearray()
+
+    def skip(self, count: int) -> None:
+        """Count `count` bytes written without keeping them (older than anything written next)."""
+        self.total += count
+        self._buf.clear()
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        if len(data) >= self.max_bytes:
+            self._buf[:] = data[-self.max_bytes:]
+            return
+        self._buf += data
+        excess = len(self._buf) - self.max_bytes
+        if excess > 0:
+            del self._buf[:excess]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self._buf)
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buf)
+
+
+def _decode(data: bytes) -> str:
+    # AHK writes UTF-8 (v2) or the ANSI code page (v1) to a redirected stream;
+    # a cut through a multi-byte character only costs that character
+    return data.decode("utf-8", errors="replace").lstrip("\ufeff")
+
+
+class OutputCapture:
+    """Follows a run's redirected stream files into ring buffers."""
+
+    def __init__(self, directory: Path, max_bytes: int = OUTPUT_BYTES, on_output: Optional[OutputCallback] = None):
+        """
+        Args:
+            directory: Where the launcher writes stdout.log and stderr.log
+            max_bytes: Tail kept per stream
+            on_output: Awaited with (stream, text) for each new chunk
+        """
+        self.paths = {name: Path(directory) / f"{name}.log" for name in STREAMS}
+        self.buffers = {name: RingBuffer(max_bytes) for name in STREAMS}
+        self.on_output = on_output
+        self._offsets = {name: 0 for name in STREAMS}
+        # A cancelled follow() may still be polling in its thread when finish() polls
+        self._lock = threading.Lock()
+
+    def launcher_args(self) -> list[str]:
+        return ["-StdoutFile", str(self.paths["stdout"]), "-StderrFile", str(self.paths["stderr"])]
+
+    def poll(self, drain: bool = False) -> dict[str, tuple[int, bytes]]:
+        """
+        Read what the streams gained since the last poll: {stream: (bytes skipped, bytes to forward)}.
+
+        Args:
+            drain: Read up to the end of the files (the run is over); only
+                their last max_bytes are read, the rest is counted
+        """
+        with self._lock:
+            return self._poll(drain)
+
+    def _poll(self, drain: bool = False) -> dict[str, tuple[int, bytes]]:
+        fresh = {}
+        for name, path in self.paths.items():
+            skipped = 0
+            recent = bytearray()
+            try:
+                with open(path, "rb") as f:
+                    if drain:
+                        # Bytes older than the tail are never kept: count them without reading
+                        gap = os.fstat(f.fileno()).st_size - self._offsets[name] - self.buffers[name].max_bytes
+                        if gap > 0:
+                            self._offsets[name] += gap
+                            self.buffers[name].skip(gap)
+                            skipped += gap
+                    f.seek(self._offsets[name])
+                    reads = 0
+                    while drain or reads < READS_PER_POLL:
+                        reads += 1
+                        data = f.read(READ_CHUNK)
+                        if not data:
+                            break
+                        self._offsets[name] += len(data)
+                        self.buffers[name].write(data)
+                        recent += data
+                        if len(recent) > FORWARD_MAX_BYTES:
+                            skipped += len(recent) - FORWARD_MAX_BYTES
+                            del recent[:-FORWARD_MAX_BYTES]
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.debug(f"Cannot read {path}: {e}")
+            if recent:
+                fresh[name] = (skipped, bytes(recent))
+        return fresh
+
+    async def _forward(self, fresh: dict[str, tuple[int, bytes]]) -> None:
+        if self.on_output is None:
+            return
+        for name, (skipped, data) in fresh.items():
+            text = _decode(data)
+            if skipped:
+                text = f"[... {skipped} bytes skipped]\n{text}"
+            try:
+                await self.on_output(name, text)
+            except Exception as e:
+                # The client going away must not fail the run
+                logger.debug(f"Could not forward {name} output: {e}")
+
+    async def follow(self, interval_s: float = POLL_INTERVAL_S) -> None:
+        """Poll until cancelled."""
+        while True:
+            await self._forward(await asyncio.to_thread(self.poll))
+            await asyncio.sleep(interval_s)
+
+    async def finish(self) -> dict:
+        """Read (and forward) what is left after the run, then summarize."""
+        await self._forward(await asyncio.to_thread(self.poll, True))
+        return self.summary()
+
+    def summary(self) -> dict:
+        """{"stdout"|"stderr": {"tail", "bytes", "truncated"}} for streams that had output."""
+        streams = {}
+        for name, buffer in self.buffers.items():
+            if not buffer.total:
+                continue
+            tail = buffer.getvalue()
+            if buffer.truncated and b"\n" in tail[:-1]:
+                # Start the tail on a whole line
+                tail = tail[tail.index(b"\n") + 1:]
+            streams[name] = {"tail": _decode(tail), "bytes": buffer.total, "truncated": buffer.truncated}
+        return streams
+
+
+def output_forwarder(ctx, run_id: str) -> Optional[OutputCallback]:
+    """Callback sending captured output to the calling MCP session, if there is one."""
+    session = ctx.session if ctx else None
+    if session is None:
+        from fastmcp.server.dependencies import get_context
+
+        try:
+            session = get_context().session
+        except RuntimeError:
+            return None
+
+    async def forward(stream: str, text: str) -> None:
+        await session.send_log_message(level="info", data={"runId": run_id, "stream": stream, "text": text}, logger="ahk_output")
+
+    return forward
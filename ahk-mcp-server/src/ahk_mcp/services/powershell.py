@@ -1,10 +1,40 @@
 """PowerShell wrapper service for ahklauncher.ps1."""
 import asyncio
+import base64
+import functools
 import json
 import logging
+import os
+import shutil
 import subprocess
+import tempfile
+import textwrap
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, Sequence
+
+import anyio
+
+from .error_parser import apply_control_tree
+from .fleet import get_fleet
+from .interpreters import interpreter_cache
+from .interop import capture_api_loader, current_launcher_source, get_interop_cache
+from .metrics import CAPTURES, CAPTURE_SECONDS, OVER_BUDGET, REAPED, RUN_SECONDS, RUNS, RUNS_IN_FLIGHT, SUBPROCESSES, track
+from .output_capture import OUTPUT_BYTES, OutputCallback, OutputCapture
+from .process_tree import BUDGET_KILL, BUDGETS, ProcessTree, check_budgets, stop_tracking
+from .speculative import SPECULATIVE, decide_version, get_interpreter_memory, is_version_mismatch, race
+from .stabilize import DOWNSAMPLE_WIDTH, FRAME_INTERVAL_MS, STABLE_FRAMES, STABLE_MAX_MS, StabilityTracker
+from .staging import stage_script
+from .trace import get_recorder, get_replay
+
+try:
+    # Optional fast decoder (pip install ahk-mcp-server[fast])
+    import orjson
+    _json_loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    _json_loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +49,9 @@ def _build_ps_command(
     version: str = "Auto",
     timeout_ms: int = 3000,
     screenshot: bool = True,
-    screenshot_path: Optional[str] = None
+    screenshot_path: Optional[str] = None,
+    keep_error_window: bool = False,
+    log_path: Optional[str] = None
 ) -> list[str]:
     """Build PowerShell command arguments."""
     args = [
@@ -38,11 +70,17 @@ def _build_ps_command(
         if screenshot_path:
             args.extend(["-ScreenshotPath", screenshot_path])
 
+    if keep_error_window:
+        args.append("-KeepErrorWindow")
+
+    if log_path:
+        args.extend(["-LogPath", log_path])
+
     return args
 
 
-def _parse_json_output(stdout: str, stderr: str) -> dict:
-    """Parse JSON output from PowerShell wrapper."""
+def _parse_json_output(stdout: str, stderr: str, version: Optional[str] = None) -> dict:
+    """Parse JSON output from PowerShell wrapper ("V1"/"V2" `version` selects the error dialog rules)."""
     # Strip UTF-8 BOM if present (PowerShell adds it with -Encoding UTF8)
     if stdout.startswith('\ufeff'):
         stdout = stdout[1:]
@@ -62,7 +100,7 @@ def _parse_json_output(stdout: str, stderr: str) -> dict:
             break
 
     if not json_line:
-        logger.error(f"No JSON found in stdout: {stdout[:500]}")
+        logger.error("No JSON found in stdout: %.500s", stdout)
         return {
             "status": "CONFIG_ERROR",
             "message": f"Failed to parse wrapper output. Stderr: {stderr[:500] if stderr else 'None'}",
@@ -71,9 +109,10 @@ def _parse_json_output(stdout: str, stderr: str) -> dict:
         }
 
     try:
-        return json.loads(json_line)
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {e}. Line: {json_line[:200]}")
+        # 1.9.0+ launchers send error dialogs as a raw control tree
+        return apply_control_tree(_json_loads(json_line), version if version in ("V1", "V2") else None)
+    except _JSONDecodeError as e:
+        logger.error("JSON decode error: %s. Line: %.200s", e, json_line)
         return {
             "status": "CONFIG_ERROR",
             "message": f"Invalid JSON from wrapper: {str(e)}",
@@ -82,12 +121,35 @@ def _parse_json_output(stdout: str, stderr: str) -> dict:
         }
 
 
+def _attach_usage(result: dict, tree: ProcessTree) -> dict:
+    """Add the run's resource usage (and any exceeded budgets) to a launcher result."""
+    usage = tree.usage()
+    result["resources"] = usage
+    over = check_budgets(usage)
+    if tree.budget_reaped:
+        # Stopped mid-run by the tracker
+        result["reapedProcesses"] = (result.get("reapedProcesses") or []) + tree.budget_reaped
+        REAPED.inc(len(tree.budget_reaped))
+    if over:
+        result["overBudget"] = over
+        for violation in over:
+            OVER_BUDGET.labels(violation["resource"]).inc()
+        summary = ", ".join(f"{v['resource']}={v['value']} (budget {v['budget']:g})" for v in over)
+        logger.warning("Run of %s over budget: %s", result.get("scriptPath") or "?", summary)
+    return result
+
+
 async def run_ahk_launcher(
     script_path: str,
     version: str = "Auto",
     timeout_ms: int = 3000,
     screenshot: bool = True,
-    screenshot_path: Optional[str] = None
+    screenshot_path: Optional[str] = None,
+    keep_error_window: bool = False,
+    run_dir: Optional[str] = None,
+    capture_output: bool = False,
+    output_bytes: int = OUTPUT_BYTES,
+    on_output: Optional[OutputCallback] = None
 ) -> dict:
     """
     Execute ahklauncher.ps1 and return parsed JSON result.
@@ -98,12 +160,210 @@ async def run_ahk_launcher(
         timeout_ms: Timeout in milliseconds
         screenshot: Whether to capture screenshot on result
         screenshot_path: Optional custom screenshot directory
+        keep_error_window: Leave the AHK process alive on ERROR so the error
+            window can be captured afterwards (caller must reap processId)
+        run_dir: Run artifact directory (see artifacts.py): the launcher output,
+            log and screenshots are written there instead of temp/shared folders
+        capture_output: Redirect the script's stdout/stderr and return their
+            last `output_bytes` as result["output"] (see output_capture.py)
+        on_output: Awaited with (stream, text) as captured output arrives
+
+    Runs are appended to a trace file when recording is enabled, and served
+    from a trace instead of powershell.exe in replay mode (see trace.py).
+    When runners are configured the run is dispatched to one (see fleet.py).
+    "Auto" runs of scripts whose version cannot be settled beforehand run
+    both interpreters and keep the first decisive verdict (see speculative.py).
+    Local runs start a run-unique copy of the script; the result names the
+    original (see staging.py).
 
     Returns:
         Dict with status, message, errorDetails, screenshot path, etc.
     """
-    logger.info(f"Running AHK script: {script_path} (version={version}, timeout={timeout_ms}ms)")
+    logger.info("Running AHK script: %s (version=%s, timeout=%sms)", script_path, version, timeout_ms)
+
+    started = time.time()
+    t0 = time.perf_counter()
+    RUNS_IN_FLIGHT.inc()
+    try:
+        # Replay mode: serve a recorded result instead of starting powershell.exe
+        replay = get_replay()
+        if replay is not None:
+            result = await replay.run(script_path, version, max_wait_s=(timeout_ms / 1000) + 10)
+        else:
+            capture = functools.partial(OutputCapture, max_bytes=output_bytes, on_output=on_output) if capture_output else None
+            if version == "Auto" and SPECULATIVE and Path(script_path).exists():
+                result = await _run_auto(script_path, timeout_ms, screenshot, screenshot_path, keep_error_window, run_dir, capture)
+            else:
+                result = await _dispatch(script_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window, run_dir, capture)
+    finally:
+        RUNS_IN_FLIGHT.dec()
+        RUN_SECONDS.observe(time.perf_counter() - t0)
+    RUNS.labels(result.get("status", "CONFIG_ERROR")).inc()
+
+    recorder = get_recorder()
+    if recorder is not None and get_replay() is None:
+        args = {
+            "version": version,
+            "timeout_ms": timeout_ms,
+            "screenshot": screenshot,
+            "keep_error_window": keep_error_window,
+        }
+        wall_ms = int((time.perf_counter() - t0) * 1000)
+        try:
+            await asyncio.to_thread(recorder.record, script_path, args, result, started, wall_ms)
+        except (OSError, TypeError, ValueError) as e:
+            # The run itself finished: a trace that cannot be written only loses the record
+            logger.warning("Could not record run of %s to %s: %s", script_path, recorder.path, e)
+    return result
+
+
+async def _dispatch(
+    script_path: str,
+    version: str,
+    timeout_ms: int,
+    screenshot: bool,
+    screenshot_path: Optional[str],
+    keep_error_window: bool,
+    run_dir: Optional[str],
+    capture: Optional[Callable[[Path], OutputCapture]] = None
+) -> dict:
+    """One launcher run on a runner of the fleet, or locally (from a staged copy, see staging.py)."""
+    if get_fleet() is not None:
+        if run_dir:
+            screenshot_path = screenshot_path or str(Path(run_dir) / "screenshots")
+        # Runners do not stream the script's output back
+        return await _run_remote(script_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window)
+    assembly, interop = get_interop_cache().resolve("launcher", current_launcher_source())
+    extra_args = ["-InteropAssembly", str(assembly)] if assembly else []
+    # Interpreter found once per process instead of by every launcher run
+    interpreter = await interpreter_cache.resolve(version)
+    if interpreter:
+        extra_args += ["-AhkExecutable", interpreter]
+    # Run-unique copy of the script: concurrent runs of it cannot be mistaken for each other
+    staged = await asyncio.to_thread(stage_script, script_path)
+    run_path = str(staged.path) if staged else script_path
+    try:
+        if capture is not None:
+            result = await _run_captured(capture, run_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window, run_dir, extra_args)
+        else:
+            result = await _run_powershell(run_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window, run_dir, extra_args)
+    finally:
+        if staged:
+            staged.release()
+    if staged:
+        result = staged.restore(result)
+        result["runToken"] = staged.token
+    if result.get("interop") == "fallback":
+        # The launcher could not load the DLL: rebuild it
+        get_interop_cache().invalidate("launcher")
+        interop = "invalid"
+    result["interopCache"] = interop
+    return result
+
+
+async def _run_captured(
+    capture: Callable[[Path], OutputCapture],
+    script_path: str,
+    version: str,
+    timeout_ms: int,
+    screenshot: bool,
+    screenshot_path: Optional[str],
+    keep_error_window: bool,
+    run_dir: Optional[str],
+    extra_args: Sequence[str] = ()
+) -> dict:
+    """Local run with the script's stdout/stderr tailed while it runs."""
+    directory = run_dir or tempfile.mkdtemp(prefix="ahk-output-")
+    output = capture(Path(directory))
+    follower = asyncio.create_task(output.follow())
+    try:
+        result = await _run_powershell(
+            script_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window, run_dir,
+            extra_args=[*extra_args, *output.launcher_args()]
+        )
+    finally:
+        follower.cancel()
+        await asyncio.gather(follower, return_exceptions=True)
+    try:
+        streams = await output.finish()
+    finally:
+        if not run_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+    if streams:
+        result["output"] = streams
+    return result
+
+
+async def _run_auto(
+    script_path: str,
+    timeout_ms: int,
+    screenshot: bool,
+    screenshot_path: Optional[str],
+    keep_error_window: bool,
+    run_dir: Optional[str],
+    capture: Optional[Callable[[Path], OutputCapture]] = None
+) -> dict:
+    """Run an "Auto" script with its known version, or race V1 against V2."""
+    version, source = await asyncio.to_thread(decide_version, script_path)
+    if version:
+        logger.debug("Version of %s: %s (%s)", script_path, version, source)
+        result = await _dispatch(script_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window, run_dir, capture)
+        if source != "memory" or not is_version_mismatch(result, version):
+            result.setdefault("ahkVersion", version)
+            return result
+        # The remembered interpreter no longer fits (script rewritten): race again
+        logger.info("Remembered %s no longer fits %s, racing both interpreters", version, script_path)
+        await asyncio.to_thread(get_interpreter_memory().forget, script_path)
+        if result.get("processId") and not result.get("runner"):
+            await asyncio.to_thread(ProcessTree(result["processId"]).reap)
+
+    async def leg(leg_version: str) -> dict:
+        # Each run gets its own launcher output/log next to the run's artifacts
+        leg_dir = None
+        if run_dir:
+            leg_dir = os.path.join(run_dir, f"speculative-{leg_version}")
+            os.makedirs(leg_dir, exist_ok=True)
+        return await _dispatch(script_path, leg_version, timeout_ms, screenshot, screenshot_path, keep_error_window, leg_dir, capture)
+
+    result = await race(script_path, leg)
+    if result["speculative"]["winner"]:
+        result.setdefault("ahkVersion", result["speculative"]["winner"])
+    return result
+
+
+async def _run_remote(
+    script_path: str,
+    version: str,
+    timeout_ms: int,
+    screenshot: bool,
+    screenshot_path: Optional[str],
+    keep_error_window: bool
+) -> dict:
+    """Dispatch a run to the runner fleet; screenshots are streamed back locally."""
+    if not Path(script_path).exists():
+        return {
+            "status": "CONFIG_ERROR",
+            "message": f"Script not found: {script_path}",
+            "executionTimeMs": 0,
+            "scriptPath": script_path
+        }
+    return await get_fleet().run(
+        script_path, version, timeout_ms, screenshot, keep_error_window,
+        screenshot_path or str(SCREENSHOTS_DIR)
+    )
+
 
+async def _run_powershell(
+    script_path: str,
+    version: str,
+    timeout_ms: int,
+    screenshot: bool,
+    screenshot_path: Optional[str],
+    keep_error_window: bool,
+    run_dir: Optional[str],
+    extra_args: Sequence[str] = ()
+) -> dict:
+    """Start ahklauncher.ps1 and wait for its JSON result (see run_ahk_launcher)."""
     # Validate script exists
     if not Path(script_path).exists():
         return {
@@ -122,22 +382,30 @@ async def run_ahk_launcher(
             "scriptPath": script_path
         }
 
-    cmd = _build_ps_command(script_path, version, timeout_ms, screenshot, screenshot_path)
-    logger.debug(f"Command: {' '.join(cmd)}")
+    log_path = None
+    if run_dir:
+        # Per-run artifact directory: outputs are kept, names cannot collide
+        output_path = os.path.join(run_dir, "launcher.json")
+        log_path = os.path.join(run_dir, "launcher.log")
+        screenshot_path = screenshot_path or os.path.join(run_dir, "screenshots")
+    else:
+        # Use temp file for output to avoid pipe inheritance issues with child processes
+        output_file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8')
+        output_file.close()
+        output_path = output_file.name
+
+    cmd = _build_ps_command(script_path, version, timeout_ms, screenshot, screenshot_path, keep_error_window, log_path)
+    logger.debug("Command: %s", cmd)
 
     # Calculate subprocess timeout (add buffer for PS startup)
     subprocess_timeout = (timeout_ms / 1000) + 10
 
-    # Use temp file for output to avoid pipe inheritance issues with child processes
-    import tempfile
-    import os
-
-    output_file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8')
-    output_file.close()
-    output_path = output_file.name
-
     # Add output redirection to temp file
-    cmd_with_redirect = cmd + ['-OutputFile', output_path]
+    cmd_with_redirect = cmd + ['-OutputFile', output_path, *extra_args]
+
+    process = None
+    tree = None
+    tracker = None
 
     try:
         # Run without capturing output - the script writes JSON to the temp file
@@ -147,6 +415,12 @@ async def run_ahk_launcher(
             stderr=subprocess.DEVNULL,
             creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
         )
+        SUBPROCESSES.inc()
+
+        # Track AHK and its descendants so timeout/cancel can reap the whole
+        # tree; the same loop samples their resource usage
+        tree = ProcessTree(process.pid, measure_root=False)
+        tracker = asyncio.create_task(tree.track(budgets=BUDGETS if BUDGET_KILL else None))
 
         try:
             exit_code = await asyncio.wait_for(
@@ -154,7 +428,9 @@ async def run_ahk_launcher(
                 timeout=subprocess_timeout
             )
         except asyncio.TimeoutError:
-            process.kill()
+            await stop_tracking(tracker)
+            reaped = await asyncio.to_thread(tree.reap)
+            REAPED.inc(len(reaped))
             process.wait()
             # Try to read partial output from temp file
             try:
@@ -162,16 +438,32 @@ async def run_ahk_launcher(
                     with open(output_path, 'r', encoding='utf-8') as f:
                         stdout = f.read()
                     if stdout.strip():
-                        return _parse_json_output(stdout, "")
+                        result = _parse_json_output(stdout, "", version)
+                        result["reapedProcesses"] = reaped
+                        return _attach_usage(result, tree)
             except Exception:
                 pass
             # No output found, return timeout
-            return {
+            return _attach_usage({
                 "status": "TIMEOUT",
                 "message": f"PowerShell wrapper timed out after {subprocess_timeout}s",
                 "executionTimeMs": int(subprocess_timeout * 1000),
-                "scriptPath": script_path
-            }
+                "scriptPath": script_path,
+                "reapedProcesses": reaped
+            }, tree)
+        except asyncio.CancelledError:
+            # MCP client cancelled the request: tear down the run before propagating
+            logger.info("Run cancelled, reaping process tree of PID %s", process.pid)
+            # Shield the cleanup: the MCP request scope stays cancelled, so any
+            # unshielded await here would be interrupted before the kill happens
+            with anyio.CancelScope(shield=True):
+                await stop_tracking(tracker)
+                REAPED.inc(len(await asyncio.to_thread(tree.reap)))
+            raise
+
+        await stop_tracking(tracker)
+        # Last sample: short runs may end between two polls
+        await asyncio.to_thread(tree.snapshot)
 
         # Read output from temp file
         stdout = ""
@@ -179,13 +471,13 @@ async def run_ahk_launcher(
             with open(output_path, 'r', encoding='utf-8') as f:
                 stdout = f.read()
 
-        logger.debug(f"Exit code: {exit_code}")
-        logger.debug(f"Stdout: {stdout[:500] if stdout else 'None'}")
+        logger.debug("Exit code: %s", exit_code)
+        logger.debug("Stdout: %.500s", stdout or None)
 
-        return _parse_json_output(stdout or "", "")
+        return _attach_usage(_parse_json_output(stdout or "", "", version), tree)
 
     except Exception as e:
-        logger.exception(f"Error running wrapper: {e}")
+        logger.exception("Error running wrapper: %s", e)
         return {
             "status": "CONFIG_ERROR",
             "message": f"Failed to execute wrapper: {str(e)}",
@@ -193,18 +485,26 @@ async def run_ahk_launcher(
             "scriptPath": script_path
         }
     finally:
-        # Cleanup temp file
+        if process is not None:
+            SUBPROCESSES.dec()
+        await stop_tracking(tracker)
+        # Cleanup temp file (run directories keep launcher.json)
         try:
-            if os.path.exists(output_path):
+            if not run_dir and os.path.exists(output_path):
                 os.unlink(output_path)
         except Exception:
             pass
 
 
+@track(CAPTURES, CAPTURE_SECONDS)
 async def capture_window_screenshot(
     window_title: Optional[str] = None,
     window_handle: Optional[str] = None,
-    output_path: Optional[str] = None
+    output_path: Optional[str] = None,
+    stable: bool = False,
+    stable_frames: int = STABLE_FRAMES,
+    max_wait_ms: int = STABLE_MAX_MS,
+    inline: bool = False
 ) -> dict:
     """
     Capture a screenshot of a specific window.
@@ -216,11 +516,27 @@ async def capture_window_screenshot(
         window_title: Window title to search for (partial match)
         window_handle: Window handle (hwnd) as string
         output_path: Custom output directory
+        stable: Wait until the window stopped changing (see stabilize.py)
+        stable_frames: Consecutive unchanged frames required in stable mode
+        max_wait_ms: Stable mode cap; the last frame is kept when reached
+        inline: Return the PNG bytes ("png") instead of saving it; runner
+            captures are saved on the runner and returned by path as usual
 
     Returns:
-        Dict with success, screenshot_path, window_dimensions
+        Dict with success, screenshot_path or png, window_dimensions (and
+        stabilization: stable, frames, elapsedMs, diffs in stable mode)
     """
-    logger.info(f"Capturing window: title={window_title}, handle={window_handle}")
+    logger.info("Capturing window: title=%s, handle=%s, stable=%s", window_title, window_handle, stable)
+
+    fleet = get_fleet()
+    if fleet is not None:
+        if not window_title and not window_handle:
+            return {
+                "success": False,
+                "error": "Either window_title or window_handle must be provided"
+            }
+        stability = {"stable": stable, "stable_frames": stable_frames, "max_wait_ms": max_wait_ms} if stable else {}
+        return await fleet.capture(window_title, window_handle, output_path, SCREENSHOTS_DIR, **stability)
 
     # Build PowerShell script for window capture
     screenshot_dir = output_path or str(SCREENSHOTS_DIR)
@@ -230,57 +546,8 @@ $ErrorActionPreference = "Stop"
 Add-Type -AssemblyName System.Drawing
 Add-Type -AssemblyName System.Windows.Forms
 
-# Win32 API declarations
-Add-Type @'
-using System;
-using System.Runtime.InteropServices;
-using System.Text;
-using System.Collections.Generic;
-
-public class CaptureAPI {{
-    [DllImport("user32.dll")]
-    public static extern IntPtr FindWindow(string lpClassName, string lpWindowName);
-
-    [DllImport("user32.dll", CharSet = CharSet.Auto)]
-    public static extern int GetWindowText(IntPtr hWnd, StringBuilder lpString, int nMaxCount);
-
-    [DllImport("user32.dll")]
-    public static extern bool IsWindowVisible(IntPtr hWnd);
-
-    [DllImport("user32.dll")]
-    public static extern bool GetWindowRect(IntPtr hWnd, out RECT lpRect);
-
-    [DllImport("user32.dll")]
-    public static extern bool PrintWindow(IntPtr hWnd, IntPtr hdcBlt, uint nFlags);
-
-    public delegate bool EnumWindowsProc(IntPtr hWnd, IntPtr lParam);
-
-    [DllImport("user32.dll")]
-    public static extern bool EnumWindows(EnumWindowsProc enumProc, IntPtr lParam);
-
-    public const uint PW_RENDERFULLCONTENT = 0x00000002;
-
-    public static List<KeyValuePair<IntPtr, string>> FoundWindows = new List<KeyValuePair<IntPtr, string>>();
-
-    public static bool EnumCallback(IntPtr hWnd, IntPtr lParam) {{
-        if (IsWindowVisible(hWnd)) {{
-            StringBuilder sb = new StringBuilder(256);
-            GetWindowText(hWnd, sb, sb.Capacity);
-            if (sb.Length > 0) {{
-                FoundWindows.Add(new KeyValuePair<IntPtr, string>(hWnd, sb.ToString()));
-            }}
-        }}
-        return true;
-    }}
-}}
-
-[StructLayout(LayoutKind.Sequential)]
-public struct RECT {{
-    public int Left, Top, Right, Bottom;
-    public int Width {{ get {{ return Right - Left; }} }}
-    public int Height {{ get {{ return Bottom - Top; }} }}
-}}
-'@
+# Win32 API declarations (cached assembly, see interop.py)
+{capture_api_loader()}
 
 $hwnd = [IntPtr]::Zero
 $windowTitle = ""
@@ -331,7 +598,13 @@ if (-not $success -or $rect.Width -le 0 -or $rect.Height -le 0) {{
     @{{ success = $false; error = "Invalid window dimensions" }} | ConvertTo-Json -Compress
     exit 1
 }}
+'''
 
+    if stable:
+        ps_script += _stable_capture_script(screenshot_dir, FRAME_INTERVAL_MS, inline)
+        return await _capture_stable(ps_script, stable_frames, max_wait_ms)
+
+    ps_script += f'''
 # Create screenshot
 $bitmap = New-Object System.Drawing.Bitmap($rect.Width, $rect.Height)
 $graphics = [System.Drawing.Graphics]::FromImage($bitmap)
@@ -340,29 +613,9 @@ $hdc = $graphics.GetHdc()
 [CaptureAPI]::PrintWindow($hwnd, $hdc, [CaptureAPI]::PW_RENDERFULLCONTENT) | Out-Null
 $graphics.ReleaseHdc($hdc)
 
-# Save
-$timestamp = Get-Date -Format "yyyyMMdd_HHmmss"
-$screenshotDir = "{screenshot_dir}"
-if (-not (Test-Path $screenshotDir)) {{ New-Item -ItemType Directory -Path $screenshotDir -Force | Out-Null }}
-$filename = "capture_${{timestamp}}.png"
-$fullPath = Join-Path $screenshotDir $filename
-$bitmap.Save($fullPath, [System.Drawing.Imaging.ImageFormat]::Png)
-
 $graphics.Dispose()
-$bitmap.Dispose()
-
-@{{
-    success = $true
-    screenshot_path = $fullPath
-    window_title = $windowTitle
-    window_dimensions = @{{
-        width = $rect.Width
-        height = $rect.Height
-        left = $rect.Left
-        top = $rect.Top
-    }}
-}} | ConvertTo-Json -Compress
 '''
+    ps_script += _capture_result_script(screenshot_dir, inline)
 
     try:
         result = await asyncio.to_thread(
@@ -377,8 +630,8 @@ $bitmap.Dispose()
 
         if result.stdout:
             try:
-                return json.loads(result.stdout.strip().split('\n')[-1])
-            except json.JSONDecodeError:
+                return _decode_inline(_json_loads(result.stdout.strip().split('\n')[-1]))
+            except _JSONDecodeError:
                 pass
 
         return {
@@ -387,8 +640,169 @@ $bitmap.Dispose()
         }
 
     except Exception as e:
-        logger.exception(f"Error capturing window: {e}")
+        logger.exception("Error capturing window: %s", e)
         return {
             "success": False,
             "error": str(e)
         }
+
+
+def _decode_inline(result: dict) -> dict:
+    """Replace the base64 "image" of an inline capture by the PNG bytes ("png")."""
+    image = result.pop("image", None)
+    if image:
+        result["png"] = base64.b64decode(image)
+    return result
+
+
+def _capture_result_script(screenshot_dir: str, inline: bool) -> str:
+    """PowerShell that saves $bitmap as a PNG (or sends it base64 encoded when inline) and prints the result JSON."""
+    if inline:
+        # The PNG never touches the disk; Python inlines it or saves it (image_content.py)
+        store = '''$stream = New-Object System.IO.MemoryStream
+$bitmap.Save($stream, [System.Drawing.Imaging.ImageFormat]::Png)
+$bitmap.Dispose()
+$image = [Convert]::ToBase64String($stream.ToArray())
+$stream.Dispose()'''
+        entry = "image = $image"
+    else:
+        store = f'''$timestamp = Get-Date -Format "yyyyMMdd_HHmmss"
+$screenshotDir = "{screenshot_dir}"
+if (-not (Test-Path $screenshotDir)) {{ New-Item -ItemType Directory -Path $screenshotDir -Force | Out-Null }}
+$fullPath = Join-Path $screenshotDir "capture_${{timestamp}}.png"
+$bitmap.Save($fullPath, [System.Drawing.Imaging.ImageFormat]::Png)
+$bitmap.Dispose()'''
+        entry = "screenshot_path = $fullPath"
+    return f'''
+{store}
+
+@{{
+    success = $true
+    {entry}
+    window_title = $windowTitle
+    window_dimensions = @{{
+        width = $rect.Width
+        height = $rect.Height
+        left = $rect.Left
+        top = $rect.Top
+    }}
+}} | ConvertTo-Json -Compress
+'''
+
+
+def _stable_capture_script(screenshot_dir: str, interval_ms: int, inline: bool = False) -> str:
+    """PowerShell tail for stable mode: one downsampled BGRA frame per line, saved (or sent) on "save"."""
+    return f'''
+$frame = 0
+while ($true) {{
+    $rect = New-Object RECT
+    if (-not [CaptureAPI]::GetWindowRect($hwnd, [ref]$rect) -or $rect.Width -le 0 -or $rect.Height -le 0) {{
+        @{{ success = $false; error = "Window closed during capture" }} | ConvertTo-Json -Compress
+        exit 1
+    }}
+    $bitmap = New-Object System.Drawing.Bitmap($rect.Width, $rect.Height)
+    $graphics = [System.Drawing.Graphics]::FromImage($bitmap)
+    $hdc = $graphics.GetHdc()
+    [CaptureAPI]::PrintWindow($hwnd, $hdc, [CaptureAPI]::PW_RENDERFULLCONTENT) | Out-Null
+    $graphics.ReleaseHdc($hdc)
+    $graphics.Dispose()
+
+    # Downsample for the diff (Python keeps or drops the full frame)
+    $scale = [Math]::Min(1.0, {DOWNSAMPLE_WIDTH} / $rect.Width)
+    $sw = [Math]::Max(1, [int]($rect.Width * $scale))
+    $sh = [Math]::Max(1, [int]($rect.Height * $scale))
+    $small = New-Object System.Drawing.Bitmap($sw, $sh, [System.Drawing.Imaging.PixelFormat]::Format32bppArgb)
+    $g = [System.Drawing.Graphics]::FromImage($small)
+    $g.InterpolationMode = [System.Drawing.Drawing2D.InterpolationMode]::HighQualityBilinear
+    $g.DrawImage($bitmap, 0, 0, $sw, $sh)
+    $g.Dispose()
+    $bits = $small.LockBits((New-Object System.Drawing.Rectangle(0, 0, $sw, $sh)), [System.Drawing.Imaging.ImageLockMode]::ReadOnly, [System.Drawing.Imaging.PixelFormat]::Format32bppArgb)
+    $bytes = New-Object byte[] ($bits.Stride * $sh)
+    [System.Runtime.InteropServices.Marshal]::Copy($bits.Scan0, $bytes, 0, $bytes.Length)
+    $stride = $bits.Stride
+    $small.UnlockBits($bits)
+    $small.Dispose()
+
+    [Console]::Out.WriteLine((@{{ frame = $frame; width = $sw; height = $sh; stride = $stride; data = [Convert]::ToBase64String($bytes) }} | ConvertTo-Json -Compress))
+    [Console]::Out.Flush()
+    $frame++
+
+    $command = [Console]::In.ReadLine()
+    if ($command -eq "save") {{
+{textwrap.indent(_capture_result_script(screenshot_dir, inline).strip(), "        ")}
+        exit 0
+    }}
+    $bitmap.Dispose()
+    if ($command -ne "next") {{ exit 0 }}
+    Start-Sleep -Milliseconds {interval_ms}
+}}
+'''
+
+
+async def _capture_stable(ps_script: str, stable_frames: int, max_wait_ms: int) -> dict:
+    """
+    Drive the stable-mode capture script frame by frame.
+
+    Each downsampled frame is diffed against the previous one; the script
+    is told to save the current full frame once the window is stable, or
+    when max_wait_ms elapsed since the first frame (PowerShell startup is
+    not counted), and to grab another frame otherwise.
+    """
+    tracker = StabilityTracker(stable_frames)
+    first_frame = None
+    process = None
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "powershell.exe", "-ExecutionPolicy", "Bypass", "-NoProfile", "-NonInteractive", "-Command", ps_script,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # Frame lines are ~100KB of base64 for a 160px-wide window; an inline
+            # full-size PNG can take a few MB
+            limit=1 << 26,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        while True:
+            line = await asyncio.wait_for(process.stdout.readline(), timeout=30)
+            if not line:
+                stderr = (await process.stderr.read()).decode("utf-8", errors="replace")
+                return {"success": False, "error": f"Failed to capture: {stderr.strip() or 'no output'}"}
+            line = line.strip()
+            if not line.startswith(b"{"):
+                continue
+            try:
+                message = _json_loads(line)
+            except _JSONDecodeError:
+                continue
+
+            if "frame" not in message:
+                # Final result (saved frame or error)
+                if message.get("success"):
+                    message["stabilization"] = {
+                        "stable": tracker.stable,
+                        "frames": tracker.frames,
+                        "elapsedMs": int((time.perf_counter() - first_frame) * 1000) if first_frame else 0,
+                        "diffs": tracker.diffs,
+                    }
+                return _decode_inline(message)
+
+            now = time.perf_counter()
+            first_frame = first_frame or now
+            stable = tracker.feed(message["width"], message["height"], base64.b64decode(message["data"]), message.get("stride"))
+            done = stable or (now - first_frame) * 1000 >= max_wait_ms
+            process.stdin.write(b"save\n" if done else b"next\n")
+            await process.stdin.drain()
+
+    except Exception as e:
+        logger.exception("Error capturing window: %s", e)
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    finally:
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
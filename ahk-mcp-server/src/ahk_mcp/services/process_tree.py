@@ -0,0 +1,265 @@
+"""Process tree tracking for launcher runs.
+
+ahklauncher.ps1 starts AutoHotkey with Start-Process, so killing the
+PowerShell wrapper leaves the AHK interpreter (and anything it spawned)
+running. ProcessTree remembers every descendant seen while the run is
+alive, so the whole tree can be reaped even after intermediate parents
+have exited and the parent/child links are gone.
+
+The same polling loop samples resource usage: CPU time, RSS, thread and
+handle counts of the processes started under the launcher, summed over
+the tree. usage() returns the totals and peaks, check_budgets() flags runs
+over the configured budgets. With AHK_MCP_BUDGET_KILL=1 the loop also
+stops the script's processes as soon as a budget is exceeded (the launcher
+is spared, so it still reports the run). Processes that start and exit between two
+samples are not seen; the interval trades that against sampling overhead.
+
+AHK_MCP_SAMPLE_INTERVAL_MS sets the interval. Budgets (0 disables one):
+AHK_MCP_BUDGET_CPU_S, AHK_MCP_BUDGET_RSS_MB, AHK_MCP_BUDGET_THREADS,
+AHK_MCP_BUDGET_HANDLES, AHK_MCP_BUDGET_CHILDREN.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# How often descendants are re-enumerated (and sampled) while the run is alive
+TRACK_INTERVAL_S = float(os.environ.get("AHK_MCP_SAMPLE_INTERVAL_MS", "100")) / 1000
+
+# Resource budgets per run, keyed like usage(); 0 disables a budget
+BUDGETS = {
+    "cpuTimeS": float(os.environ.get("AHK_MCP_BUDGET_CPU_S", "5")),
+    "peakRssMb": float(os.environ.get("AHK_MCP_BUDGET_RSS_MB", "512")),
+    "peakThreads": float(os.environ.get("AHK_MCP_BUDGET_THREADS", "64")),
+    "peakHandles": float(os.environ.get("AHK_MCP_BUDGET_HANDLES", "5000")),
+    "children": float(os.environ.get("AHK_MCP_BUDGET_CHILDREN", "10")),
+}
+
+# Reap runs while they are over budget instead of only flagging them afterwards
+BUDGET_KILL = os.environ.get("AHK_MCP_BUDGET_KILL", "0") == "1"
+
+# Helpers the launcher itself starts (console host, Add-Type compiler):
+# their cost is not the script's
+LAUNCHER_HELPERS = {"conhost.exe", "csc.exe", "cvtres.exe"}
+
+# Grace period between terminate() and kill() when reaping
+REAP_GRACE_S = 1.0
+
+
+class ProcessTree:
+    """Track and reap all processes spawned under a root PID."""
+
+    def __init__(self, root_pid: int, measure_root: bool = True):
+        """
+        Args:
+            root_pid: Process whose descendants are tracked
+            measure_root: Include the root itself in usage() (False for the
+                PowerShell launcher, whose startup cost is not the script's)
+        """
+        self.root_pid = root_pid
+        self.measure_root = measure_root
+        self._known: dict[int, psutil.Process] = {}
+        self._excluded: set[int] = set()
+        self._gone: set[int] = set()
+        self._cpu: dict[int, float] = {}
+        self._peaks = {"peakRssMb": 0.0, "peakThreads": 0, "peakHandles": 0}
+        self._samples = 0
+        self._sample_s = 0.0
+        # Processes stopped by track() for exceeding a budget
+        self.budget_reaped: list[dict] = []
+        try:
+            root = psutil.Process(root_pid)
+            self._known[root_pid] = root
+        except psutil.Error:
+            logger.debug(f"Root process {root_pid} already gone")
+
+    def snapshot(self) -> int:
+        """Record the current descendants of every known process and sample them. Returns the tracked count."""
+        start = time.thread_time()
+        # Each enumeration scans the whole process table: only start one from
+        # processes not already found under another (orphans after their
+        # parent exited), and never from processes known to be gone
+        found: set[int] = set()
+        for proc in list(self._known.values()):
+            if proc.pid in found or proc.pid in self._gone:
+                continue
+            try:
+                children = proc.children(recursive=True)
+            except psutil.Error:
+                self._gone.add(proc.pid)
+                continue
+            found.update(child.pid for child in children)
+            for child in children:
+                # psutil.Process equality includes create_time, so a recycled
+                # PID is never confused with the original process
+                if self._known.get(child.pid) != child:
+                    self._known[child.pid] = child
+                    self._cpu.pop(child.pid, None)
+                    self._gone.discard(child.pid)
+        self._sample()
+        self._sample_s += time.thread_time() - start
+        return len(self._known)
+
+    def _measured(self, proc: psutil.Process) -> bool:
+        if proc.pid in self._excluded:
+            return False
+        if proc.pid == self.root_pid:
+            return self.measure_root
+        try:
+            if proc.name().lower() in LAUNCHER_HELPERS:
+                self._excluded.add(proc.pid)
+                return False
+        except psutil.Error:
+            return False
+        return True
+
+    def _sample(self) -> None:
+        rss = threads = handles = 0
+        for proc in list(self._known.values()):
+            if proc.pid in self._gone or not self._measured(proc):
+                continue
+            try:
+                with proc.oneshot():
+                    cpu = proc.cpu_times()
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    handles += proc.num_handles() if psutil.WINDOWS else proc.num_fds()
+            except psutil.NoSuchProcess:
+                # Exited: its last sampled CPU time still counts
+                self._gone.add(proc.pid)
+                continue
+            except psutil.Error:
+                continue
+            self._cpu[proc.pid] = cpu.user + cpu.system
+        self._samples += 1
+        self._peaks["peakRssMb"] = max(self._peaks["peakRssMb"], rss / (1024 * 1024))
+        self._peaks["peakThreads"] = max(self._peaks["peakThreads"], threads)
+        self._peaks["peakHandles"] = max(self._peaks["peakHandles"], handles)
+
+    def usage(self) -> dict:
+        """
+        Resource totals of the measured processes since tracking started.
+
+        Returns:
+            Dict with cpuTimeS (user+system, summed), peakRssMb, peakThreads and
+            peakHandles (tree sums at the busiest sample; handles are file
+            descriptors outside Windows), children (processes seen), samples
+            and samplerCpuMs (CPU time the sampler itself used)
+        """
+        return {
+            "cpuTimeS": round(sum(self._cpu.values()), 3),
+            "peakRssMb": round(self._peaks["peakRssMb"], 1),
+            "peakThreads": self._peaks["peakThreads"],
+            "peakHandles": self._peaks["peakHandles"],
+            "children": len([pid for pid in self._cpu if pid != self.root_pid]),
+            "samples": self._samples,
+            "samplerCpuMs": round(self._sample_s * 1000, 1),
+        }
+
+    def alive(self) -> list[psutil.Process]:
+        """Return tracked processes that are still running."""
+        return [p for p in self._known.values() if _is_running(p)]
+
+    async def track(self, interval: float = TRACK_INTERVAL_S, budgets: Optional[dict] = None) -> None:
+        """
+        Poll descendants until cancelled (run as a background task).
+
+        Args:
+            interval: Seconds between two samples
+            budgets: Reap the measured processes once usage() exceeds one of
+                these (see check_budgets); None only samples
+        """
+        while True:
+            await asyncio.to_thread(self.snapshot)
+            if budgets and not self.budget_reaped and check_budgets(self.usage(), budgets):
+                reap = asyncio.ensure_future(asyncio.to_thread(self.reap, REAP_GRACE_S, True))
+                try:
+                    self.budget_reaped = await asyncio.shield(reap)
+                except asyncio.CancelledError:
+                    # The run ended because of the reap: still record it
+                    self.budget_reaped = await reap
+                    raise
+            await asyncio.sleep(interval)
+
+    def reap(self, grace: float = REAP_GRACE_S, measured_only: bool = False) -> list[dict]:
+        """
+        Terminate every tracked process, then kill the ones still alive after `grace`.
+
+        Args:
+            grace: Seconds between terminate() and kill()
+            measured_only: Spare the processes usage() leaves out (an
+                unmeasured root, launcher helpers)
+
+        Returns:
+            List of {"pid", "name", "killed"} for each process that was reaped
+        """
+        self.snapshot()
+        targets = [p for p in self.alive() if not measured_only or self._measured(p)]
+        if not targets:
+            return []
+
+        names: dict[int, str] = {}
+        for proc in targets:
+            try:
+                names[proc.pid] = proc.name()
+            except psutil.Error:
+                names[proc.pid] = "?"
+            try:
+                proc.terminate()
+            except psutil.Error:
+                pass
+
+        _, still_alive = psutil.wait_procs(targets, timeout=grace)
+        for proc in still_alive:
+            try:
+                proc.kill()
+            except psutil.Error:
+                pass
+        psutil.wait_procs(still_alive, timeout=grace)
+
+        forced = {p.pid for p in still_alive}
+        reaped = [
+            {"pid": p.pid, "name": names[p.pid], "killed": p.pid in forced}
+            for p in targets
+        ]
+        summary = ", ".join(f"{r['name']}({r['pid']})" for r in reaped)
+        logger.info(f"Reaped {len(reaped)} process(es) under PID {self.root_pid}: {summary}")
+        return reaped
+
+
+def check_budgets(usage: dict, budgets: Optional[dict] = None) -> list[dict]:
+    """
+    Compare usage() totals with the budgets.
+
+    Returns:
+        List of {"resource", "value", "budget"} for each exceeded budget
+    """
+    budgets = BUDGETS if budgets is None else budgets
+    return [
+        {"resource": resource, "value": usage[resource], "budget": budget}
+        for resource, budget in budgets.items()
+        if budget > 0 and usage.get(resource, 0) > budget
+    ]
+
+
+def _is_running(proc: psutil.Process) -> bool:
+    try:
+        return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+async def stop_tracking(task: Optional[asyncio.Task]) -> None:
+    """Cancel a ProcessTree.track() task and wait for it to finish."""
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
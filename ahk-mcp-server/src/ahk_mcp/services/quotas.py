@@ -0,0 +1,116 @@
+"""Shared run pool with per-client concurrency quotas.
+
+In multi-client mode (run_server.py --transport http) one server process
+serves every session, so source indexes, the error index, the artifact
+store, deferred captures, interpreter discovery (interpreters.py) and the
+runner fleet are shared. So is the pool of
+launcher slots: at most MAX_RUNS tool calls run at once, and one client may
+hold at most CLIENT_MAX_RUNS of them, so a long batch from one session
+cannot starve the others. Calls over quota wait; they are not rejected.
+
+Override with AHK_MCP_MAX_RUNS / AHK_MCP_CLIENT_MAX_RUNS.
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MAX_RUNS = int(os.environ.get("AHK_MCP_MAX_RUNS", "8"))
+CLIENT_MAX_RUNS = int(os.environ.get("AHK_MCP_CLIENT_MAX_RUNS", "2"))
+
+# Calls made outside an MCP request (watch sessions, scripts, tests)
+LOCAL_CLIENT = "local"
+
+QUOTA_WAIT_SECONDS = registry.histogram(
+    "ahk_quota_wait_seconds", "Time tool calls waited for a run slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+
+
+class _ClientSlots:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0   # calls holding or waiting for a slot
+        self.active = 0  # calls holding a slot
+
+
+class RunPool:
+    """Bounded pool of run slots shared by every client, with a per-client cap."""
+
+    def __init__(self, max_runs: int = MAX_RUNS, client_max_runs: int = CLIENT_MAX_RUNS):
+        self.max_runs = max_runs
+        self.client_max_runs = client_max_runs
+        self._total = asyncio.Semaphore(max_runs)
+        self._clients: dict[str, _ClientSlots] = {}
+
+    @asynccontextmanager
+    async def slot(self, client_id: str) -> AsyncIterator[None]:
+        """Hold one slot for `client_id` (waits while the client or the pool is full)."""
+        client = self._clients.get(client_id)
+        if client is None:
+            client = self._clients[client_id] = _ClientSlots(self.client_max_runs)
+        client.users += 1
+        start = time.perf_counter()
+        try:
+            # Client quota first: a client over quota never occupies a pool slot
+            async with client.semaphore:
+                async with self._total:
+                    QUOTA_WAIT_SECONDS.observe(time.perf_counter() - start)
+                    client.active += 1
+                    try:
+                        yield
+                    finally:
+                        client.active -= 1
+        finally:
+            client.users -= 1
+            if client.users == 0:
+                self._clients.pop(client_id, None)
+
+    def in_use(self) -> int:
+        return sum(c.active for c in list(self._clients.values()))
+
+    def status(self) -> dict:
+        clients = list(self._clients.items())
+        return {
+            "maxRuns": self.max_runs,
+            "clientMaxRuns": self.client_max_runs,
+            "inUse": sum(c.active for _, c in clients),
+            "waiting": sum(c.users - c.active for _, c in clients),
+            "clients": {client_id: c.active for client_id, c in clients},
+        }
+
+
+run_pool = RunPool()
+
+registry.gauge("ahk_run_pool_in_use", "Run slots held by tool calls", function=run_pool.in_use)
+registry.gauge("ahk_run_pool_clients", "Clients holding or waiting for run slots", function=lambda: len(run_pool._clients))
+
+
+def current_client_id() -> str:
+    """Client of the current MCP request (client ID, else session ID), or "local"."""
+    from fastmcp.server.dependencies import get_context
+
+    try:
+        ctx = get_context()
+    except RuntimeError:
+        return LOCAL_CLIENT
+    try:
+        return ctx.client_id or ctx.session_id or LOCAL_CLIENT
+    except RuntimeError:
+        return LOCAL_CLIENT
+
+
+def client_quota(func):
+    """Run a tool coroutine inside a run slot of the calling client."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with run_pool.slot(current_client_id()):
+            return await func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,166 @@
+"""Runner agent: executes dispatched jobs on the host it runs on.
+
+Serves the fleet.py protocol. Each job's script tree is written to a fresh
+work directory, run through run_ahk_launcher() and deleted afterwards;
+screenshots are streamed back in chunks before the result. Runs beyond the
+agent's capacity wait for a slot.
+
+Started with runner_agent.py. On a host without AutoHotkey, pass a trace
+(--replay) to serve recorded results: that is the stand-in used to exercise
+the dispatcher on Linux.
+"""
+import asyncio
+import base64
+import logging
+import platform
+import secrets
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .fleet import CHUNK_SIZE, LINE_LIMIT, RunnerError, read_message, send_message, sign
+from .powershell import capture_window_screenshot, run_ahk_launcher
+from .process_tree import ProcessTree
+
+logger = logging.getLogger(__name__)
+
+AUTH_TIMEOUT_S = 10.0
+
+
+def _inside(root: Path, relative: str) -> Path:
+    """`relative` resolved under `root`; ValueError if it escapes it (.., absolute paths, links)."""
+    target = (root / relative).resolve()
+    if root.resolve() not in target.parents:
+        raise ValueError(f"Refusing path outside the job directory: {relative}")
+    return target
+
+
+class RunnerAgent:
+    """Accept authenticated jobs and run them locally, `capacity` at a time."""
+
+    def __init__(self, token: str, name: Optional[str] = None, capacity: int = 1, work_dir: Optional[str] = None):
+        self.token = token
+        self.name = name or platform.node()
+        self.capacity = capacity
+        self.work_dir = work_dir
+        self.active = 0
+        self.completed = 0
+        self._slots = asyncio.Semaphore(capacity)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+        bound = server.sockets[0].getsockname()
+        logger.info(f"Runner {self.name} listening on {bound[0]}:{bound[1]} (capacity {self.capacity})")
+        return server
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            nonce = secrets.token_hex(16)
+            await send_message(writer, {"type": "hello", "nonce": nonce, "runner": self.name, "capacity": self.capacity})
+            auth = await asyncio.wait_for(read_message(reader), timeout=AUTH_TIMEOUT_S)
+            if not secrets.compare_digest(str(auth.get("mac", "")), sign(self.token, nonce)):
+                await send_message(writer, {"type": "error", "message": "unauthorized"})
+                logger.warning(f"Rejected unauthenticated connection from {writer.get_extra_info('peername')}")
+                return
+            await send_message(writer, {"type": "ready"})
+
+            request = await asyncio.wait_for(read_message(reader), timeout=AUTH_TIMEOUT_S)
+            op = request.get("op")
+            args = request.get("args") or {}
+            if op == "health":
+                result = {"runner": self.name, "capacity": self.capacity, "active": self.active, "completed": self.completed}
+            elif op == "run":
+                result = await self._run(args, writer)
+            elif op == "capture":
+                result = await self._capture(args, writer)
+            else:
+                await send_message(writer, {"type": "error", "message": f"unknown op: {op}"})
+                return
+            await send_message(writer, {"type": "result", "result": result})
+        except (RunnerError, asyncio.TimeoutError, ConnectionError) as e:
+            logger.debug(f"Connection dropped: {e}")
+        except Exception as e:
+            logger.exception(f"Job failed: {e}")
+            try:
+                await send_message(writer, {"type": "error", "message": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _stream_file(self, writer: asyncio.StreamWriter, path: Path) -> None:
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                await send_message(writer, {"type": "chunk", "name": path.name, "data": base64.b64encode(data).decode("ascii")})
+
+    def _materialize(self, args: dict) -> tuple[Path, Path]:
+        """Write the shipped script tree to a new work directory; returns (dir, entry)."""
+        root = Path(tempfile.mkdtemp(prefix="ahk-job-", dir=self.work_dir))
+        try:
+            for relative, data in args["files"].items():
+                target = _inside(root, relative)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(base64.b64decode(data))
+            entry = _inside(root, args["entry"])
+            if not entry.is_file():
+                raise ValueError(f"Entry script not shipped: {args['entry']}")
+        except BaseException:
+            shutil.rmtree(root, ignore_errors=True)
+            raise
+        return root, entry
+
+    async def _run(self, args: dict, writer: asyncio.StreamWriter) -> dict:
+        async with self._slots:
+            job_dir, entry = await asyncio.to_thread(self._materialize, args)
+            self.active += 1
+            shots = job_dir / "_screenshots"
+            try:
+                result = await run_ahk_launcher(
+                    script_path=str(entry),
+                    version=args.get("version", "Auto"),
+                    timeout_ms=int(args.get("timeout_ms", 3000)),
+                    screenshot=bool(args.get("screenshot", False)),
+                    screenshot_path=str(shots),
+                    keep_error_window=bool(args.get("capture", False))
+                )
+                status = result.get("status")
+                if args.get("capture") and result.get("windowHandle") and status in ("ERROR", "SUCCESS", "RUNNING"):
+                    capture = await capture_window_screenshot(
+                        window_handle=str(result["windowHandle"]), output_path=str(shots),
+                        # Error dialogs are static; GUIs may still be drawing
+                        stable=status != "ERROR"
+                    )
+                    if capture.get("success"):
+                        result["screenshot"] = capture["screenshot_path"]
+                if status == "ERROR" and result.get("processId") and args.get("capture"):
+                    result["reapedProcesses"] = await asyncio.to_thread(ProcessTree(result["processId"]).reap)
+
+                screenshot = result.get("screenshot")
+                if screenshot and Path(screenshot).is_file():
+                    await self._stream_file(writer, Path(screenshot))
+                return result
+            finally:
+                self.active -= 1
+                self.completed += 1
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    async def _capture(self, args: dict, writer: asyncio.StreamWriter) -> dict:
+        shots = Path(tempfile.mkdtemp(prefix="ahk-capture-", dir=self.work_dir))
+        try:
+            stability = {k: args[k] for k in ("stable", "stable_frames", "max_wait_ms") if k in args}
+            result = await capture_window_screenshot(
+                window_title=args.get("window_title"),
+                window_handle=args.get("window_handle"),
+                output_path=str(shots),
+                **stability
+            )
+            path = result.get("screenshot_path")
+            if result.get("success") and path and Path(path).is_file():
+                await self._stream_file(writer, Path(path))
+            return result
+        finally:
+            shutil.rmtree(shots, ignore_errors=True)
@@ -0,0 +1,293 @@
+"""Cost-aware scheduling of multi-script runs.
+
+A batch is bounded by its slowest scripts: resident scripts (GUI, timers,
+hotkeys, #Persistent) are only judged after the full timeout window, while
+syntax errors come back in a few hundred ms. Each script's runtime is
+predicted and the batch is dispatched longest-first across the workers
+(greedy LPT), which keeps the long runs from ending up last.
+
+Prediction:
+    1. the script's own past runtimes (EWMA per script/version/timeout), else
+    2. a feature model: launcher overhead + size and #Include depth terms,
+       or the timeout window for resident scripts, scaled per class by the
+       ratio of observed to modelled runtimes.
+
+Runtimes are recorded by the scheduler itself in runs/runtimes.json: the
+launcher time of each completed run, not the time it waited for a quota
+slot (quotas.py).
+"""
+import asyncio
+import heapq
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Literal, Optional
+
+from .artifacts import RUNS_DIR
+from .error_index import error_index
+from .powershell import run_ahk_launcher
+from .quotas import run_pool
+from .source_index import get_source_index
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = RUNS_DIR / "runtimes.json"
+HISTORY_VERSION = 1
+MAX_HISTORY = 5000
+
+# Feature model priors (ms); the per-class calibration corrects them over time
+OVERHEAD_MS = 700.0
+PER_KB_MS = 15.0
+PER_DEPTH_MS = 40.0
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.5
+
+# Verdicts of runs that went through the launcher; CONFIG_ERROR and skipped
+# runs say nothing about the script's runtime
+OBSERVED_STATUSES = frozenset({"SUCCESS", "ERROR", "RUNNING", "TIMEOUT"})
+
+_GUI_RE = re.compile(r"\bGui\b", re.IGNORECASE)
+_PERSISTENT_RE = re.compile(r"(#|\b)Persistent\b", re.IGNORECASE)
+_SETTIMER_RE = re.compile(r"\bSetTimer\b", re.IGNORECASE)
+_HOTKEY_RE = re.compile(r"^\s*[^;\s\"'][^\s\"']*::")
+_COMMENT_RE = re.compile(r"(^|\s);.*$")
+
+
+def extract_features(script_path: str) -> dict:
+    """Size, include depth and residency directives of a script's #Include closure."""
+    index = get_source_index(script_path)
+    features = {"bytes": 0, "files": len(index.files), "includeDepth": 0, "gui": 0, "persistent": 0, "setTimer": 0, "hotkeys": 0}
+
+    depth = {index.root: 0}
+    stack = [index.root]
+    while stack:
+        path = stack.pop()
+        for child in index.includes.get(path, []):
+            if child not in depth:
+                depth[child] = depth[path] + 1
+                stack.append(child)
+    features["includeDepth"] = max(depth.values(), default=0)
+
+    for path in index.files:
+        for line in index.lines(path):
+            features["bytes"] += len(line) + 1
+            code = _COMMENT_RE.sub("", line)
+            if not code.strip():
+                continue
+            features["gui"] += bool(_GUI_RE.search(code))
+            features["persistent"] += bool(_PERSISTENT_RE.search(code))
+            features["setTimer"] += bool(_SETTIMER_RE.search(code))
+            features["hotkeys"] += bool(_HOTKEY_RE.match(code))
+    return features
+
+
+def is_resident(features: dict) -> bool:
+    """Scripts that keep running (and so use the whole timeout window)."""
+    return bool(features["gui"] or features["persistent"] or features["setTimer"] or features["hotkeys"])
+
+
+class CostModel:
+    """Runtime predictions from history, falling back to the feature model."""
+
+    def __init__(self, path: Path = HISTORY_PATH):
+        self.path = Path(path)
+        self.history: dict[str, dict] = {}
+        self.calibration = {"resident": 1.0, "exits": 1.0}
+        # Batches observe on the loop and save from worker threads
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("v") != HISTORY_VERSION:
+            return
+        self.history = data.get("scripts", {})
+        self.calibration.update(data.get("calibration", {}))
+
+    def save(self) -> None:
+        """Write the history atomically (the newest MAX_HISTORY scripts; blocking)."""
+        # Saves are serialized so an older snapshot never replaces a newer one
+        with self._lock:
+            scripts = dict(sorted(self.history.items(), key=lambda kv: kv[1].get("t", 0))[-MAX_HISTORY:])
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A temp file per save: a server sharing runs/ never renames ours away
+            with tempfile.NamedTemporaryFile("w", dir=self.path.parent, prefix="runtimes-", suffix=".tmp",
+                                             delete=False, encoding="utf-8") as f:
+                f.write(json.dumps({"v": HISTORY_VERSION, "calibration": self.calibration, "scripts": scripts}))
+            try:
+                os.replace(f.name, self.path)
+            except OSError:
+                os.unlink(f.name)
+                raise
+
+    @staticmethod
+    def _key(script_path: str, version: str, timeout_ms: int) -> str:
+        return f"{Path(script_path).resolve()}|{version.upper()}|{timeout_ms}"
+
+    @staticmethod
+    def _class(features: dict) -> str:
+        return "resident" if is_resident(features) else "exits"
+
+    def model_estimate(self, features: dict, timeout_ms: int) -> float:
+        """Uncalibrated feature-model runtime in ms."""
+        if is_resident(features):
+            return OVERHEAD_MS + timeout_ms
+        return OVERHEAD_MS + PER_KB_MS * features["bytes"] / 1024 + PER_DEPTH_MS * features["includeDepth"]
+
+    def predict(self, script_path: str, version: str, timeout_ms: int, features: dict) -> tuple[float, str]:
+        """(predicted ms, "history" or "model")."""
+        past = self.history.get(self._key(script_path, version, timeout_ms))
+        if past:
+            return past["ms"], "history"
+        return self.model_estimate(features, timeout_ms) * self.calibration[self._class(features)], "model"
+
+    def last_status(self, script_path: str, version: str, timeout_ms: int) -> Optional[str]:
+        past = self.history.get(self._key(script_path, version, timeout_ms))
+        return past.get("status") if past else None
+
+    def observe(self, script_path: str, version: str, timeout_ms: int, features: dict, actual_ms: float, status: str) -> bool:
+        """Fold a run's launcher time into the history; False for runs that did not complete."""
+        if status not in OBSERVED_STATUSES:
+            return False
+        key = self._key(script_path, version, timeout_ms)
+        cls = self._class(features)
+        ratio = actual_ms / max(self.model_estimate(features, timeout_ms), 1.0)
+        with self._lock:
+            past = self.history.get(key)
+            ms = actual_ms if past is None else EWMA_ALPHA * actual_ms + (1 - EWMA_ALPHA) * past["ms"]
+            self.history[key] = {"ms": round(ms, 1), "n": (past["n"] + 1) if past else 1, "status": status, "t": round(time.time())}
+            self.calibration[cls] = round(EWMA_ALPHA * ratio + (1 - EWMA_ALPHA) * self.calibration[cls], 4)
+        return True
+
+
+def simulate_makespan(durations: list[float], workers: int) -> float:
+    """Makespan of greedy list scheduling of `durations` (in order) on `workers`."""
+    finish = [0.0] * max(workers, 1)
+    for duration in durations:
+        earliest = heapq.heappop(finish)
+        heapq.heappush(finish, earliest + duration)
+    return max(finish)
+
+
+_model: Optional[CostModel] = None
+
+
+def get_cost_model() -> CostModel:
+    global _model
+    if _model is None:
+        _model = CostModel()
+    return _model
+
+
+async def run_batch(
+    scripts: list[str],
+    version: str = "Auto",
+    timeout_ms: int = 3000,
+    workers: int = 4,
+    order: Literal["longest", "fail_fast", "input"] = "longest",
+    stop_on_failure: bool = False,
+    client_id: Optional[str] = None
+) -> dict:
+    """
+    Run several scripts through run_ahk_launcher with cost-aware ordering.
+
+    Args:
+        scripts: Script paths
+        version: AHK version for every script
+        timeout_ms: Timeout per run
+        workers: Runs in flight at once
+        order: "longest" (predicted longest first, minimizes the makespan),
+            "fail_fast" (previous failures first, then shortest first) or "input"
+        stop_on_failure: Start no new run once one returned ERROR
+        client_id: Take each run's slot from this client's quota (quotas.py)
+
+    Returns:
+        Dict with per-script predicted/actual times and the batch makespans
+    """
+    model = get_cost_model()
+    features = await asyncio.gather(*(asyncio.to_thread(extract_features, s) for s in scripts))
+
+    jobs = []
+    for position, (script, feats) in enumerate(zip(scripts, features)):
+        predicted, source = model.predict(script, version, timeout_ms, feats)
+        jobs.append({
+            "script": script,
+            "features": feats,
+            "predictedMs": round(predicted),
+            "source": source,
+            "failedBefore": model.last_status(script, version, timeout_ms) == "ERROR",
+            "position": position,
+        })
+
+    if order == "longest":
+        jobs.sort(key=lambda j: -j["predictedMs"])
+    elif order == "fail_fast":
+        jobs.sort(key=lambda j: (not j["failedBefore"], j["predictedMs"]))
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    failed = asyncio.Event()
+    batch_start = time.perf_counter()
+
+    async def launch(job: dict) -> dict:
+        # Timed from here: waiting for a quota slot is not the script's runtime
+        start = time.perf_counter()
+        job["startMs"] = round((start - batch_start) * 1000)
+        result = await run_ahk_launcher(job["script"], version, timeout_ms, screenshot=False)
+        job["actualMs"] = round((time.perf_counter() - start) * 1000)
+        return result
+
+    async def run_one(job: dict) -> dict:
+        if client_id is None:
+            return await launch(job)
+        async with run_pool.slot(client_id):
+            return await launch(job)
+
+    async def worker(worker_id: int) -> None:
+        while not queue.empty():
+            job = queue.get_nowait()
+            if stop_on_failure and failed.is_set():
+                job["status"] = "SKIPPED"
+                continue
+            result = await run_one(job)
+            job["status"] = result.get("status", "CONFIG_ERROR")
+            job["worker"] = worker_id
+            if job["status"] == "ERROR":
+                job["fingerprint"] = error_index.add(result, script_path=job["script"])
+                failed.set()
+            model.observe(job["script"], version, timeout_ms, job["features"], job["actualMs"], job["status"])
+
+    await asyncio.gather(*(worker(i) for i in range(max(1, min(workers, len(jobs))))))
+    actual_makespan = round((time.perf_counter() - batch_start) * 1000)
+    await asyncio.to_thread(model.save)
+
+    ran = [j for j in jobs if "actualMs" in j]
+    statuses: dict[str, int] = {}
+    for job in jobs:
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    by_input = sorted(jobs, key=lambda j: j["position"])
+
+    return {
+        "success": True,
+        "order": order,
+        "workers": workers,
+        "predictedMakespanMs": round(simulate_makespan([j["predictedMs"] for j in jobs], workers)),
+        "inputOrderMakespanMs": round(simulate_makespan([j["predictedMs"] for j in by_input], workers)),
+        "actualMakespanMs": actual_makespan,
+        "meanAbsErrorMs": round(sum(abs(j["actualMs"] - j["predictedMs"]) for j in ran) / len(ran)) if ran else 0,
+        "statuses": statuses,
+        "scripts": [
+            {k: v for k, v in job.items() if k not in ("features", "failedBefore", "position")}
+            for job in jobs
+        ],
+    }
@@ -0,0 +1,320 @@
+"""Source index over a script's #Include closure.
+
+AHK error dialogs report a line number and the text of that line, but
+not which included file it belongs to. SourceIndex reads the root script
+and every file it includes once, and answers "which file/line is this?"
+with a dict lookup on the line text plus a bisect on the line number.
+Indexes are cached per root script and rebuilt when any file's mtime
+changes or an #Include that did not resolve starts resolving.
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .warm_state import register_state
+
+logger = logging.getLogger(__name__)
+
+# #Include / #IncludeAgain, V1 comma form, optional *i flag
+_INCLUDE_RE = re.compile(r"^\s*#Include(Again)?\s*,?\s*(?:\*i\s+)?(.+?)\s*$", re.IGNORECASE)
+
+# Trailing comment: ";" preceded by whitespace
+_COMMENT_RE = re.compile(r"\s+;.*$")
+
+# Built-in variables allowed in #Include paths
+_VAR_RE = re.compile(r"%(A_\w+)%", re.IGNORECASE)
+
+# "---> 012: text" / "012: text" lines from errorDetails.sourceCode
+_SOURCE_LINE_RE = re.compile(r"^\s*(--->)?\s*(\d{1,5}):\s?(.*)$")
+
+# V1 "Error at line 12 in #include file "C:\x\lib.ahk"."
+_INCLUDE_ERROR_RE = re.compile(r'Error at line (\d+) in #include file "([^"]+)"', re.IGNORECASE)
+
+# Lines of context returned around a located line
+CONTEXT_RADIUS = 3
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _read_lines(path: Path) -> list[str]:
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        return f.read().splitlines()
+
+
+def _user_lib_dir() -> Path:
+    return Path.home() / "Documents" / "AutoHotkey" / "Lib"
+
+
+class SourceIndex:
+    """Line index over a root script and everything it #Includes."""
+
+    def __init__(self, root: Path, build: bool = True):
+        self.root = root
+        self.files: list[Path] = []
+        self.includes: dict[Path, list[Path]] = {}
+        self.mtimes: dict[Path, float] = {}
+        # Includes that did not resolve: (spec, including file, include directory)
+        self.missing: list[tuple[str, Path, Path]] = []
+        self._lines: dict[Path, list[str]] = {}
+        self._by_text: Optional[dict[str, list[tuple[int, int, Path]]]] = None
+        if build:
+            self._build()
+
+    # -- building -----------------------------------------------------
+
+    def _build(self) -> None:
+        self._visit(self.root)
+        self._index_text()
+        logger.debug(f"Indexed {len(self.files)} file(s) for {self.root}")
+
+    def _index_text(self) -> dict[str, list[tuple[int, int, Path]]]:
+        if self._by_text is None:
+            by_text: dict[str, list[tuple[int, int, Path]]] = {}
+            for order, path in enumerate(self.files):
+                for lineno, text in enumerate(self._lines[path], start=1):
+                    key = _normalize(text)
+                    if key:
+                        by_text.setdefault(key, []).append((lineno, order, path))
+            for entries in by_text.values():
+                entries.sort()
+            self._by_text = by_text
+        return self._by_text
+
+    def _visit(self, path: Path) -> None:
+        if path in self._lines:
+            return
+        try:
+            self.mtimes[path] = path.stat().st_mtime
+            lines = _read_lines(path)
+        except OSError as e:
+            logger.debug(f"Cannot read include {path}: {e}")
+            return
+
+        self._lines[path] = lines
+        self.files.append(path)
+        children = self.includes.setdefault(path, [])
+        include_dir = self.root.parent
+
+        for line in lines:
+            match = _INCLUDE_RE.match(line)
+            if not match:
+                continue
+            spec = _COMMENT_RE.sub("", match.group(2))
+            target = self._resolve(spec, path, include_dir)
+            if target is None:
+                self.missing.append((spec, path, include_dir))
+                continue
+            if target.is_dir():
+                # A directory include changes the base for later relative includes
+                include_dir = target
+                continue
+            children.append(target)
+            self._visit(target)
+
+    def _resolve(self, spec: str, current: Path, include_dir: Path) -> Optional[Path]:
+        spec = spec.strip().strip('"')
+        if spec.startswith("<") and spec.endswith(">"):
+            name = spec[1:-1]
+            for lib in (self.root.parent / "Lib", _user_lib_dir()):
+                for candidate in (lib / f"{name}.ahk", lib / f"{name.split('_', 1)[0]}.ahk"):
+                    if candidate.is_file():
+                        return candidate.resolve()
+            return None
+
+        variables = {
+            "a_scriptdir": str(self.root.parent),
+            "a_linefile": str(current),
+            "a_workingdir": str(include_dir),
+            "a_appdata": os.environ.get("APPDATA", ""),
+            "a_mydocuments": str(Path.home() / "Documents"),
+        }
+        spec = _VAR_RE.sub(lambda m: variables.get(m.group(1).lower(), m.group(0)), spec)
+        if os.sep != "\\":
+            spec = spec.replace("\\", os.sep)
+
+        target = Path(spec)
+        if target.is_absolute():
+            candidates = [target]
+        else:
+            # V1 resolves against the include directory, V2 against the including file
+            candidates = [include_dir / target, current.parent / target]
+        for candidate in candidates:
+            try:
+                candidate = candidate.resolve()
+            except OSError:
+                continue
+            if candidate.exists():
+                return candidate
+        return None
+
+    # -- queries ------------------------------------------------------
+
+    def is_fresh(self) -> bool:
+        """True if no indexed file changed (or disappeared) and no missing include appeared since the build."""
+        for path, mtime in self.mtimes.items():
+            try:
+                if path.stat().st_mtime != mtime:
+                    return False
+            except OSError:
+                return False
+        return all(self._resolve(spec, current, include_dir) is None for spec, current, include_dir in self.missing)
+
+    def contains(self, path: Path) -> bool:
+        """True if `path` is part of this script's include closure."""
+        return path in self.mtimes
+
+    def lines(self, path: Path) -> list[str]:
+        """Indexed lines of one file of the closure (empty if not part of it)."""
+        return self._lines.get(path, [])
+
+    def context(self, path: Path, line: int, radius: int = CONTEXT_RADIUS) -> list[str]:
+        """Numbered lines around `line` ("--->" marks the line itself)."""
+        lines = self._lines.get(path, [])
+        start = max(1, line - radius)
+        end = min(len(lines), line + radius)
+        return [
+            f"{'---> ' if n == line else ''}{n:03d}: {lines[n - 1]}"
+            for n in range(start, end + 1)
+        ]
+
+    def locate(self, line: int, snippet: Optional[str] = None, file_hint: Optional[str] = None) -> Optional[dict]:
+        """
+        Map an error's line number (and line text) to a file in the closure.
+
+        Args:
+            line: Line number reported by AHK
+            snippet: Text AHK printed for that line
+            file_hint: File named by the error message, if any
+
+        Returns:
+            {"file", "line", "context"} or None if nothing matches
+        """
+        if file_hint:
+            hinted = Path(file_hint.replace("\\", os.sep) if os.sep != "\\" else file_hint)
+            for path in self.files:
+                if path == hinted or path.name.lower() == hinted.name.lower():
+                    return self._location(path, line)
+
+        if snippet:
+            key = _normalize(snippet)
+            entries = self._index_text().get(key)
+            if entries:
+                i = bisect.bisect_left(entries, (line, -1, self.root))
+                if i < len(entries) and entries[i][0] == line:
+                    return self._location(entries[i][2], line)
+            # AHK may truncate long lines: fall back to a prefix match at that line
+            if key:
+                for path in self.files:
+                    lines = self._lines[path]
+                    if 1 <= line <= len(lines) and _normalize(lines[line - 1]).startswith(key.rstrip(". ")):
+                        return self._location(path, line)
+            return None
+
+        # No snippet: only the root script can be assumed
+        if 1 <= line <= len(self._lines.get(self.root, [])):
+            return self._location(self.root, line)
+        return None
+
+    def _location(self, path: Path, line: int) -> dict:
+        return {"file": str(path), "line": line, "context": self.context(path, line)}
+
+    # -- persistence (warm_state.py) ----------------------------------
+
+    def to_state(self) -> dict:
+        return {
+            "files": [str(p) for p in self.files],
+            "includes": {str(p): [str(c) for c in children] for p, children in self.includes.items()},
+            "mtimes": {str(p): m for p, m in self.mtimes.items()},
+            "missing": [[spec, str(current), str(include_dir)] for spec, current, include_dir in self.missing],
+            "lines": {str(p): lines for p, lines in self._lines.items()},
+        }
+
+    @classmethod
+    def from_state(cls, root: Path, state: dict) -> "SourceIndex":
+        """Rebuild from to_state() output without reading any file (the text index is built on first use)."""
+        index = cls(root, build=False)
+        index.files = [Path(p) for p in state["files"]]
+        index.includes = {Path(p): [Path(c) for c in children] for p, children in state["includes"].items()}
+        index.mtimes = {Path(p): m for p, m in state["mtimes"].items()}
+        index.missing = [(spec, Path(current), Path(include_dir)) for spec, current, include_dir in state.get("missing", [])]
+        index._lines = {Path(p): lines for p, lines in state["lines"].items()}
+        return index
+
+
+_indexes: dict[Path, SourceIndex] = {}
+# Indexes are looked up from worker threads (asyncio.to_thread); builds run outside the lock
+_indexes_lock = threading.Lock()
+
+
+def get_source_index(script_path: str) -> SourceIndex:
+    """Return the cached index for a script, rebuilding it if any file changed."""
+    root = Path(script_path).resolve()
+    with _indexes_lock:
+        index = _indexes.get(root)
+    if index is None or not index.is_fresh():
+        index = SourceIndex(root)
+        with _indexes_lock:
+            _indexes[root] = index
+    return index
+
+
+def _dump_indexes() -> dict:
+    with _indexes_lock:
+        indexes = list(_indexes.items())
+    return {str(root): index.to_state() for root, index in indexes}
+
+
+def _restore_indexes(state: dict) -> int:
+    # Restored indexes are checked against file mtimes when first used (is_fresh)
+    restored = {Path(root): SourceIndex.from_state(Path(root), data) for root, data in state.items()}
+    with _indexes_lock:
+        for root, index in restored.items():
+            _indexes.setdefault(root, index)
+    return len(state)
+
+
+register_state("source_indexes", _dump_indexes, _restore_indexes)
+
+
+def locate_error(script_path: str, result: dict) -> Optional[dict]:
+    """
+    Locate the failing line of an ERROR result in the script's include closure.
+
+    Returns:
+        {"file", "line", "context"} or None when the result has no usable line
+    """
+    details = result.get("errorDetails") or {}
+    message = result.get("message") or ""
+
+    file_hint = None
+    hint = _INCLUDE_ERROR_RE.search(message)
+    if hint:
+        file_hint = hint.group(2)
+
+    line = snippet = None
+    for source_line in details.get("sourceCode") or []:
+        match = _SOURCE_LINE_RE.match(source_line)
+        if match and match.group(1):
+            line, snippet = int(match.group(2)), match.group(3)
+            break
+
+    if line is None and hint:
+        line = int(hint.group(1))
+    if line is None and details.get("line"):
+        # Dialogs without a source excerpt ("Error at line 12.", V2 "Line: 12")
+        line = details["line"]
+        file_hint = file_hint or details.get("file")
+    if line is None:
+        return None
+
+    try:
+        return get_source_index(script_path).locate(line, snippet, file_hint)
+    except OSError as e:
+        logger.debug(f"Source mapping failed for {script_path}: {e}")
+        return None
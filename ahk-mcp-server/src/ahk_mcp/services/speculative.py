@@ -0,0 +1,323 @@
+"""Speculative V1/V2 runs for scripts whose AutoHotkey version is unknown.
+
+With version="Auto" the launcher only honours a #Requires directive and
+otherwise starts whatever interpreter it finds first. When that guess is
+wrong the run ends with a version-mismatch error ("requires AutoHotkey
+v2", V1 command syntax rejected by V2, ...) and the caller has to run the
+script again with the other version.
+
+run_ahk_launcher() therefore settles the version before launching:
+
+    1. #Requires AutoHotkey v1/v2 in the first lines of the script
+    2. the interpreter that won an earlier race for this script
+    3. one-sided dialect evidence (V1 command syntax vs V2 expressions)
+
+and only when all three are silent runs both interpreters at once
+(race()). The first decisive verdict that is not a version mismatch
+wins, the other run is cancelled (its process tree is reaped) and the
+winner is remembered in runs/interpreters.json for the next runs.
+
+The interpreters' main windows carry their own version in the title, so
+#SingleInstance in the script does not make one run replace the other.
+
+Disable with AHK_MCP_SPECULATIVE=0.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from .artifacts import RUNS_DIR
+from .metrics import SPECULATIVE_RUNS
+from .process_tree import ProcessTree
+from .source_index import get_source_index
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE = os.environ.get("AHK_MCP_SPECULATIVE", "1") != "0"
+
+INTERPRETERS_PATH = RUNS_DIR / "interpreters.json"
+INTERPRETERS_VERSION = 1
+MAX_INTERPRETERS = 5000
+
+VERSIONS = ("V1", "V2")
+
+# Same rule as the launcher's Get-ScriptRequiredVersion (first 50 lines)
+REQUIRES_LINES = 50
+_REQUIRES_RE = re.compile(r"^\s*#Requires\s+AutoHotkey\s+v?([12])", re.IGNORECASE)
+
+# Lines only one dialect accepts
+_V1_SYNTAX = [re.compile(p, re.IGNORECASE) for p in (
+    r"^\s*#(NoEnv|CommentFlag|EscapeChar|DerefChar|Delimiter|AllowSameLineComments|MaxMem)\b",
+    r"^\s*(SetBatchLines|StringReplace|StringSplit|StringUpper|StringLower|StringLeft|StringRight|StringMid|StringLen|StringGetPos|StringTrimLeft|StringTrimRight|EnvAdd|EnvSub|Transform|SplashTextOn|Progress|IfEqual|IfNotEqual|IfInString|IfNotInString|IfExist|IfNotExist|IfWinExist|IfWinNotExist|IfWinActive|IfWinNotActive)\b",
+    r"^\s*(MsgBox|Gui|Menu|Send|SendInput|Sleep|Run|RunWait|WinActivate|WinWait|SetTimer|Hotkey|FileAppend|FileRead|FileDelete|IniRead|IniWrite|ToolTip|TrayTip|Loop)\s*,",
+)]
+_V2_SYNTAX = [re.compile(p, re.IGNORECASE) for p in (
+    r"\bGui\(",
+    r"\.OnEvent\(",
+    r"=>",
+    r"^\s*MsgBox\(",
+    r"^\s*Persistent\(",
+    r"\bMap\(",
+)]
+_COMMENT_RE = re.compile(r"(^|\s);.*$")
+
+# #Requires mismatch: the interpreter names the version the script needs
+_MISMATCH_RE = re.compile(r"requires AutoHotkey v?\d|Current interpreter:", re.IGNORECASE)
+
+# Load errors that code of the other dialect raises, but that ordinary
+# mistakes raise too: they only count as a mismatch when the failing line
+# is written in the dialect the interpreter does not speak
+_LOAD_ERROR_RE = re.compile("|".join((
+    r"This line does not contain a recognized action",
+    r"Function calls require a space or \"\(\"",
+    r"Missing space or operator before this",
+    r"Unexpected comma",
+    r"contains an illegal character",
+    r"Call to nonexistent function",
+    r"Unsupported use of \"\.\"",
+    r"Functions cannot contain functions",
+)), re.IGNORECASE)
+_FOREIGN_SYNTAX = {"V1": _V2_SYNTAX, "V2": _V1_SYNTAX}
+_FAILING_LINE_RE = re.compile(r"^--->\s*\d+:(.*)$")
+
+# Results that say nothing about the script (interpreter missing, wrapper failure)
+_INCONCLUSIVE = ("CONFIG_ERROR",)
+
+
+def requires_version(script_path: str) -> Optional[str]:
+    """V1/V2 from a #Requires directive near the top of the script, if any."""
+    try:
+        with open(script_path, "r", encoding="utf-8-sig", errors="replace") as f:
+            for _, line in zip(range(REQUIRES_LINES), f):
+                match = _REQUIRES_RE.match(line)
+                if match:
+                    return f"V{match.group(1)}"
+    except OSError:
+        pass
+    return None
+
+
+def dialect_evidence(script_path: str) -> dict:
+    """Count of V1-only and V2-only lines over the script's #Include closure."""
+    evidence = {"V1": 0, "V2": 0}
+    try:
+        index = get_source_index(script_path)
+    except OSError:
+        return evidence
+    for path in index.files:
+        for line in index.lines(path):
+            code = _COMMENT_RE.sub("", line)
+            if not code.strip():
+                continue
+            evidence["V1"] += any(p.search(code) for p in _V1_SYNTAX)
+            evidence["V2"] += any(p.search(code) for p in _V2_SYNTAX)
+    return evidence
+
+
+def _failing_line(result: dict) -> Optional[str]:
+    """The source line an error dialog points at, if it shows one."""
+    for line in (result.get("errorDetails") or {}).get("sourceCode") or ():
+        match = _FAILING_LINE_RE.match(line)
+        if match:
+            return _COMMENT_RE.sub("", match.group(1))
+    return None
+
+
+def is_version_mismatch(result: dict, version: Optional[str] = None) -> bool:
+    """
+    ERROR raised because the script was run by the wrong interpreter.
+
+    Args:
+        result: Launcher result
+        version: Interpreter that ran the script ("V1"/"V2"); without it
+            only #Requires mismatches are recognized
+    """
+    if result.get("status") != "ERROR":
+        return False
+    details = result.get("errorDetails") or {}
+    text = "\n".join(details.get("errorContent") or ()) or result.get("message") or ""
+    if _MISMATCH_RE.search(text):
+        return True
+    if version not in _FOREIGN_SYNTAX or not _LOAD_ERROR_RE.search(text):
+        return False
+    line = _failing_line(result)
+    return line is not None and any(p.search(line) for p in _FOREIGN_SYNTAX[version])
+
+
+def is_decisive(result: dict, version: Optional[str] = None) -> bool:
+    """A verdict about the script itself (not the interpreter choice)."""
+    return result.get("status") not in _INCONCLUSIVE and not is_version_mismatch(result, version)
+
+
+class InterpreterMemory:
+    """Interpreter that won the last race, per script."""
+
+    def __init__(self, path: Path = INTERPRETERS_PATH):
+        self.path = Path(path)
+        self.scripts: dict[str, dict] = {}
+        # remember()/forget() run in worker threads
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("v") != INTERPRETERS_VERSION:
+            return
+        self.scripts = data.get("scripts", {})
+
+    def save(self) -> None:
+        """Write the table atomically (the newest MAX_INTERPRETERS scripts; blocking)."""
+        with self._lock:
+            scripts = dict(sorted(self.scripts.items(), key=lambda kv: kv[1].get("t", 0))[-MAX_INTERPRETERS:])
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"v": INTERPRETERS_VERSION, "scripts": scripts}), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    @staticmethod
+    def _key(script_path: str) -> str:
+        return str(Path(script_path).resolve())
+
+    def get(self, script_path: str) -> Optional[str]:
+        entry = self.scripts.get(self._key(script_path))
+        return entry["version"] if entry else None
+
+    def remember(self, script_path: str, version: str) -> None:
+        """Record the winner of a race and save the table (blocking: call through asyncio.to_thread)."""
+        key = self._key(script_path)
+        with self._lock:
+            past = self.scripts.get(key)
+            self.scripts[key] = {"version": version, "n": (past["n"] + 1) if past and past["version"] == version else 1, "t": round(time.time())}
+        self._save_quietly()
+
+    def forget(self, script_path: str) -> None:
+        """Drop a script's remembered interpreter (blocking, like remember())."""
+        with self._lock:
+            forgotten = self.scripts.pop(self._key(script_path), None) is not None
+        if forgotten:
+            self._save_quietly()
+
+    def _save_quietly(self) -> None:
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning(f"Could not save interpreter table: {e}")
+
+
+_memory: Optional[InterpreterMemory] = None
+
+
+def get_interpreter_memory() -> InterpreterMemory:
+    global _memory
+    if _memory is None:
+        _memory = InterpreterMemory()
+    return _memory
+
+
+def decide_version(script_path: str) -> tuple[Optional[str], str]:
+    """
+    The version to run an "Auto" script with, without running it.
+
+    Returns:
+        (version, source): source is "requires", "memory" or "dialect";
+        (None, "unknown") when the script has to be raced
+    """
+    version = requires_version(script_path)
+    if version:
+        return version, "requires"
+    version = get_interpreter_memory().get(script_path)
+    if version:
+        return version, "memory"
+    evidence = dialect_evidence(script_path)
+    if evidence["V1"] and not evidence["V2"]:
+        return "V1", "dialect"
+    if evidence["V2"] and not evidence["V1"]:
+        return "V2", "dialect"
+    return None, "unknown"
+
+
+async def _reap(result: dict) -> None:
+    """Terminate a finished losing run's AHK process (left alive on RUNNING/SUCCESS or kept for capture)."""
+    pid = result.get("processId")
+    if pid and not result.get("runner"):
+        await asyncio.to_thread(ProcessTree(pid).reap)
+
+
+async def race(script_path: str, launch: Callable[[str], Awaitable[dict]]) -> dict:
+    """
+    Run the script with both interpreters and keep the first decisive verdict.
+
+    Args:
+        script_path: Script being run (the winner is remembered for it)
+        launch: Starts one run for a version ("V1"/"V2") and returns its result
+
+    Returns:
+        The winning result with a "speculative" entry: winner (None when
+        no run was decisive) and each version's outcome ("won",
+        "cancelled", "mismatch", "inconclusive" or "lost")
+    """
+    t0 = time.perf_counter()
+    tasks = {asyncio.create_task(launch(version)): version for version in VERSIONS}
+    finished: list[tuple[str, dict]] = []
+    winner: Optional[tuple[str, dict]] = None
+    pending = set(tasks)
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                version = tasks[task]
+                try:
+                    result = task.result()
+                except Exception as e:
+                    logger.warning(f"Speculative {version} run failed: {e}")
+                    result = {"status": "CONFIG_ERROR", "message": str(e), "executionTimeMs": 0, "scriptPath": script_path}
+                if winner is None and is_decisive(result, version):
+                    winner = (version, result)
+                else:
+                    finished.append((version, result))
+    finally:
+        # Losers still running (or the whole race, on cancellation): their
+        # CancelledError path reaps the AHK process tree
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    outcomes = {tasks[task]: "cancelled" for task in pending}
+    if winner is None:
+        # Nothing decisive: report the run that got furthest (a mismatch says
+        # more than a missing interpreter), the first one on a tie
+        finished.sort(key=lambda item: item[1].get("status") in _INCONCLUSIVE)
+        winner = finished.pop(0) if finished else (None, {
+            "status": "CONFIG_ERROR", "message": "No interpreter run completed",
+            "executionTimeMs": 0, "scriptPath": script_path,
+        })
+        decided = None
+    else:
+        decided = winner[0]
+        await asyncio.to_thread(get_interpreter_memory().remember, script_path, decided)
+
+    for version, result in finished:
+        outcomes[version] = "mismatch" if is_version_mismatch(result, version) else "inconclusive" if result.get("status") in _INCONCLUSIVE else "lost"
+        await _reap(result)
+    version, result = winner
+    if version:
+        outcomes[version] = "won" if decided else ("mismatch" if is_version_mismatch(result, version) else "inconclusive")
+
+    SPECULATIVE_RUNS.labels(decided or "none").inc()
+    logger.info(f"Speculative run of {script_path}: winner={decided}, outcomes={outcomes}")
+    result["speculative"] = {
+        "winner": decided,
+        "outcomes": outcomes,
+        "elapsedMs": int((time.perf_counter() - t0) * 1000),
+    }
+    return result
@@ -0,0 +1,111 @@
+"""Frame differencing for stable window captures.
+
+A single PrintWindow frame can catch a window half drawn (controls still
+being created, fonts loading, a GUI resized after Show). In stable mode
+capture_window_screenshot() grabs frames of the window at short
+intervals, downsampled to at most DOWNSAMPLE_WIDTH pixels wide, and keeps
+the full-size frame once STABLE_FRAMES consecutive frames barely differ
+from their predecessor, or when the time cap is reached.
+
+Frames are 32bpp BGRA buffers. A pixel counts as changed when any colour
+channel moved by more than PIXEL_DELTA; a frame is stable when at most
+STABLE_FRACTION of its pixels changed. The diff is vectorized with NumPy
+when it is installed (pip install ahk-mcp-server[capture]), pure Python
+otherwise.
+
+AHK_MCP_STABLE_FRAMES, AHK_MCP_FRAME_INTERVAL_MS and AHK_MCP_STABLE_MAX_MS
+set the defaults.
+"""
+import os
+from typing import Optional
+
+try:
+    # Optional vectorized diff (pip install ahk-mcp-server[capture])
+    import numpy as np
+except ImportError:
+    np = None
+
+# Frames are downsampled in PowerShell to at most this width before being sent
+DOWNSAMPLE_WIDTH = 160
+
+# Channel change (0-255) below which a pixel counts as unchanged (antialiasing, cursor blink)
+PIXEL_DELTA = 12
+
+# Share of changed pixels up to which a frame counts as stable
+STABLE_FRACTION = 0.002
+
+STABLE_FRAMES = int(os.environ.get("AHK_MCP_STABLE_FRAMES", "2"))
+FRAME_INTERVAL_MS = int(os.environ.get("AHK_MCP_FRAME_INTERVAL_MS", "100"))
+STABLE_MAX_MS = int(os.environ.get("AHK_MCP_STABLE_MAX_MS", "3000"))
+
+
+def changed_fraction(previous: bytes, current: bytes, width: int, height: int, stride: Optional[int] = None) -> float:
+    """
+    Share of pixels whose B, G or R channel moved by more than PIXEL_DELTA.
+
+    Args:
+        previous, current: BGRA buffers of the same geometry
+        width, height: Frame size in pixels
+        stride: Bytes per row (default width * 4)
+    """
+    stride = stride or width * 4
+    if len(previous) != len(current) or len(current) < stride * height or width <= 0 or height <= 0:
+        return 1.0
+    if previous == current:
+        # Settled windows repeat byte for byte; memcmp beats any diff
+        return 0.0
+
+    if np is not None:
+        a = np.frombuffer(previous, dtype=np.uint8, count=stride * height).reshape(height, stride)[:, :width * 4]
+        b = np.frombuffer(current, dtype=np.uint8, count=stride * height).reshape(height, stride)[:, :width * 4]
+        # uint8 |a - b| without widening: max(a, b) - min(a, b)
+        delta = np.maximum(a, b) - np.minimum(a, b)
+        changed = delta.reshape(height, width, 4)[:, :, :3].max(axis=2) > PIXEL_DELTA
+        return float(changed.mean())
+
+    changed = 0
+    for row in range(height):
+        start = row * stride
+        a = previous[start:start + width * 4]
+        b = current[start:start + width * 4]
+        if a == b:
+            continue
+        for i in range(0, width * 4, 4):
+            if (abs(a[i] - b[i]) > PIXEL_DELTA or abs(a[i + 1] - b[i + 1]) > PIXEL_DELTA
+                    or abs(a[i + 2] - b[i + 2]) > PIXEL_DELTA):
+                changed += 1
+    return changed / (width * height)
+
+
+class StabilityTracker:
+    """Feed downsampled frames in order; stable once N consecutive frames match their predecessor."""
+
+    def __init__(self, stable_frames: int = STABLE_FRAMES, threshold: float = STABLE_FRACTION):
+        self.stable_frames = max(1, stable_frames)
+        self.threshold = threshold
+        self.frames = 0
+        self.streak = 0
+        self.diffs: list[float] = []
+        self._previous: Optional[tuple[int, int, int, bytes]] = None
+
+    def feed(self, width: int, height: int, data: bytes, stride: Optional[int] = None) -> bool:
+        """Add the next frame. Returns True once the window is stable."""
+        stride = stride or width * 4
+        self.frames += 1
+        previous = self._previous
+        self._previous = (width, height, stride, data)
+        if previous is None:
+            return False
+
+        if previous[:3] != (width, height, stride):
+            # Resized (or moved between monitors with another DPI): not stable yet
+            diff = 1.0
+        else:
+            diff = changed_fraction(previous[3], data, width, height, stride)
+        self.diffs.append(round(diff, 5))
+        self.streak = self.streak + 1 if diff <= self.threshold else 0
+        return self.stable
+
+    @property
+    def stable(self) -> bool:
+        return self.streak >= self.stable_frames
@@ -0,0 +1,151 @@
+"""Per-run identity: every local run starts a uniquely named copy of the script.
+
+Two runs of the same script (parallel tool calls, the V1 and V2 legs of a
+speculative run, ahk_watch next to a manual run) used to start the very
+same file, so their windows, tray icons and #SingleInstance checks looked
+alike. Each run now starts a staged copy instead:
+
+    <script dir>/.ahkrun-<token>-<script name>
+
+    - the copy sits next to the original, so relative #Includes and
+      A_ScriptDir resolve as before; the bytes are identical, so error line
+      numbers are unchanged
+    - the token is random per run, so window titles and A_ScriptName differ
+      between runs of the same script and #SingleInstance does not make a
+      run replace another one
+    - the launcher attributes windows and the tray icon to the AHK process
+      tree of its run (1.12.0), the staged name only has to tell concurrent
+      runs of one script apart
+
+The result is mapped back before it is returned: the marker is removed
+from every string, so paths, titles and error texts show the original
+name. Artifact paths (ARTIFACT_KEYS) are left as they are: the launcher
+names screenshots after the script it ran, so the file on disk carries
+the staged name. The copy is deleted KEEP_S after the run (a script left RUNNING may
+still Reload itself); copies left behind by a crash are swept when the
+directory is staged again after STALE_S. A directory the server cannot
+write to runs the original file, attributed by process tree only.
+
+Disable with AHK_MCP_STAGE_SCRIPTS=0.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Staged copies start with this prefix (skipped by test discovery and ahk_watch)
+STAGE_PREFIX = ".ahkrun-"
+
+ENABLED = os.environ.get("AHK_MCP_STAGE_SCRIPTS", "1") != "0"
+
+KEEP_S = float(os.environ.get("AHK_MCP_STAGE_KEEP_S", "60"))
+STALE_S = 3600
+# Tokens tried before running the original (another run holds the name)
+STAGE_ATTEMPTS = 3
+
+# Result keys holding paths of files the launcher wrote under the staged name
+ARTIFACT_KEYS = frozenset({"screenshot"})
+
+STAGED = registry.counter("ahk_staged_runs_total", "Local runs by script staging outcome", ("outcome",))
+
+
+class StagedScript:
+    """A run's copy of a script and the marker that tells it apart."""
+
+    def __init__(self, original: Path, token: str):
+        self.original = original
+        self.token = token
+        self.marker = f"{STAGE_PREFIX}{token}-"
+        self.path = original.with_name(f"{self.marker}{original.name}")
+
+    def restore(self, value: Any) -> Any:
+        """`value` (launcher result, nested) with the staged name mapped back to the original."""
+        if isinstance(value, str):
+            return value.replace(self.marker, "") if self.marker in value else value
+        if isinstance(value, dict):
+            return {key: item if key in ARTIFACT_KEYS else self.restore(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.restore(item) for item in value]
+        return value
+
+    def remove(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Still open somewhere; the next sweep of the directory removes it
+            logger.debug(f"Could not remove staged script {self.path}: {e}")
+
+    def release(self, delay_s: float = KEEP_S) -> None:
+        """Delete the copy after `delay_s` (now if there is no running loop)."""
+        try:
+            asyncio.get_running_loop().call_later(delay_s, self.remove)
+        except RuntimeError:
+            self.remove()
+
+
+def sweep_stale(directory: Path, max_age_s: float = STALE_S) -> list[Path]:
+    """Delete staged copies in `directory` written more than `max_age_s` ago."""
+    removed = []
+    cutoff = time.time() - max_age_s
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return removed
+    for entry in entries:
+        if not entry.name.startswith(STAGE_PREFIX):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed.append(Path(entry.path))
+        except OSError:
+            pass
+    return removed
+
+
+def stage_script(script_path: str, token: Optional[str] = None) -> Optional[StagedScript]:
+    """
+    Copy the script to a run-unique name next to it (blocking).
+
+    Args:
+        script_path: The script to run
+        token: Run identity in the staged name (random by default, or when
+            another run holds that name)
+
+    Returns:
+        The staged copy, or None to run the original (staging disabled,
+        script missing or directory not writable)
+    """
+    if not ENABLED:
+        return None
+    original = Path(script_path)
+    try:
+        data = original.read_bytes()
+        for attempt in range(STAGE_ATTEMPTS):
+            staged = StagedScript(original, token if token and attempt == 0 else secrets.token_hex(4))
+            try:
+                # "x": never reuse (or overwrite) the copy of another run
+                with open(staged.path, "xb") as f:
+                    f.write(data)
+                break
+            except FileExistsError:
+                logger.debug(f"Staged name {staged.path.name} is taken, drawing another token")
+        else:
+            raise FileExistsError(f"No free staged name after {STAGE_ATTEMPTS} tokens")
+    except OSError as e:
+        STAGED.labels("unstaged").inc()
+        logger.debug(f"Running {script_path} unstaged: {e}")
+        return None
+    STAGED.labels("staged").inc()
+    for path in sweep_stale(original.parent):
+        logger.info(f"Removed stale staged script {path}")
+    return staged
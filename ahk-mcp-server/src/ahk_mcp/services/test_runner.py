@@ -0,0 +1,382 @@
+"""AHK unit tests: discovery, result reporting, sharding and merged reports.
+
+A test file is an ordinary AHK script that calls the reporter functions:
+
+    AhkTest("adds numbers")            ; starts a test case (optional)
+    AhkAssert(1 + 1 = 2, "sum")        ; records a passed/failed assertion
+    AhkAssertEqual(Add(1, 2), 3)       ; same, with expected/actual in the message
+
+Each file is run through a generated harness placed next to it (so its
+relative #Includes and A_ScriptDir keep working), named
+.ahktest-<token>-<file> with a token of its own, so concurrent runs of the
+same file never share (or delete) each other's harness:
+
+    AhkTestResults := "<dir>\\results-" . SubStr(A_AhkVersion, 1, 1) . ".tsv"
+    #Include <reporter.ahk>
+    #Include <the test file>
+    AhkTest_Done()
+    ExitApp
+
+The reporter is written in the subset of AHK that v1.1 and v2 both accept
+(FileOpen, expression calls), so one include serves both interpreters; the
+results file is per interpreter so the legs of a speculative V1/V2 run never
+write to the same file. Every record is one tab-separated line:
+
+    TEST  <name>        a test case starts
+    PASS  <message>     assertion passed
+    FAIL  <message>     assertion failed
+    END   <ms>          the current test case ended after <ms>
+    DONE                the whole file ran to the end
+
+A file that stops early (error dialog, ExitApp, timeout) leaves no DONE;
+its open test case is then reported as an error with the launcher verdict.
+
+Files are spread over `shards` parallel runs by predicted runtime (the
+scheduler's cost model, longest first onto the least loaded shard) and the
+per-file results are merged into one report (JSON and JUnit XML).
+"""
+import asyncio
+import fnmatch
+import logging
+import os
+import secrets
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .artifacts import artifact_store
+from .metrics import registry
+from .powershell import run_ahk_launcher
+from .process_tree import ProcessTree
+from .quotas import run_pool
+from .scheduler import extract_features, get_cost_model
+from .speculative import decide_version
+from .staging import STAGE_PREFIX
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATTERNS = ("test_*.ahk", "*_test.ahk", "*.test.ahk")
+
+# Generated harnesses start with this prefix (skipped by discovery and ahk_watch)
+HARNESS_PREFIX = ".ahktest-"
+
+# Launcher verdicts that mean the file did not run to its end on its own
+_STOPPED = ("ERROR", "TIMEOUT", "CONFIG_ERROR", "RUNNING")
+
+TEST_CASES = registry.counter("ahk_test_cases_total", "AHK test cases by outcome", ("outcome",))
+
+REPORTER = """\
+; Result reporter injected by ahk_run_tests (AutoHotkey v1.1 and v2)
+AhkTest(name) {
+    global AhkTestCurrent, AhkTestStart
+    AhkTest_End()
+    AhkTestCurrent := name
+    AhkTestStart := A_TickCount
+    AhkTest_Write("TEST`t" . AhkTest_Clean(name))
+}
+
+AhkAssert(condition, message := "") {
+    global AhkTestCurrent, AhkTestFile
+    if (AhkTestCurrent = "")
+        AhkTest(AhkTestFile)
+    AhkTest_Write((condition ? "PASS" : "FAIL") . "`t" . AhkTest_Clean(message))
+    return condition
+}
+
+AhkAssertEqual(actual, expected, message := "") {
+    if (actual == expected)
+        return AhkAssert(true, message)
+    return AhkAssert(false, (message = "" ? "" : message . ": ") . "expected <" . expected . "> got <" . actual . ">")
+}
+
+AhkTest_End() {
+    global AhkTestCurrent, AhkTestStart
+    if (AhkTestCurrent != "")
+        AhkTest_Write("END`t" . (A_TickCount - AhkTestStart))
+    AhkTestCurrent := ""
+}
+
+AhkTest_Done() {
+    AhkTest_End()
+    AhkTest_Write("DONE")
+}
+
+AhkTest_Clean(text) {
+    return StrReplace(StrReplace(StrReplace(text, "`r", " "), "`n", " "), "`t", " ")
+}
+
+AhkTest_Write(line) {
+    global AhkTestResults
+    f := FileOpen(AhkTestResults, "a", "UTF-8")
+    f.Write(line . "`n")
+    f.Close()
+}
+"""
+
+
+def discover_tests(directory: Path, patterns: Iterable[str] = DEFAULT_PATTERNS) -> list[Path]:
+    """Test files under `directory` (recursive) whose name matches one of `patterns`."""
+    patterns = [p.lower() for p in patterns]
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            lowered = name.lower()
+            if lowered.startswith((HARNESS_PREFIX, STAGE_PREFIX)) or not lowered.endswith(".ahk"):
+                continue
+            if any(fnmatch.fnmatchcase(lowered, p) for p in patterns):
+                found.append((Path(root) / name).resolve())
+    return sorted(found)
+
+
+def harness_path(test_path: Path, token: str) -> Path:
+    return test_path.with_name(f"{HARNESS_PREFIX}{token}-{test_path.name}")
+
+
+def write_harness(test_path: Path, results_dir: Path, reporter_path: Path, token: Optional[str] = None) -> Path:
+    """Write the harness that runs `test_path` with the reporter (named after `token`, random by default); returns its path."""
+    path = harness_path(test_path, token or secrets.token_hex(4))
+    path.write_text(
+        f"; Generated by ahk_run_tests for {test_path.name} (deleted after the run)\n"
+        f'AhkTestResults := "{results_dir}\\results-" . SubStr(A_AhkVersion, 1, 1) . ".tsv"\n'
+        f'AhkTestFile := "{test_path.stem}"\n'
+        'AhkTestCurrent := ""\n'
+        "AhkTestStart := A_TickCount\n"
+        f"#Include {reporter_path}\n"
+        f"#Include {test_path}\n"
+        "AhkTest_Done()\n"
+        "ExitApp\n",
+        encoding="utf-8-sig",
+    )
+    return path
+
+
+def parse_results(lines: Iterable[str]) -> dict:
+    """
+    Collect reporter records into test cases.
+
+    Returns:
+        {"tests": [{"name", "status", "durationMs", "assertions",
+        "failures": [message]}], "complete": bool}; the last case stays
+        "open" (status None) when the file stopped before ending it
+    """
+    tests: list[dict] = []
+    current: Optional[dict] = None
+    complete = False
+    for raw in lines:
+        kind, _, value = raw.rstrip("\r\n").lstrip("\ufeff").partition("\t")
+        if kind == "TEST":
+            current = {"name": value, "status": None, "durationMs": None, "assertions": 0, "failures": []}
+            tests.append(current)
+        elif kind in ("PASS", "FAIL"):
+            if current is None:
+                # Reporter always opens a case first; tolerate hand-written channels
+                current = {"name": "", "status": None, "durationMs": None, "assertions": 0, "failures": []}
+                tests.append(current)
+            current["assertions"] += 1
+            if kind == "FAIL":
+                current["failures"].append(value or "assertion failed")
+        elif kind == "END" and current is not None:
+            current["durationMs"] = int(value) if value.isdigit() else None
+            current["status"] = "failed" if current["failures"] else "passed"
+            current = None
+        elif kind == "DONE":
+            complete = True
+    return {"tests": tests, "complete": complete}
+
+
+def read_results(results_dir: Path, version: Optional[str] = None) -> Optional[list[str]]:
+    """Record lines written by the run (the given interpreter's file first)."""
+    candidates = [results_dir / f"results-{version[-1]}.tsv"] if version else []
+    candidates += sorted(results_dir.glob("results-*.tsv"))
+    for path in candidates:
+        try:
+            return path.read_text(encoding="utf-8-sig", errors="replace").splitlines()
+        except OSError:
+            continue
+    return None
+
+
+def collect(test_path: Path, results_dir: Path, run: dict) -> dict:
+    """Per-file outcome: the reporter records, settled against the launcher verdict."""
+    lines = read_results(results_dir, run.get("ahkVersion"))
+    parsed = parse_results(lines or ())
+    status = run.get("status", "CONFIG_ERROR")
+    message = (run.get("message") or "").strip()
+    tests = parsed["tests"]
+
+    for test in tests:
+        if test["status"] is None:
+            # Open case: the file stopped inside it (an error, or ExitApp/return)
+            if status in _STOPPED:
+                test["status"] = "error"
+                test["error"] = message or status
+            else:
+                test["status"] = "failed" if test["failures"] else "passed"
+    if not tests and (status in _STOPPED or not parsed["complete"]):
+        # Nothing reported: syntax error, missing interpreter, script that never exits
+        error = (message or status) if status in _STOPPED else "Stopped before the end of the file (ExitApp or return) without reporting"
+        tests.append({
+            "name": test_path.stem, "status": "error", "durationMs": None, "assertions": 0,
+            "failures": [], "error": error,
+        })
+
+    return {
+        "file": str(test_path),
+        "status": status,
+        "ahkVersion": run.get("ahkVersion"),
+        "complete": parsed["complete"],
+        "tests": tests,
+    }
+
+
+def partition(jobs: list[dict], shards: int) -> list[list[dict]]:
+    """Split jobs over `shards` by predictedMs: longest first onto the least loaded shard."""
+    groups: list[list[dict]] = [[] for _ in range(max(1, min(shards, len(jobs))))]
+    loads = [0.0] * len(groups)
+    for job in sorted(jobs, key=lambda j: -j["predictedMs"]):
+        target = loads.index(min(loads))
+        groups[target].append(job)
+        loads[target] += job["predictedMs"]
+    return groups
+
+
+def merge(files: list[dict]) -> dict:
+    """Totals over per-file outcomes (collect() results with shard/durationMs set)."""
+    totals = {"files": len(files), "tests": 0, "passed": 0, "failed": 0, "errors": 0, "assertions": 0}
+    for outcome in files:
+        for test in outcome["tests"]:
+            totals["tests"] += 1
+            totals["assertions"] += test["assertions"]
+            key = {"passed": "passed", "failed": "failed"}.get(test["status"], "errors")
+            totals[key] += 1
+    return totals
+
+
+def junit_xml(report: dict) -> str:
+    """JUnit XML of a merged report: one testsuite per file, one testcase per test."""
+    totals = report["totals"]
+    suites = ET.Element("testsuites", {
+        "name": "ahk", "tests": str(totals["tests"]), "failures": str(totals["failed"]),
+        "errors": str(totals["errors"]), "time": f"{report['durationMs'] / 1000:.3f}",
+    })
+    for outcome in report["files"]:
+        tests = outcome["tests"]
+        suite = ET.SubElement(suites, "testsuite", {
+            "name": Path(outcome["file"]).stem,
+            "file": outcome["file"],
+            "tests": str(len(tests)),
+            "failures": str(sum(t["status"] == "failed" for t in tests)),
+            "errors": str(sum(t["status"] == "error" for t in tests)),
+            "time": f"{outcome['durationMs'] / 1000:.3f}",
+        })
+        ET.SubElement(ET.SubElement(suite, "properties"), "property", {"name": "shard", "value": str(outcome["shard"])})
+        for test in tests:
+            case = ET.SubElement(suite, "testcase", {
+                "classname": Path(outcome["file"]).stem,
+                "name": test["name"],
+                "time": f"{(test['durationMs'] or 0) / 1000:.3f}",
+                "assertions": str(test["assertions"]),
+            })
+            if test["status"] == "failed":
+                failure = ET.SubElement(case, "failure", {"message": test["failures"][0]})
+                failure.text = "\n".join(test["failures"])
+            elif test["status"] == "error":
+                error = ET.SubElement(case, "error", {"message": test["error"].split("\n", 1)[0]})
+                error.text = test["error"]
+    ET.indent(suites)
+    return ET.tostring(suites, encoding="unicode", xml_declaration=True) + "\n"
+
+
+async def run_tests(
+    tests: list[str],
+    version: str = "Auto",
+    timeout_ms: int = 5000,
+    shards: int = 4,
+    client_id: Optional[str] = None
+) -> dict:
+    """
+    Run test files in parallel shards and merge their results.
+
+    Args:
+        tests: Test file paths
+        version: AHK version for every file ("Auto": each file's own #Requires,
+            remembered interpreter or dialect, else a V1/V2 race)
+        timeout_ms: Timeout per file
+        shards: Parallel runs
+        client_id: Take each run's slot from this client's quota (quotas.py)
+
+    Returns:
+        Dict with the run ID, totals, per-file/per-test outcomes with timings
+        and the paths of result.json and junit.xml in the run directory
+    """
+    run = await asyncio.to_thread(artifact_store.create, tests[0] if len(tests) == 1 else None)
+    reporter = run.directory / "reporter.ahk"
+    reporter.write_text(REPORTER, encoding="utf-8-sig")
+
+    model = get_cost_model()
+    features = await asyncio.gather(*(asyncio.to_thread(extract_features, t) for t in tests))
+    jobs = []
+    for position, (test, feats) in enumerate(zip(tests, features)):
+        predicted, _ = model.predict(test, version, timeout_ms, feats)
+        jobs.append({"test": Path(test).resolve(), "features": feats, "predictedMs": round(predicted), "position": position})
+    groups = partition(jobs, shards)
+    start = time.perf_counter()
+
+    async def run_one(job: dict, shard: int) -> dict:
+        test = job["test"]
+        file_dir = run.directory / "tests" / f"{job['position']:03d}-{test.stem}"
+        file_dir.mkdir(parents=True, exist_ok=True)
+        file_version = version
+        if version == "Auto":
+            # The harness has no #Requires of its own: settle the version on the test file
+            file_version = (await asyncio.to_thread(decide_version, str(test)))[0] or "Auto"
+        harness = await asyncio.to_thread(write_harness, test, file_dir, reporter)
+        t0 = time.perf_counter()
+        try:
+            if client_id is None:
+                result = await run_ahk_launcher(str(harness), file_version, timeout_ms, screenshot=False, run_dir=str(file_dir))
+            else:
+                async with run_pool.slot(client_id):
+                    result = await run_ahk_launcher(str(harness), file_version, timeout_ms, screenshot=False, run_dir=str(file_dir))
+        finally:
+            try:
+                harness.unlink()
+            except OSError:
+                pass
+        if result.get("processId") and not result.get("runner"):
+            # Test files that opened a window or stayed resident are not left behind
+            await asyncio.to_thread(ProcessTree(result["processId"]).reap)
+        elapsed = round((time.perf_counter() - t0) * 1000)
+        if file_version != "Auto":
+            result.setdefault("ahkVersion", file_version)
+        outcome = await asyncio.to_thread(collect, test, file_dir, result)
+        outcome.update(shard=shard, durationMs=elapsed, predictedMs=job["predictedMs"])
+        model.observe(str(test), version, timeout_ms, job["features"], elapsed, outcome["status"])
+        for case in outcome["tests"]:
+            TEST_CASES.labels(case["status"]).inc()
+        return outcome
+
+    async def run_shard(shard: int, group: list[dict]) -> list[dict]:
+        return [await run_one(job, shard) for job in group]
+
+    results = await asyncio.gather(*(run_shard(i, group) for i, group in enumerate(groups)))
+    duration = round((time.perf_counter() - start) * 1000)
+    await asyncio.to_thread(model.save)
+
+    files = sorted((outcome for group in results for outcome in group), key=lambda o: o["file"])
+    report = {
+        "success": True,
+        "runId": run.run_id,
+        "shards": len(groups),
+        "durationMs": duration,
+        "shardMs": [sum(o["durationMs"] for o in group) for group in results],
+        "totals": merge(files),
+        "files": files,
+    }
+    report["reportPath"] = str(run.result_path)
+    report["junitPath"] = str(run.directory / "junit.xml")
+    (run.directory / "junit.xml").write_text(junit_xml(report), encoding="utf-8")
+    await asyncio.to_thread(artifact_store.finalize, run, report)
+    return report
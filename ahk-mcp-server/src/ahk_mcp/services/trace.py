@@ -0,0 +1,215 @@
+"""Record/replay of launcher runs.
+
+Record mode appends one JSON line per run_ahk_launcher invocation
+(arguments, parsed launcher JSON, wall-clock time) to a trace file.
+Replay mode serves those records instead of starting powershell.exe,
+so runs can be reproduced and load-tested on Linux without AutoHotkey.
+
+Enable with environment variables before the server starts:
+    AHK_MCP_RECORD=traces/run.jsonl[.gz]
+    AHK_MCP_REPLAY=traces/run.jsonl[.gz]   AHK_MCP_REPLAY_SCALE=0.1
+
+Recording the tests/*.ahk corpus and load-testing a trace are driven by
+replay_runs.py at the root of the MCP server.
+"""
+import asyncio
+import gzip
+import itertools
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .staging import STAGE_PREFIX
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _trace_key(script_path: str, version: str) -> tuple[str, str]:
+    # Traces recorded on Windows are replayed elsewhere: key on the file name only
+    return (script_path.replace("\\", "/").rsplit("/", 1)[-1].lower(), version.upper())
+
+
+class TraceRecorder:
+    """Append-only JSONL writer for launcher invocations."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(self, script_path: str, args: dict, result: dict, started: float, wall_ms: int) -> None:
+        line = json.dumps({
+            "v": TRACE_VERSION,
+            "t": round(started, 3),
+            "script": script_path,
+            "args": args,
+            "ms": wall_ms,
+            "out": result,
+        }, separators=(",", ":"), ensure_ascii=False)
+        with self._lock, _open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+def load_trace(path: str) -> list[dict]:
+    """Read every record of a trace file."""
+    records = []
+    with _open(Path(path), "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+class ReplayBackend:
+    """Serve recorded launcher results instead of running powershell.exe."""
+
+    def __init__(self, records: list[dict], time_scale: float = 1.0):
+        self.time_scale = time_scale
+        self.records = records
+        by_key: dict[tuple[str, str], list[dict]] = {}
+        for record in records:
+            key = _trace_key(record["script"], record["args"].get("version", "Auto"))
+            by_key.setdefault(key, []).append(record)
+        # Several recordings of the same script are served round-robin
+        self._cycles = {key: itertools.cycle(recs) for key, recs in by_key.items()}
+
+    @classmethod
+    def from_file(cls, path: str, time_scale: float = 1.0) -> "ReplayBackend":
+        return cls(load_trace(path), time_scale)
+
+    async def run(self, script_path: str, version: str = "Auto", max_wait_s: Optional[float] = None) -> dict:
+        cycle = self._cycles.get(_trace_key(script_path, version))
+        if cycle is None:
+            return {
+                "status": "CONFIG_ERROR",
+                "message": f"No recorded trace for {script_path} (version={version})",
+                "executionTimeMs": 0,
+                "scriptPath": script_path
+            }
+        record = next(cycle)
+        delay = record["ms"] / 1000 * self.time_scale
+        if max_wait_s is not None:
+            delay = min(delay, max_wait_s)
+        await asyncio.sleep(delay)
+        result = dict(record["out"])
+        result["scriptPath"] = script_path
+        # Recorded PIDs/handles belong to another session: never reap or capture them
+        result.pop("processId", None)
+        result.pop("windowHandle", None)
+        return result
+
+
+_recorder: Optional[TraceRecorder] = None
+_replay: Optional[ReplayBackend] = None
+
+
+def enable_recording(path: Optional[str]) -> None:
+    global _recorder
+    _recorder = TraceRecorder(path) if path else None
+    if path:
+        logger.info(f"Recording launcher runs to {path}")
+
+
+def enable_replay(path: Optional[str], time_scale: float = 1.0) -> None:
+    global _replay
+    _replay = ReplayBackend.from_file(path, time_scale) if path else None
+    if path:
+        logger.info(f"Replaying launcher runs from {path} ({len(_replay.records)} records, scale={time_scale})")
+
+
+def get_recorder() -> Optional[TraceRecorder]:
+    return _recorder
+
+
+def get_replay() -> Optional[ReplayBackend]:
+    return _replay
+
+
+# Configure from environment at import (same pattern as the GH token)
+enable_recording(os.environ.get("AHK_MCP_RECORD"))
+enable_replay(os.environ.get("AHK_MCP_REPLAY"), float(os.environ.get("AHK_MCP_REPLAY_SCALE", "1.0")))
+
+
+async def load_test(path: str, amplify: int = 1, time_scale: float = 1.0, concurrency: int = 0) -> dict:
+    """
+    Replay every record of a trace `amplify` times through run_ahk_launcher.
+
+    Args:
+        path: Trace file
+        amplify: Copies of each record issued concurrently
+        time_scale: Multiplier applied to recorded wall times
+        concurrency: Max in-flight runs (0 = unbounded)
+
+    Returns:
+        Dict with runs, wall time, throughput, latency percentiles and status counts
+    """
+    from .powershell import run_ahk_launcher
+
+    global _replay
+    previous = _replay
+    backend = _replay = ReplayBackend.from_file(path, time_scale)
+    semaphore = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+
+    async def one(record: dict) -> None:
+        args = record["args"]
+        start = time.perf_counter()
+        if semaphore:
+            async with semaphore:
+                result = await run_ahk_launcher(record["script"], args.get("version", "Auto"), args.get("timeout_ms", 3000), False)
+        else:
+            result = await run_ahk_launcher(record["script"], args.get("version", "Auto"), args.get("timeout_ms", 3000), False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[result.get("status", "?")] = statuses.get(result.get("status", "?"), 0) + 1
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(r) for r in backend.records for _ in range(amplify)))
+        wall = time.perf_counter() - start
+    finally:
+        _replay = previous
+
+    latencies.sort()
+    return {
+        "runs": len(latencies),
+        "wallS": round(wall, 3),
+        "throughputPerS": round(len(latencies) / wall, 1) if wall else 0.0,
+        "latencyMs": {
+            "p50": round(statistics.median(latencies), 1) if latencies else 0,
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1], 1) if latencies else 0,
+            "max": round(latencies[-1], 1) if latencies else 0,
+        },
+        "statuses": statuses,
+    }
+
+
+async def record_corpus(trace_path: str, corpus_dir: str, version: str = "Auto", timeout_ms: int = 3000) -> int:
+    """Run every .ahk in `corpus_dir` through the real launcher with recording on."""
+    from .powershell import run_ahk_launcher
+
+    global _recorder
+    previous = _recorder
+    enable_recording(trace_path)
+    try:
+        scripts = sorted(p for p in Path(corpus_dir).glob("*.ahk") if not p.name.startswith(STAGE_PREFIX))
+        for script in scripts:
+            result = await run_ahk_launcher(str(script.resolve()), version, timeout_ms, screenshot=False)
+            logger.info(f"Recorded {script.name}: {result.get('status')}")
+        return len(scripts)
+    finally:
+        _recorder = previous
@@ -0,0 +1,162 @@
+"""Warm-state snapshots that survive server restarts (reloaderoo reloads).
+
+Modules holding rebuildable state register a dump/restore pair under a
+section name. A background thread checkpoints every section into one
+versioned, gzipped JSON file (written atomically, skipped when nothing
+changed) and the state is saved once more at exit. run_server.py restores
+the file on startup. Restore does no I/O beyond reading the snapshot; each
+section checks its entries lazily when they are first used (source indexes
+against file mtimes, the artifact index against the runs directory mtime
+and its run sizes on the next GC pass, cached issue data against its TTL).
+
+Secrets (the GitHub token) are never written.
+
+AHK_MCP_STATE_FILE sets the file ("" disables snapshots),
+AHK_MCP_STATE_INTERVAL_S the checkpoint interval.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+MCP_SERVER_ROOT = Path(__file__).parent.parent.parent.parent
+STATE_FILE = os.environ.get("AHK_MCP_STATE_FILE", str(MCP_SERVER_ROOT / "state" / "warm_state.json.gz"))
+CHECKPOINT_INTERVAL_S = float(os.environ.get("AHK_MCP_STATE_INTERVAL_S", "60"))
+
+# Dumps race with the event loop mutating the dicts they copy: retry a few times
+DUMP_ATTEMPTS = 3
+
+_sections: dict[str, tuple[Callable[[], Any], Callable[[Any], int]]] = {}
+_last_digest: Optional[str] = None
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def register_state(name: str, dump: Callable[[], Any], restore: Callable[[Any], int]) -> None:
+    """
+    Include a section in snapshots.
+
+    Args:
+        name: Section key in the snapshot file
+        dump: Returns JSON-serializable state (called from the checkpoint thread)
+        restore: Loads that state back and returns the number of entries restored
+    """
+    _sections[name] = (dump, restore)
+
+
+def _dump_section(name: str, dump: Callable[[], Any]) -> Any:
+    for attempt in range(DUMP_ATTEMPTS):
+        try:
+            return dump()
+        except RuntimeError as e:
+            # "dictionary changed size during iteration"
+            if attempt == DUMP_ATTEMPTS - 1:
+                logger.debug(f"Snapshot section {name} skipped: {e}")
+    return None
+
+
+def save_snapshot(path: Optional[str] = None) -> Optional[dict]:
+    """
+    Write every registered section to the snapshot file.
+
+    Returns:
+        Dict with bytes written and per-section sizes, or None when the state
+        did not change since the last save (or snapshots are disabled)
+    """
+    global _last_digest
+    path = path if path is not None else STATE_FILE
+    if not path:
+        return None
+
+    with _lock:
+        sections = {}
+        for name, (dump, _) in list(_sections.items()):
+            data = _dump_section(name, dump)
+            if data is not None:
+                sections[name] = data
+        body = json.dumps(sections, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if digest == _last_digest:
+            return None
+
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        header = json.dumps({"v": STATE_VERSION, "saved": time.time()}).encode("utf-8")
+        with gzip.open(tmp, "wb", compresslevel=1) as f:
+            f.write(header + b"\n" + body)
+        os.replace(tmp, target)
+        _last_digest = digest
+
+    stats = {"bytes": target.stat().st_size, "sections": {name: len(data) for name, data in sections.items()}}
+    logger.debug(f"Warm state saved to {target}: {stats}")
+    return stats
+
+
+def restore_snapshot(path: Optional[str] = None) -> dict:
+    """
+    Load the snapshot file into the registered sections.
+
+    A missing file, another format version or a corrupt file restores nothing.
+
+    Returns:
+        Dict of section name -> entries restored (or an "error" key)
+    """
+    global _last_digest
+    path = path if path is not None else STATE_FILE
+    if not path or not Path(path).is_file():
+        return {}
+
+    try:
+        with gzip.open(path, "rb") as f:
+            header_line, _, body = f.read().partition(b"\n")
+        header = json.loads(header_line)
+        if header.get("v") != STATE_VERSION:
+            logger.info(f"Ignoring warm state {path}: version {header.get('v')} != {STATE_VERSION}")
+            return {"error": "version mismatch"}
+        sections = json.loads(body)
+    except (OSError, ValueError, EOFError) as e:
+        logger.warning(f"Ignoring unreadable warm state {path}: {e}")
+        return {"error": str(e)}
+
+    restored = {}
+    for name, data in sections.items():
+        entry = _sections.get(name)
+        if entry is None:
+            continue
+        try:
+            restored[name] = entry[1](data)
+        except Exception as e:
+            logger.warning(f"Warm state section {name} not restored: {e}")
+    _last_digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    logger.info(f"Warm state restored from {path} (saved {time.time() - header.get('saved', 0):.0f}s ago): {restored}")
+    return restored
+
+
+def _checkpoint_loop(interval_s: float) -> None:
+    while True:
+        time.sleep(interval_s)
+        try:
+            save_snapshot()
+        except Exception as e:
+            logger.warning(f"Warm state checkpoint failed: {e}")
+
+
+def start_checkpoints(interval_s: float = CHECKPOINT_INTERVAL_S) -> None:
+    """Checkpoint in a daemon thread every interval_s, and once more at exit (idempotent)."""
+    global _thread
+    if _thread is not None or not STATE_FILE:
+        return
+    _thread = threading.Thread(target=_checkpoint_loop, args=(interval_s,), name="ahk-warm-state", daemon=True)
+    _thread.start()
+    atexit.register(save_snapshot)
@@ -0,0 +1,328 @@
+"""Watch mode: re-validate scripts when files in a directory change.
+
+A WatchSession watches a directory (inotify on Linux, mtime polling
+elsewhere), debounces bursts of edits, maps each changed file to the root
+scripts whose #Include closure contains it, and re-runs only those through
+run_ahk_launcher. Results are compared with the previous run of each
+script and the deltas are pushed to the MCP session that started the watch.
+A batch that fails (watcher backend, include index, launcher) is logged
+and kept as the session's last error; the watch goes on with the next
+change.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import AnyUrl
+
+from .error_index import error_index
+from .metrics import registry
+from .powershell import run_ahk_launcher
+from .source_index import get_source_index
+from .staging import STAGE_PREFIX
+from .test_runner import HARNESS_PREFIX
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE_MS = 300
+POLL_INTERVAL_S = 0.5
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_ahk(path: Path) -> bool:
+    # ahk_run_tests harnesses and staged run copies come and go next to the scripts
+    return path.suffix.lower() == ".ahk" and not path.name.startswith((HARNESS_PREFIX, STAGE_PREFIX))
+
+
+def _scan(directory: Path) -> dict[Path, float]:
+    mtimes = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = Path(root) / name
+            if _is_ahk(path):
+                try:
+                    mtimes[path] = path.stat().st_mtime
+                except OSError:
+                    pass
+    return mtimes
+
+
+class _PollingBackend:
+    """Portable backend: compare .ahk mtimes every POLL_INTERVAL_S."""
+
+    def __init__(self, directory: Path, queue: asyncio.Queue):
+        self.directory = directory
+        self.queue = queue
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self) -> None:
+        previous = await asyncio.to_thread(_scan, self.directory)
+        while True:
+            await asyncio.sleep(POLL_INTERVAL_S)
+            current = await asyncio.to_thread(_scan, self.directory)
+            for path in current.keys() | previous.keys():
+                if current.get(path) != previous.get(path):
+                    self.queue.put_nowait(path)
+            previous = current
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+
+class _InotifyBackend:
+    """Linux backend: inotify watches on the directory and its subdirectories."""
+
+    MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_MODIFY
+
+    def __init__(self, directory: Path, queue: asyncio.Queue):
+        self.directory = directory
+        self.queue = queue
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, Path] = {}
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def start(self) -> None:
+        for root, _, _ in os.walk(self.directory):
+            self._add_watch(Path(root))
+        asyncio.get_running_loop().add_reader(self._fd, self._on_readable)
+
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / os.fsdecode(name)
+            if mask & _IN_ISDIR:
+                if mask & _IN_CREATE:
+                    self._add_watch(path)
+            elif _is_ahk(path):
+                self.queue.put_nowait(path)
+
+    def close(self) -> None:
+        try:
+            asyncio.get_running_loop().remove_reader(self._fd)
+        except RuntimeError:
+            pass
+        os.close(self._fd)
+
+
+def _make_backend(directory: Path, queue: asyncio.Queue, backend: str = "auto"):
+    if backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            return _InotifyBackend(directory, queue)
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            logger.info(f"inotify unavailable ({e}), falling back to polling")
+    return _PollingBackend(directory, queue)
+
+
+def find_root_scripts(directory: Path) -> list[Path]:
+    """Scripts in `directory` that are not #Included by another script there."""
+    scripts = sorted(_scan(directory))
+    included: set[Path] = set()
+    for script in scripts:
+        index = get_source_index(str(script))
+        included.update(f for f in index.files if f != index.root)
+    return [s.resolve() for s in scripts if s.resolve() not in included]
+
+
+def _outcome(result: dict) -> dict:
+    status = result.get("status", "CONFIG_ERROR")
+    outcome = {
+        "status": status,
+        "message": (result.get("message") or "").split("\n", 1)[0],
+        "executionTimeMs": result.get("executionTimeMs", 0),
+    }
+    if status == "ERROR":
+        outcome["fingerprint"] = error_index.add(result, script_path=result.get("scriptPath"))
+    return outcome
+
+
+class WatchSession:
+    """One watched directory and the latest outcome of each root script."""
+
+    def __init__(
+        self,
+        directory: str,
+        scripts: Optional[list[str]] = None,
+        version: str = "Auto",
+        timeout_ms: int = 3000,
+        debounce_ms: int = DEFAULT_DEBOUNCE_MS,
+        session: Any = None,
+        backend: str = "auto"
+    ):
+        self.id = uuid.uuid4().hex[:8]
+        self.directory = Path(directory).resolve()
+        self.explicit_scripts = [Path(s).resolve() for s in scripts] if scripts else None
+        self.version = version
+        self.timeout_ms = timeout_ms
+        self.debounce_s = debounce_ms / 1000
+        self.session = session
+        self.results: dict[str, dict] = {}
+        self.run_count = 0
+        self.failed_batches = 0
+        self.last_error: Optional[str] = None
+        self.started_at = time.time()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._backend = _make_backend(self.directory, self._queue, backend)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def uri(self) -> str:
+        return f"ahk://watch/{self.id}"
+
+    @property
+    def backend_name(self) -> str:
+        return "inotify" if isinstance(self._backend, _InotifyBackend) else "polling"
+
+    def roots(self) -> list[Path]:
+        return self.explicit_scripts or find_root_scripts(self.directory)
+
+    def start(self) -> None:
+        self._backend.start()
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Watch {self.id} started on {self.directory} ({self.backend_name})")
+
+    async def stop(self) -> None:
+        self._backend.close()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info(f"Watch {self.id} stopped after {self.run_count} run(s)")
+
+    async def _next_batch(self) -> set[Path]:
+        """Wait for a change, then keep collecting until the debounce window is quiet."""
+        changed = {await self._queue.get()}
+        while True:
+            try:
+                changed.add(await asyncio.wait_for(self._queue.get(), timeout=self.debounce_s))
+            except asyncio.TimeoutError:
+                return changed
+
+    def affected(self, changed: set[Path]) -> list[Path]:
+        """Root scripts whose include closure contains any changed file."""
+        changed = {p.resolve() for p in changed}
+        affected = []
+        for root in self.roots():
+            if root in changed:
+                affected.append(root)
+                continue
+            index = get_source_index(str(root))
+            if any(index.contains(p) for p in changed):
+                affected.append(root)
+        return affected
+
+    async def _loop(self) -> None:
+        while True:
+            changed = await self._next_batch()
+            # Edits that arrived while the previous batch ran are already queued
+            # and get coalesced into this batch by _next_batch()
+            try:
+                await self._run_batch(changed)
+            except Exception as e:
+                self.failed_batches += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception(f"Watch {self.id}: batch of {len(changed)} change(s) failed")
+
+    async def _run_batch(self, changed: set[Path]) -> None:
+        affected = await asyncio.to_thread(self.affected, changed)
+        if not affected:
+            return
+        logger.info(f"Watch {self.id}: {len(changed)} change(s) -> re-running {len(affected)} script(s)")
+        deltas = []
+        for script in affected:
+            result = await run_ahk_launcher(str(script), self.version, self.timeout_ms, screenshot=False)
+            self.run_count += 1
+            outcome = _outcome(result)
+            previous = self.results.get(str(script))
+            self.results[str(script)] = outcome
+            if previous is None or (previous["status"], previous.get("fingerprint")) != (outcome["status"], outcome.get("fingerprint")):
+                deltas.append({
+                    "script": str(script),
+                    "previous": previous["status"] if previous else None,
+                    **outcome,
+                })
+        await self._notify(deltas, len(affected))
+
+    async def _notify(self, deltas: list[dict], rerun: int) -> None:
+        if self.session is None:
+            return
+        payload = {"watchId": self.id, "rerun": rerun, "unchanged": rerun - len(deltas), "deltas": deltas}
+        try:
+            await self.session.send_resource_updated(AnyUrl(self.uri))
+            if deltas:
+                await self.session.send_log_message(level="info", data=payload, logger="ahk_watch")
+        except Exception as e:
+            logger.warning(f"Watch {self.id}: could not notify client ({e}), stopping")
+            asyncio.create_task(stop_watch(self.id))
+
+
+_sessions: dict[str, WatchSession] = {}
+
+registry.gauge("ahk_watch_sessions", "Active watch sessions", function=lambda: len(_sessions))
+
+
+async def start_watch(directory: str, **kwargs) -> WatchSession:
+    """Create and start a WatchSession (see WatchSession for arguments)."""
+    watch = WatchSession(directory, **kwargs)
+    watch.start()
+    _sessions[watch.id] = watch
+    return watch
+
+
+async def stop_watch(watch_id: str) -> bool:
+    watch = _sessions.pop(watch_id, None)
+    if watch is None:
+        return False
+    await watch.stop()
+    return True
+
+
+def get_watch(watch_id: str) -> Optional[WatchSession]:
+    return _sessions.get(watch_id)
+
+
+def list_watches() -> list[WatchSession]:
+    return list(_sessions.values())
@@ -0,0 +1,398 @@
+"""Structured logging: background JSON-lines writer with correlation IDs.
+
+Loggers only enqueue records (QueueHandler); a QueueListener thread formats
+them and writes one JSON object per line to logs/mcp-server.jsonl. Message
+arguments are formatted on that thread, never on the event loop.
+
+Every record carries the correlation ID of the tool invocation that produced
+it (`cid`) and, during ahk_run_script, its run ID. Records with a run ID or
+status are indexed by byte offset as they are written; rotated files are
+gzip-compressed next to a small JSON sidecar holding their index, so
+query_logs() seeks straight to matching lines instead of scanning files.
+
+Environment:
+    AHK_MCP_LOG_LEVEL         file log level (default DEBUG)
+    AHK_MCP_LOG_DEBUG_SAMPLE  fraction of DEBUG records kept per call site (default 1.0)
+"""
+import atexit
+import contextvars
+import functools
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
+
+LOG_FILE_NAME = "mcp-server.jsonl"
+MAX_BYTES = 2 * 1024 * 1024
+BACKUP_COUNT = 5
+
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ahk_correlation_id", default=None)
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ahk_run_id", default=None)
+
+# Record attributes copied into the JSON object when present (logger.info(..., extra={...}))
+_EXTRA_FIELDS = ("tool", "status", "script", "duration_ms")
+
+_json_handler: Optional["JsonLinesHandler"] = None
+_listener: Optional[QueueListener] = None
+
+
+# -- correlation ------------------------------------------------------
+
+def correlated(tool_name: str):
+    """Decorator for tool handlers: give each invocation its own correlation ID."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cid_token = _correlation_id.set(uuid.uuid4().hex[:8])
+            run_token = _run_id.set(None)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                logging.getLogger("ahk_mcp.tools").debug(
+                    "%s finished in %dms", tool_name, (time.perf_counter() - start) * 1000,
+                    extra={"tool": tool_name}
+                )
+                _run_id.reset(run_token)
+                _correlation_id.reset(cid_token)
+        return wrapper
+    return decorator
+
+
+def bind_run(run_id: str) -> None:
+    """Tag every following record of the current invocation with `run_id`."""
+    _run_id.set(run_id)
+
+
+def current_correlation_id() -> Optional[str]:
+    return _correlation_id.get()
+
+
+class _ContextFilter(logging.Filter):
+    """Copy the context variables onto the record (in the caller, before enqueueing)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "cid"):
+            record.cid = _correlation_id.get()
+        if not hasattr(record, "run_id"):
+            record.run_id = _run_id.get()
+        return True
+
+
+class _DebugSampler(logging.Filter):
+    """Keep one DEBUG record in every N per call site; other levels pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts: dict[tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        key = (record.pathname, record.lineno)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Enqueue the record as-is: message formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# -- JSON lines -------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "cid", None):
+            entry["cid"] = record.cid
+        if getattr(record, "run_id", None):
+            entry["run_id"] = record.run_id
+        for field in _EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _index_keys(entry: dict) -> list[str]:
+    keys = []
+    if entry.get("run_id"):
+        keys.append(f"run:{entry['run_id']}")
+    if entry.get("status"):
+        keys.append(f"status:{entry['status']}")
+    return keys
+
+
+class JsonLinesHandler(logging.Handler):
+    """
+    JSON-lines file with an offset index and compressed rotation.
+
+    Rotated files are named mcp-server.<timestamp>.jsonl.gz and each has a
+    .idx.json sidecar mapping "run:<id>" / "status:<STATUS>" to the offsets of
+    matching lines in the uncompressed stream.
+    """
+
+    def __init__(self, log_dir: Path, max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT):
+        super().__init__()
+        self.log_dir = Path(log_dir)
+        self.path = self.log_dir / LOG_FILE_NAME
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.index: dict[str, list[int]] = {}
+        self._index_lock = threading.Lock()
+        self._stream = None
+        self._open()
+
+    def _open(self) -> None:
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self._rebuild_index()
+        self._stream = open(self.path, "ab")
+
+    def _rebuild_index(self) -> None:
+        """Index the current file once at startup (it is at most max_bytes)."""
+        index: dict[str, list[int]] = {}
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    keys = _index_keys(json.loads(line))
+                except ValueError:
+                    keys = []
+                for key in keys:
+                    index.setdefault(key, []).append(offset)
+                offset += len(line)
+        self.index = index
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+            data = line.encode("utf-8") + b"\n"
+            if self._stream.tell() + len(data) > self.max_bytes:
+                self._rollover()
+            offset = self._stream.tell()
+            self._stream.write(data)
+
+            keys = []
+            if getattr(record, "run_id", None):
+                keys.append(f"run:{record.run_id}")
+            if getattr(record, "status", None):
+                keys.append(f"status:{record.status}")
+            if keys:
+                with self._index_lock:
+                    for key in keys:
+                        self.index.setdefault(key, []).append(offset)
+        except Exception:
+            self.handleError(record)
+
+    def _rollover(self) -> None:
+        self._stream.close()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        rotated = self.log_dir / f"mcp-server.{stamp}.jsonl.gz"
+        with open(self.path, "rb") as src, gzip.open(rotated, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        with self._index_lock:
+            sidecar = json.dumps(self.index, separators=(",", ":"))
+            self.index = {}
+        Path(f"{rotated}.idx.json").write_text(sidecar, encoding="utf-8")
+        self.path.unlink()
+
+        for old in rotated_files(self.log_dir)[self.backup_count:]:
+            old.unlink(missing_ok=True)
+            Path(f"{old}.idx.json").unlink(missing_ok=True)
+
+        self._stream = open(self.path, "ab")
+
+    def flush(self) -> None:
+        # Called by readers (query_logs); emit() leaves writes buffered
+        self.acquire()
+        try:
+            if self._stream:
+                self._stream.flush()
+        finally:
+            self.release()
+
+    def offsets(self, key: str) -> list[int]:
+        with self._index_lock:
+            return list(self.index.get(key, ()))
+
+    def close(self) -> None:
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+
+def rotated_files(log_dir: Path) -> list[Path]:
+    """Compressed log files, newest first."""
+    return sorted(Path(log_dir).glob("mcp-server.*.jsonl.gz"), reverse=True)
+
+
+# -- setup ------------------------------------------------------------
+
+def setup_logging(log_dir: Path, stderr_level: int = logging.INFO) -> QueueListener:
+    """
+    Route all logging through a queue to the JSON-lines file and stderr.
+
+    Returns:
+        The started QueueListener (stopped automatically at exit)
+    """
+    global _json_handler, _listener
+
+    json_handler = JsonLinesHandler(log_dir)
+    json_handler.setLevel(os.environ.get("AHK_MCP_LOG_LEVEL", "DEBUG").upper())
+    json_handler.setFormatter(JsonFormatter())
+
+    # Also log to stderr for MCP inspector debugging
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    stderr_handler.setLevel(stderr_level)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _LazyQueueHandler(log_queue)
+    queue_handler.addFilter(_DebugSampler(float(os.environ.get("AHK_MCP_LOG_DEBUG_SAMPLE", "1.0"))))
+    queue_handler.addFilter(_ContextFilter())
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(logging.DEBUG)
+
+    listener = QueueListener(log_queue, json_handler, stderr_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    _json_handler = json_handler
+    _listener = listener
+    return listener
+
+
+# -- queries ----------------------------------------------------------
+
+def _read_at(path: Path, offsets: list[int]) -> list[dict]:
+    entries = []
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            try:
+                entries.append(json.loads(f.readline()))
+            except ValueError:
+                pass
+    return entries
+
+
+def _read_gz_at(path: Path, offsets: list[int]) -> list[dict]:
+    """Read lines at offsets of the uncompressed stream (stops after the last one)."""
+    wanted = set(offsets)
+    last = max(offsets)
+    entries = []
+    with gzip.open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if offset in wanted:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+            if offset >= last:
+                break
+            offset += len(line)
+    return entries
+
+
+def _tail(path: Path, count: int, chunk: int = 64 * 1024) -> list[dict]:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - chunk))
+        lines = f.read().splitlines()[-count:]
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            pass
+    return entries
+
+
+def query_logs(
+    run_id: Optional[str] = None,
+    status: Optional[str] = None,
+    level: Optional[str] = None,
+    limit: int = 50
+) -> Optional[list[dict]]:
+    """
+    Structured log records matching a run ID and/or status, oldest first.
+
+    Without run_id/status the tail of the current file is returned. Only the
+    offsets listed in the in-memory index (current file) and in the sidecars
+    (rotated files) are read.
+
+    Returns:
+        Matching records (at most `limit`), or None if setup_logging() was not called
+    """
+    handler = _json_handler
+    if handler is None:
+        return None
+
+    min_level = logging.getLevelName(level.upper()) if level else logging.DEBUG
+
+    def keep(entry: dict) -> bool:
+        if run_id and entry.get("run_id") != run_id:
+            return False
+        if status and entry.get("status") != status:
+            return False
+        return logging.getLevelName(entry.get("level", "DEBUG")) >= min_level
+
+    key = f"run:{run_id}" if run_id else f"status:{status}"
+    # The handler lock keeps the listener thread from rotating the file between
+    # the flush, the index lookup and the reads of the current file; rotated
+    # files are listed at the same point so no line is read twice or missed
+    handler.acquire()
+    try:
+        handler.flush()
+        if not run_id and not status:
+            return [e for e in _tail(handler.path, limit * 4) if keep(e)][-limit:]
+        results = [e for e in _read_at(handler.path, handler.offsets(key)) if keep(e)]
+        rotated = rotated_files(handler.log_dir)
+    finally:
+        handler.release()
+
+    for path in rotated:
+        if len(results) >= limit:
+            break
+        try:
+            sidecar = json.loads(Path(f"{path}.idx.json").read_text(encoding="utf-8"))
+            offsets = sidecar.get(key)
+            if offsets:
+                results = [e for e in _read_gz_at(path, offsets) if keep(e)] + results
+        except (OSError, ValueError, EOFError):
+            # Deleted by a later rotation (past backup_count) while reading
+            continue
+
+    return results[-limit:]
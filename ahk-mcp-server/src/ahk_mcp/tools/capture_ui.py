@@ -1,12 +1,15 @@
 """Tool: ahk_capture_ui - Capture screenshot of AHK window UI."""
 import logging
-from typing import Annotated, Optional
+from typing import Annotated, Optional, Union
 from pathlib import Path
 
 from fastmcp import Context
+from fastmcp.tools.tool import ToolResult
 from pydantic import Field
 
-from ..services.powershell import capture_window_screenshot
+from ..services.image_content import IMAGE_MAX_DIM, IMAGE_QUALITY, describe, image_response, inline_screenshot
+from ..services.powershell import SCREENSHOTS_DIR, capture_window_screenshot
+from ..services.stabilize import STABLE_FRAMES, STABLE_MAX_MS
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +18,13 @@ async def ahk_capture_ui(
     ctx: Context,
     window_title: Annotated[Optional[str], Field(description="Window title to capture (partial match)")] = None,
     window_handle: Annotated[Optional[str], Field(description="Window handle from ahk_run_script result")] = None,
-) -> str:
+    wait_stable: Annotated[bool, Field(description="Wait until the window stops changing before capturing")] = False,
+    stable_frames: Annotated[int, Field(description="Consecutive unchanged frames required (1-10)", ge=1, le=10)] = STABLE_FRAMES,
+    max_wait_ms: Annotated[int, Field(description="Cap on the stabilization wait in milliseconds (200-10000)", ge=200, le=10000)] = STABLE_MAX_MS,
+    inline: Annotated[bool, Field(description="Return the screenshot as image content instead of a file path")] = False,
+    max_dimension: Annotated[int, Field(description="Inline images: longest side in pixels after downscaling (64-4096)", ge=64, le=4096)] = IMAGE_MAX_DIM,
+    quality: Annotated[int, Field(description="Inline images: JPEG/WebP quality (1-100)", ge=1, le=100)] = IMAGE_QUALITY,
+) -> Union[str, ToolResult]:
     """
     Capture a screenshot of an AutoHotkey script's window/UI.
 
@@ -25,10 +34,14 @@ async def ahk_capture_ui(
     - window_handle: The exact window handle from ahk_run_script result
 
     The screenshot allows visual verification that the AHK script's UI matches the expected design.
+    With wait_stable=True, frames are compared until stable_frames in a row are unchanged
+    (or max_wait_ms elapses) so a GUI that is still drawing is not captured half built.
 
-    Returns the path to the captured screenshot image.
+    Returns the path to the captured screenshot image. With inline=True the image is
+    returned as image content instead, downscaled to max_dimension and encoded in
+    memory; an image still larger than the size budget is saved and returned by path.
     """
-    logger.info(f"ahk_capture_ui called: title={window_title}, handle={window_handle}")
+    logger.info(f"ahk_capture_ui called: title={window_title}, handle={window_handle}, stable={wait_stable}, inline={inline}")
 
     if not window_title and not window_handle:
         return (
@@ -40,9 +53,17 @@ async def ahk_capture_ui(
 
     result = await capture_window_screenshot(
         window_title=window_title,
-        window_handle=window_handle
+        window_handle=window_handle,
+        stable=wait_stable,
+        stable_frames=stable_frames,
+        max_wait_ms=max_wait_ms,
+        inline=inline
     )
 
+    image = reason = None
+    if result.get("success") and inline:
+        image, reason = await inline_screenshot(result, str(SCREENSHOTS_DIR), max_dim=max_dimension, quality=quality)
+
     if result.get("success"):
         screenshot_path = result.get("screenshot_path", "")
         window_title_found = result.get("window_title", "Unknown")
@@ -54,11 +75,33 @@ async def ahk_capture_ui(
             f"**Window Title**: {window_title_found}",
             f"**Dimensions**: {dimensions.get('width', 0)}x{dimensions.get('height', 0)}",
             f"**Position**: ({dimensions.get('left', 0)}, {dimensions.get('top', 0)})",
+        ]
+
+        stabilization = result.get("stabilization")
+        if stabilization:
+            if stabilization.get("stable"):
+                response_lines.append(
+                    f"**Stabilization**: stable after {stabilization.get('frames', 0)} frames "
+                    f"({stabilization.get('elapsedMs', 0)} ms)"
+                )
+            else:
+                response_lines.append(
+                    f"**Stabilization**: not stable within {stabilization.get('elapsedMs', 0)} ms "
+                    f"({stabilization.get('frames', 0)} frames); last frame kept"
+                )
+
+        if image:
+            response_lines.extend(["", f"**Screenshot**: {describe(image)}"])
+            return image_response("\n".join(response_lines), image)
+
+        if reason:
+            response_lines.extend(["", f"_Not inlined: {reason}._"])
+        response_lines.extend([
             "",
             f"**Screenshot Path**: `{screenshot_path}`",
             "",
             "_Use the Read tool to view the screenshot and verify the UI design._"
-        ]
+        ])
 
         return "\n".join(response_lines)
 
@@ -0,0 +1,51 @@
+"""Tool: ahk_query_logs - Query the structured server logs."""
+import asyncio
+import logging
+from typing import Annotated, Literal, Optional
+
+from fastmcp import Context
+from pydantic import Field
+
+from ..structured_logging import query_logs
+
+logger = logging.getLogger(__name__)
+
+
+async def ahk_query_logs(
+    ctx: Context,
+    run_id: Annotated[Optional[str], Field(description="Run ID from ahk_run_script")] = None,
+    status: Annotated[Optional[Literal["SUCCESS", "ERROR", "RUNNING", "TIMEOUT", "CONFIG_ERROR"]], Field(description="Only runs that ended with this status")] = None,
+    level: Annotated[Optional[Literal["DEBUG", "INFO", "WARNING", "ERROR"]], Field(description="Minimum log level")] = None,
+    limit: Annotated[int, Field(description="Maximum records returned (most recent)", ge=1, le=500)] = 50,
+) -> str:
+    """
+    Query the server's structured (JSON-lines) logs.
+
+    With run_id, returns every record logged during that run (launcher command,
+    process reaping, deferred capture...). With status, returns the final record
+    of each run that ended with that status. Without filters, returns the most
+    recent records. Matching lines are located through an offset index, so
+    large or rotated log files are not scanned.
+    """
+    logger.info("ahk_query_logs called: run_id=%s, status=%s, level=%s", run_id, status, level)
+
+    try:
+        records = await asyncio.to_thread(query_logs, run_id, status, level, limit)
+    except OSError as e:
+        return f"## Error: Log Query Failed\n\n{e}"
+
+    if records is None:
+        return "## Error: Structured Logging Not Configured\n\nStart the server with run_server.py to enable the JSON-lines log."
+
+    filters = ", ".join(f"{k}={v}" for k, v in (("run_id", run_id), ("status", status), ("level", level)) if v) or "none"
+    if not records:
+        return f"No log records found (filters: {filters})."
+
+    lines = [f"## Log Records ({len(records)})", "", f"Filters: {filters}", "", "```"]
+    for record in records:
+        tags = " ".join(f"{k}={record[k]}" for k in ("cid", "run_id", "status") if record.get(k))
+        lines.append(f"{record.get('ts')} {record.get('level', ''):<7} [{record.get('logger')}] {tags} {record.get('msg')}")
+        if record.get("exc"):
+            lines.append(record["exc"])
+    lines.append("```")
+    return "\n".join(lines)
@@ -0,0 +1,76 @@
+"""Tool: ahk_run_batch - Run many AHK scripts with cost-aware scheduling."""
+import logging
+from pathlib import Path
+from typing import Annotated, Literal, Optional
+
+from fastmcp import Context
+from pydantic import Field
+
+from ..services.quotas import current_client_id
+from ..services.scheduler import run_batch
+from ..services.watcher import find_root_scripts
+
+logger = logging.getLogger(__name__)
+
+
+async def ahk_run_batch(
+    ctx: Context,
+    scripts: Annotated[Optional[list[str]], Field(description="Absolute paths of the scripts to run")] = None,
+    directory: Annotated[Optional[str], Field(description="Run every root script of this directory (not #Included by another)")] = None,
+    version: Annotated[str, Field(description="AutoHotkey version: V1, V2, or Auto (default)")] = "Auto",
+    timeout_ms: Annotated[int, Field(description="Timeout per run in milliseconds (500-30000)", ge=500, le=30000)] = 3000,
+    workers: Annotated[int, Field(description="Runs in flight at once (also capped by the per-client quota)", ge=1, le=16)] = 4,
+    order: Annotated[Literal["longest", "fail_fast", "input"], Field(description="longest: predicted longest first (shortest batch); fail_fast: previous failures, then quickest verdicts first; input: as given")] = "longest",
+    stop_on_failure: Annotated[bool, Field(description="Start no new run once one returned ERROR")] = False,
+) -> str:
+    """
+    Run several AHK scripts in parallel, scheduled by predicted runtime.
+
+    Each script's runtime is predicted from its own past runs, or from its size,
+    #Include depth and Gui/Persistent/SetTimer/hotkey directives (resident
+    scripts use the whole timeout window). Longest-first dispatch keeps those
+    from finishing last; fail_fast surfaces errors as early as possible.
+    The report compares predicted and actual times per script and per batch.
+    """
+    logger.info(f"ahk_run_batch called: {len(scripts or [])} script(s), directory={directory}, workers={workers}, order={order}")
+
+    if not scripts:
+        if not directory or not Path(directory).is_dir():
+            return "## Error: Missing Scripts\n\nProvide `scripts` or an existing `directory`."
+        scripts = [str(p) for p in find_root_scripts(Path(directory))]
+    missing = [s for s in scripts if not Path(s).is_file()]
+    if missing:
+        return "## Error: Script Not Found\n\n" + "\n".join(f"- `{s}`" for s in missing)
+    if not scripts:
+        return f"## No Scripts\n\nNo .ahk root scripts in `{directory}`."
+
+    version_upper = version.upper() if version else "AUTO"
+    if version_upper in ("V1", "1"):
+        version = "V1"
+    elif version_upper in ("V2", "2"):
+        version = "V2"
+    else:
+        version = "Auto"
+
+    report = await run_batch(scripts, version, timeout_ms, workers, order, stop_on_failure, client_id=current_client_id())
+
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(report["statuses"].items()))
+    lines = [
+        "## Batch Result",
+        "",
+        f"**Scripts**: {len(scripts)} ({statuses})",
+        f"**Order**: {order}, {workers} worker(s)",
+        f"**Batch time**: {report['actualMakespanMs']}ms actual, {report['predictedMakespanMs']}ms predicted "
+        f"({report['inputOrderMakespanMs']}ms predicted in input order)",
+        f"**Mean prediction error**: {report['meanAbsErrorMs']}ms",
+        "",
+        "| Script | Status | Predicted | Actual | Source |",
+        "|---|---|---|---|---|",
+    ]
+    for job in report["scripts"]:
+        actual = f"{job['actualMs']}ms" if "actualMs" in job else "-"
+        lines.append(f"| `{Path(job['script']).name}` | {job['status']} | {job['predictedMs']}ms | {actual} | {job['source']} |")
+
+    if any(job.get("fingerprint") for job in report["scripts"]):
+        lines.extend(["", "Errors are grouped at `ahk://errors/clusters`; re-run a script with `ahk_run_script` for details."])
+    return "\n".join(lines)
@@ -1,12 +1,23 @@
 """Tool: ahk_run_script - Execute and test AutoHotkey scripts."""
+import asyncio
 import logging
-from typing import Annotated
+from typing import Annotated, Literal, Optional, Union
 from pathlib import Path
 
 from fastmcp import Context
+from fastmcp.tools.tool import ToolResult
 from pydantic import Field
 
+from ..services.artifacts import artifact_store
 from ..services.powershell import run_ahk_launcher
+from ..services.deferred_capture import get_capture, publish_capture, schedule_capture
+from ..services.image_content import describe, image_response, inline_screenshot
+from ..services.process_tree import ProcessTree
+from ..services.error_index import error_index
+from ..services.output_capture import output_forwarder
+from ..services.source_index import locate_error
+from ..structured_logging import bind_run
+from ..formatting import build_run_result, render_compact, render_json, truncate_source_code
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +27,13 @@ async def ahk_run_script(
     script_path: Annotated[str, Field(description="Absolute path to the .ahk script file to execute")],
     version: Annotated[str, Field(description="AutoHotkey version: V1, V2, or Auto (default)")] = "Auto",
     timeout_ms: Annotated[int, Field(description="Timeout in milliseconds (500-30000)", ge=500, le=30000)] = 3000,
-) -> str:
+    format: Annotated[Literal["markdown", "json", "compact"], Field(description="Response format: markdown (default), json or compact (one line)")] = "markdown",
+    token_budget: Annotated[Optional[int], Field(description="Approximate token budget for source code context around the failing line", ge=10)] = None,
+    snapshot: Annotated[bool, Field(description="Copy the script and its #Include files into the run's artifact directory")] = False,
+    capture_output: Annotated[bool, Field(description="Capture the script's stdout/stderr (FileAppend to * / **), stream it as log notifications and return its tail")] = False,
+    output_kb: Annotated[int, Field(description="Tail of each captured stream kept in the result, in KB (1-1024)", ge=1, le=1024)] = 16,
+    inline_images: Annotated[bool, Field(description="On ERROR, wait for the error window screenshot and return it as image content")] = False,
+) -> Union[str, ToolResult]:
     """
     Execute an AutoHotkey script and detect if it works or has errors.
 
@@ -29,10 +46,29 @@ async def ahk_run_script(
     - TIMEOUT: Script monitoring timed out (usually means SUCCESS for GUI scripts)
     - CONFIG_ERROR: Configuration issue (script not found, AHK not installed, etc.)
 
-    The screenshot of the error window (if any) is returned in the result and can be
-    viewed by the LLM to understand the exact error.
+    The error/success window is captured in the background after the result is returned;
+    the response includes the pending resource URI (ahk://runs/{run_id}/screenshot).
+
+    Each run gets its own artifact directory (result.json, launcher log, screenshots
+    and, with snapshot=True, a copy of the script's include closure), listed by the
+    ahk://runs/{run_id} resource.
+
+    With capture_output=True the script's stdout/stderr are tailed while it runs:
+    new output is pushed to the client as "ahk_output" log notifications and the
+    last output_kb KB of each stream are returned (stdout.log/stderr.log stay in
+    the run directory), which verifies console scripts without a screenshot.
+
+    With inline_images=True an ERROR response waits for the error window capture
+    and carries it as image content (downscaled, see AHK_MCP_IMAGE_*), so no
+    separate resource read is needed; a capture over the size budget is only
+    served at the resource URI.
+
+    Formats:
+    - markdown: Human-readable report with advice (default)
+    - json: RunScriptResult serialized as JSON
+    - compact: Single line "STATUS | time | run=id | error signature"
     """
-    logger.info(f"ahk_run_script called: {script_path} (version={version}, timeout={timeout_ms})")
+    logger.info("ahk_run_script called: %s (version=%s, timeout=%s, format=%s)", script_path, version, timeout_ms, format)
 
     # Normalize and validate version parameter (case-insensitive)
     version_upper = version.upper() if version else "AUTO"
@@ -43,13 +79,26 @@ async def ahk_run_script(
     else:
         version = "Auto"
 
+    run = await asyncio.to_thread(artifact_store.create, script_path, snapshot)
+    artifact_store.start_gc()
+    run_id = run.run_id
+    run_dir = str(run.directory)
+    bind_run(run_id)
+
     # Run the script through PowerShell wrapper
-    # v1.8.1: Disable screenshot for faster returns - use ahk_capture_ui for screenshots
+    # v1.8.1: Disable in-launcher screenshot for faster returns - the window is
+    # captured by a deferred background task instead (the launcher keeps the
+    # AHK error window open for it)
     result = await run_ahk_launcher(
         script_path=script_path,
         version=version,
         timeout_ms=timeout_ms,
-        screenshot=False  # Disabled for speed - use ahk_capture_ui separately
+        screenshot=False,
+        keep_error_window=True,
+        run_dir=run_dir,
+        capture_output=capture_output,
+        output_bytes=output_kb * 1024,
+        on_output=output_forwarder(ctx, run_id) if capture_output else None
     )
 
     # Format response for LLM consumption
@@ -60,6 +109,54 @@ async def ahk_run_script(
     window_handle = result.get("windowHandle")
     execution_time = result.get("executionTimeMs", 0)
     tray_icon = result.get("trayIcon", "NOT_CHECKED")
+    reaped = result.get("reapedProcesses") or []
+    process_id = result.get("processId")
+
+    screenshot_uri = None
+    if result.get("runner") and screenshot:
+        # Dispatched run: the runner captured (and reaped) the window itself
+        screenshot_uri = publish_capture(run_id, {"success": True, "screenshot_path": screenshot})
+    elif window_handle and status in ("ERROR", "SUCCESS", "RUNNING"):
+        screenshot_uri = schedule_capture(
+            run_id,
+            window_handle=window_handle,
+            reap_pid=process_id if status == "ERROR" else None,
+            output_dir=str(run.screenshots_dir),
+            # Error dialogs are static; script GUIs may still be drawing
+            stable=status != "ERROR"
+        )
+    elif status == "ERROR" and process_id:
+        # No window to capture: reap the process the launcher left alive
+        reaped = reaped + await asyncio.to_thread(ProcessTree(process_id).reap)
+        result["reapedProcesses"] = reaped
+
+    image = None
+    if inline_images and status == "ERROR" and screenshot_uri:
+        capture = await get_capture(run_id)
+        if capture and capture.get("success"):
+            image, _ = await inline_screenshot(dict(capture), str(run.screenshots_dir))
+
+    fingerprint = None
+    location = None
+    if status == "ERROR":
+        fingerprint = error_index.add(result, run_id=run_id, script_path=script_path)
+        location = await asyncio.to_thread(locate_error, script_path, result)
+
+    await asyncio.to_thread(artifact_store.finalize, run, {
+        **result,
+        "runId": run_id,
+        "errorFingerprint": fingerprint,
+        "sourceLocation": location,
+    })
+    logger.info(
+        "Run %s finished: %s in %sms", run_id, status, execution_time,
+        extra={"status": status, "script": script_path, "duration_ms": execution_time}
+    )
+
+    if format == "compact":
+        return image_response(render_compact(result, run_id, screenshot_uri, fingerprint, location), image)
+    if format == "json":
+        return image_response(render_json(build_run_result(result, run_id, screenshot_uri, token_budget, fingerprint, location, run_dir)), image)
 
     # Build response
     response_lines = [
@@ -67,8 +164,31 @@ async def ahk_run_script(
         "",
         f"**Script**: `{script_path}`",
         f"**Execution Time**: {execution_time}ms",
+        f"**Run ID**: {run_id}",
+        f"**Artifacts**: `{run_dir}` (see `ahk://runs/{run_id}`)",
     ]
 
+    usage = result.get("resources")
+    if usage:
+        response_lines.append(
+            f"**Resources**: {usage['cpuTimeS']}s CPU, {usage['peakRssMb']} MB peak RSS, "
+            f"{usage['peakThreads']} threads, {usage['peakHandles']} handles, {usage['children']} process(es)"
+        )
+    for violation in result.get("overBudget") or []:
+        response_lines.append(f"**Over Budget**: {violation['resource']} {violation['value']} > {violation['budget']:g}")
+
+    race = result.get("speculative")
+    if race:
+        outcomes = ", ".join(f"{v} {outcome}" for v, outcome in sorted(race["outcomes"].items()))
+        response_lines.append(f"**Interpreter**: {race.get('winner') or 'undecided'} (V1 and V2 raced: {outcomes})")
+    elif result.get("ahkVersion") and version == "Auto":
+        response_lines.append(f"**Interpreter**: {result['ahkVersion']}")
+
+    if image:
+        response_lines.append(f"**Screenshot**: {describe(image)} (full size at `{screenshot_uri}`)")
+    elif screenshot_uri:
+        response_lines.append(f"**Screenshot**: pending at `{screenshot_uri}` (read the resource to get the image)")
+
     if status == "SUCCESS":
         response_lines.extend([
             "",
@@ -82,6 +202,7 @@ async def ahk_run_script(
         response_lines.extend([
             "",
             f"**Error Message**: {message}",
+            f"**Error Fingerprint**: `{fingerprint}` (see ahk://errors/clusters)",
         ])
 
         if error_details:
@@ -101,7 +222,7 @@ async def ahk_run_script(
                 response_lines.append("")
                 response_lines.append("**Source Code Context**:")
                 response_lines.append("```")
-                for line in error_details["sourceCode"]:
+                for line in truncate_source_code(error_details["sourceCode"], token_budget):
                     response_lines.append(line)
                 response_lines.append("```")
 
@@ -109,6 +230,16 @@ async def ahk_run_script(
                 response_lines.append("")
                 response_lines.append(f"**Buttons**: {', '.join(error_details['buttons'])}")
 
+        if location:
+            response_lines.extend([
+                "",
+                "### Source Location",
+                f"**File**: `{location['file']}` line {location['line']}",
+                "```",
+                *location["context"],
+                "```",
+            ])
+
         if screenshot and Path(screenshot).exists():
             response_lines.extend([
                 "",
@@ -147,4 +278,15 @@ async def ahk_run_script(
             "- The script has valid .ahk extension"
         ])
 
-    return "\n".join(response_lines)
+    if reaped:
+        response_lines.extend([
+            "",
+            f"**Reaped Processes** ({len(reaped)}): "
+            + ", ".join(f"{p['name']} (PID {p['pid']})" for p in reaped),
+        ])
+
+    for name, stream in (result.get("output") or {}).items():
+        kept = f"last {len(stream['tail'].encode('utf-8'))} of {stream['bytes']} bytes" if stream["truncated"] else f"{stream['bytes']} bytes"
+        response_lines.extend(["", f"### {name} ({kept})", "```", stream["tail"].rstrip("\n"), "```"])
+
+    return image_response("\n".join(response_lines), image)
@@ -0,0 +1,91 @@
+"""Tool: ahk_run_tests - Run AHK unit tests in parallel shards."""
+import json
+import logging
+from pathlib import Path
+from typing import Annotated, Literal, Optional
+
+from fastmcp import Context
+from pydantic import Field
+
+from ..services.quotas import current_client_id
+from ..services.test_runner import DEFAULT_PATTERNS, discover_tests, junit_xml, run_tests
+
+logger = logging.getLogger(__name__)
+
+
+async def ahk_run_tests(
+    ctx: Context,
+    tests: Annotated[Optional[list[str]], Field(description="Absolute paths of the test files to run")] = None,
+    directory: Annotated[Optional[str], Field(description="Run every test file under this directory")] = None,
+    patterns: Annotated[Optional[list[str]], Field(description="File name patterns of test files in `directory` (default test_*.ahk, *_test.ahk, *.test.ahk)")] = None,
+    version: Annotated[str, Field(description="AutoHotkey version: V1, V2, or Auto (default)")] = "Auto",
+    timeout_ms: Annotated[int, Field(description="Timeout per test file in milliseconds (500-30000)", ge=500, le=30000)] = 5000,
+    shards: Annotated[int, Field(description="Test files run in this many parallel shards", ge=1, le=16)] = 4,
+    format: Annotated[Literal["markdown", "json", "junit"], Field(description="Response format: markdown (default), json (merged report) or junit (JUnit XML)")] = "markdown",
+) -> str:
+    """
+    Run AHK test files and report per-test pass/fail results.
+
+    Test files call AhkTest(name), AhkAssert(condition, message) and
+    AhkAssertEqual(actual, expected, message); the reporter that defines
+    them is injected by the runner, which also works out the V1/V2 dialect.
+    Files are balanced over parallel shards by predicted runtime. A file
+    that stops with an error dialog reports its open test as an error.
+
+    The merged report (result.json) and junit.xml are kept in the run's
+    artifact directory (ahk://runs/{run_id}).
+    """
+    logger.info(f"ahk_run_tests called: {len(tests or [])} file(s), directory={directory}, shards={shards}")
+
+    if not tests:
+        if not directory or not Path(directory).is_dir():
+            return "## Error: Missing Tests\n\nProvide `tests` or an existing `directory`."
+        tests = [str(p) for p in discover_tests(Path(directory), patterns or DEFAULT_PATTERNS)]
+        if not tests:
+            return f"## No Tests\n\nNo files matching {', '.join(patterns or DEFAULT_PATTERNS)} in `{directory}`."
+    missing = [t for t in tests if not Path(t).is_file()]
+    if missing:
+        return "## Error: Test File Not Found\n\n" + "\n".join(f"- `{t}`" for t in missing)
+
+    version_upper = version.upper() if version else "AUTO"
+    if version_upper in ("V1", "1"):
+        version = "V1"
+    elif version_upper in ("V2", "2"):
+        version = "V2"
+    else:
+        version = "Auto"
+
+    report = await run_tests(tests, version, timeout_ms, shards, client_id=current_client_id())
+
+    if format == "json":
+        return json.dumps(report, ensure_ascii=False)
+    if format == "junit":
+        return junit_xml(report)
+
+    totals = report["totals"]
+    verdict = "PASSED" if not totals["failed"] and not totals["errors"] else "FAILED"
+    lines = [
+        f"## Tests {verdict}",
+        "",
+        f"**Tests**: {totals['tests']} ({totals['passed']} passed, {totals['failed']} failed, {totals['errors']} errors), "
+        f"{totals['assertions']} assertions in {totals['files']} file(s)",
+        f"**Time**: {report['durationMs']}ms over {report['shards']} shard(s) (busiest shard {max(report['shardMs'], default=0)}ms)",
+        f"**Run ID**: `{report['runId']}` (JUnit XML: `{report['junitPath']}`)",
+        "",
+        "| File | Shard | Tests | Failed | Time |",
+        "|---|---|---|---|---|",
+    ]
+    for outcome in report["files"]:
+        bad = sum(t["status"] != "passed" for t in outcome["tests"])
+        lines.append(f"| `{Path(outcome['file']).name}` | {outcome['shard']} | {len(outcome['tests'])} | {bad} | {outcome['durationMs']}ms |")
+
+    problems = [(outcome, test) for outcome in report["files"] for test in outcome["tests"] if test["status"] != "passed"]
+    if problems:
+        lines.extend(["", "### Failures", ""])
+        for outcome, test in problems:
+            name = f"{Path(outcome['file']).name} :: {test['name']}"
+            if test["status"] == "error":
+                lines.append(f"- **{name}** (error): {test['error'].splitlines()[0] if test['error'] else ''}")
+            else:
+                lines.append(f"- **{name}**: " + "; ".join(test["failures"]))
+    return "\n".join(lines)
@@ -0,0 +1,89 @@
+"""Tool: ahk_watch - Re-validate AHK scripts when files change."""
+import asyncio
+import logging
+from pathlib import Path
+from typing import Annotated, Literal, Optional
+
+from fastmcp import Context
+from pydantic import Field
+
+from ..services.watcher import (
+    DEFAULT_DEBOUNCE_MS,
+    list_watches,
+    start_watch,
+    stop_watch,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def ahk_watch(
+    ctx: Context,
+    action: Annotated[Literal["start", "stop", "list"], Field(description="start a watch, stop one, or list active watches")] = "start",
+    directory: Annotated[Optional[str], Field(description="Directory to watch (required for start)")] = None,
+    scripts: Annotated[Optional[list[str]], Field(description="Root scripts to re-run; default: every .ahk not #Included by another")] = None,
+    watch_id: Annotated[Optional[str], Field(description="Watch to stop (required for stop)")] = None,
+    version: Annotated[str, Field(description="AutoHotkey version: V1, V2, or Auto (default)")] = "Auto",
+    timeout_ms: Annotated[int, Field(description="Timeout per run in milliseconds (500-30000)", ge=500, le=30000)] = 3000,
+    debounce_ms: Annotated[int, Field(description="Quiet period before a burst of edits is re-run", ge=50, le=10000)] = DEFAULT_DEBOUNCE_MS,
+) -> str:
+    """
+    Watch a script directory and re-run affected scripts when files change.
+
+    Only scripts whose #Include closure contains a changed file are re-run, and a
+    burst of edits is coalesced into a single run. Each batch updates the
+    ahk://watch/{watch_id} resource; scripts whose status or error fingerprint
+    changed are also pushed to the client as "ahk_watch" log notifications.
+    """
+    logger.info(f"ahk_watch called: action={action}, directory={directory}, watch_id={watch_id}")
+
+    if action == "list":
+        watches = list_watches()
+        if not watches:
+            return "No active watches."
+        lines = ["## Active Watches", ""]
+        for watch in watches:
+            lines.append(f"- `{watch.id}`: `{watch.directory}` ({watch.backend_name}, {watch.run_count} runs) - `{watch.uri}`")
+        return "\n".join(lines)
+
+    if action == "stop":
+        if not watch_id:
+            return "## Error: Missing Parameter\n\nPlease provide `watch_id` (see `action=\"list\"`)."
+        if await stop_watch(watch_id):
+            return f"## Watch Stopped\n\nWatch `{watch_id}` stopped."
+        return f"## Error: Unknown Watch\n\nNo active watch with id `{watch_id}`."
+
+    if not directory or not Path(directory).is_dir():
+        return f"## Error: Invalid Directory\n\nDirectory not found: `{directory}`"
+
+    version_upper = version.upper() if version else "AUTO"
+    if version_upper in ("V1", "1"):
+        version = "V1"
+    elif version_upper in ("V2", "2"):
+        version = "V2"
+    else:
+        version = "Auto"
+
+    watch = await start_watch(
+        directory,
+        scripts=scripts,
+        version=version,
+        timeout_ms=timeout_ms,
+        debounce_ms=debounce_ms,
+        session=ctx.session if ctx else None,
+    )
+    # Reads every script of the directory (include closures)
+    roots = await asyncio.to_thread(watch.roots)
+
+    lines = [
+        "## Watch Started",
+        "",
+        f"**Watch ID**: {watch.id}",
+        f"**Directory**: `{watch.directory}`",
+        f"**Backend**: {watch.backend_name} (debounce {debounce_ms}ms)",
+        f"**Resource**: `{watch.uri}`",
+        "",
+        f"**Root Scripts** ({len(roots)}):",
+    ]
+    lines.extend(f"- `{root}`" for root in roots)
+    return "\n".join(lines)
@@ -0,0 +1,69 @@
+"""Shared fixtures: stand-ins for powershell.exe and AutoHotkey process trees."""
+import os
+import stat
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import psutil
+import pytest
+
+from ahk_mcp.services import interop
+
+# A process that starts two children, each with a child of its own, then sleeps
+SLEEPING_TREE = """
+import subprocess, sys, time
+leaf = [sys.executable, "-c", "import time; time.sleep(60)"]
+branch = [sys.executable, "-c", f"import subprocess, time; subprocess.Popen({leaf!r}); time.sleep(60)"]
+children = [subprocess.Popen(branch) for _ in range(2)]
+time.sleep(60)
+"""
+TREE_SIZE = 4
+
+
+def wait_for_descendants(pid: int, count: int, timeout_s: float = 10) -> list[psutil.Process]:
+    """The descendants of `pid`, once there are `count` of them."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        children = psutil.Process(pid).children(recursive=True)
+        if len(children) >= count or time.monotonic() > deadline:
+            return children
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def sleeping_tree():
+    """Start SLEEPING_TREE; yields its root process, kills whatever is left afterwards."""
+    root = subprocess.Popen([sys.executable, "-c", SLEEPING_TREE])
+    procs = [psutil.Process(root.pid), *wait_for_descendants(root.pid, TREE_SIZE)]
+    yield root
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    root.wait()
+
+
+@pytest.fixture
+def standin_powershell(tmp_path, monkeypatch):
+    """
+    Install a Python stand-in for powershell.exe on PATH.
+
+    Call the fixture with the body of the stand-in: Python run with sys.argv
+    holding the launcher arguments. The interop cache is disabled so the
+    stand-in only ever sees launcher runs.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    monkeypatch.setattr(interop, "ENABLED", False)
+
+    def install(body: str) -> Path:
+        path = bin_dir / "powershell.exe"
+        path.write_text(f"#!{sys.executable}\n{body}", encoding="utf-8")
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        return path
+
+    return install
@@ -0,0 +1,76 @@
+"""Run artifact store quotas."""
+import asyncio
+
+from ahk_mcp.services import deferred_capture
+from ahk_mcp.services.artifacts import ArtifactStore
+
+
+def _finished_run(store: ArtifactStore):
+    run = store.create()
+    (run.screenshots_dir / "x.png").write_bytes(b"x" * 1024)
+    store.finalize(run, {"status": "SUCCESS"})
+    return run
+
+
+def test_collect_removes_oldest_over_quota(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=0)
+    runs = [_finished_run(store) for _ in range(2)]
+    unfinished = store.create()
+
+    stats = store.collect()
+
+    assert stats["removed"] == 2
+    assert not any(run.directory.exists() for run in runs)
+    assert store.get(unfinished.run_id) is not None
+
+
+def test_held_runs_are_not_collected(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=0)
+    run = _finished_run(store)
+
+    store.hold(run.run_id)
+    assert store.collect()["removed"] == 0 and run.directory.exists()
+
+    store.release(run.run_id)
+    assert store.collect()["removed"] == 1 and not run.directory.exists()
+
+
+async def test_pending_capture_holds_its_run(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path, max_bytes=0)
+    monkeypatch.setattr(deferred_capture, "artifact_store", store)
+    captured = asyncio.Event()
+
+    async def capture(**kwargs):
+        await captured.wait()
+        (tmp_path / run.run_id / "screenshots" / "late.png").write_bytes(b"png")
+        return {"success": True, "screenshot_path": "late.png"}
+
+    monkeypatch.setattr(deferred_capture, "capture_window_screenshot", capture)
+    run = _finished_run(store)
+    deferred_capture.schedule_capture(run.run_id, window_handle="0x1", output_dir=str(run.screenshots_dir))
+
+    assert store.collect()["removed"] == 0
+    captured.set()
+    assert (await deferred_capture.get_capture(run.run_id))["success"]
+    assert store.collect()["removed"] == 1
+
+
+def test_restored_index_is_checked_on_disk(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=10 ** 9)
+    done = _finished_run(store)
+    running = store.create()
+    state = store.to_state()
+    # Grows after the snapshot, without adding a run directory
+    (done.screenshots_dir / "late.png").write_bytes(b"x" * 4096)
+
+    restored = ArtifactStore(tmp_path, max_bytes=0)
+    restored.load_state(state)
+    assert not restored.get(running.run_id).finished
+
+    stats = restored.collect()
+    assert stats["removed"] == 1 and stats["freedBytes"] > 4096
+    assert restored.get(running.run_id) is not None
+
+    store.finalize(running, {"status": "SUCCESS"})
+    restored.mark_dirty(running.run_id)
+    assert restored.collect()["removed"] == 1
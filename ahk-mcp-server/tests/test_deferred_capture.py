@@ -0,0 +1,113 @@
+"""Deferred captures: scheduling, waiting, status, eviction and reaping kept error windows."""
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from ahk_mcp.services import deferred_capture
+from ahk_mcp.services.artifacts import ArtifactStore
+from ahk_mcp.services.deferred_capture import (
+    capture_status, get_capture, publish_capture, schedule_capture, screenshot_uri,
+)
+
+
+class Tree:
+    """ProcessTree stand-in recording the PIDs it reaped."""
+
+    reaped: list[int] = []
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def reap(self) -> list[dict]:
+        Tree.reaped.append(self.pid)
+        return []
+
+
+class Capture:
+    """capture_window_screenshot stand-in: behavior "ok", "fail" or "crash" after `delay` seconds."""
+
+    def __init__(self, store: ArtifactStore):
+        self.store = store
+        self.behavior = "ok"
+        self.delay = 0.0
+        self.calls: list[dict] = []
+
+    async def __call__(self, window_title=None, window_handle=None, output_path=None, stable=False) -> dict:
+        self.calls.append({"title": window_title, "handle": window_handle, "output": output_path, "stable": stable})
+        await asyncio.sleep(self.delay)
+        if self.behavior == "crash":
+            raise RuntimeError("capture helper died")
+        if self.behavior == "fail":
+            return {"success": False, "error": "Window not found"}
+        return {"success": True, "screenshot_path": f"{output_path}/shot.png"}
+
+
+@pytest.fixture
+def capture(tmp_path, monkeypatch):
+    stub = Capture(ArtifactStore(tmp_path / "runs"))
+    Tree.reaped = []
+    monkeypatch.setattr(deferred_capture, "capture_window_screenshot", stub)
+    monkeypatch.setattr(deferred_capture, "ProcessTree", Tree)
+    monkeypatch.setattr(deferred_capture, "artifact_store", stub.store)
+    monkeypatch.setattr(deferred_capture, "_captures", OrderedDict())
+    return stub
+
+
+async def test_capture_is_published_and_awaited(capture):
+    capture.delay = 0.1
+    uri = schedule_capture("r1", window_handle="0x10", output_dir="/runs/r1", stable=True)
+
+    assert uri == screenshot_uri("r1") == "ahk://runs/r1/screenshot"
+    assert capture_status("r1") == "pending"
+    assert capture.store._held == {"r1": 1}
+
+    result = await get_capture("r1")
+
+    assert result == {"success": True, "screenshot_path": "/runs/r1/shot.png"}
+    assert capture.calls == [{"title": None, "handle": "0x10", "output": "/runs/r1", "stable": True}]
+    assert capture_status("r1") == "ready"
+    assert capture.store._held == {} and "r1" in capture.store._dirty
+    assert capture_status("nope") == "unknown" and await get_capture("nope") is None
+
+
+async def test_pending_capture_times_out_without_cancelling(capture):
+    capture.delay = 0.3
+    schedule_capture("r1", window_title="x.ahk")
+
+    result = await get_capture("r1", wait_s=0.05)
+
+    assert result == {"success": False, "pending": True, "error": "Capture still pending after 0.05s"}
+    assert capture_status("r1") == "pending"
+    assert (await get_capture("r1"))["success"]
+
+
+@pytest.mark.parametrize("behavior, error", [("fail", "Window not found"), ("crash", "capture helper died")])
+async def test_kept_error_window_is_reaped(capture, behavior, error):
+    capture.behavior = behavior
+    schedule_capture("r1", window_handle="0x10", reap_pid=4242, output_dir="/runs/r1")
+
+    result = await get_capture("r1")
+
+    assert result == {"success": False, "error": error}
+    assert capture_status("r1") == "failed"
+    assert Tree.reaped == [4242]
+    # Nothing was written into the run directory
+    assert "r1" not in capture.store._dirty
+
+
+async def test_oldest_finished_captures_are_evicted(capture, monkeypatch):
+    monkeypatch.setattr(deferred_capture, "MAX_CAPTURES", 3)
+    capture.delay = 0.2
+    schedule_capture("slow")
+    for i in range(3):
+        publish_capture(f"done{i}", {"success": True})
+
+    # The oldest capture is still pending: nothing is evicted past it
+    assert capture_status("slow") == "pending" and capture_status("done0") == "ready"
+    await get_capture("slow")
+    publish_capture("done3", {"success": True})
+
+    assert [capture_status(r) for r in ("slow", "done0", "done1", "done2", "done3")] == [
+        "unknown", "unknown", "ready", "ready", "ready",
+    ]
@@ -0,0 +1,39 @@
+"""Error fingerprints and clusters."""
+from ahk_mcp.services.error_index import ErrorIndex, fingerprint, normalize_error
+
+
+def _error(path: str, line: int, name: str) -> dict:
+    return {
+        "status": "ERROR",
+        "scriptPath": path,
+        "errorDetails": {"errorContent": [
+            f"Error at line {line} in {path}.",
+            "Error: Call to nonexistent function.",
+            f"Specifically: {name}()",
+            f"---> {line:03d}: {name}()",
+        ]},
+    }
+
+
+def test_fingerprint_ignores_script_specific_parts():
+    a = _error("C:\\a\\one.ahk", 5, "Foo")
+    b = _error("D:\\b\\two.ahk", 120, "Bar")
+    assert normalize_error(a) == normalize_error(b)
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint({"message": "Error: Missing \"}\""})
+
+
+def test_add_clusters_by_fingerprint():
+    index = ErrorIndex()
+    a = _error("C:\\a\\one.ahk", 5, "Foo")
+    fp = index.add(a, run_id="r1")
+    assert fp == fingerprint(a)
+    assert index.add(_error("C:\\a\\two.ahk", 9, "Bar"), run_id="r2") == fp
+    index.add({"message": "Error: Missing \"}\""}, run_id="r3")
+
+    cluster = index.get(fp)
+    assert cluster["count"] == 2 and cluster["lastRunId"] == "r2"
+    assert cluster["signature"] == normalize_error(a)
+    assert cluster["scripts"] == ["C:\\a\\one.ahk", "C:\\a\\two.ahk"]
+    assert [c["fingerprint"] for c in index.top_clusters()][0] == fp
+    assert len(index) == 2 and index.total_runs() == 3
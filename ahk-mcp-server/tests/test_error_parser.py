@@ -0,0 +1,103 @@
+"""Control-tree parsing: fuzzed dialogs, linear time, version-specific rules."""
+import json
+import random
+import time
+
+import pytest
+
+from ahk_mcp.services.error_parser import CANONICAL_MARKER, RULE_SETS, apply_control_tree, parse_control_tree
+from ahk_mcp.services.powershell import _parse_json_output
+
+SEEDS = range(200)
+
+# Fragments real dialogs are made of, in every registered dialect
+FRAGMENTS = [
+    "Error at line 12.", "Line: 12", "Ligne : 7", "Zeile: 3", "File: C:\\x.ahk", "Fichier : C:\\é.ahk",
+    'in #include file "lib.ahk"', "Line#", "Ligne#", "--->\t012: MsgBox", "▶\t013: x := 1", "014: y()",
+    "Specifically: foo", "Call stack:", "Erreur à la ligne 9", "Fehler in Zeile 4", "The program will exit.",
+    "", " ", "\t", "99999999999999999999:", "--->", "▶", "OK", "Cancel", "\u200b", "\ufeff", "\r",
+]
+CLASSES = ["Static", "Edit", "Button", "SysLink", "", None]
+BUTTONS = sorted({b for rules in RULE_SETS.values() for b in rules.buttons} | {"ok", "&nope"})
+
+
+def _text(rng: random.Random) -> str:
+    parts = [rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 8))]
+    if rng.random() < 0.3:
+        parts.append("".join(chr(rng.randint(1, 0x2FFF)) for _ in range(rng.randint(1, 40))))
+    return rng.choice(["\n", "\r\n", " "]).join(parts)
+
+
+def _tree(rng: random.Random) -> dict:
+    controls = []
+    for order in range(rng.randint(0, 12)):
+        cls = rng.choice(CLASSES)
+        text = rng.choice(BUTTONS) if cls == "Button" and rng.random() < 0.7 else _text(rng)
+        control = {"class": cls, "text": text if rng.random() > 0.1 else None, "order": order}
+        if rng.random() < 0.1:
+            del control["order"]
+        controls.append(control)
+    rng.shuffle(controls)
+    return {"title": rng.choice(["x.ahk", "", None]), "controls": controls}
+
+
+@pytest.mark.parametrize("version", [None, "V1", "V2"])
+def test_fuzzed_trees_parse(version):
+    for seed in SEEDS:
+        details = parse_control_tree(_tree(random.Random(seed)), version)
+        rules = RULE_SETS[details["rules"]]
+        assert all(b.lower() in rules.buttons for b in details["buttons"])
+        for line in details["sourceCode"]:
+            assert line.startswith(CANONICAL_MARKER) or line[0].isdigit()
+        assert all(line and line == line.strip() for line in details["errorContent"])
+        assert isinstance(details.get("line", 0), int)
+
+
+def test_garbage_never_costs_the_verdict():
+    rng = random.Random(0)
+    junk = [None, 3, "x", [], {}, {"class": 5}, {"order": "a"}, {"text": ["a"]}]
+    for _ in range(200):
+        tree = {"controls": [rng.choice(junk) for _ in range(rng.randint(1, 5))] + [{"order": 1}]}
+        result = apply_control_tree({"status": "ERROR", "message": "raw | text", "controlTree": tree})
+        assert result["status"] == "ERROR" and result["message"]
+
+
+def test_parse_time_is_linear():
+    def dialog(lines: int) -> dict:
+        text = "\n".join(f"--->\t{i:03}: MsgBox % x{i}" if i % 3 else f"Error at line {i}." for i in range(lines))
+        return {"title": "x.ahk", "controls": [{"class": "Static", "text": text, "order": 0},
+                                                {"class": "Button", "text": "OK", "order": 1}]}
+
+    def best_of(tree: dict) -> float:
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            parse_control_tree(tree)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    small, large = best_of(dialog(2000)), best_of(dialog(20000))
+    assert len(parse_control_tree(dialog(20000))["sourceCode"]) == 13333
+    # 10x the text: well under the 100x a quadratic parser would take
+    assert large < small * 30
+
+
+# No buttons and no dialect keywords: only the interpreter tells V1 and V2 apart
+AMBIGUOUS = {"status": "ERROR", "message": "raw", "controlTree": {
+    "title": "x.ahk", "controls": [{"class": "Static", "text": "Something failed here\nLine: 12", "order": 0}]}}
+
+
+def test_version_selects_rules():
+    assert parse_control_tree(AMBIGUOUS["controlTree"])["rules"] == "V1"
+    assert parse_control_tree(AMBIGUOUS["controlTree"], "V2")["rules"] == "V2"
+
+
+@pytest.mark.parametrize("version, rules, line", [
+    ("V2", "V2", 12),
+    ("V1", "V1", None),
+    ("Auto", "V1", None),
+])
+def test_launcher_output_uses_run_version(version, rules, line):
+    result = _parse_json_output(json.dumps(AMBIGUOUS), "", version)
+    assert result["errorDetails"]["rules"] == rules
+    assert result["errorDetails"].get("line") == line
@@ -0,0 +1,145 @@
+"""Dispatch to runner agents, against an in-process agent and a stand-in launcher."""
+import base64
+import os
+import shutil
+
+import pytest
+
+from ahk_mcp.services.fleet import Fleet, RunnerEndpoint, RunnerError, pack_script
+from ahk_mcp.services.runner import RunnerAgent
+
+TOKEN = "secret"
+
+# Stand-in launcher: ERROR, with a screenshot when -Screenshot is passed
+LAUNCHER = """
+import json, os, sys
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+result = {"status": "ERROR", "message": "Error: boom", "executionTimeMs": 5,
+          "scriptPath": value("-ScriptPath"), "windowHandle": "0x10",
+          "included": open(os.path.join(os.path.dirname(value("-ScriptPath")), "lib", "util.ahk")).read()}
+if "-Screenshot" in args:
+    os.makedirs(value("-ScreenshotPath"), exist_ok=True)
+    shot = os.path.join(value("-ScreenshotPath"), "error.png")
+    open(shot, "wb").write(b"PNG" * 50000)
+    result["screenshot"] = shot
+json.dump(result, open(value("-OutputFile"), "w"))
+"""
+
+
+@pytest.fixture
+def script(tmp_path):
+    (tmp_path / "src" / "lib").mkdir(parents=True)
+    (tmp_path / "src" / "lib" / "util.ahk").write_text("Util() {\n}\n")
+    main = tmp_path / "src" / "main.ahk"
+    main.write_text("#Include lib\\util.ahk\nUtil()\n")
+    return main
+
+
+@pytest.fixture
+async def agent(tmp_path, standin_powershell):
+    standin_powershell(LAUNCHER)
+    work = tmp_path / "work"
+    work.mkdir()
+    agent = RunnerAgent(TOKEN, "stand-in", capacity=2, work_dir=str(work))
+    server = await agent.serve("127.0.0.1", 0)
+    agent.port = server.sockets[0].getsockname()[1]
+    agent.work = work
+    yield agent
+    server.close()
+    await server.wait_closed()
+
+
+def _fleet(*ports: int, token: str = TOKEN) -> Fleet:
+    return Fleet([RunnerEndpoint("127.0.0.1", port) for port in ports], token, health_interval_s=3600)
+
+
+async def _stop(fleet: Fleet) -> None:
+    if fleet._health_task:
+        fleet._health_task.cancel()
+
+
+async def test_run_ships_include_closure_and_streams_screenshot(agent, script, tmp_path):
+    fleet = _fleet(agent.port)
+    shots = tmp_path / "shots"
+    try:
+        result = await fleet.run(str(script), "V1", 1000, True, False, str(shots))
+    finally:
+        await _stop(fleet)
+
+    assert result["status"] == "ERROR" and result["runner"] == f"127.0.0.1:{agent.port}"
+    assert result["scriptPath"] == str(script)
+    assert result["included"] == "Util() {\n}\n"
+    assert result["screenshot"] == str(shots / "error.png")
+    assert (shots / "error.png").read_bytes() == b"PNG" * 50000
+    # The job directory is gone, the window is remembered for later captures
+    assert os.listdir(agent.work) == []
+    assert fleet._affinity["0x10"] == result["runner"]
+
+
+async def test_chunks_without_directory_go_to_a_temp_dir(agent, script, tmp_path, monkeypatch):
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    fleet = _fleet(agent.port)
+    args = {**pack_script(str(script)), "version": "V1", "timeout_ms": 1000, "screenshot": True}
+
+    result = await fleet._call(fleet.endpoints[0], "run", args, 30)
+
+    path = result["_files"]["error.png"]
+    assert os.path.isfile(path) and not path.startswith(str(cwd))
+    assert os.listdir(cwd) == []
+    shutil.rmtree(os.path.dirname(path))
+
+
+async def test_failed_runner_is_skipped(agent, script, tmp_path, unused_tcp_port):
+    fleet = _fleet(unused_tcp_port, agent.port)
+    try:
+        result = await fleet.run(str(script), "V1", 1000, False, False, str(tmp_path / "shots"))
+    finally:
+        await _stop(fleet)
+
+    assert result["runner"] == fleet.endpoints[1].name
+    dead = fleet.endpoints[0]
+    assert not dead.healthy and dead.failures == 1
+
+
+async def test_wrong_token_is_refused(agent, script, tmp_path):
+    fleet = _fleet(agent.port, token="wrong")
+    try:
+        result = await fleet.run(str(script), "V1", 1000, False, False, str(tmp_path / "shots"))
+    finally:
+        await _stop(fleet)
+
+    assert result["status"] == "CONFIG_ERROR" and "refused" in result["message"]
+
+
+@pytest.mark.parametrize("files, entry", [
+    ({"../escape.ahk": "eA=="}, "../escape.ahk"),
+    ({"main.ahk": "eA=="}, "../../main.ahk"),
+    ({"main.ahk": "eA=="}, "/etc/passwd"),
+    ({"main.ahk": "eA=="}, "missing.ahk"),
+])
+def test_materialize_rejects_paths_outside_the_job(tmp_path, files, entry):
+    agent = RunnerAgent(TOKEN, work_dir=str(tmp_path))
+
+    with pytest.raises(ValueError):
+        agent._materialize({"files": files, "entry": entry})
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_materialize_writes_tree(tmp_path):
+    agent = RunnerAgent(TOKEN, work_dir=str(tmp_path))
+    data = base64.b64encode(b"x := 1").decode()
+
+    root, entry = agent._materialize({"files": {"main.ahk": data, "lib/a.ahk": data}, "entry": "main.ahk"})
+
+    assert entry == (root / "main.ahk").resolve() and (root / "lib" / "a.ahk").read_bytes() == b"x := 1"
+
+
+async def test_bad_job_frees_the_slot(agent):
+    fleet = _fleet(agent.port)
+    with pytest.raises(RunnerError):
+        await fleet._call(fleet.endpoints[0], "run", {"files": {}, "entry": "../x.ahk"}, 30)
+    assert agent.active == 0
@@ -0,0 +1,51 @@
+"""Launcher results validated into RunScriptResult, including malformed fields."""
+import logging
+
+from ahk_mcp.formatting import build_run_result
+
+RESULT = {
+    "status": "ERROR",
+    "message": "Error at line 3.",
+    "executionTimeMs": 812,
+    "scriptPath": "C:\\s\\x.ahk",
+    "trayIcon": "NOT_FOUND",
+    "windowHandle": 1001,
+    "errorDetails": {"errorContent": ["Error at line 3."], "sourceCode": ["--->\t003: Foo("], "line": 3},
+    "resources": {"cpuTimeS": 0.2, "peakRssMb": 12.5, "peakThreads": 3, "peakHandles": 80, "children": 0, "samples": 4},
+}
+
+
+def test_valid_result():
+    run = build_run_result(RESULT, run_id="r1")
+    assert (run.status, run.message, run.execution_time_ms, run.window_handle) == ("ERROR", "Error at line 3.", 812, "1001")
+    assert run.error_details.line == 3 and run.resources.peak_threads == 3
+
+
+def test_malformed_fields_keep_the_verdict(caplog):
+    result = {
+        **RESULT,
+        "trayIcon": "MAYBE",
+        "resources": {"cpuTimeS": "a lot"},
+        "speculative": ["V1"],
+        "reapedProcesses": [{"pid": "x"}],
+        "output": {"stdout": {"tail": "x"}},
+    }
+
+    with caplog.at_level(logging.WARNING, logger="ahk_mcp.formatting"):
+        run = build_run_result(result, run_id="r1")
+
+    assert (run.status, run.message, run.script_path) == ("ERROR", "Error at line 3.", "C:\\s\\x.ahk")
+    assert run.execution_time_ms == 812 and run.error_details.line == 3 and run.run_id == "r1"
+    assert run.tray_icon is None and run.resources is None and run.speculative is None
+    assert run.reaped_processes is None and run.output is None
+    (record,) = caplog.records
+    assert "r1" in record.getMessage()
+    for name in ("tray_icon", "resources", "speculative", "reaped_processes", "output"):
+        assert name in record.getMessage()
+
+
+def test_malformed_required_fields_fall_back():
+    run = build_run_result({"status": "SUCCESS", "message": ["not", "text"], "executionTimeMs": "soon"})
+    assert (run.status, run.message, run.execution_time_ms, run.script_path) == ("SUCCESS", "Unknown error", 0, "")
+    # A status the launcher never reports is a configuration problem
+    assert build_run_result({**RESULT, "status": "DONE"}).status == "CONFIG_ERROR"
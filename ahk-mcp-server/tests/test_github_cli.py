@@ -0,0 +1,44 @@
+"""GraphQL response cache of the GitHub resources."""
+import json
+import subprocess
+
+import pytest
+
+from ahk_mcp.services import github_cli
+
+ISSUE = {"number": 7, "title": "Crash", "body": "...", "state": "OPEN", "createdAt": "2026-01-01T00:00:00Z",
+         "url": "https://github.com/x/y/issues/7", "author": {"login": "someone"},
+         "labels": {"nodes": []}, "comments": {"totalCount": 3}}
+
+
+@pytest.fixture
+def gh(monkeypatch):
+    """Stand-in for `gh api graphql`: returns ISSUE, records the calls."""
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        stdout = json.dumps({"data": {"repository": {"issue": ISSUE}}})
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(github_cli.subprocess, "run", run)
+    github_cli._responses.clear()
+    yield calls
+    github_cli._responses.clear()
+
+
+async def test_issue_read_twice_from_cache(gh):
+    first = await github_cli.get_github_issue(7)
+    second = await github_cli.get_github_issue(7)
+    assert len(gh) == 1
+    assert first == second
+    assert second["issue"]["labels"] == [] and second["issue"]["comment_count"] == 3
+    assert "comments" not in second["issue"]
+
+
+async def test_malformed_output_is_an_error(monkeypatch):
+    monkeypatch.setattr(github_cli.subprocess, "run",
+                        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0, stdout="<html>", stderr=""))
+    github_cli._responses.clear()
+    result = await github_cli.get_github_issue(8)
+    assert not result["success"] and "Malformed" in result["error"]
@@ -0,0 +1,86 @@
+"""Inline screenshots: encoding, and the path fallback when encoding fails."""
+import io
+import logging
+
+import pytest
+
+from ahk_mcp.services.image_content import _image_format, encode_image, inline_screenshot
+
+# Resizing and re-encoding need the [images] extra
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(width: int, height: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (30, 120, 200)).save(out, "PNG")
+    return out.getvalue()
+
+
+def _no_encoder(self, fp, format=None, **params):
+    raise OSError(f"encoder {format} not available")
+
+
+def test_image_format_is_checked(caplog):
+    assert _image_format("WebP") == "webp"
+    assert _image_format("jpg") == "jpeg"
+    with caplog.at_level(logging.WARNING):
+        assert _image_format("bmp") == "jpeg"
+    assert "AHK_MCP_IMAGE_FORMAT" in caplog.text
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "png", "webp"])
+def test_encode_downscales(image_format):
+    image = encode_image(_png(2000, 1000), max_dim=500, image_format=image_format)
+    assert (image["format"], image["width"], image["height"]) == (image_format, 500, 250)
+    assert (image["sourceWidth"], image["sourceHeight"]) == (2000, 1000)
+    assert Image.open(io.BytesIO(image["data"])).size == (500, 250)
+
+
+def test_small_png_is_inlined_as_is():
+    png = _png(100, 50)
+    assert encode_image(png, image_format="png")["data"] == png
+    assert encode_image(png, image_format="png", max_bytes=10) is None
+
+
+def test_encoding_errors_fall_back(monkeypatch):
+    png = _png(2000, 1000)
+    # Unknown to Pillow
+    assert encode_image(png, image_format="jpg") is None
+
+    # A Pillow build without WebP
+    monkeypatch.setattr(Image.Image, "save", _no_encoder)
+    assert encode_image(png, image_format="webp") is None
+
+
+async def test_inline_screenshot_inlines_or_saves(tmp_path, monkeypatch):
+    capture = {"success": True, "png": _png(800, 600)}
+    image, reason = await inline_screenshot(capture, str(tmp_path), image_format="jpeg")
+    assert image["format"] == "jpeg" and reason is None
+    assert "png" not in capture and "screenshot_path" not in capture
+
+    png = _png(800, 600)
+    monkeypatch.setattr(Image.Image, "save", _no_encoder)
+    capture = {"success": True, "png": png}
+    assert await inline_screenshot(capture, str(tmp_path), image_format="webp") == (
+        None, "the screenshot could not be encoded as webp (encoder WEBP not available)")
+    # Not inlined: the capture is saved and answered with its path
+    assert open(capture["screenshot_path"], "rb").read() == png
+
+
+async def test_not_inlined_reasons(tmp_path):
+    png = _png(800, 600)
+    saved = []
+    for _ in range(3):
+        capture = {"success": True, "png": png}
+        image, reason = await inline_screenshot(capture, str(tmp_path), image_format="png", max_bytes=100, max_dim=640)
+        assert image is None and reason == "larger than the 0 KB image budget at 640px"
+        saved.append(capture["screenshot_path"])
+    # Captures saved within the same second do not overwrite each other
+    assert len(set(saved)) == 3 and len(list(tmp_path.iterdir())) == 3
+
+    garbage = tmp_path / "garbage.png"
+    garbage.write_bytes(b"not an image")
+    image, reason = await inline_screenshot({"success": True, "screenshot_path": str(garbage)}, str(tmp_path))
+    assert image is None and reason.startswith("the screenshot could not be decoded")
+    image, reason = await inline_screenshot({"success": True, "screenshot_path": str(tmp_path / "gone.png")}, str(tmp_path))
+    assert image is None and reason.startswith("the screenshot file could not be read")
@@ -0,0 +1,128 @@
+"""Interop assembly cache: source hashing, lookup, invalidation, pruning and build back-off."""
+import pytest
+
+from ahk_mcp.services import interop
+from ahk_mcp.services.interop import InteropCache, launcher_source, normalize, source_hash
+
+SOURCE = "public class A {\r\n    public int X;   \r\n}\r\n"
+
+# Stand-in compiler: powershell.exe writing the -OutputAssembly file, or failing
+# when STANDIN_FAIL is set; waits STANDIN_DELAY seconds first
+COMPILER = """
+import os, re, sys, time
+time.sleep(float(os.environ.get("STANDIN_DELAY", "0")))
+if os.environ.get("STANDIN_FAIL"):
+    sys.stderr.write("error CS1002: ; expected")
+    sys.exit(1)
+output = re.search(r"-OutputAssembly '((?:[^']|'')*)'", sys.argv[-1]).group(1).replace("''", "'")
+open(output, "wb").write(b"MZ")
+"""
+
+
+@pytest.fixture
+def cache(tmp_path, standin_powershell, monkeypatch):
+    standin_powershell(COMPILER)
+    monkeypatch.setattr(interop, "ENABLED", True)
+    return InteropCache(tmp_path / "interop")
+
+
+def test_normalize_ignores_layout_only_changes():
+    assert normalize(SOURCE) == "public class A {\n    public int X;\n}\n"
+    assert normalize("\n\n" + SOURCE + "  \n\n") == normalize(SOURCE)
+    assert normalize(SOURCE.replace("\r\n", "\n")) == normalize(SOURCE)
+
+
+def test_source_hash_keys_on_source_and_version():
+    digest = source_hash(SOURCE)
+    assert len(digest) == 16 and int(digest, 16) >= 0
+    assert source_hash(SOURCE.replace("\r\n", "\n") + "\n") == digest
+    assert source_hash(SOURCE.replace("X", "Y")) != digest
+    assert source_hash(SOURCE, version=2) != digest
+
+
+def test_launcher_source_reads_the_here_string(tmp_path):
+    assert "class Win32API" in launcher_source()
+    script = tmp_path / "launcher.ps1"
+    script.write_bytes("\ufeffparam()\r\nAdd-Type @'\r\npublic class B {}\r\n'@\r\nAdd-Type @'\r\nclass C {}\r\n'@\r\n".encode("utf-8"))
+    assert launcher_source(script) == "public class B {}"
+    script.write_text("param()\n")
+    assert launcher_source(script) == ""
+
+
+def test_lookup_follows_source_and_file(cache):
+    assert cache.lookup("launcher", SOURCE) is None
+    path = cache.build("launcher", SOURCE)
+
+    assert cache.lookup("launcher", SOURCE) == path
+    assert cache.lookup("launcher", SOURCE.replace("\r\n", "\n")) == path
+    assert cache.lookup("launcher", SOURCE.replace("X", "Y")) is None
+    # The manifest survives a restart
+    assert InteropCache(cache.directory).lookup("launcher", SOURCE) == path
+    path.unlink()
+    assert cache.lookup("launcher", SOURCE) is None
+
+
+def test_invalidate_forgets_and_deletes(cache):
+    path = cache.build("launcher", SOURCE)
+    cache.invalidate("launcher")
+
+    assert not path.exists()
+    assert cache.lookup("launcher", SOURCE) is None
+    assert "launcher" not in InteropCache(cache.directory).assemblies
+    cache.invalidate("launcher")
+
+
+def test_prune_keeps_current_and_other_names(cache):
+    old = cache.build("launcher", SOURCE)
+    capture = cache.build("capture", SOURCE)
+    # Building a new source prunes the previous DLL of that name only
+    new = cache.build("launcher", SOURCE.replace("X", "Y"))
+
+    assert not old.exists() and new.exists() and capture.exists()
+    stray = cache.directory / "launcher-0000000000000000.dll"
+    stray.write_bytes(b"MZ")
+    assert cache.prune("launcher") == [stray]
+    assert new.exists()
+
+
+async def test_resolve_builds_in_background(cache, monkeypatch):
+    monkeypatch.setenv("STANDIN_DELAY", "0.3")
+    assert cache.resolve("launcher", SOURCE) == (None, "miss")
+    assert cache.resolve("launcher", SOURCE) == (None, "building")
+    await cache.wait_builds()
+    path, outcome = cache.resolve("launcher", SOURCE)
+    assert outcome == "hit" and path.is_file()
+
+
+async def test_failed_build_backs_off(cache, monkeypatch):
+    def expire_failure():
+        digest, failed_at = cache._failed["launcher"]
+        cache._failed["launcher"] = (digest, failed_at - interop.BUILD_RETRY_S - 1)
+
+    monkeypatch.setenv("STANDIN_FAIL", "1")
+    assert cache.resolve("launcher", SOURCE) == (None, "miss")
+    await cache.wait_builds()
+    # Inline compilation until BUILD_RETRY_S passed...
+    assert cache.resolve("launcher", SOURCE) == (None, "failed")
+    expire_failure()
+    assert cache.resolve("launcher", SOURCE) == (None, "miss")
+    await cache.wait_builds()
+    assert cache.resolve("launcher", SOURCE) == (None, "failed")
+    # ...or the source changed
+    assert cache.resolve("launcher", SOURCE.replace("X", "Y")) == (None, "miss")
+    await cache.wait_builds()
+
+    monkeypatch.delenv("STANDIN_FAIL")
+    assert cache.resolve("launcher", SOURCE.replace("X", "Y")) == (None, "failed")
+    expire_failure()
+    assert cache.resolve("launcher", SOURCE.replace("X", "Y")) == (None, "miss")
+    await cache.wait_builds()
+    assert cache.resolve("launcher", SOURCE.replace("X", "Y"))[1] == "hit"
+    assert "launcher" not in cache._failed
+
+
+def test_disabled_cache_never_builds(cache, monkeypatch):
+    monkeypatch.setattr(interop, "ENABLED", False)
+    assert cache.resolve("launcher", SOURCE) == (None, "disabled")
+    assert cache.resolve("launcher", "") == (None, "disabled")
+    assert not cache.directory.exists()
@@ -0,0 +1,74 @@
+"""Process-wide interpreter discovery and its hand-off to the launcher."""
+import pytest
+
+from ahk_mcp.services import interpreters, powershell
+from ahk_mcp.services.interpreters import InterpreterCache, interpreter_cache
+from ahk_mcp.services.powershell import run_ahk_launcher
+
+# Stand-in launcher: reports the interpreter it was handed
+LAUNCHER = """
+import json, sys
+args = sys.argv
+value = lambda name: args[args.index(name) + 1] if name in args else None
+json.dump({"status": "SUCCESS", "executionTimeMs": 1, "ahkExecutable": value("-AhkExecutable")},
+          open(value("-OutputFile"), "w"))
+"""
+
+
+@pytest.fixture
+def installs(tmp_path, monkeypatch):
+    """A Program Files with AutoHotkey, counting the discoveries."""
+    program_files = tmp_path / "Program Files"
+    monkeypatch.setenv("ProgramFiles", str(program_files))
+    monkeypatch.delenv("ProgramFiles(x86)", raising=False)
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    discover = interpreters.discover
+    monkeypatch.setattr(interpreters, "discover", lambda version: calls.append(version) or discover(version))
+    interpreter_cache.clear()
+    yield program_files / "AutoHotkey" / "AutoHotkey.exe", calls
+    interpreter_cache.clear()
+
+
+def _install(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"MZ")
+
+
+def test_lookup_follows_launcher_order(installs, tmp_path):
+    exe, _ = installs
+    cache = InterpreterCache()
+    assert cache.lookup("V2") is None
+    _install(tmp_path / "AutoHotkey.exe")
+    _install(exe)
+    # Program Files comes before the working directory
+    assert InterpreterCache().lookup("V2") == str(exe)
+    assert cache.lookup("Auto") is None
+
+
+def test_lookup_is_cached_until_ttl(installs):
+    exe, calls = installs
+    cache = InterpreterCache(ttl_s=3600)
+    assert cache.lookup("V1") is None
+    _install(exe)
+    # "Not found" is cached too
+    assert cache.lookup("V1") is None
+    assert calls == ["V1"]
+    cache.ttl_s = 0
+    assert cache.lookup("V1") == str(exe)
+    assert calls == ["V1", "V1"]
+
+
+async def test_runs_share_one_discovery(installs, tmp_path, standin_powershell, monkeypatch):
+    exe, calls = installs
+    _install(exe)
+    standin_powershell(LAUNCHER)
+    script = tmp_path / "main.ahk"
+    script.write_text("MsgBox\n")
+    results = [await run_ahk_launcher(str(script), "V2", 3000, screenshot=False) for _ in range(3)]
+    assert [r["ahkExecutable"] for r in results] == [str(exe)] * 3
+    assert calls == ["V2"]
+    # Auto runs keep the launcher's #Requires detection
+    monkeypatch.setattr(powershell, "SPECULATIVE", False)
+    auto = await run_ahk_launcher(str(script), "Auto", 3000, screenshot=False)
+    assert auto["ahkExecutable"] is None
@@ -0,0 +1,56 @@
+"""In-process metrics registry."""
+import asyncio
+import threading
+
+import pytest
+
+from ahk_mcp.resources.metrics import get_metrics
+from ahk_mcp.services.metrics import Counter, Histogram, Registry
+
+
+def test_register_same_metric_returns_it():
+    registry = Registry()
+    counter = registry.counter("runs_total", "Runs", ("status",))
+    assert registry.counter("runs_total", "Runs", ("status",)) is counter
+
+
+def test_register_with_other_type_or_labels_fails():
+    registry = Registry()
+    registry.counter("runs_total", "Runs", ("status",))
+    with pytest.raises(ValueError):
+        registry.gauge("runs_total", "Runs", ("status",))
+    with pytest.raises(ValueError):
+        registry.counter("runs_total", "Runs", ("outcome",))
+
+
+def test_counter_sums_threads_and_children_are_public():
+    counter = Counter("calls_total", "Calls", ("op",))
+
+    def work():
+        for _ in range(1000):
+            counter.labels("a").inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.labels("b").inc(2)
+
+    assert {key: child.value() for key, child in counter.children()} == {("a",): 4000, ("b",): 2}
+
+
+def test_histogram_quantiles():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    child = dict(histogram.children())[()]
+    assert child.quantile(0.5) == 0.1 and child.quantile(0.99) == 10.0
+
+
+def test_metrics_resource_renders_histograms():
+    from ahk_mcp.services.metrics import RUN_SECONDS
+
+    RUN_SECONDS.observe(0.3)
+    text = asyncio.run(get_metrics())
+    assert "| ahk_run_duration_seconds |" in text
@@ -0,0 +1,85 @@
+"""Output capture of chatty scripts, with a stand-in launcher streaming to the redirect files."""
+import re
+
+from ahk_mcp.services.output_capture import FORWARD_MAX_BYTES, OutputCapture, RingBuffer
+from ahk_mcp.services.powershell import run_ahk_launcher
+
+LINES = 1_000_000
+LINE = "line {:08d} " + "x" * 6 + "\n"
+
+# Stand-in launcher: the "script" writes LINES lines to stdout in bursts, a
+# few to stderr, and exits
+LAUNCHER = f"""
+import json, sys, time
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+with open(value("-StdoutFile"), "w") as out, open(value("-StderrFile"), "w") as err:
+    for start in range(0, {LINES}, 100_000):
+        out.write("".join({LINE!r}.format(i) for i in range(start, start + 100_000)))
+        out.flush()
+        err.write(f"progress {{start}}\\n")
+        err.flush()
+        time.sleep(0.02)
+json.dump({{"status": "SUCCESS", "message": "Script exited", "executionTimeMs": 300}}, open(value("-OutputFile"), "w"))
+"""
+
+
+def test_ring_buffer_keeps_the_tail():
+    buffer = RingBuffer(8)
+    buffer.write(b"abcdef")
+    buffer.write(b"ghij")
+    assert buffer.getvalue() == b"cdefghij" and buffer.total == 10 and buffer.truncated
+    buffer.skip(100)
+    buffer.write(b"0123456789")
+    assert buffer.getvalue() == b"23456789" and buffer.total == 120
+
+
+async def test_finish_reads_output_left_after_the_run(tmp_path):
+    # More than one poll reads: the run ended before the polls caught up
+    data = "".join(LINE.format(i) for i in range(LINES)).encode()
+    (tmp_path / "stdout.log").write_bytes(data)
+    forwarded = []
+
+    async def on_output(stream, text):
+        forwarded.append(text)
+
+    capture = OutputCapture(tmp_path, max_bytes=4096, on_output=on_output)
+    capture.poll()
+    streams = await capture.finish()
+
+    assert streams["stdout"]["bytes"] == len(data)
+    assert streams["stdout"]["truncated"]
+    assert streams["stdout"]["tail"].endswith(LINE.format(LINES - 1))
+    assert streams["stdout"]["tail"].startswith("line ")
+    assert forwarded[-1].startswith("[... ") and forwarded[-1].endswith(LINE.format(LINES - 1))
+
+
+async def test_streaming_a_chatty_script(tmp_path, standin_powershell):
+    standin_powershell(LAUNCHER)
+    script = tmp_path / "chatty.ahk"
+    script.write_text("Loop\n")
+    forwarded = {"stdout": [], "stderr": []}
+
+    async def on_output(stream, text):
+        forwarded[stream].append(text)
+
+    result = await run_ahk_launcher(str(script), "V2", 20000, screenshot=False, capture_output=True,
+                                    output_bytes=16384, on_output=on_output)
+
+    stdout = result["output"]["stdout"]
+    assert stdout["bytes"] == LINES * len(LINE.format(0))
+    assert stdout["truncated"]
+    assert stdout["tail"].endswith(LINE.format(LINES - 1))
+    assert len(stdout["tail"]) <= 16384
+    assert result["output"]["stderr"] == {
+        "tail": "".join(f"progress {start}\n" for start in range(0, LINES, 100_000)),
+        "bytes": sum(len(f"progress {start}\n") for start in range(0, LINES, 100_000)),
+        "truncated": False,
+    }
+    # Forwarded while running: bounded chunks, in order
+    numbers = []
+    for text in forwarded["stdout"]:
+        body = text.split("\n", 1)[1] if text.startswith("[... ") else text
+        assert len(body.encode()) <= FORWARD_MAX_BYTES
+        numbers += [int(n) for n in re.findall(r"line (\d{8})", body)]
+    assert numbers == sorted(numbers) and numbers[-1] == LINES - 1
@@ -0,0 +1,149 @@
+"""Process tree reaping and resource sampling, on stand-in process trees."""
+import asyncio
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from ahk_mcp.services import powershell
+from ahk_mcp.services.powershell import run_ahk_launcher
+from ahk_mcp.services.process_tree import BUDGETS, ProcessTree, _is_running, check_budgets
+
+from conftest import SLEEPING_TREE, TREE_SIZE, wait_for_descendants
+
+
+# A process with two children: one spins the CPU, one holds 64 MB
+BUSY_TREE = """
+import subprocess, sys, time
+spin = [sys.executable, "-c", "while True: pass"]
+hold = [sys.executable, "-c", "import time; data = bytearray(64 * 1024 * 1024); time.sleep(60)"]
+children = [subprocess.Popen(spin), subprocess.Popen(hold)]
+time.sleep(60)
+"""
+
+# Stand-in launcher: runs BUSY_TREE as the "script", reports once it ends
+BUSY_LAUNCHER = f"""
+import json, subprocess, sys
+args = sys.argv
+script = subprocess.Popen([sys.executable, "-c", {BUSY_TREE!r}])
+script.wait()
+json.dump({{"status": "ERROR", "message": "Script exited", "executionTimeMs": 1}},
+          open(args[args.index("-OutputFile") + 1], "w"))
+"""
+
+
+@pytest.fixture
+def busy_tree():
+    root = subprocess.Popen([sys.executable, "-c", BUSY_TREE])
+    procs = [psutil.Process(root.pid), *wait_for_descendants(root.pid, 2)]
+    yield root
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    root.wait()
+
+
+def _all_gone(procs: list[psutil.Process]) -> bool:
+    return not any(_is_running(p) for p in procs)
+
+
+def test_reap_kills_whole_tree(sleeping_tree):
+    tree = ProcessTree(sleeping_tree.pid)
+    procs = [psutil.Process(sleeping_tree.pid), *psutil.Process(sleeping_tree.pid).children(recursive=True)]
+
+    reaped = tree.reap(grace=2)
+
+    assert {r["pid"] for r in reaped} == {p.pid for p in procs}
+    assert all(r["name"] for r in reaped)
+    assert _all_gone(procs)
+    assert tree.reap() == []
+
+
+def test_reap_finds_orphans_of_exited_parents(sleeping_tree):
+    tree = ProcessTree(sleeping_tree.pid)
+    tree.snapshot()
+    grandchildren = [p for child in psutil.Process(sleeping_tree.pid).children() for p in child.children()]
+    # The intermediate parents exit: their children are re-parented away from the root
+    for child in psutil.Process(sleeping_tree.pid).children():
+        child.kill()
+    deadline = time.monotonic() + 5
+    while any(_is_running(c) for c in psutil.Process(sleeping_tree.pid).children()) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    reaped = tree.reap(grace=2)
+
+    assert {p.pid for p in grandchildren} <= {r["pid"] for r in reaped}
+    assert _all_gone(grandchildren)
+
+
+async def test_cancel_reaps_launcher_tree(tmp_path, standin_powershell):
+    standin_powershell(SLEEPING_TREE)
+    script = tmp_path / "gui.ahk"
+    script.write_text("Gui, Show\n")
+
+    task = asyncio.create_task(run_ahk_launcher(str(script), "V1", 3000, screenshot=False))
+    # The stand-in launcher and its tree
+    deadline = time.monotonic() + 10
+    procs = []
+    while len(procs) < 1 + TREE_SIZE and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        procs = psutil.Process().children(recursive=True)
+    assert len(procs) >= 1 + TREE_SIZE
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert _all_gone(procs)
+
+
+def test_usage_sums_the_tree(busy_tree):
+    tree = ProcessTree(busy_tree.pid)
+    for _ in range(10):
+        tree.snapshot()
+        time.sleep(0.1)
+
+    usage = tree.usage()
+
+    assert usage["children"] == 2
+    assert usage["samples"] == 10
+    assert usage["cpuTimeS"] > 0.3
+    assert usage["peakRssMb"] > 64
+    assert usage["peakThreads"] >= 3 and usage["peakHandles"] > 0
+    over = check_budgets(usage, {"cpuTimeS": 0.1, "peakRssMb": 0, "children": 5})
+    assert [v["resource"] for v in over] == ["cpuTimeS"]
+
+
+async def test_track_reaps_over_budget_processes(busy_tree):
+    tree = ProcessTree(busy_tree.pid, measure_root=False)
+    children = psutil.Process(busy_tree.pid).children()
+    task = asyncio.create_task(tree.track(interval=0.05, budgets={"cpuTimeS": 0.3}))
+    deadline = time.monotonic() + 10
+    while not tree.budget_reaped and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    task.cancel()
+
+    assert {r["pid"] for r in tree.budget_reaped} == {p.pid for p in children}
+    assert _all_gone(children)
+    # The unmeasured root (the launcher) is spared
+    assert _is_running(psutil.Process(busy_tree.pid))
+
+
+async def test_over_budget_run_is_stopped(tmp_path, standin_powershell, monkeypatch):
+    standin_powershell(BUSY_LAUNCHER)
+    monkeypatch.setattr(powershell, "BUDGET_KILL", True)
+    monkeypatch.setitem(BUDGETS, "cpuTimeS", 0.3)
+    script = tmp_path / "spin.ahk"
+    script.write_text("Loop\n")
+
+    result = await run_ahk_launcher(str(script), "V1", 20000, screenshot=False)
+
+    assert result["status"] == "ERROR"
+    assert [v["resource"] for v in result["overBudget"]] == ["cpuTimeS"]
+    # The script process and its two children
+    assert len(result["reapedProcesses"]) == 3
+    assert result["resources"]["cpuTimeS"] < 5
@@ -0,0 +1,151 @@
+"""Cost-aware batches: LPT ordering, makespans, and the runtime model's persistence."""
+import json
+import threading
+
+import pytest
+
+from ahk_mcp.services import scheduler
+from ahk_mcp.services.quotas import RunPool
+from ahk_mcp.services.scheduler import CostModel, run_batch, simulate_makespan
+
+# Stand-in launcher: the script's "; sleep s" line says how long it runs,
+# "; status S" what it reports
+LAUNCHER = """
+import json, re, sys, time
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+text = open(value("-ScriptPath"), encoding="utf-8").read()
+sleep = re.search(r"; sleep ([\\d.]+)", text)
+time.sleep(float(sleep.group(1)) if sleep else 0)
+status = re.search(r"; status (\\w+)", text)
+json.dump({"status": status.group(1) if status else "SUCCESS", "message": "", "executionTimeMs": 1},
+          open(value("-OutputFile"), "w"))
+"""
+
+EXITS = {"bytes": 2048, "files": 1, "includeDepth": 1, "gui": 0, "persistent": 0, "setTimer": 0, "hotkeys": 0}
+RESIDENT = {**EXITS, "gui": 1}
+
+
+def test_simulate_makespan():
+    assert simulate_makespan([], 2) == 0
+    assert simulate_makespan([5, 3, 2], 1) == 10
+    # Greedy list scheduling: short jobs first leave the long one for last
+    assert simulate_makespan([1, 1, 1, 1, 4], 2) == 6
+    assert simulate_makespan([4, 1, 1, 1, 1], 2) == 4
+    assert simulate_makespan([3, 3], 0) == 6
+
+
+def test_predictions_fall_back_to_the_calibrated_model(tmp_path):
+    model = CostModel(tmp_path / "runtimes.json")
+    exits = model.model_estimate(EXITS, 3000)
+    assert exits == scheduler.OVERHEAD_MS + 2 * scheduler.PER_KB_MS + scheduler.PER_DEPTH_MS
+    assert model.model_estimate(RESIDENT, 3000) == scheduler.OVERHEAD_MS + 3000
+    assert model.predict("a.ahk", "V2", 3000, EXITS) == (exits, "model")
+
+    # Runs slower than modelled raise the estimate of every script of the class
+    model.observe("a.ahk", "V2", 3000, EXITS, exits * 3, "SUCCESS")
+    assert model.calibration == {"resident": 1.0, "exits": 2.0}
+    assert model.predict("b.ahk", "V2", 3000, EXITS) == (exits * 2, "model")
+    # The script itself is predicted from its own history
+    assert model.predict("a.ahk", "V2", 3000, EXITS) == (round(exits * 3, 1), "history")
+    model.observe("a.ahk", "V2", 3000, EXITS, exits, "ERROR")
+    assert model.predict("a.ahk", "V2", 3000, EXITS)[0] == round(exits * 2, 1)
+    assert model.last_status("a.ahk", "V2", 3000) == "ERROR"
+    assert model.predict("a.ahk", "V1", 3000, EXITS)[1] == "model"
+
+
+def test_only_completed_runs_are_observed(tmp_path):
+    model = CostModel(tmp_path / "runtimes.json")
+    for status in ("CONFIG_ERROR", "SKIPPED"):
+        assert not model.observe("a.ahk", "V2", 3000, EXITS, 5, status)
+    assert model.history == {} and model.calibration["exits"] == 1.0
+    assert model.observe("a.ahk", "V2", 3000, RESIDENT, 3700, "RUNNING")
+
+
+def test_history_persists(tmp_path):
+    path = tmp_path / "runs" / "runtimes.json"
+    model = CostModel(path)
+    model.observe("a.ahk", "V2", 3000, EXITS, 1500, "SUCCESS")
+    model.save()
+
+    reloaded = CostModel(path)
+    assert reloaded.history == model.history and reloaded.calibration == model.calibration
+    assert [p.name for p in path.parent.iterdir()] == ["runtimes.json"]
+
+    # Another format version starts over
+    path.write_text(json.dumps({"v": scheduler.HISTORY_VERSION + 1, "scripts": model.history}))
+    assert CostModel(path).history == {}
+    path.write_text("{not json")
+    assert CostModel(path).history == {}
+
+
+def test_concurrent_saves(tmp_path):
+    model = CostModel(tmp_path / "runtimes.json")
+    errors = []
+
+    def save_many(n: int) -> None:
+        try:
+            for i in range(50):
+                model.observe(f"{n}-{i}.ahk", "V2", 3000, EXITS, 1000, "SUCCESS")
+                model.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_many, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(CostModel(model.path).history) == 200
+    assert [p.name for p in tmp_path.iterdir()] == ["runtimes.json"]
+
+
+@pytest.fixture
+def batch(tmp_path, standin_powershell, monkeypatch):
+    standin_powershell(LAUNCHER)
+    monkeypatch.setattr(scheduler, "_model", CostModel(tmp_path / "runtimes.json"))
+    scripts = tmp_path / "scripts"
+    scripts.mkdir()
+
+    def add(name: str, body: str) -> str:
+        path = scripts / name
+        path.write_text(body, encoding="utf-8")
+        return str(path)
+
+    return add
+
+
+async def test_longest_predicted_runs_first(batch):
+    short = batch("short.ahk", "; sleep 0\nx := 1\n")
+    resident = batch("gui.ahk", "; sleep 0.2\nGui, Show\n")
+    longer = batch("long.ahk", "; sleep 0\n" + "x := 1\n" * 2000)
+
+    report = await run_batch([short, resident, longer], version="V2", workers=1)
+
+    assert [s["script"] for s in report["scripts"]] == [resident, longer, short]
+    assert report["statuses"] == {"SUCCESS": 3}
+    assert report["predictedMakespanMs"] == report["inputOrderMakespanMs"]
+    assert len(scheduler._model.history) == 3
+
+
+async def test_quota_wait_is_not_runtime(batch, monkeypatch):
+    # Four workers, but the client may only run one script at a time
+    monkeypatch.setattr(scheduler, "run_pool", RunPool(max_runs=8, client_max_runs=1))
+    scripts = [batch(f"s{i}.ahk", "; sleep 0.4\n") for i in range(3)]
+
+    report = await run_batch(scripts, version="V2", workers=4, client_id="c")
+
+    runs = sorted(report["scripts"], key=lambda s: s["startMs"])
+    assert runs[-1]["startMs"] >= 800
+    for run in runs:
+        assert 400 <= run["actualMs"] < 800
+        assert scheduler._model.predict(run["script"], "V2", 3000, EXITS)[0] == run["actualMs"]
+
+
+async def test_config_errors_are_not_observed(batch):
+    script = batch("broken.ahk", "; status CONFIG_ERROR\n")
+    report = await run_batch([script], version="V2")
+    assert report["statuses"] == {"CONFIG_ERROR": 1}
+    assert scheduler._model.history == {}
@@ -0,0 +1,59 @@
+"""Source index over a script's #Include closure."""
+from ahk_mcp.services.source_index import SourceIndex, get_source_index, locate_error
+
+
+def _write(path, *lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_locate_maps_line_to_included_file(tmp_path):
+    root = _write(tmp_path / "main.ahk", "#Include lib.ahk", "x := 1", "Foo()")
+    lib = _write(tmp_path / "lib.ahk", "Helper() {", "    return Bar(", "}")
+    index = SourceIndex(root.resolve())
+
+    assert index.locate(2, "return Bar(")["file"] == str(lib.resolve())
+    assert index.locate(3, "Foo()")["file"] == str(root.resolve())
+    # Truncated snippet: prefix match at that line
+    assert index.locate(2, "return Ba...")["file"] == str(lib.resolve())
+
+
+def test_line_zero_does_not_wrap_to_last_line(tmp_path):
+    root = _write(tmp_path / "main.ahk", "x := 1", "Foo()")
+    index = SourceIndex(root.resolve())
+
+    assert index.locate(0, "Foo()") is None
+    assert index.locate(0) is None
+
+
+def test_missing_include_that_appears_makes_index_stale(tmp_path):
+    root = _write(tmp_path / "main.ahk", "#Include *i later.ahk", "x := 1")
+    index = get_source_index(str(root))
+    assert index.is_fresh() and len(index.files) == 1
+
+    later = _write(tmp_path / "later.ahk", "Later() {", "}")
+
+    assert not index.is_fresh()
+    rebuilt = get_source_index(str(root))
+    assert rebuilt is not index and rebuilt.contains(later.resolve())
+    assert rebuilt.is_fresh()
+
+
+def test_missing_includes_survive_state_roundtrip(tmp_path):
+    root = _write(tmp_path / "main.ahk", "#Include <NotYet>", "x := 1")
+    index = SourceIndex.from_state(root.resolve(), SourceIndex(root.resolve()).to_state())
+    assert index.is_fresh()
+
+    (tmp_path / "Lib").mkdir()
+    _write(tmp_path / "Lib" / "NotYet.ahk", "NotYet() {", "}")
+
+    assert not index.is_fresh()
+
+
+def test_locate_error_uses_source_excerpt(tmp_path):
+    root = _write(tmp_path / "main.ahk", "x := 1", "Foo(", "y := 2")
+    result = {"status": "ERROR", "errorDetails": {"sourceCode": ["001: x := 1", "---> 002: Foo(", "003: y := 2"]}}
+
+    location = locate_error(str(root), result)
+
+    assert location["line"] == 2 and location["context"][1] == "---> 002: Foo("
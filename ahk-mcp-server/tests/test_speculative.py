@@ -0,0 +1,117 @@
+"""Speculative V1/V2 runs against stand-in interpreters of different speeds."""
+import json
+
+import psutil
+import pytest
+
+from ahk_mcp.services import speculative
+from ahk_mcp.services.powershell import run_ahk_launcher
+from ahk_mcp.services.speculative import InterpreterMemory, is_version_mismatch
+
+# Stand-in launcher: behaves as STANDIN_BEHAVIOR says for its -AhkVersion
+# ({"V1": {"delay": s, "result": {...}}}) and logs the versions it ran
+LAUNCHER = """
+import json, os, sys, time
+args = sys.argv
+version = args[args.index("-AhkVersion") + 1]
+with open(os.environ["STANDIN_LOG"], "a") as log:
+    log.write(version + "\\n")
+behavior = json.loads(os.environ["STANDIN_BEHAVIOR"])[version]
+time.sleep(behavior["delay"])
+result = {"executionTimeMs": int(behavior["delay"] * 1000), **behavior["result"]}
+json.dump(result, open(args[args.index("-OutputFile") + 1], "w"))
+"""
+
+SUCCESS = {"status": "SUCCESS", "message": "Script exited"}
+
+
+def error(content: str, failing_line: str) -> dict:
+    return {"status": "ERROR", "message": content,
+            "errorDetails": {"errorContent": [content], "sourceCode": [f"--->\t003: {failing_line}"]}}
+
+
+@pytest.fixture
+def interpreters(tmp_path, standin_powershell, monkeypatch):
+    """Install the stand-ins; returns set_behavior(V1=..., V2=...) -> versions launched so far."""
+    standin_powershell(LAUNCHER)
+    log = tmp_path / "launched.log"
+    log.touch()
+    monkeypatch.setenv("STANDIN_LOG", str(log))
+    monkeypatch.setattr(speculative, "_memory", InterpreterMemory(tmp_path / "interpreters.json"))
+
+    def set_behavior(**behavior: tuple[float, dict]) -> None:
+        monkeypatch.setenv("STANDIN_BEHAVIOR", json.dumps(
+            {version: {"delay": delay, "result": result} for version, (delay, result) in behavior.items()}
+        ))
+
+    set_behavior.launched = lambda: log.read_text().split()
+    return set_behavior
+
+
+@pytest.fixture
+def script(tmp_path):
+    # No #Requires and no one-sided syntax: the version has to be raced
+    path = tmp_path / "plain.ahk"
+    path.write_text("x := 1\nFoo()\n")
+    return path
+
+
+def test_mismatch_signatures():
+    assert is_version_mismatch({"status": "ERROR", "message": "Script requires AutoHotkey v2.0"})
+    # Ordinary mistakes are never mismatches...
+    assert not is_version_mismatch(error("Call to nonexistent function.", "Foo()"), "V1")
+    assert not is_version_mismatch(error("Unexpected comma", "x := 1,,"), "V2")
+    assert not is_version_mismatch(error("Line Text: x€ contains an illegal character", "x€ := 1"), "V2")
+    # ...unless the failing line is written in the other dialect
+    assert is_version_mismatch(error("Call to nonexistent function.", "Persistent()"), "V1")
+    assert is_version_mismatch(error('Function calls require a space or "("', "MsgBox, hello"), "V2")
+    assert not is_version_mismatch(error("Call to nonexistent function.", "Persistent()"))
+
+
+async def test_slow_right_interpreter_beats_fast_mismatch(interpreters, script):
+    interpreters(V1=(0.1, error("Call to nonexistent function.", "Persistent()")), V2=(0.8, SUCCESS))
+
+    result = await run_ahk_launcher(str(script), "Auto", 5000, screenshot=False)
+
+    assert result["status"] == "SUCCESS"
+    assert result["speculative"]["winner"] == "V2"
+    assert result["speculative"]["outcomes"] == {"V1": "mismatch", "V2": "won"}
+    assert json.loads(speculative._memory.path.read_text())["scripts"][str(script.resolve())]["version"] == "V2"
+
+
+async def test_fast_decisive_verdict_cancels_the_other_run(interpreters, script):
+    interpreters(V1=(0.1, error("Call to nonexistent function.", "Foo()")), V2=(30, SUCCESS))
+    before = {p.pid for p in psutil.Process().children(recursive=True)}
+
+    result = await run_ahk_launcher(str(script), "Auto", 60000, screenshot=False)
+
+    assert result["status"] == "ERROR"
+    assert result["speculative"]["outcomes"] == {"V1": "won", "V2": "cancelled"}
+    assert result["speculative"]["elapsedMs"] < 10000
+    # The cancelled stand-in was reaped
+    assert {p.pid for p in psutil.Process().children(recursive=True)} <= before
+
+
+async def test_remembered_interpreter_survives_ordinary_errors(interpreters, script):
+    interpreters(V1=(0.1, SUCCESS), V2=(0.5, SUCCESS))
+    await run_ahk_launcher(str(script), "Auto", 5000, screenshot=False)
+    assert speculative._memory.get(str(script)) == "V1"
+
+    interpreters(V1=(0.1, error("Call to nonexistent function.", "Foo()")), V2=(0.1, SUCCESS))
+    for _ in range(2):
+        result = await run_ahk_launcher(str(script), "Auto", 5000, screenshot=False)
+        assert result["status"] == "ERROR" and "speculative" not in result
+
+    # One race, then two runs on the remembered interpreter only
+    assert sorted(interpreters.launched()) == ["V1", "V1", "V1", "V2"]
+    assert speculative._memory.scripts[str(script.resolve())]["n"] == 1
+
+
+async def test_remembered_interpreter_is_raced_again_on_mismatch(interpreters, script):
+    speculative._memory.remember(str(script), "V1")
+    interpreters(V1=(0.1, error("Call to nonexistent function.", "Persistent()")), V2=(0.3, SUCCESS))
+
+    result = await run_ahk_launcher(str(script), "Auto", 5000, screenshot=False)
+
+    assert result["speculative"]["winner"] == "V2"
+    assert speculative._memory.get(str(script)) == "V2"
@@ -0,0 +1,103 @@
+"""Frame differencing on synthetic frame sequences, with and without NumPy."""
+import pytest
+
+from ahk_mcp.services import stabilize
+from ahk_mcp.services.powershell import _capture_stable
+from ahk_mcp.services.stabilize import PIXEL_DELTA, StabilityTracker, changed_fraction
+
+W, H = 16, 8
+
+
+def frame(shade: int = 0, changed: int = 0, stride: int = W * 4) -> bytes:
+    """A W x H BGRA frame of `shade`, with its first `changed` pixels white."""
+    data = bytearray(stride * H)
+    for row in range(H):
+        for col in range(W):
+            i = row * stride + col * 4
+            white = row * W + col < changed
+            data[i:i + 4] = bytes([255, 255, 255, 255] if white else [shade, shade, shade, 255])
+    return bytes(data)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def diff_path(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(stabilize, "np", None)
+    elif stabilize.np is None:
+        pytest.skip("NumPy not installed")
+    return request.param
+
+
+def test_changed_fraction(diff_path):
+    assert changed_fraction(frame(), frame(), W, H) == 0.0
+    assert changed_fraction(frame(), frame(changed=W), W, H) == pytest.approx(1 / H)
+    # Antialiasing-sized changes do not count
+    assert changed_fraction(frame(0), frame(PIXEL_DELTA), W, H) == 0.0
+    assert changed_fraction(frame(0), frame(PIXEL_DELTA + 1), W, H) == 1.0
+    # Row padding is ignored
+    padded = (W + 2) * 4
+    assert changed_fraction(frame(stride=padded), frame(changed=1, stride=padded), W, H, padded) == pytest.approx(1 / (W * H))
+    # Mismatched geometry
+    assert changed_fraction(frame(), frame()[:-4], W, H) == 1.0
+
+
+def test_stable_sequence(diff_path):
+    tracker = StabilityTracker(stable_frames=2)
+    # Drawing, then settled
+    results = [tracker.feed(W, H, data) for data in (frame(changed=40), frame(changed=80), frame(changed=80), frame(changed=80))]
+    assert results == [False, False, False, True]
+    assert tracker.diffs == [pytest.approx(40 / (W * H), abs=1e-4), 0.0, 0.0]
+
+
+def test_flickering_sequence(diff_path):
+    tracker = StabilityTracker(stable_frames=2)
+    # A blinking control never gives two unchanged frames in a row
+    for i in range(20):
+        assert not tracker.feed(W, H, frame(changed=8 if i % 2 else 0))
+    assert tracker.frames == 20 and tracker.streak == 0
+
+
+def test_resize_restarts_the_streak(diff_path):
+    tracker = StabilityTracker(stable_frames=2)
+    tracker.feed(W, H, frame())
+    tracker.feed(W, H, frame())
+    assert not tracker.feed(W * 2, H, bytes(W * 8 * H))
+    assert tracker.diffs[-1] == 1.0
+
+
+# Stand-in stable-mode capture script: frames of a window that settles after
+# SETTLE frames (never when SETTLE is 0), saved on "save"
+CAPTURE = """
+import base64, json, sys
+SETTLE = {settle}
+frame = 0
+while True:
+    shade = 0 if SETTLE and frame >= SETTLE else (frame % 2) * 255
+    data = bytes([shade, shade, shade, 255]) * (16 * 8)
+    print(json.dumps({{"frame": frame, "width": 16, "height": 8, "data": base64.b64encode(data).decode()}}), flush=True)
+    frame += 1
+    command = sys.stdin.readline().strip()
+    if command == "save":
+        print(json.dumps({{"success": True, "screenshot_path": "shot.png"}}), flush=True)
+        sys.exit(0)
+    if command != "next":
+        sys.exit(0)
+"""
+
+
+async def test_capture_saves_once_stable(standin_powershell, diff_path):
+    standin_powershell(CAPTURE.format(settle=3))
+    result = await _capture_stable("", stable_frames=2, max_wait_ms=5000)
+    assert result["success"]
+    assert result["stabilization"]["stable"]
+    # Frames 2, 3 and 4 are alike: stable after two unchanged diffs
+    assert result["stabilization"]["frames"] == 5
+
+
+async def test_capture_times_out_on_flicker(standin_powershell, diff_path):
+    standin_powershell(CAPTURE.format(settle=0))
+    result = await _capture_stable("", stable_frames=2, max_wait_ms=300)
+    stabilization = result["stabilization"]
+    assert result["success"] and not stabilization["stable"]
+    assert stabilization["elapsedMs"] >= 300
+    assert all(diff == 1.0 for diff in stabilization["diffs"])
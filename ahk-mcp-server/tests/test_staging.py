@@ -0,0 +1,150 @@
+"""Per-run staged copies: naming, result mapping, sweeping, and tree-scoped detection."""
+import os
+import time
+from pathlib import Path
+
+from ahk_mcp.services import staging
+from ahk_mcp.services.detection import detect
+from ahk_mcp.services.powershell import run_ahk_launcher
+from ahk_mcp.services.staging import STAGE_PREFIX, StagedScript, stage_script, sweep_stale
+
+# Stand-in launcher: takes a screenshot named after the script it was given,
+# the way Take-Screenshot does, and reports the paths it saw
+LAUNCHER = """
+import json, os, sys
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+script = value("-ScriptPath")
+shots = os.path.join(os.path.dirname(value("-OutputFile")), "screenshots")
+os.makedirs(shots, exist_ok=True)
+shot = os.path.join(shots, os.path.basename(script)[:-4] + "_20260101_000000_SUCCESS.png")
+open(shot, "wb").write(b"PNG")
+json.dump({"status": "SUCCESS", "message": "Script window detected: " + os.path.basename(script),
+           "scriptPath": script, "screenshot": shot, "executionTimeMs": 5}, open(value("-OutputFile"), "w"))
+"""
+
+
+def _script(tmp_path: Path, name: str = "x.ahk") -> Path:
+    path = tmp_path / name
+    path.write_bytes(b"MsgBox 1\r\n")
+    return path
+
+
+def test_each_run_gets_its_own_copy(tmp_path):
+    script = _script(tmp_path)
+    first, second = stage_script(str(script)), stage_script(str(script))
+
+    assert first.path != second.path and first.token != second.token
+    for staged in (first, second):
+        assert staged.path.parent == tmp_path
+        assert staged.path.name == f"{STAGE_PREFIX}{staged.token}-x.ahk"
+        assert staged.path.read_bytes() == script.read_bytes()
+    first.remove()
+    assert not first.path.exists() and second.path.exists()
+    first.remove()
+
+
+def test_taken_name_draws_another_token(tmp_path):
+    script = _script(tmp_path)
+    taken = stage_script(str(script), token="abcd1234")
+    taken.path.write_bytes(b"another run")
+
+    staged = stage_script(str(script), token="abcd1234")
+
+    assert staged is not None and staged.token != "abcd1234"
+    assert staged.path.read_bytes() == script.read_bytes()
+    # The other run's copy is never overwritten
+    assert taken.path.read_bytes() == b"another run"
+
+
+def test_unstaged_runs(tmp_path, monkeypatch):
+    script = _script(tmp_path)
+    assert stage_script(str(tmp_path / "missing.ahk")) is None
+    monkeypatch.setattr(staging, "ENABLED", False)
+    assert stage_script(str(script)) is None
+    assert [p.name for p in tmp_path.iterdir()] == ["x.ahk"]
+
+
+def test_restore_maps_names_back_but_not_artifacts():
+    staged = StagedScript(Path("C:/s/x.ahk"), "abcd1234")
+    shot = "C:/shots/.ahkrun-abcd1234-x_20260101_000000_SUCCESS.png"
+    result = {
+        "status": "ERROR",
+        "message": "Error at line 3 in .ahkrun-abcd1234-x.ahk",
+        "scriptPath": "C:/s/.ahkrun-abcd1234-x.ahk",
+        "screenshot": shot,
+        "errorDetails": {"errorContent": ["x", ".ahkrun-abcd1234-x.ahk"], "line": 3},
+        "reapedProcesses": [{"pid": 4, "name": "AutoHotkey64.exe"}],
+        "processId": 42,
+    }
+
+    restored = staged.restore(result)
+
+    assert restored["message"] == "Error at line 3 in x.ahk"
+    assert restored["scriptPath"] == "C:/s/x.ahk"
+    assert restored["errorDetails"] == {"errorContent": ["x", "x.ahk"], "line": 3}
+    assert restored["screenshot"] == shot
+    assert restored["reapedProcesses"] == result["reapedProcesses"] and restored["processId"] == 42
+    # Another run's marker is not touched
+    assert staged.restore(".ahkrun-ffff0000-x.ahk") == ".ahkrun-ffff0000-x.ahk"
+
+
+def test_sweep_removes_old_copies_only(tmp_path):
+    script = _script(tmp_path)
+    old, fresh = stage_script(str(script)), stage_script(str(script))
+    hour_ago = time.time() - staging.STALE_S - 10
+    os.utime(old.path, (hour_ago, hour_ago))
+    other = tmp_path / "notes.ahk"
+    other.write_text("")
+    os.utime(other, (hour_ago, hour_ago))
+
+    assert sweep_stale(tmp_path) == [old.path]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([fresh.path.name, "notes.ahk", "x.ahk"])
+    assert sweep_stale(tmp_path / "missing") == []
+
+
+async def test_local_run_reports_real_paths(tmp_path, standin_powershell):
+    standin_powershell(LAUNCHER)
+    script = _script(tmp_path)
+
+    result = await run_ahk_launcher(str(script), "V2", 5000, screenshot=True, run_dir=str(tmp_path / "run"))
+
+    assert result["scriptPath"] == str(script)
+    assert result["message"] == "Script window detected: x.ahk"
+    # The screenshot keeps the name the launcher saved it under
+    assert Path(result["screenshot"]).is_file()
+    assert Path(result["screenshot"]).name.startswith(f"{STAGE_PREFIX}{result['runToken']}-x_")
+
+
+def _window(hwnd: int, pid: int, title: str, controls: tuple = ()) -> dict:
+    return {"hwnd": hwnd, "pid": pid, "title": title, "class": "#32770", "controls": list(controls)}
+
+
+ERROR_DIALOG = ({"class": "Static", "text": "Error at line 3.\n\nThe program will exit."}, {"class": "Button", "text": "OK"})
+
+
+def test_detection_only_sees_the_run_tree():
+    staged = ".ahkrun-abcd1234-x.ahk"
+    # Another run of the script, and an editor on it, show error-looking windows
+    foreign = [
+        {"t": 0, "open": _window(1, 9000, ".ahkrun-ffff0000-x.ahk", ERROR_DIALOG)},
+        {"t": 0, "open": _window(2, 9001, "x.ahk - Notepad")},
+    ]
+    # The run's GUI is opened by a child process it started
+    trace = {"script": f"C:\\s\\{staged}", "pid": 4242, "childPids": [4250], "events": foreign + [
+        {"t": 300, "open": _window(3, 4250, "Settings")},
+    ]}
+
+    result = detect(trace)
+    assert result["status"] == "SUCCESS" and result["windowHandle"] == "3"
+    assert result["executionTimeMs"] >= 300
+
+    # Without childPids the child's window is not the run's either
+    alone = detect({**trace, "childPids": []})
+    assert alone["status"] == "RUNNING"
+
+    # The run's own error dialog is still found
+    failing = {**trace, "events": foreign + [{"t": 200, "open": _window(4, 4250, staged, ERROR_DIALOG)}]}
+    result = detect(failing)
+    assert result["status"] == "ERROR" and result["windowHandle"] == "4"
+    assert "Error at line 3." in result["message"]
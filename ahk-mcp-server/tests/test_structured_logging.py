@@ -0,0 +1,118 @@
+"""JSON-lines log file: offset index, compressed rotation and indexed queries."""
+import gzip
+import json
+import logging
+import threading
+
+import pytest
+
+from ahk_mcp import structured_logging
+from ahk_mcp.structured_logging import JsonFormatter, JsonLinesHandler, query_logs, rotated_files
+
+
+def _handler(log_dir, **options) -> JsonLinesHandler:
+    handler = JsonLinesHandler(log_dir, **options)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _log(handler: JsonLinesHandler, msg: str, level: int = logging.INFO, **extra) -> None:
+    # What the QueueListener thread does with each record
+    handler.handle(logging.makeLogRecord({
+        "name": "ahk_mcp.test", "msg": msg, "levelno": level, "levelname": logging.getLevelName(level), **extra,
+    }))
+
+
+@pytest.fixture
+def handler(tmp_path, monkeypatch):
+    """The process-wide handler query_logs() reads, over a small file."""
+    handler = _handler(tmp_path / "logs", max_bytes=4096, backup_count=3)
+    monkeypatch.setattr(structured_logging, "_json_handler", handler)
+    yield handler
+    handler.close()
+
+
+def test_index_lists_offsets_of_run_and_status_lines(tmp_path):
+    handler = _handler(tmp_path)
+    _log(handler, "plain")
+    _log(handler, "start", run_id="r1")
+    _log(handler, "done", run_id="r1", status="ERROR")
+    handler.flush()
+
+    lines = handler.path.read_bytes().splitlines(keepends=True)
+    assert handler.offsets("run:r1") == [len(lines[0]), len(lines[0]) + len(lines[1])]
+    assert handler.offsets("status:ERROR") == handler.offsets("run:r1")[1:]
+    assert handler.offsets("run:r2") == []
+    handler.close()
+
+    # Reopening indexes the existing file the same way
+    reopened = _handler(tmp_path)
+    assert reopened.index == {"run:r1": handler.offsets("run:r1"), "status:ERROR": handler.offsets("status:ERROR")}
+    reopened.close()
+
+
+def test_rotation_compresses_with_sidecars(handler):
+    for i in range(200):
+        _log(handler, f"line {i:03d} " + "x" * 60, run_id=f"r{i % 4}")
+
+    rotated = rotated_files(handler.log_dir)
+    assert len(rotated) == handler.backup_count
+    for path in rotated:
+        sidecar = json.loads(path.with_name(path.name + ".idx.json").read_text())
+        data = gzip.decompress(path.read_bytes())
+        for key, offsets in sidecar.items():
+            for offset in offsets:
+                entry = json.loads(data[offset:data.index(b"\n", offset)])
+                assert f"run:{entry['run_id']}" == key
+    assert len(list(handler.log_dir.glob("*.idx.json"))) == handler.backup_count
+    assert handler.path.stat().st_size <= handler.max_bytes
+
+
+def test_queries_by_run_status_and_level(handler):
+    for i in range(120):
+        _log(handler, f"step {i:03d} " + "x" * 60, logging.DEBUG if i % 2 else logging.INFO, run_id=f"r{i % 3}")
+    _log(handler, "finished", run_id="r0", status="SUCCESS")
+    _log(handler, "finished", logging.WARNING, run_id="r1", status="ERROR")
+    assert rotated_files(handler.log_dir)
+
+    entries = query_logs(run_id="r0", limit=1000)
+    messages = [e["msg"] for e in entries]
+    # Oldest first, across the rotated files and the current one
+    assert messages[:-1] == sorted(messages[:-1]) and messages[-1] == "finished"
+    assert all(e["run_id"] == "r0" for e in entries)
+    assert [e["msg"][:8] for e in query_logs(run_id="r0", limit=2)] == ["step 117", "finished"]
+
+    assert [e["run_id"] for e in query_logs(status="ERROR")] == ["r1"]
+    assert all(e["level"] in ("INFO", "WARNING") for e in query_logs(run_id="r1", level="info", limit=1000))
+    assert [e["msg"] for e in query_logs(run_id="r1", level="warning")] == ["finished"]
+    assert query_logs(run_id="nope") == []
+
+    tail = query_logs(limit=3)
+    assert [e["msg"] for e in tail][-2:] == ["finished", "finished"] and len(tail) == 3
+
+
+def test_query_logs_without_setup(monkeypatch):
+    monkeypatch.setattr(structured_logging, "_json_handler", None)
+    assert query_logs(run_id="r1") is None
+
+
+def test_queries_during_rotation(handler):
+    done = threading.Event()
+
+    def write() -> None:
+        for i in range(3000):
+            _log(handler, f"{i:05d}", run_id="busy" if i % 2 else "other")
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        while not done.is_set():
+            entries = query_logs(run_id="busy", limit=20)
+            assert all(e["run_id"] == "busy" for e in entries)
+            seq = [int(e["msg"]) for e in entries]
+            assert seq == sorted(seq)
+            query_logs(limit=20)
+    finally:
+        writer.join()
+    assert int(query_logs(run_id="busy", limit=1)[0]["msg"]) == 2999
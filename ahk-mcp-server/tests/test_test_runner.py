@@ -0,0 +1,169 @@
+"""ahk_run_tests: result collection, sharding and merged reports, with a stand-in interpreter."""
+import asyncio
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from ahk_mcp.services import scheduler, test_runner
+from ahk_mcp.services.artifacts import ArtifactStore
+from ahk_mcp.services.scheduler import CostModel
+from ahk_mcp.services.test_runner import (
+    HARNESS_PREFIX, collect, discover_tests, junit_xml, merge, parse_results, partition, run_tests, write_harness,
+)
+
+# Stand-in launcher: "runs" the harness by replaying the ";> " records of the
+# test file it includes into the results file, the way the reporter would.
+# ";> SLEEP s" waits, ";> ERROR message" stops the file with an error dialog.
+LAUNCHER = """
+import json, os, re, sys, time
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+harness = value("-ScriptPath")
+text = open(harness, encoding="utf-8-sig").read()
+results_dir = re.search(r'AhkTestResults := "(.*)\\\\results-', text).group(1)
+test_file = re.findall(r"^#Include (.*)$", text, re.M)[-1]
+records, result = [], {"status": "SUCCESS", "message": "Script exited", "executionTimeMs": 1}
+for line in open(test_file, encoding="utf-8"):
+    if not line.startswith(";> "):
+        continue
+    kind, _, rest = line[3:].rstrip("\\n").partition(" ")
+    if kind == "SLEEP":
+        time.sleep(float(rest))
+    elif kind == "ERROR":
+        result = {"status": "ERROR", "message": rest, "executionTimeMs": 1}
+        break
+    else:
+        records.append(f"{kind}\\t{rest}" if rest else kind)
+else:
+    records.append("DONE")
+with open(os.path.join(results_dir, "results-" + value("-AhkVersion")[-1] + ".tsv"), "a", encoding="utf-8") as f:
+    f.write("".join(r + "\\n" for r in records))
+json.dump(result, open(value("-OutputFile"), "w"))
+"""
+
+
+def test_parse_results_builds_cases():
+    parsed = parse_results([
+        "\ufeffTEST\tadds", "PASS\tsum", "END\t12",
+        "TEST\tsplits", "PASS\t", "FAIL\texpected <a> got <b>", "END\t3",
+        "TEST\topen", "PASS\tfirst",
+    ])
+    assert not parsed["complete"]
+    assert [(t["name"], t["status"], t["durationMs"], t["assertions"]) for t in parsed["tests"]] == [
+        ("adds", "passed", 12, 1), ("splits", "failed", 3, 2), ("open", None, None, 1),
+    ]
+    assert parsed["tests"][1]["failures"] == ["expected <a> got <b>"]
+    assert parse_results(["PASS\tloose", "DONE"])["tests"][0]["name"] == ""
+
+
+@pytest.mark.parametrize("status, records, expected", [
+    # Open case in a file that stopped on an error dialog
+    ("ERROR", ["TEST\ta", "PASS\tx"], [("a", "error", "Error: boom")]),
+    # Open case in a file that ended on its own (ExitApp inside the test)
+    ("SUCCESS", ["TEST\ta", "FAIL\tx"], [("a", "failed", None)]),
+    # Nothing reported at all
+    ("ERROR", [], [("test_x", "error", "Error: boom")]),
+    ("SUCCESS", [], [("test_x", "error", "Stopped before the end of the file (ExitApp or return) without reporting")]),
+    # A file without assertions that ran to its end
+    ("SUCCESS", ["DONE"], []),
+])
+def test_collect_settles_against_verdict(tmp_path, status, records, expected):
+    (tmp_path / "results-2.tsv").write_text("".join(r + "\n" for r in records), encoding="utf-8")
+    outcome = collect(tmp_path / "test_x.ahk", tmp_path, {"status": status, "message": "Error: boom", "ahkVersion": "V2"})
+    assert [(t["name"], t["status"], t.get("error")) for t in outcome["tests"]] == expected
+
+
+def test_collect_prefers_the_interpreters_file(tmp_path):
+    (tmp_path / "results-1.tsv").write_text("TEST\tv1\nEND\t1\nDONE\n", encoding="utf-8")
+    (tmp_path / "results-2.tsv").write_text("TEST\tv2\nEND\t1\nDONE\n", encoding="utf-8")
+    outcome = collect(tmp_path / "t.ahk", tmp_path, {"status": "SUCCESS", "ahkVersion": "V2"})
+    assert [t["name"] for t in outcome["tests"]] == ["v2"]
+
+
+def test_partition_balances_predicted_time():
+    jobs = [{"predictedMs": ms, "position": i} for i, ms in enumerate([900, 100, 500, 400, 300, 200])]
+    groups = partition(jobs, 3)
+    assert sorted(sum(j["predictedMs"] for j in g) for g in groups) == [700, 800, 900]
+    assert sorted(j["position"] for g in groups for j in g) == list(range(6))
+    # Never more shards than jobs
+    assert len(partition(jobs[:2], 8)) == 2
+
+
+def test_merge_and_junit():
+    files = [
+        {"file": "C:\\t\\test_a.ahk", "shard": 0, "durationMs": 40, "tests": [
+            {"name": "ok", "status": "passed", "durationMs": 5, "assertions": 2, "failures": []},
+            {"name": "bad", "status": "failed", "durationMs": 7, "assertions": 1, "failures": ["expected <1> got <2>"]},
+        ]},
+        {"file": "C:\\t\\test_b.ahk", "shard": 1, "durationMs": 30, "tests": [
+            {"name": "test_b", "status": "error", "durationMs": None, "assertions": 0, "failures": [], "error": "Error: boom\nLine 3"},
+        ]},
+    ]
+    totals = merge(files)
+    assert totals == {"files": 2, "tests": 3, "passed": 1, "failed": 1, "errors": 1, "assertions": 3}
+
+    root = ET.fromstring(junit_xml({"totals": totals, "durationMs": 50, "files": files}))
+    assert (root.get("tests"), root.get("failures"), root.get("errors"), root.get("time")) == ("3", "1", "1", "0.050")
+    a, b = root.findall("testsuite")
+    assert [c.get("time") for c in a.findall("testcase")] == ["0.005", "0.007"]
+    assert a.find("testcase[@name='bad']/failure").get("message") == "expected <1> got <2>"
+    assert b.find("testcase/error").get("message") == "Error: boom"
+    assert b.find("properties/property").get("value") == "1"
+
+
+def test_harness_names_are_unique(tmp_path):
+    test = tmp_path / "test_x.ahk"
+    test.write_text("")
+    first = write_harness(test, tmp_path, tmp_path / "reporter.ahk")
+    second = write_harness(test, tmp_path, tmp_path / "reporter.ahk")
+    assert first != second and first.exists() and second.exists()
+    assert first.name.startswith(HARNESS_PREFIX) and first.name.endswith("-test_x.ahk")
+    assert discover_tests(tmp_path) == [test.resolve()]
+
+
+@pytest.fixture
+def runner(tmp_path, standin_powershell, monkeypatch):
+    standin_powershell(LAUNCHER)
+    monkeypatch.setattr(test_runner, "artifact_store", ArtifactStore(tmp_path / "runs"))
+    monkeypatch.setattr(scheduler, "_model", CostModel(tmp_path / "runtimes.json"))
+    suite = tmp_path / "suite"
+    suite.mkdir()
+
+    def add(name: str, *records: str) -> str:
+        path = suite / name
+        path.write_text("".join(f";> {r}\n" for r in records), encoding="utf-8")
+        return str(path)
+
+    return add
+
+
+async def test_run_tests_shards_and_merges(runner):
+    tests = [
+        runner("test_a.ahk", "SLEEP 0.3", "TEST\tone", "PASS\tok", "END\t4"),
+        runner("test_b.ahk", "SLEEP 0.3", "TEST\ttwo", "FAIL\tno", "END\t2"),
+        runner("test_c.ahk", "TEST\tthree", "PASS\tok", "ERROR Error: boom"),
+    ]
+
+    report = await run_tests(tests, version="V2", shards=2)
+
+    assert report["shards"] == 2
+    assert report["totals"] == {"files": 3, "tests": 3, "passed": 1, "failed": 1, "errors": 1, "assertions": 3}
+    assert {o["shard"] for o in report["files"]} == {0, 1}
+    # test_a and test_b ran in parallel
+    assert report["durationMs"] < sum(report["shardMs"])
+    assert json.loads(open(report["reportPath"], encoding="utf-8").read())["totals"] == report["totals"]
+    assert ET.parse(report["junitPath"]).getroot().get("tests") == "3"
+    # Harnesses are deleted after the run
+    assert not list((Path(tests[0]).parent).glob(f"{HARNESS_PREFIX}*"))
+
+
+async def test_concurrent_runs_of_one_file(runner):
+    test = runner("test_a.ahk", "SLEEP 0.3", "TEST\tone", "PASS\tok", "END\t4")
+
+    reports = await asyncio.gather(*(run_tests([test], version="V2") for _ in range(3)))
+
+    for report in reports:
+        assert report["totals"]["passed"] == 1
+        assert report["files"][0]["status"] == "SUCCESS"
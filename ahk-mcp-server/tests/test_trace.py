@@ -0,0 +1,132 @@
+"""Record/replay of launcher runs: round trip, round-robin, time scaling and load tests."""
+import json
+import time
+
+import pytest
+
+from ahk_mcp.services import trace
+from ahk_mcp.services.powershell import run_ahk_launcher
+from ahk_mcp.services.trace import ReplayBackend, enable_recording, enable_replay, load_test, load_trace
+
+# Stand-in launcher: the verdict is the script's first line
+LAUNCHER = """
+import json, sys
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+status = open(value("-ScriptPath"), encoding="utf-8").readline().strip("; \\n")
+json.dump({"status": status, "message": "Script " + status.lower(), "executionTimeMs": 3, "processId": 99,
+           "windowHandle": "0x10"}, open(value("-OutputFile"), "w"))
+"""
+
+
+@pytest.fixture(autouse=True)
+def trace_state(monkeypatch):
+    """Recording and replay are process-wide: every test starts and ends without them."""
+    monkeypatch.setattr(trace, "_recorder", None)
+    monkeypatch.setattr(trace, "_replay", None)
+
+
+def _record(script: str, version: str, ms: int, out: dict) -> dict:
+    return {"v": trace.TRACE_VERSION, "t": 0, "script": script, "args": {"version": version}, "ms": ms, "out": out}
+
+
+def _write(path, records: list[dict]) -> str:
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("name", ["run.jsonl", "run.jsonl.gz"])
+async def test_record_then_replay(tmp_path, standin_powershell, monkeypatch, name):
+    standin_powershell(LAUNCHER)
+    scripts = {}
+    for status in ("SUCCESS", "ERROR"):
+        scripts[status] = tmp_path / f"{status.lower()}.ahk"
+        scripts[status].write_text(f"; {status}\n")
+    path = tmp_path / "traces" / name
+
+    enable_recording(str(path))
+    recorded = {s: await run_ahk_launcher(str(p), "V2", 3000, screenshot=False) for s, p in scripts.items()}
+    enable_recording(None)
+
+    records = load_trace(str(path))
+    assert [(r["script"], r["args"]["version"], r["out"]["status"]) for r in records] == [
+        (str(scripts["SUCCESS"]), "V2", "SUCCESS"), (str(scripts["ERROR"]), "V2", "ERROR"),
+    ]
+    assert all(r["ms"] >= 0 for r in records)
+
+    # No launcher on PATH: replay answers from the trace, for any directory
+    monkeypatch.setenv("PATH", "")
+    enable_replay(str(path))
+    for status, script in scripts.items():
+        replayed = await run_ahk_launcher(f"C:\\elsewhere\\{script.name}", "V2", 3000, screenshot=False)
+        expected = {k: v for k, v in recorded[status].items() if k not in ("processId", "windowHandle")}
+        assert replayed == {**expected, "scriptPath": f"C:\\elsewhere\\{script.name}"}
+    missing = await run_ahk_launcher("other.ahk", "V2", 3000, screenshot=False)
+    assert missing["status"] == "CONFIG_ERROR"
+    assert (await run_ahk_launcher(str(scripts["SUCCESS"]), "V1", 3000, screenshot=False))["status"] == "CONFIG_ERROR"
+
+
+async def test_unwritable_trace_keeps_the_result(tmp_path, standin_powershell):
+    standin_powershell(LAUNCHER)
+    script = tmp_path / "x.ahk"
+    script.write_text("; SUCCESS\n")
+    (tmp_path / "trace.jsonl").mkdir()
+    enable_recording(str(tmp_path / "trace.jsonl"))
+
+    result = await run_ahk_launcher(str(script), "V2", 3000, screenshot=False)
+
+    assert result["status"] == "SUCCESS"
+
+
+async def test_recordings_of_one_script_are_served_round_robin():
+    backend = ReplayBackend([
+        _record("C:\\s\\x.ahk", "V2", 0, {"status": "SUCCESS", "message": "first"}),
+        _record("C:\\s\\X.AHK", "v2", 0, {"status": "ERROR", "message": "second"}),
+        _record("C:\\s\\x.ahk", "V1", 0, {"status": "RUNNING", "message": "v1"}),
+    ])
+
+    messages = [(await backend.run("/tmp/x.ahk", "V2"))["message"] for _ in range(5)]
+
+    assert messages == ["first", "second", "first", "second", "first"]
+    assert (await backend.run("x.ahk", "V1"))["message"] == "v1"
+
+
+async def test_recorded_time_is_scaled_and_capped():
+    backend = ReplayBackend([_record("x.ahk", "V2", 1000, {"status": "SUCCESS"})], time_scale=0.2)
+
+    start = time.perf_counter()
+    await backend.run("x.ahk", "V2")
+    scaled = time.perf_counter() - start
+    start = time.perf_counter()
+    await backend.run("x.ahk", "V2", max_wait_s=0.05)
+    capped = time.perf_counter() - start
+
+    assert 0.19 <= scaled < 0.6
+    assert 0.04 <= capped < 0.15
+
+
+async def test_load_test_amplifies_each_record(tmp_path):
+    path = _write(tmp_path / "trace.jsonl", [
+        _record("a.ahk", "V2", 200, {"status": "SUCCESS"}),
+        _record("b.ahk", "V2", 200, {"status": "ERROR"}),
+    ])
+
+    report = await load_test(path, amplify=5)
+
+    assert report["runs"] == 10
+    assert report["statuses"] == {"SUCCESS": 5, "ERROR": 5}
+    # Issued concurrently: about one recorded run, not ten
+    assert report["wallS"] < 1.0
+    assert 190 <= report["latencyMs"]["p50"] <= report["latencyMs"]["max"]
+    # The replay backend is only installed for the load test
+    assert trace.get_replay() is None
+
+
+async def test_load_test_concurrency_and_scale(tmp_path):
+    path = _write(tmp_path / "trace.jsonl", [_record("a.ahk", "V2", 1000, {"status": "SUCCESS"})])
+
+    report = await load_test(path, amplify=4, time_scale=0.1, concurrency=1)
+
+    # One run at a time, each a tenth of the recorded second
+    assert report["runs"] == 4 and report["statuses"] == {"SUCCESS": 4}
+    assert 0.39 <= report["wallS"] < 1.5
@@ -0,0 +1,142 @@
+"""Watch sessions: debouncing, #Include dependents, backends and failing batches."""
+import asyncio
+import time
+
+import pytest
+
+from ahk_mcp.services import watcher
+from ahk_mcp.services.watcher import WatchSession
+
+# Stand-in launcher: logs each script it runs, reports the "; status S" line
+# of the script or of the files it #Includes
+LAUNCHER = """
+import json, os, re, sys
+args = sys.argv
+value = lambda name: args[args.index(name) + 1]
+script = value("-ScriptPath")
+with open(os.environ["STANDIN_LOG"], "a") as log:
+    log.write(re.sub(r"^\\.ahkrun-[0-9a-f]+-", "", os.path.basename(script)) + "\\n")
+text = open(script, encoding="utf-8").read()
+for name in re.findall(r"^#Include (.*)$", text, re.M):
+    text += open(os.path.join(os.path.dirname(script), name), encoding="utf-8").read()
+status = re.search(r"; status (\\w+)", text)
+json.dump({"status": status.group(1) if status else "SUCCESS", "message": "", "executionTimeMs": 1},
+          open(value("-OutputFile"), "w"))
+"""
+
+
+class Session:
+    """MCP session stand-in collecting the watch notifications."""
+
+    def __init__(self):
+        self.updates = []
+        self.messages = []
+
+    async def send_resource_updated(self, uri):
+        self.updates.append(str(uri))
+
+    async def send_log_message(self, level, data, logger):
+        self.messages.append(data)
+
+
+async def _until(condition, timeout_s: float = 10) -> None:
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+def launched(tmp_path, standin_powershell, monkeypatch):
+    """Install the stand-in; returns the names of the scripts it ran so far."""
+    standin_powershell(LAUNCHER)
+    log = tmp_path / "launched.log"
+    log.touch()
+    monkeypatch.setenv("STANDIN_LOG", str(log))
+    return lambda: log.read_text().split()
+
+
+@pytest.fixture
+def project(tmp_path, launched, monkeypatch):
+    """A watched directory: main.ahk includes lib.ahk, other.ahk stands alone."""
+    monkeypatch.setattr(watcher, "POLL_INTERVAL_S", 0.05)
+    directory = tmp_path / "project"
+    directory.mkdir()
+    (directory / "lib.ahk").write_text("Helper() {\n}\n")
+    (directory / "main.ahk").write_text("#Include lib.ahk\nHelper()\n")
+    (directory / "other.ahk").write_text("x := 1\n")
+    return directory
+
+
+@pytest.fixture
+async def watch(project):
+    sessions = []
+
+    async def start(**kwargs) -> WatchSession:
+        session = WatchSession(str(project), session=Session(), **kwargs)
+        session.start()
+        sessions.append(session)
+        # Let the backend take its first look at the directory
+        await asyncio.sleep(0.2)
+        return session
+
+    yield start
+    for session in sessions:
+        await session.stop()
+
+
+@pytest.mark.parametrize("backend", ["inotify", "polling"])
+async def test_include_change_reruns_its_dependents(watch, project, launched, backend):
+    session = await watch(backend=backend, version="V2", debounce_ms=100)
+    assert session.backend_name == backend
+
+    (project / "lib.ahk").write_text("Helper() {\n    ; status RUNNING\n}\n")
+    await _until(lambda: session.run_count == 1)
+    assert launched() == ["main.ahk"]
+    assert session.results[str(project / "main.ahk")]["status"] == "RUNNING"
+    assert session.session.messages[-1]["deltas"][0]["script"] == str(project / "main.ahk")
+
+    (project / "other.ahk").write_text("x := 2\n")
+    await _until(lambda: session.run_count == 2)
+    assert launched() == ["main.ahk", "other.ahk"]
+
+
+async def test_bursts_are_coalesced(watch, project, launched):
+    session = await watch(backend="polling", version="V2", debounce_ms=300)
+
+    for i in range(5):
+        (project / "lib.ahk").write_text(f"Helper() {{\n    x := {i}\n}}\n")
+        (project / "main.ahk").write_text(f"#Include lib.ahk\nHelper() ; {i}\n")
+        await asyncio.sleep(0.08)
+    await _until(lambda: session.run_count >= 1)
+    await asyncio.sleep(0.5)
+
+    # One batch, one run of the one affected script
+    assert launched() == ["main.ahk"]
+    assert session.session.messages[-1]["rerun"] == 1
+    # An unchanged outcome is not sent again
+    (project / "main.ahk").write_text("#Include lib.ahk\nHelper() ; again\n")
+    await _until(lambda: session.run_count == 2)
+    assert len(session.session.messages) == 1 and len(session.session.updates) == 2
+
+
+async def test_failed_batch_keeps_watching(watch, project, monkeypatch):
+    session = await watch(backend="polling", version="V2", debounce_ms=50)
+    real = watcher.run_ahk_launcher
+    calls = []
+
+    async def flaky(*args, **kwargs):
+        calls.append(args[0])
+        if len(calls) == 1:
+            raise OSError("launcher went away")
+        return await real(*args, **kwargs)
+
+    monkeypatch.setattr(watcher, "run_ahk_launcher", flaky)
+    (project / "other.ahk").write_text("x := 2\n")
+    await _until(lambda: session.failed_batches == 1)
+    assert session.last_error == "OSError: launcher went away"
+    assert not session._task.done()
+
+    (project / "other.ahk").write_text("x := 3\n")
+    await _until(lambda: session.run_count == 1)
+    assert session.results[str(project / "other.ahk")]["status"] == "SUCCESS"
@@ -29,12 +29,33 @@
     [string]$ScreenshotPath = "",
 
     [Parameter(Mandatory=$false)]
-    [string]$OutputFile = ""  # v1.8.1: Write JSON to file instead of stdout (for MCP pipe issues)
+    [string]$OutputFile = "",  # v1.8.1: Write JSON to file instead of stdout (for MCP pipe issues)
+
+    [Parameter(Mandatory=$false)]
+    [switch]$KeepErrorWindow,  # v1.8.4: Leave the AHK process (and its error window) alive for a deferred capture
+
+    [Parameter(Mandatory=$false)]
+    [string]$LogPath = "",  # v1.8.5: Write the log to this exact file (implies -LogFile)
+
+    [Parameter(Mandatory=$false)]
+    [string]$StdoutFile = "",  # v1.10.0: Redirect the script's stdout (FileAppend ..., *) to this file
+
+    [Parameter(Mandatory=$false)]
+    [string]$StderrFile = "",  # v1.10.0: Redirect the script's stderr (FileAppend ..., **) to this file
+
+    [Parameter(Mandatory=$false)]
+    [string]$InteropAssembly = ""  # v1.11.0: Precompiled Win32API/RECT/WindowInfo (built by the MCP server) instead of Add-Type compilation
 )
 
 # AHK Launcher PowerShell - Script Validation AutoHotkey avec Extraction Erreurs
-# Version: 1.8.3 - Auto-detect AHK version from #Requires directive
+# Version: 1.12.0 - Run-scoped window attribution (AHK process tree)
 # Objectif: Validation rapide scripts AHK + extraction erreurs intelligente via APIs Windows
+# v1.12.0: Windows and tray status are attributed by the AHK process tree only (Test-WindowIsSuccess was unfiltered, Test-TrayIconPresent system-wide)
+# v1.11.0: -InteropAssembly loads the interop types from a cached DLL (no C# compilation); falls back to Add-Type, reported as "interop"
+# v1.10.0: -StdoutFile/-StderrFile redirect the script's standard streams to files (read while the script runs)
+# v1.9.0: Error windows are exported once as controlTree (class, text, order); Get-WindowTextSmart removed, text collection is linear
+# v1.8.5: -LogPath writes the log to a given file (no second-level timestamp collisions between parallel runs)
+# v1.8.4: -KeepErrorWindow skips killing AHK on ERROR; JSON output includes processId
 # v1.8.3: Read #Requires AutoHotkey directive to auto-detect V1/V2 (fixes V1 being used for V2 scripts)
 # v1.8.2: Handle scripts that exit with code 0 (spawning child processes) - immediate SUCCESS
 # v1.8.1: -OutputFile parameter to write JSON to file (avoids pipe inheritance issues with MCP)
@@ -44,7 +65,21 @@
 # v1.5: Smart error extraction - separate error content from buttons using GetClassName
 # v1.4: JSON output format + automatic log file generation + screenshot capture
 
+# v1.11.0: Types interop precompiles (DLL du cache du serveur MCP), sinon compilation Add-Type
+# Le serveur hache le here-string ci-dessous pour construire la DLL : toute modification la reconstruit
+$global:InteropSource = "compiled"
+if ($InteropAssembly) {
+    try {
+        Add-Type -Path $InteropAssembly -ErrorAction Stop
+        $global:InteropSource = "assembly"
+    } catch {
+        Write-Verbose "Interop assembly unusable, compiling: $($_.Exception.Message)"
+        $global:InteropSource = "fallback"
+    }
+}
+
 # Add-Type pour APIs Windows necessaires + EnumWindows fonctionnel
+if ($global:InteropSource -ne "assembly") {
 Add-Type @'
 using System;
 using System.Runtime.InteropServices;
@@ -58,6 +93,9 @@ public class Win32API {
     [DllImport("user32.dll", CharSet = CharSet.Auto, SetLastError = true)]
     public static extern int GetWindowText(IntPtr hWnd, StringBuilder lpString, int nMaxCount);
 
+    [DllImport("user32.dll", CharSet = CharSet.Auto, SetLastError = true)]
+    public static extern int GetWindowTextLength(IntPtr hWnd);
+
     [DllImport("user32.dll", CharSet = CharSet.Auto, SetLastError = true)]
     public static extern int GetClassName(IntPtr hWnd, StringBuilder lpClassName, int nMaxCount);
 
@@ -119,6 +157,91 @@ public class Win32API {
         FoundWindows.Clear();
         EnumWindows(EnumWindowCallback, IntPtr.Zero);
     }
+
+    // v1.12.0: Arbre de processus (Toolhelp32) - fenetres attribuees au run par PID
+    [DllImport("kernel32.dll", SetLastError = true)]
+    public static extern IntPtr CreateToolhelp32Snapshot(uint dwFlags, uint th32ProcessID);
+
+    [DllImport("kernel32.dll", CharSet = CharSet.Unicode, SetLastError = true)]
+    public static extern bool Process32FirstW(IntPtr hSnapshot, ref PROCESSENTRY32 lppe);
+
+    [DllImport("kernel32.dll", CharSet = CharSet.Unicode, SetLastError = true)]
+    public static extern bool Process32NextW(IntPtr hSnapshot, ref PROCESSENTRY32 lppe);
+
+    [DllImport("kernel32.dll", SetLastError = true)]
+    public static extern bool CloseHandle(IntPtr hObject);
+
+    public const uint TH32CS_SNAPPROCESS = 0x00000002;
+
+    // PIDs vivants du processus racine et de tous ses descendants (la racine peut etre terminee)
+    public static HashSet<uint> GetProcessTree(uint rootPid)
+    {
+        HashSet<uint> tree = new HashSet<uint>();
+        Dictionary<uint, List<uint>> children = new Dictionary<uint, List<uint>>();
+        IntPtr snapshot = CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0);
+        if (snapshot == IntPtr.Zero || snapshot == new IntPtr(-1))
+        {
+            tree.Add(rootPid);
+            return tree;
+        }
+        try
+        {
+            PROCESSENTRY32 entry = new PROCESSENTRY32();
+            entry.dwSize = (uint)Marshal.SizeOf(typeof(PROCESSENTRY32));
+            bool more = Process32FirstW(snapshot, ref entry);
+            while (more)
+            {
+                if (entry.th32ProcessID == rootPid)
+                {
+                    tree.Add(rootPid);
+                }
+                else if (entry.th32ProcessID != 0)
+                {
+                    List<uint> list;
+                    if (!children.TryGetValue(entry.th32ParentProcessID, out list))
+                    {
+                        list = new List<uint>();
+                        children[entry.th32ParentProcessID] = list;
+                    }
+                    list.Add(entry.th32ProcessID);
+                }
+                more = Process32NextW(snapshot, ref entry);
+            }
+        }
+        finally
+        {
+            CloseHandle(snapshot);
+        }
+
+        Queue<uint> pending = new Queue<uint>();
+        pending.Enqueue(rootPid);
+        while (pending.Count > 0)
+        {
+            List<uint> list;
+            if (!children.TryGetValue(pending.Dequeue(), out list)) continue;
+            foreach (uint pid in list)
+            {
+                if (tree.Add(pid)) pending.Enqueue(pid);
+            }
+        }
+        return tree;
+    }
+}
+
+[StructLayout(LayoutKind.Sequential, CharSet = CharSet.Unicode)]
+public struct PROCESSENTRY32
+{
+    public uint dwSize;
+    public uint cntUsage;
+    public uint th32ProcessID;
+    public IntPtr th32DefaultHeapID;
+    public uint th32ModuleID;
+    public uint cntThreads;
+    public uint th32ParentProcessID;
+    public int pcPriClassBase;
+    public uint dwFlags;
+    [MarshalAs(UnmanagedType.ByValTStr, SizeConst = 260)]
+    public string szExeFile;
 }
 
 [StructLayout(LayoutKind.Sequential)]
@@ -139,6 +262,7 @@ public class WindowInfo
     public string Title { get; set; }
 }
 '@
+}
 
 # Add-Type pour screenshot - System.Drawing et System.Windows.Forms
 Add-Type -AssemblyName System.Drawing
@@ -148,7 +272,7 @@ function Write-StructuredOutput {
     param(
         [string]$Status,
         [string]$Message,
-        [hashtable]$ErrorDetails = $null,
+        [hashtable]$ControlTree = $null,
         [string]$WindowHandle = "",
         [string]$TrayIcon = "NOT_CHECKED",
         [string]$Timestamp = (Get-Date -Format "yyyy-MM-dd HH:mm:ss"),
@@ -167,9 +291,9 @@ function Write-StructuredOutput {
             scriptPath = $ScriptPath
         }
 
-        # v1.5: Add structured error details
-        if ($ErrorDetails) {
-            $result.errorDetails = $ErrorDetails
+        # v1.9.0: Raw controls of the error window (errorDetails are built by the caller)
+        if ($ControlTree) {
+            $result.controlTree = $ControlTree
         }
 
         if ($WindowHandle) {
@@ -180,6 +304,14 @@ function Write-StructuredOutput {
             $result.screenshot = $ScreenshotFile
         }
 
+        # v1.8.4: PID of the AHK process so the caller can capture/reap it later
+        if ($global:AhkProcessId) {
+            $result.processId = $global:AhkProcessId
+        }
+
+        # v1.11.0: How the interop types were loaded (assembly, compiled, fallback)
+        $result.interop = $global:InteropSource
+
         # v1.8.1: Write to file if OutputFile specified (avoids pipe inheritance issues)
         $jsonOutput = $result | ConvertTo-Json -Depth 5 -Compress
         if ($OutputFile) {
@@ -190,8 +322,8 @@ function Write-StructuredOutput {
     } else {
         Write-Output "STATUS: $Status"
         Write-Output "MESSAGE: $Message"
-        if ($ErrorDetails) {
-            Write-Output "ERROR_DETAILS: $($ErrorDetails | ConvertTo-Json -Compress)"
+        if ($ControlTree) {
+            Write-Output "CONTROL_TREE: $($ControlTree | ConvertTo-Json -Depth 4 -Compress)"
         }
         Write-Output "TRAY_ICON: $TrayIcon"
         Write-Output "TIMESTAMP: $Timestamp"
@@ -207,13 +339,36 @@ function Write-StructuredOutput {
 # Global log file path (si activÃ©)
 $global:LogFilePath = $null
 
+# v1.8.4: PID du processus AHK lancé (inclus dans la sortie JSON)
+$global:AhkProcessId = $null
+
+# v1.12.0: PIDs du run (processus AHK et descendants), rafraichis a chaque tour de surveillance.
+# Seules les fenetres de ces processus sont attribuees au run : un editeur ouvert sur le script
+# ou un autre run du meme script ne peut plus fausser le verdict
+$global:RunProcessIds = $null
+
+function Update-RunProcessIds {
+    if ($global:AhkProcessId) {
+        $global:RunProcessIds = [Win32API]::GetProcessTree([uint32]$global:AhkProcessId)
+    }
+}
+
+function Test-WindowInRun {
+    param([IntPtr]$WindowHandle)
+
+    if ($null -eq $global:RunProcessIds) { return $false }
+    $windowPid = 0
+    [Win32API]::GetWindowThreadProcessId($WindowHandle, [ref]$windowPid) | Out-Null
+    return $global:RunProcessIds.Contains([uint32]$windowPid)
+}
+
 function Write-LogFile {
     param(
         [string]$Message,
         [string]$Level = "INFO"
     )
 
-    if ($global:LogFilePath -and $LogFile) {
+    if ($global:LogFilePath -and ($LogFile -or $LogPath)) {
         $timestamp = Get-Date -Format "yyyy-MM-dd HH:mm:ss.fff"
         $logEntry = "[$timestamp] [$Level] $Message"
         Add-Content -Path $global:LogFilePath -Value $logEntry -Encoding UTF8
@@ -221,7 +376,15 @@ function Write-LogFile {
 }
 
 function Initialize-LogFile {
-    if ($LogFile) {
+    if ($LogPath) {
+        # v1.8.5: Chemin explicite (dossier d'artefacts du run)
+        $logDir = Split-Path -Parent $LogPath
+        if ($logDir -and -not (Test-Path $logDir)) {
+            New-Item -ItemType Directory -Path $logDir -Force | Out-Null
+        }
+        $global:LogFilePath = $LogPath
+    }
+    elseif ($LogFile) {
         $logDir = Join-Path $PSScriptRoot "logs"
         if (-not (Test-Path $logDir)) {
             New-Item -ItemType Directory -Path $logDir -Force | Out-Null
@@ -230,7 +393,9 @@ function Initialize-LogFile {
         $scriptBaseName = [System.IO.Path]::GetFileNameWithoutExtension($ScriptPath)
         $timestamp = Get-Date -Format "yyyyMMdd_HHmmss"
         $global:LogFilePath = Join-Path $logDir "${scriptBaseName}_${timestamp}.log"
+    }
 
+    if ($global:LogFilePath) {
         Write-LogFile "=== AHK Launcher v1.5 ===" "INFO"
         Write-LogFile "Script: $ScriptPath" "INFO"
         Write-LogFile "Timeout: ${TimeoutMs}ms" "INFO"
@@ -250,7 +415,8 @@ function Test-WindowHasErrorButtons {
     try {
         # v1.2 CORRECTION CRITIQUE: Utiliser GetWindow pour parcourir les enfants
         # au lieu d'une fonction GetChildWindows inexistante
-        $allChildTexts = @()
+        # v1.9.0: List au lieu de += (copie du tableau a chaque ajout)
+        $allChildTexts = New-Object System.Collections.Generic.List[string]
         
         # Obtenir le premier enfant
         $childHandle = [Win32API]::GetWindow($WindowHandle, [Win32API]::GW_CHILD)
@@ -262,7 +428,7 @@ function Test-WindowHasErrorButtons {
             if ($length -gt 0) {
                 $text = $buffer.ToString().Trim()
                 if ($text.Length -gt 0) {
-                    $allChildTexts += $text
+                    $allChildTexts.Add($text)
                 }
             }
             
@@ -301,6 +467,11 @@ function Test-WindowIsSuccess {
         [Win32API]::EnumerateWindows()
 
         foreach ($win in [Win32API]::FoundWindows) {
+            # v1.12.0: Seulement les fenetres du run (un editeur "script.ahk - ..." n'est pas un SUCCESS)
+            if (-not (Test-WindowInRun -WindowHandle $win.Handle)) {
+                continue
+            }
+
             # Vérifier si le titre contient le nom du script
             if ($win.Title -like "*$ScriptName*") {
                 # Vérifier que ce n'est PAS une fenêtre d'erreur via les boutons
@@ -365,11 +536,8 @@ function Test-WindowIsSuccess {
 
 # v1.7: Fonction pour détecter les fenêtres appartenant à un processus spécifique (par PID)
 # Utile pour les scripts GUI avec titres personnalisés qui ne contiennent pas le nom du script
+# v1.12.0: Processus du run = processus AHK et ses descendants ($global:RunProcessIds)
 function Get-ProcessWindows {
-    param(
-        [int]$ProcessId
-    )
-
     try {
         # Énumérer toutes les fenêtres visibles
         [Win32API]::EnumerateWindows()
@@ -377,11 +545,7 @@ function Get-ProcessWindows {
         $processWindows = @()
 
         foreach ($win in [Win32API]::FoundWindows) {
-            # Obtenir le PID de la fenêtre
-            $windowPid = 0
-            [Win32API]::GetWindowThreadProcessId($win.Handle, [ref]$windowPid) | Out-Null
-
-            if ($windowPid -eq $ProcessId) {
+            if (Test-WindowInRun -WindowHandle $win.Handle) {
                 # Vérifier que ce n'est PAS une fenêtre d'erreur
                 $hasErrorButtons = Test-WindowHasErrorButtons -WindowHandle $win.Handle
 
@@ -418,7 +582,7 @@ function Get-ProcessWindows {
                     WindowText = $windowText
                 }
 
-                Write-Verbose "Found window for PID $ProcessId : '$($win.Title)' (IsError: $isError)"
+                Write-Verbose "Found window of the run: '$($win.Title)' (IsError: $isError)"
             }
         }
 
@@ -544,10 +708,6 @@ function Test-AutohotkeyAvailable {
 }
 
 function Get-ErrorWindowText {
-    param(
-        [int]$ProcessId = 0  # v1.7: Optionnel - filtrer par PID du processus AHK
-    )
-
     # NOUVELLE APPROCHE: Enumeration complete et efficace de toutes les fenetres
     Write-Verbose "Enumerating all visible windows using Win32API.EnumerateWindows()..."
 
@@ -559,19 +719,15 @@ function Get-ErrorWindowText {
         $scriptName = Split-Path -Leaf $ScriptPath
         $scriptBaseName = $scriptName.Replace(".ahk", "")
 
-        Write-Verbose "Found $([Win32API]::FoundWindows.Count) visible windows (filtering by PID: $ProcessId)"
+        Write-Verbose "Found $([Win32API]::FoundWindows.Count) visible windows (run PIDs: $($global:RunProcessIds -join ', '))"
         # Chercher les fenetres qui correspondent a notre script d'erreur
         foreach ($window in [Win32API]::FoundWindows) {
             $title = $window.Title
 
-            # v1.7: Filtrer par PID si spécifié
-            if ($ProcessId -gt 0) {
-                $windowPid = 0
-                [Win32API]::GetWindowThreadProcessId($window.Handle, [ref]$windowPid) | Out-Null
-                if ($windowPid -ne $ProcessId) {
-                    # Cette fenêtre n'appartient pas à notre processus AHK, ignorer
-                    continue
-                }
+            # v1.7: Filtrer par PID - v1.12.0: processus AHK et descendants
+            if (-not (Test-WindowInRun -WindowHandle $window.Handle)) {
+                # Cette fenêtre n'appartient pas à notre run, ignorer
+                continue
             }
 
             Write-Verbose "Inspecting window: '$title' (Handle: $($window.Handle))"
@@ -679,40 +835,21 @@ function Get-ErrorWindowText {
             # }
             
             if ($isErrorWindow) {
-                Write-Verbose "Potential error window found: '$title' - extracting smart text..."
-
-                # v1.5: Use smart extraction with control class detection
-                $smartResult = Get-WindowTextSmart -WindowHandle $window.Handle
-
-                # Build comprehensive error message from smart extraction
-                $errorMessage = ""
-                if ($smartResult.errorContent.Count -gt 0) {
-                    $errorMessage = $smartResult.errorContent -join "`n"
-                }
-                if ($smartResult.sourceCode.Count -gt 0) {
-                    if ($errorMessage) { $errorMessage += "`n`n" }
-                    $errorMessage += "Source Code:`n" + ($smartResult.sourceCode -join "`n")
-                }
-
-                if ($errorMessage -and $errorMessage.Length -gt 10) {
-                    Write-Verbose "Successfully extracted smart error text: $($smartResult.errorContent.Count) error lines, $($smartResult.sourceCode.Count) source lines"
-                    return @{
-                        Status="ERROR"
-                        Message=$errorMessage
-                        ErrorDetails=$smartResult
-                        WindowType="ERROR_WINDOW"
-                        WindowHandle=$window.Handle
-                    }
+                Write-Verbose "Potential error window found: '$title' - exporting control tree..."
+
+                # v1.9.0: Exporter les contrôles bruts une seule fois; errorDetails
+                # (errorContent, sourceCode, buttons) est construit côté Python
+                $controlTree = Get-WindowControls -WindowHandle $window.Handle
+                $fullText = Get-ControlTreeText -Tree $controlTree
+                if (-not $fullText) {
+                    $fullText = "Error detected in window: $title"
                 }
-                else {
-                    Write-Verbose "Could not extract meaningful text from error window, falling back to simple extraction"
-                    # Fallback: utiliser méthode simple
-                    $fullText = Get-WindowTextRecursive -WindowHandle $window.Handle
-                    if ($fullText) {
-                        return @{Status="ERROR"; Message=$fullText; WindowType="ERROR_WINDOW"; WindowHandle=$window.Handle}
-                    } else {
-                        return @{Status="ERROR"; Message="Error detected in window: $title"; WindowType="ERROR_WINDOW"; WindowHandle=$window.Handle}
-                    }
+                return @{
+                    Status="ERROR"
+                    Message=$fullText
+                    ControlTree=$controlTree
+                    WindowType="ERROR_WINDOW"
+                    WindowHandle=$window.Handle
                 }
             }
         }        
@@ -726,127 +863,62 @@ function Get-ErrorWindowText {
     }
 }
 
-# v1.5: Smart text extraction with control class detection
-function Get-WindowTextSmart {
+# v1.9.0: Arbre brut des contrôles (classe, texte, ordre), lu une seule fois par fenêtre
+# Remplace Get-WindowTextSmart: la classification du texte se fait dans ahk_mcp.services.error_parser
+function Get-WindowControls {
     param([IntPtr]$WindowHandle)
 
-    $result = @{
-        title = ""
-        errorContent = @()
-        sourceCode = @()
-        buttons = @()
-    }
-
-    # Titre de la fenêtre
     $titleBuffer = New-Object System.Text.StringBuilder(512)
     [Win32API]::GetWindowText($WindowHandle, $titleBuffer, $titleBuffer.Capacity) | Out-Null
-    $result.title = $titleBuffer.ToString()
 
-    # Parcourir tous les contrôles enfants
+    $controls = New-Object System.Collections.Generic.List[object]
     $childWindow = [Win32API]::GetWindow($WindowHandle, [Win32API]::GW_CHILD)
     $orderIndex = 0
 
     while ($childWindow -ne [IntPtr]::Zero) {
-        # Obtenir la classe du contrôle
         $classBuffer = New-Object System.Text.StringBuilder(256)
         [Win32API]::GetClassName($childWindow, $classBuffer, $classBuffer.Capacity) | Out-Null
-        $className = $classBuffer.ToString()
-
-        # Obtenir le texte du contrôle (buffer plus grand pour Edit)
-        $textBuffer = New-Object System.Text.StringBuilder(4096)
-        $textLength = [Win32API]::GetWindowText($childWindow, $textBuffer, $textBuffer.Capacity)
 
+        # Buffer à la taille du texte (plus de troncature des longs dialogues)
+        $text = ""
+        $textLength = [Win32API]::GetWindowTextLength($childWindow)
         if ($textLength -gt 0) {
-            $text = $textBuffer.ToString().Trim()
-
-            Write-Verbose "Control [$orderIndex]: Class='$className', Text='$text'"
-
-            # Classifier selon le type de contrôle
-            if ($className -eq "Button") {
-                # C'est un bouton
-                if ($text -match "^(&Abort|&Help|&Edit|&Reload|E&xitApp|&Continue)$") {
-                    $result.buttons += $text
-                }
-            }
-            elseif ($className -eq "Static") {
-                # C'est un contrôle Static (texte statique, peut être multiline)
-                if ($text.Length -gt 3 -and $text -notmatch "^(OK|Cancel)$") {
-                    # Split by newlines to process each line individually
-                    $lines = $text -split "`r?`n"
-                    foreach ($line in $lines) {
-                        $line = $line.Trim()
-                        if ($line.Length -gt 0) {
-                            # Identifier si c'est du code source (ligne commençant par numéro)
-                            if ($line -match "^\s*\d{3,4}:" -or $line -match "^--->\s*\d{3,4}:") {
-                                $result.sourceCode += $line
-                            } elseif ($line -notmatch "^(Line#|Line\s*#)$") {
-                                # Ignorer les séparateurs comme "Line#"
-                                $result.errorContent += $line
-                            }
-                        }
-                    }
-                }
-            }
-            elseif ($className -eq "Edit") {
-                # C'est un contrôle Edit (peut contenir code source multilignes)
-                $lines = $text -split "`r?`n"
-                foreach ($line in $lines) {
-                    $line = $line.Trim()
-                    if ($line.Length -gt 0) {
-                        if ($line -match "^\s*\d{3,4}:") {
-                            $result.sourceCode += $line
-                        } else {
-                            $result.errorContent += $line
-                        }
-                    }
-                }
-            }
+            $textBuffer = New-Object System.Text.StringBuilder($textLength + 1)
+            [Win32API]::GetWindowText($childWindow, $textBuffer, $textBuffer.Capacity) | Out-Null
+            $text = $textBuffer.ToString()
         }
 
+        $controls.Add(@{ class = $classBuffer.ToString(); text = $text; order = $orderIndex })
+
         $childWindow = [Win32API]::GetWindow($childWindow, [Win32API]::GW_HWNDNEXT)
         $orderIndex++
     }
 
-    Write-Verbose "Smart extraction result: $($result.errorContent.Count) error lines, $($result.sourceCode.Count) source lines, $($result.buttons.Count) buttons"
-    return $result
+    Write-Verbose "Control tree: $($controls.Count) controls"
+    return @{ title = $titleBuffer.ToString(); controls = $controls.ToArray() }
 }
 
-function Get-WindowTextRecursive {
-    param([IntPtr]$WindowHandle)
+# Texte de la fenêtre et des contrôles significatifs, joint par " | "
+function Get-ControlTreeText {
+    param([hashtable]$Tree)
 
-    $allText = ""
+    $parts = New-Object System.Collections.Generic.List[string]
 
-    # Texte de la fenetre principale
-    $buffer = New-Object System.Text.StringBuilder(512)
-    $length = [Win32API]::GetWindowText($WindowHandle, $buffer, $buffer.Capacity)
-    if ($length -gt 0) {
-        $mainText = $buffer.ToString()
-        if ($mainText -and $mainText -notmatch "^(OK|Cancel|&OK|&Cancel)$") {
-            $allText += $mainText + " | "
-        }
+    $mainText = $Tree.title
+    if ($mainText -and $mainText -notmatch "^(OK|Cancel|&OK|&Cancel)$") {
+        $parts.Add($mainText)
     }
 
-    # Parcourir tous les controles enfants
-    $childWindow = [Win32API]::GetWindow($WindowHandle, [Win32API]::GW_CHILD)
-
-    while ($childWindow -ne [IntPtr]::Zero) {
-        $buffer = New-Object System.Text.StringBuilder(512)
-        $length = [Win32API]::GetWindowText($childWindow, $buffer, $buffer.Capacity)
-
-        if ($length -gt 0) {
-            $text = $buffer.ToString().Trim()
-            Write-Verbose "Found child window text: '$text'"
-            # Filtrer le texte significatif
-            if ($text -and $text.Length -gt 3 -and $text -notmatch "^(OK|Cancel|&OK|&Cancel|Button)$") {
-                $allText += $text + " | "
-            }
+    foreach ($control in $Tree.controls) {
+        $text = $control.text.Trim()
+        # Filtrer le texte significatif
+        if ($text -and $text.Length -gt 3 -and $text -notmatch "^(OK|Cancel|&OK|&Cancel|Button)$") {
+            $parts.Add($text)
         }
-
-        $childWindow = [Win32API]::GetWindow($childWindow, [Win32API]::GW_HWNDNEXT)
     }
 
     # Nettoyer et retourner le texte
-    $allText = $allText.TrimEnd(" | ").Trim()
+    $allText = ($parts -join " | ").TrimEnd(" | ").Trim()
     if ($allText) {
         return $allText
     } else {
@@ -854,11 +926,23 @@ function Get-WindowTextRecursive {
     }
 }
 
+function Get-WindowTextRecursive {
+    param([IntPtr]$WindowHandle)
+
+    return Get-ControlTreeText -Tree (Get-WindowControls -WindowHandle $WindowHandle)
+}
+
 function Test-TrayIconPresent {
-    # Implementation basique : verifier si des processus AutoHotkey sont toujours actifs
-    $ahkProcesses = Get-Process | Where-Object { $_.ProcessName -like "*AutoHotkey*" }
-    if ($ahkProcesses -and $ahkProcesses.Count -gt 0) {
-        return "FOUND"
+    # Implementation basique : verifier si des processus AutoHotkey du run sont toujours actifs
+    # v1.12.0: seulement l'arbre du processus lance (plus n'importe quel AutoHotkey du systeme)
+    if (-not $global:AhkProcessId) {
+        return "NOT_FOUND"
+    }
+    foreach ($treePid in [Win32API]::GetProcessTree([uint32]$global:AhkProcessId)) {
+        $process = Get-Process -Id $treePid -ErrorAction SilentlyContinue
+        if ($process -and $process.ProcessName -like "*AutoHotkey*") {
+            return "FOUND"
+        }
     }
     return "NOT_FOUND"
 }
@@ -972,7 +1056,7 @@ try {
     # Initialize screenshot path, error window handle, and error details
     $global:ScreenshotPath = $null
     $global:ErrorWindowHandle = [IntPtr]::Zero
-    $global:ErrorDetails = $null
+    $global:ControlTree = $null
     $scriptBaseName = [System.IO.Path]::GetFileNameWithoutExtension((Split-Path -Leaf $ScriptPath))
 
     # 1. VALIDATION PARAMETRES
@@ -1007,7 +1091,11 @@ try {
     # 4. LANCEMENT PROCESSUS AVEC MONITORING - v1.2 ISOLATION COMPLÃˆTE
     Write-Verbose "Launching AutoHotkey process with full isolation..."
     Write-LogFile "Launching AutoHotkey process" "INFO"
-    $ahkProcess = Start-Process -FilePath $ahkExecutable -ArgumentList "`"$ScriptPath`"" -PassThru -WindowStyle Hidden -NoNewWindow:$false
+    # v1.10.0: Flux standard rediriges vers des fichiers (lus en continu par le serveur MCP)
+    $startArgs = @{ FilePath = $ahkExecutable; ArgumentList = "`"$ScriptPath`""; PassThru = $true; WindowStyle = "Hidden" }
+    if ($StdoutFile) { $startArgs.RedirectStandardOutput = $StdoutFile }
+    if ($StderrFile) { $startArgs.RedirectStandardError = $StderrFile }
+    $ahkProcess = Start-Process @startArgs -NoNewWindow:$false
 
     if (-not $ahkProcess) {
         Write-LogFile "Failed to start AutoHotkey process" "ERROR"
@@ -1015,6 +1103,7 @@ try {
         exit 1
     }
 
+    $global:AhkProcessId = $ahkProcess.Id
     Write-Verbose "Process started - PID: $($ahkProcess.Id)"
     Write-LogFile "Process started - PID: $($ahkProcess.Id)" "INFO"
     
@@ -1048,7 +1137,8 @@ try {
         # Rechercher fenetres d'erreur (polling plus frequent) - v1.7 DETECTION PAR PID
         $elapsed = (Get-Date) - $startTime
         Write-Verbose "Checking for error windows... (elapsed: $($elapsed.TotalMilliseconds)ms)"
-        $windowResult = Get-ErrorWindowText -ProcessId $ahkProcess.Id
+        Update-RunProcessIds
+        $windowResult = Get-ErrorWindowText
         
         # v1.2: Traiter le nouveau format de retour (objet ou texte)
         if ($windowResult -is [hashtable]) {
@@ -1073,7 +1163,7 @@ try {
                 $errorDetected = $true
                 $errorMessage = $windowResult.Message
                 $global:ErrorWindowHandle = $windowResult.WindowHandle
-                $global:ErrorDetails = $windowResult.ErrorDetails
+                $global:ControlTree = $windowResult.ControlTree
             }
         } elseif ($windowResult) {
             # Format ancien (texte simple) = ERROR dÃ©tectÃ©
@@ -1106,7 +1196,7 @@ try {
             # v1.7: Fallback - chercher les fenêtres du processus AHK par PID
             # Utile pour les scripts GUI avec titres personnalisés (ex: "Better Transcription")
             if (-not $ahkProcess.HasExited) {
-                $processWindows = Get-ProcessWindows -ProcessId $ahkProcess.Id
+                $processWindows = Get-ProcessWindows
                 # v1.7.1: Forcer array pour éviter unwrapping PowerShell
                 $nonErrorWindows = @($processWindows | Where-Object { -not $_.IsError })
 
@@ -1142,8 +1232,9 @@ try {
         # Si une erreur a été détectée, fermer le processus et arrêter
         if ($errorDetected) {
             # Fermer le processus AutoHotkey defaillant
+            # v1.8.4: sauf si l'appelant capture la fenêtre d'erreur plus tard (-KeepErrorWindow)
             try {
-                if (-not $ahkProcess.HasExited) {
+                if (-not $ahkProcess.HasExited -and -not $KeepErrorWindow) {
                     $ahkProcess.Kill()
                     $ahkProcess.WaitForExit(1000)
                 }
@@ -1201,7 +1292,7 @@ try {
 
         Write-LogFile "Final status: ERROR - $errorMessage" "ERROR"
         Write-LogFile "Total execution time: ${execTime}ms" "INFO"
-        Write-StructuredOutput -Status "ERROR" -Message $errorMessage -ErrorDetails $global:ErrorDetails -WindowHandle $global:ErrorWindowHandle -TrayIcon "NOT_FOUND" -ExecutionTimeMs $execTime -Format $OutputFormat -ScreenshotFile $global:ScreenshotPath
+        Write-StructuredOutput -Status "ERROR" -Message $errorMessage -ControlTree $global:ControlTree -WindowHandle $global:ErrorWindowHandle -TrayIcon "NOT_FOUND" -ExecutionTimeMs $execTime -Format $OutputFormat -ScreenshotFile $global:ScreenshotPath
         exit 1
     }
     elseif ($timeoutReached) {